@@ -1,13 +1,89 @@
 # -*- coding: utf-8 -*-
 """
 Supabase client for backend operations
+
+- ``supabase``: 同期クライアント（同期コード・スレッド内からの利用向け）
+- ``get_async_supabase_client()``: 非同期クライアント（``async def`` からの利用向け）
+- ``run_in_db_thread()``: 同期のDB処理をイベントループ外で実行するヘルパー
+
+同期クライアントにはイベントループ上からの呼び出しを検知するガードを仕込んでおり、
+``DB_LOOP_GUARD_MODE`` (off / warn / raise) で挙動を切り替えられる。
 """
-from supabase import create_client, Client
-from app.core.config import settings
+import asyncio
 import logging
+import traceback
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set, Tuple, TypeVar
+
+from supabase import AsyncClient, Client, acreate_client, create_client
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+class SyncDatabaseCallOnEventLoopError(RuntimeError):
+    """イベントループ上で同期DB呼び出しが行われた（DB_LOOP_GUARD_MODE=raise 時）"""
+
+
+# 同じ呼び出し箇所について警告を出し続けないための記録
+_reported_call_sites: Set[Tuple[str, int]] = set()
+
+_APP_ROOT = str(Path(__file__).resolve().parent.parent)
+
+
+def _find_app_call_site() -> Optional[traceback.FrameSummary]:
+    """スタックを遡り、アプリケーションコード内の呼び出し元フレームを返す"""
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(_APP_ROOT) and frame.filename != __file__:
+            return frame
+    return None
+
+
+def _guard_sync_request(request: Any) -> None:
+    """同期 httpx クライアントの request フック: イベントループ上での実行を検知する"""
+    mode = settings.db_loop_guard_mode
+    if mode == "off":
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # ワーカースレッド等、イベントループ外からの呼び出しは問題なし
+
+    frame = _find_app_call_site()
+    location = f"{frame.filename}:{frame.lineno}" if frame else "unknown"
+    message = (
+        f"Sync Supabase call on the event loop: {request.method} {request.url.path} "
+        f"(from {location}). Use get_async_supabase_client() or run_in_db_thread()."
+    )
+    if mode == "raise":
+        raise SyncDatabaseCallOnEventLoopError(message)
+
+    call_site = (frame.filename, frame.lineno) if frame else ("unknown", 0)
+    if call_site in _reported_call_sites:
+        return
+    _reported_call_sites.add(call_site)
+    logger.warning(message)
+
+
+def install_event_loop_guard(client: Client) -> Client:
+    """同期クライアントの PostgREST セッションにイベントループ検知フックを追加する"""
+    try:
+        session = client.postgrest.session
+        hooks: Dict[str, list] = dict(session.event_hooks)
+        request_hooks = list(hooks.get("request", []))
+        if _guard_sync_request not in request_hooks:
+            request_hooks.append(_guard_sync_request)
+        hooks["request"] = request_hooks
+        session.event_hooks = hooks
+    except Exception as e:
+        logger.warning(f"Failed to install event loop guard on Supabase client: {e}")
+    return client
+
+
 def create_supabase_client() -> Client:
     """Create a Supabase client with service role key for backend operations"""
     try:
@@ -15,7 +91,7 @@ def create_supabase_client() -> Client:
             settings.supabase_url,
             settings.supabase_service_role_key
         )
-        return supabase_client
+        return install_event_loop_guard(supabase_client)
     except Exception as e:
         logger.error(f"Failed to create Supabase client: {e}")
         raise
@@ -23,6 +99,41 @@ def create_supabase_client() -> Client:
 # Global client instance
 supabase: Client = create_supabase_client()
 
+# イベントループごとの非同期クライアント（httpx.AsyncClient はループに紐づくため）。
+# 終了したループのクライアントが残り続けたり、再利用された id() で別ループのクライアントを
+# 掴んだりしないよう、ループ自体を弱参照のキーにする
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """
+    Get the shared async Supabase client (service role key)
+
+    PostgREST への接続は HTTP/2 + keep-alive の httpx.AsyncClient でプールされ、
+    クエリ待ちの間もイベントループは他のリクエスト（SSE/Realtime配信など）を処理できる。
+    クエリビルダーの API は同期クライアントと同じで、``execute()`` を ``await`` する。
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        try:
+            client = await acreate_client(
+                settings.supabase_url,
+                settings.supabase_service_role_key
+            )
+        except Exception as e:
+            logger.error(f"Failed to create async Supabase client: {e}")
+            raise
+        # 同時初期化された場合は先に登録されたクライアントを使う
+        client = _async_clients.setdefault(loop, client)
+    return client
+
+
+async def run_in_db_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """同期クライアントを使う既存処理をワーカースレッドで実行し、イベントループを塞がない"""
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
 def test_connection() -> bool:
     """Test Supabase connection"""
     try:
@@ -32,4 +143,4 @@ def test_connection() -> bool:
         return True
     except Exception as e:
         logger.error(f"Supabase connection test failed: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -22,6 +22,62 @@ class Settings(BaseSettings):
     # --- Database ---
     supabase_url: str = Field(default_factory=lambda: os.getenv("SUPABASE_URL", ""))
     supabase_service_role_key: str = Field(default_factory=lambda: os.getenv("SUPABASE_SERVICE_ROLE_KEY", ""))
+    # イベントループ上での同期DB呼び出し検知 (off / warn / raise)
+    db_loop_guard_mode: str = Field(default_factory=lambda: os.getenv("DB_LOOP_GUARD_MODE", "warn"))
+    # プロセスイベントの書き込みバッファ（フラッシュ間隔[秒] / バッファ上限件数）
+    process_event_flush_interval: float = Field(default_factory=lambda: float(os.getenv("PROCESS_EVENT_FLUSH_INTERVAL", "0.5")))
+    process_event_buffer_size: int = Field(default_factory=lambda: int(os.getenv("PROCESS_EVENT_BUFFER_SIZE", "500")))
+    # article_context の差分保存（変更キーのみ jsonb マージ）と全体チェックポイントの間隔（保存回数）
+    context_delta_persistence: bool = Field(default_factory=lambda: os.getenv("CONTEXT_DELTA_PERSISTENCE", "true").lower() == "true")
+    context_checkpoint_interval: int = Field(default_factory=lambda: int(os.getenv("CONTEXT_CHECKPOINT_INTERVAL", "10")))
+    # ステップスナップショットをフィールド単位の内容ハッシュチャンクで保存する（false で従来の全体保存）
+    context_snapshot_chunking: bool = Field(default_factory=lambda: os.getenv("CONTEXT_SNAPSHOT_CHUNKING", "true").lower() == "true")
+    # AI ブロック編集用ナレッジキャッシュ（エントリ数 / 概算バイト数 / TTL秒）
+    edit_knowledge_cache_max_entries: int = Field(default_factory=lambda: int(os.getenv("EDIT_KNOWLEDGE_CACHE_MAX_ENTRIES", "256")))
+    edit_knowledge_cache_max_bytes: int = Field(default_factory=lambda: int(os.getenv("EDIT_KNOWLEDGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+    edit_knowledge_cache_ttl: float = Field(default_factory=lambda: float(os.getenv("EDIT_KNOWLEDGE_CACHE_TTL", "300")))
+    # ローカルディスクのキャッシュ（SQLite）。同じホストのワーカー間で共有される
+    local_cache_path: str = Field(
+        default_factory=lambda: os.getenv(
+            "LOCAL_CACHE_PATH",
+            str(Path(tempfile.gettempdir()) / "marketing-automation-cache.sqlite3")
+        )
+    )
+    # リサーチクエリ結果のキャッシュ（有効/無効 / TTL秒 / 合計バイト数 / キーに含める日付の区切り[日]）
+    research_cache_enabled: bool = Field(default_factory=lambda: os.getenv("RESEARCH_CACHE_ENABLED", "true").lower() == "true")
+    research_cache_ttl: float = Field(default_factory=lambda: float(os.getenv("RESEARCH_CACHE_TTL", "86400")))
+    research_cache_max_bytes: int = Field(default_factory=lambda: int(os.getenv("RESEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+    research_cache_date_bucket_days: int = Field(default_factory=lambda: int(os.getenv("RESEARCH_CACHE_DATE_BUCKET_DAYS", "1")))
+    # リクエスト単位の上流呼び出し計測（Server-Timing / /metrics）。/metrics は METRICS_TOKEN を設定した場合のみ Bearer 認証付きで公開
+    request_metrics_enabled: bool = Field(default_factory=lambda: os.getenv("REQUEST_METRICS_ENABLED", "true").lower() == "true")
+    request_metrics_db_call_warn_threshold: int = Field(default_factory=lambda: int(os.getenv("REQUEST_METRICS_DB_CALL_WARN_THRESHOLD", "50")))
+    metrics_token: str = Field(default_factory=lambda: os.getenv("METRICS_TOKEN", ""))
+    # background_tasks の実行方式（inline: API プロセスが確保して実行 / worker: python worker.py のワーカーが実行）
+    background_task_mode: str = Field(default_factory=lambda: os.getenv("BACKGROUND_TASK_MODE", "inline"))
+    # ワーカーの同時実行数 / リース期間[秒] / ハートビート間隔[秒] / ポーリング間隔[秒]
+    background_worker_concurrency: int = Field(default_factory=lambda: int(os.getenv("BACKGROUND_WORKER_CONCURRENCY", "8")))
+    background_task_lease_seconds: int = Field(default_factory=lambda: int(os.getenv("BACKGROUND_TASK_LEASE_SECONDS", "120")))
+    background_task_heartbeat_interval: float = Field(default_factory=lambda: float(os.getenv("BACKGROUND_TASK_HEARTBEAT_INTERVAL", "30")))
+    background_worker_poll_interval: float = Field(default_factory=lambda: float(os.getenv("BACKGROUND_WORKER_POLL_INTERVAL", "2.0")))
+    # 空きスロットのうち、ユーザー操作で作成されたタスク（generation_continue / resume）専用に残す数
+    background_worker_interactive_slots: int = Field(default_factory=lambda: int(os.getenv("BACKGROUND_WORKER_INTERACTIVE_SLOTS", "1")))
+    # 停止時に実行中タスクがステップの区切りに達するのを待つ秒数（Cloud Run の SIGTERM 猶予 10 秒以内）
+    background_task_drain_timeout: float = Field(default_factory=lambda: float(os.getenv("BACKGROUND_TASK_DRAIN_TIMEOUT", "8")))
+    # リースを持たない running タスクを孤立とみなすハートビート途絶時間[秒]
+    background_task_stale_seconds: int = Field(default_factory=lambda: int(os.getenv("BACKGROUND_TASK_STALE_SECONDS", "900")))
+    # テナント（組織・ユーザー）のプラン別の重み・同時実行上限のキャッシュ秒数 / /metrics 用のキュー集計のキャッシュ秒数
+    generation_tenant_policy_ttl: float = Field(default_factory=lambda: float(os.getenv("GENERATION_TENANT_POLICY_TTL", "300")))
+    background_task_queue_stats_max_age: float = Field(default_factory=lambda: float(os.getenv("BACKGROUND_TASK_QUEUE_STATS_MAX_AGE", "10")))
+    # 実行中プロセスが他インスタンスからのキャンセル・一時停止を確認する間隔[秒]
+    cancellation_poll_interval: float = Field(default_factory=lambda: float(os.getenv("CANCELLATION_POLL_INTERVAL", "1.0")))
+    # OpenAI API のレート制限（モデル別 RPM / TPM のトークンバケット。上限はレスポンスヘッダーで自動補正）
+    openai_rate_limit_enabled: bool = Field(default_factory=lambda: os.getenv("OPENAI_RATE_LIMIT_ENABLED", "true").lower() == "true")
+    openai_rate_limit_rpm: int = Field(default_factory=lambda: int(os.getenv("OPENAI_RATE_LIMIT_RPM", "500")))
+    openai_rate_limit_tpm: int = Field(default_factory=lambda: int(os.getenv("OPENAI_RATE_LIMIT_TPM", "200000")))
+    # モデル別の上限 "model=RPM:TPM,..."（例: gpt-5-mini=500:500000）
+    openai_rate_limits: str = Field(default_factory=lambda: os.getenv("OPENAI_RATE_LIMITS", ""))
+    # true で全ワーカー共通のバケット（Supabase）を使う
+    openai_rate_limit_shared: bool = Field(default_factory=lambda: os.getenv("OPENAI_RATE_LIMIT_SHARED", "false").lower() == "true")
 
     # --- Authentication ---
     clerk_secret_key: str = Field(default_factory=lambda: os.getenv("CLERK_SECRET_KEY", ""))
@@ -54,8 +110,48 @@ class Settings(BaseSettings):
     # Reasoning summary translation
     reasoning_translate_model: str = os.getenv("REASONING_TRANSLATE_MODEL", "gpt-5-nano")
 
+    # セクション並列執筆（各セクションを共有の指示から独立に書き、最後につなぎ文だけを補う）
+    parallel_section_writing: bool = Field(default_factory=lambda: os.getenv("PARALLEL_SECTION_WRITING", "false").lower() == "true")
+    parallel_section_writing_concurrency: int = Field(default_factory=lambda: int(os.getenv("PARALLEL_SECTION_WRITING_CONCURRENCY", "4")))
+    parallel_section_continuity_pass: bool = Field(default_factory=lambda: os.getenv("PARALLEL_SECTION_CONTINUITY_PASS", "true").lower() == "true")
+
+    # セクション執筆の会話履歴の圧縮（直近 N セクションはそのまま、それ以前は見出し+冒頭の要約にする）
+    section_writer_history_compaction: bool = Field(default_factory=lambda: os.getenv("SECTION_WRITER_HISTORY_COMPACTION", "true").lower() == "true")
+    section_writer_history_window: int = Field(default_factory=lambda: int(os.getenv("SECTION_WRITER_HISTORY_WINDOW", "2")))
+    section_writer_history_summary_chars: int = Field(default_factory=lambda: int(os.getenv("SECTION_WRITER_HISTORY_SUMMARY_CHARS", "300")))
+
+    # ユーザー入力待ちの間に、最も選ばれそうな選択肢で次のステップを先に実行しておく（一致しなければ破棄）
+    speculative_execution: bool = Field(default_factory=lambda: os.getenv("SPECULATIVE_EXECUTION", "false").lower() == "true")
+    speculative_execution_max_runs: int = Field(default_factory=lambda: int(os.getenv("SPECULATIVE_EXECUTION_MAX_RUNS", "4")))
+    speculative_execution_ttl: float = Field(default_factory=lambda: float(os.getenv("SPECULATIVE_EXECUTION_TTL", "1800")))
+
     # Scraping settings
     max_concurrent_scraping: int = int(os.getenv("MAX_CONCURRENT_SCRAPING", "5"))
+    # 共有 HTTP クライアント（HTTP/2 / タイムアウト[秒] / 全体とホストごとの同時接続数 / keep-alive[秒] / 読み込む最大バイト数）
+    scraping_http2: bool = Field(default_factory=lambda: os.getenv("SCRAPING_HTTP2", "true").lower() == "true")
+    scraping_timeout: float = Field(default_factory=lambda: float(os.getenv("SCRAPING_TIMEOUT", "5")))
+    scraping_connect_timeout: float = Field(default_factory=lambda: float(os.getenv("SCRAPING_CONNECT_TIMEOUT", "3")))
+    scraping_max_connections: int = Field(default_factory=lambda: int(os.getenv("SCRAPING_MAX_CONNECTIONS", "20")))
+    scraping_per_host_connections: int = Field(default_factory=lambda: int(os.getenv("SCRAPING_PER_HOST_CONNECTIONS", "2")))
+    scraping_keepalive_expiry: float = Field(default_factory=lambda: float(os.getenv("SCRAPING_KEEPALIVE_EXPIRY", "30")))
+    scraping_max_response_bytes: int = Field(default_factory=lambda: int(os.getenv("SCRAPING_MAX_RESPONSE_BYTES", str(5 * 1024 * 1024))))
+    # HTML パース専用のスレッド数（既定のスレッドプールとは別）
+    scraping_parse_workers: int = Field(default_factory=lambda: int(os.getenv("SCRAPING_PARSE_WORKERS", "2")))
+    # ホスト単位のスケジューリング（robots.txt のキャッシュ秒数 / Crawl-delay の上限秒 / 同じホストへの最小間隔秒）
+    scraping_robots_ttl: float = Field(default_factory=lambda: float(os.getenv("SCRAPING_ROBOTS_TTL", "86400")))
+    scraping_max_crawl_delay: float = Field(default_factory=lambda: float(os.getenv("SCRAPING_MAX_CRAWL_DELAY", "10")))
+    scraping_min_host_interval: float = Field(default_factory=lambda: float(os.getenv("SCRAPING_MIN_HOST_INTERVAL", "0")))
+    # スクレイピング結果（パース済み）のキャッシュ（sqlite / memory / none、TTL秒、ディスクとメモリの合計バイト数）
+    scrape_cache_backend: str = Field(default_factory=lambda: os.getenv("SCRAPE_CACHE_BACKEND", "sqlite"))
+    scrape_cache_ttl: float = Field(default_factory=lambda: float(os.getenv("SCRAPE_CACHE_TTL", "86400")))
+    scrape_cache_max_bytes: int = Field(default_factory=lambda: int(os.getenv("SCRAPE_CACHE_MAX_BYTES", str(128 * 1024 * 1024))))
+    scrape_cache_memory_max_bytes: int = Field(default_factory=lambda: int(os.getenv("SCRAPE_CACHE_MEMORY_MAX_BYTES", str(16 * 1024 * 1024))))
+    # SerpAPI レスポンスのキャッシュ（有効/無効 / そのまま返す秒数 / TTL秒 / 合計バイト数 / キーに含める日付の区切り[日]）
+    serp_cache_enabled: bool = Field(default_factory=lambda: os.getenv("SERP_CACHE_ENABLED", "true").lower() == "true")
+    serp_cache_fresh_seconds: float = Field(default_factory=lambda: float(os.getenv("SERP_CACHE_FRESH_SECONDS", "21600")))
+    serp_cache_ttl: float = Field(default_factory=lambda: float(os.getenv("SERP_CACHE_TTL", "86400")))
+    serp_cache_max_bytes: int = Field(default_factory=lambda: int(os.getenv("SERP_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+    serp_cache_date_bucket_days: int = Field(default_factory=lambda: int(os.getenv("SERP_CACHE_DATE_BUCKET_DAYS", "1")))
 
     # デバッグフラグ
     debug: bool = os.getenv("DEBUG", "false").lower() == "true"
@@ -108,6 +204,10 @@ class Settings(BaseSettings):
     blog_prompt_cache_scope: str = Field(default_factory=lambda: os.getenv("BLOG_PROMPT_CACHE_SCOPE", "global"))
     blog_prompt_cache_key_version: str = Field(default_factory=lambda: os.getenv("BLOG_PROMPT_CACHE_KEY_VERSION", "v1"))
     blog_prompt_cache_retention_24h: bool = Field(default_factory=lambda: os.getenv("BLOG_PROMPT_CACHE_RETENTION_24H", "true").lower() == "true")
+    # blog_process_events のINSERTをまとめる間隔（秒）
+    blog_event_flush_interval: float = Field(default_factory=lambda: float(os.getenv("BLOG_EVENT_FLUSH_INTERVAL", "0.2")))
+    # ブログ生成の同時実行数（超過分はテナント単位の公平キューで待機）
+    blog_generation_concurrency: int = Field(default_factory=lambda: int(os.getenv("BLOG_GENERATION_CONCURRENCY", "8")))
     credential_encryption_key: str = Field(default_factory=lambda: os.getenv("CREDENTIAL_ENCRYPTION_KEY", ""))
 
     # SMTP / Contact notification settings
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException
 import logging
 
 from app.common.admin_auth import get_admin_user_email_from_token
+from app.common.database import run_in_db_thread
 from app.domains.admin.service import admin_service
 from app.domains.admin.schemas import (
     UserListResponse,
@@ -289,7 +290,9 @@ async def grant_articles(
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
     try:
-        result = usage_service.grant_articles(user_id=user_id, amount=request.amount)
+        result = await run_in_db_thread(
+            usage_service.grant_articles, user_id=user_id, amount=request.amount
+        )
         if not result:
             raise HTTPException(
                 status_code=404, detail="User not found or no usage tracking record"
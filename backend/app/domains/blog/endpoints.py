@@ -28,6 +28,7 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel, Field
 
 from app.common.auth import get_current_user_id_from_token
+from app.common.database import run_in_db_thread
 from app.core.config import settings
 import logging
 from app.domains.blog.schemas import (
@@ -44,7 +45,9 @@ from app.domains.blog.services.wordpress_mcp_service import (
     clear_mcp_client_cache,
 )
 from app.domains.blog.services.generation_service import BlogGenerationService
+from app.domains.blog.services.generation_scheduler import blog_generation_scheduler
 from app.domains.usage.service import usage_service
+from app.infrastructure.cancellation import cancellation_registry
 
 logger = logging.getLogger(__name__)
 
@@ -920,8 +923,10 @@ async def start_blog_generation(
         )
 
     # 使用量プリチェック
-    org_id = _get_user_org_for_usage(user_id)
-    usage_result = usage_service.check_can_generate(user_id=user_id, organization_id=org_id)
+    org_id = await run_in_db_thread(_get_user_org_for_usage, user_id)
+    usage_result = await run_in_db_thread(
+        usage_service.check_can_generate, user_id=user_id, organization_id=org_id
+    )
     if not usage_result.allowed:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -1009,9 +1014,13 @@ async def start_blog_generation(
             detail="生成プロセスの作成に失敗しました",
         )
 
-    # バックグラウンドで生成を開始
+    # バックグラウンドで生成を開始（テナント単位の公平キューで実行枠を待つ）
+    tenant = await blog_generation_scheduler.resolve_tenant(user_id, org_id)
     generation_service = BlogGenerationService()
     background_tasks.add_task(
+        blog_generation_scheduler.run,
+        tenant,
+        process_id,
         generation_service.run_generation,
         process_id=process_id,
         user_id=user_id,
@@ -1310,6 +1319,11 @@ async def cancel_generation(
             detail="生成プロセスが見つかりません",
         )
 
+    # このインスタンスで実行中のエージェントを即座に止める（他インスタンスは状態のポーリングで検知する）
+    cancellation_registry.cancel(process_id)
+    # 実行枠を待っている場合はキューから外す
+    blog_generation_scheduler.discard(process_id)
+
     state = result.data[0]
     return BlogGenerationStateResponse(
         id=state["id"],
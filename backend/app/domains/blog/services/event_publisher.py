@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Blog AI Domain - Event Publisher
+
+blog_process_events への Realtime イベント書き込み。
+
+実行中のプロセスについては event_sequence をメモリ上で払い出す（初回のみDBの最大値から
+シードする）ため、イベントごとの ``SELECT MAX`` が不要になり、parallel_tool_calls で
+同時に発行されたイベントでも連番が重複しない。INSERT は短い間隔でまとめて行う。
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.common.database import get_async_supabase_client
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 発行後すぐに書き込むイベント（ユーザー入力待ち・終端）
+FLUSH_EVENT_TYPES = frozenset({
+    "user_input_required",
+    "generation_completed",
+    "generation_error",
+    "generation_cancelled",
+})
+
+# 書き込み失敗時に再送を試みる回数
+MAX_INSERT_ATTEMPTS = 3
+
+
+class BlogEventPublisher:
+    """
+    blog_process_events 用のシーケンス払い出し + バッチINSERT
+
+    払い出し自体は await を挟まない単純なインクリメントなので、イベントループ上では
+    ロックなしで単調増加が保証される。
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._next_sequence: Dict[str, int] = {}
+        # 同時に来た初回呼び出しでシードのクエリを1回にまとめる
+        self._seeding: Dict[str, asyncio.Task] = {}
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._attempts: Dict[Tuple[str, int], int] = {}
+        self._flusher_task: Optional[asyncio.Task] = None
+
+    async def publish(
+        self,
+        process_id: str,
+        user_id: str,
+        event_type: str,
+        event_data: Dict[str, Any],
+        flush: bool = False,
+    ) -> int:
+        """イベントに連番を割り当ててバッファに積み、割り当てた連番を返す"""
+        sequence = await self.allocate(process_id)
+        self._pending.setdefault(process_id, []).append(
+            {
+                "process_id": process_id,
+                "user_id": user_id,
+                "event_type": event_type,
+                "event_data": event_data,
+                "event_sequence": sequence,
+            }
+        )
+        if flush or event_type in FLUSH_EVENT_TYPES:
+            await self.flush(process_id)
+        else:
+            self._ensure_flusher()
+        return sequence
+
+    async def allocate(self, process_id: str) -> int:
+        """次の event_sequence を払い出す"""
+        if process_id not in self._next_sequence:
+            task = self._seeding.get(process_id)
+            if task is None:
+                task = asyncio.get_running_loop().create_task(self._load_last_sequence(process_id))
+                self._seeding[process_id] = task
+            try:
+                last_sequence = await task
+            finally:
+                self._seeding.pop(process_id, None)
+            self._next_sequence.setdefault(process_id, last_sequence + 1)
+
+        sequence = self._next_sequence[process_id]
+        self._next_sequence[process_id] = sequence + 1
+        return sequence
+
+    async def flush(self, process_id: Optional[str] = None) -> None:
+        """指定プロセス（省略時は全プロセス）のバッファを書き込む"""
+        process_ids = [process_id] if process_id else list(self._pending)
+        for pid in process_ids:
+            rows = self._pending.pop(pid, None)
+            if rows:
+                await self._insert_rows(pid, rows)
+
+    async def release(self, process_id: str) -> None:
+        """実行終了時に残りを書き込み、メモリ上の連番を破棄する（再開時はDBから再シード）"""
+        await self.flush(process_id)
+        if process_id not in self._pending:
+            self._next_sequence.pop(process_id, None)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _load_last_sequence(self, process_id: str) -> int:
+        db = await get_async_supabase_client()
+        result = await (
+            db.table("blog_process_events")
+            .select("event_sequence")
+            .eq("process_id", process_id)
+            .order("event_sequence", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if result.data:
+            return result.data[0]["event_sequence"]
+        return 0
+
+    async def _insert_rows(self, process_id: str, rows: List[Dict[str, Any]]) -> None:
+        try:
+            db = await get_async_supabase_client()
+            await db.table("blog_process_events").insert(rows).execute()
+            for row in rows:
+                self._attempts.pop((process_id, row["event_sequence"]), None)
+        except Exception as e:
+            # 連番は割り当て済みなので、再送しても順序は変わらない
+            retry = []
+            for row in rows:
+                key = (process_id, row["event_sequence"])
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts < MAX_INSERT_ATTEMPTS:
+                    self._attempts[key] = attempts
+                    retry.append(row)
+                else:
+                    self._attempts.pop(key, None)
+            if retry:
+                self._pending[process_id] = retry + self._pending.get(process_id, [])
+                self._ensure_flusher()
+            logger.warning(
+                f"イベント発行失敗 (process={process_id}, 件数={len(rows)}, 再送={len(retry)}): {e}"
+            )
+
+
+# シングルトンインスタンス
+blog_event_publisher = BlogEventPublisher(
+    flush_interval=settings.blog_event_flush_interval,
+)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Blog AI Domain - Generation Scheduler
+
+ブログ生成の開始をテナント（組織、個人契約ならユーザー）単位の重み付き公平キューで行う。
+
+- テナントの重みと同時実行上限は ``resolve_generation_tenant`` RPC（plan_tiers の
+  scheduling_weight / max_concurrent_generations）から取得し、一定時間キャッシュする
+- 実行枠（``blog_generation_concurrency``）が空くと、開始タグ（start-time fair queuing）が最も小さい
+  テナントのジョブから開始する。1つの組織が30記事をまとめて開始しても、後から来た小さなテナントの
+  ジョブは先頭付近に割り込める
+- テナントの実行中ジョブが上限に達している間は、そのテナントのジョブは待機させる
+
+ユーザー入力後の再開（continue_generation）は待っているユーザーがいるためキューを通さない。
+キューと上限はインスタンスごと。
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.common.database import get_async_supabase_client
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHT = 1
+DEFAULT_MAX_RUNNING = 2
+
+
+@dataclass(frozen=True)
+class TenantPolicy:
+    tenant_id: str
+    weight: int = DEFAULT_WEIGHT
+    max_running: Optional[int] = DEFAULT_MAX_RUNNING
+
+
+@dataclass
+class _Job:
+    process_id: str
+    start_tag: float
+    enqueued_at: float
+    future: asyncio.Future
+
+
+@dataclass
+class _TenantQueue:
+    policy: TenantPolicy
+    running: int = 0
+    # 最後に積んだジョブの終了タグ
+    last_finish_tag: float = 0.0
+    jobs: Deque[_Job] = field(default_factory=deque)
+
+    @property
+    def can_start(self) -> bool:
+        max_running = self.policy.max_running
+        return bool(self.jobs) and (max_running is None or self.running < max_running)
+
+
+@dataclass
+class GenerationSchedulerStats:
+    started: int = 0
+    # 実行枠・テナント上限のために待たされたジョブ数
+    delayed: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.__dict__)
+
+
+class BlogGenerationScheduler:
+    """テナント単位の重み付き公平キュー + テナントごとの同時実行上限"""
+
+    def __init__(self, concurrency: int, policy_ttl: float):
+        self.concurrency = concurrency
+        self.policy_ttl = policy_ttl
+        self.stats = GenerationSchedulerStats()
+        self._tenants: Dict[str, _TenantQueue] = {}
+        self._running = 0
+        self._virtual_time = 0.0
+        self._policies: Dict[Tuple[str, Optional[str]], Tuple[float, TenantPolicy]] = {}
+
+    # --- テナント ---
+
+    async def resolve_tenant(self, user_id: str, organization_id: Optional[str]) -> TenantPolicy:
+        """ユーザー・組織からテナントと契約プランの重み・同時実行上限を求める"""
+        key = (user_id, organization_id)
+        cached = self._policies.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        tenant_id = f"org:{organization_id}" if organization_id else f"user:{user_id}"
+        policy = TenantPolicy(tenant_id)
+        try:
+            db = await get_async_supabase_client()
+            result = await db.rpc("resolve_generation_tenant", {
+                "p_user_id": user_id,
+                "p_organization_id": organization_id,
+            }).execute()
+            if result.data:
+                row = result.data[0]
+                policy = TenantPolicy(
+                    tenant_id=row.get("tenant_id") or tenant_id,
+                    weight=max(int(row.get("weight") or DEFAULT_WEIGHT), 1),
+                    max_running=row.get("max_running"),
+                )
+        except Exception as e:
+            # 取得できなくても生成は止めず、既定の重みで扱う
+            logger.warning(f"テナント設定の取得に失敗 (user={user_id}, org={organization_id}): {e}")
+        self._policies[key] = (time.monotonic() + self.policy_ttl, policy)
+        return policy
+
+    # --- 実行 ---
+
+    async def run(
+        self,
+        tenant: TenantPolicy,
+        process_id: str,
+        func: Callable[..., Awaitable[Any]],
+        /,
+        **kwargs: Any,
+    ) -> None:
+        """実行枠を得てから func(**kwargs) を実行する。待機中に discard() されたら実行しない"""
+        if not await self.acquire(tenant, process_id):
+            logger.info(f"キュー待ちのブログ生成を取り消し: process_id={process_id}")
+            return
+        try:
+            await func(**kwargs)
+        finally:
+            self.release(tenant.tenant_id)
+
+    async def acquire(self, tenant: TenantPolicy, process_id: str) -> bool:
+        """実行枠を確保する。False は待機中に取り消されたことを示す"""
+        queue = self._tenants.get(tenant.tenant_id)
+        if queue is None:
+            queue = self._tenants[tenant.tenant_id] = _TenantQueue(policy=tenant)
+        else:
+            queue.policy = tenant
+
+        start_tag = max(self._virtual_time, queue.last_finish_tag)
+        queue.last_finish_tag = start_tag + 1.0 / max(tenant.weight, 1)
+        job = _Job(
+            process_id=process_id,
+            start_tag=start_tag,
+            enqueued_at=time.monotonic(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        queue.jobs.append(job)
+        self._dispatch()
+
+        if not job.future.done():
+            self.stats.delayed += 1
+            logger.info(
+                f"ブログ生成をキューに追加: process_id={process_id}, tenant={tenant.tenant_id}, "
+                f"待機={len(queue.jobs)}, 実行中={queue.running}"
+            )
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            if job in queue.jobs:
+                queue.jobs.remove(job)
+                self._dispatch()
+            elif job.future.done() and not job.future.cancelled() and job.future.result():
+                # 枠を得た直後に呼び出し元が止められた
+                self.release(tenant.tenant_id)
+            raise
+
+    def release(self, tenant_id: str) -> None:
+        queue = self._tenants.get(tenant_id)
+        if queue is not None and queue.running > 0:
+            queue.running -= 1
+            self._running -= 1
+        self._dispatch()
+
+    def discard(self, process_id: str) -> bool:
+        """キュー待ちのジョブを取り消す（キャンセルされたプロセス用）"""
+        for queue in self._tenants.values():
+            for job in queue.jobs:
+                if job.process_id == process_id:
+                    queue.jobs.remove(job)
+                    if not job.future.done():
+                        job.future.set_result(False)
+                    return True
+        return False
+
+    def _dispatch(self) -> None:
+        while self._running < self.concurrency:
+            candidates = [queue for queue in self._tenants.values() if queue.can_start]
+            if not candidates:
+                break
+            queue = min(candidates, key=lambda q: q.jobs[0].start_tag)
+            job = queue.jobs.popleft()
+            queue.running += 1
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, job.start_tag)
+
+            waited = time.monotonic() - job.enqueued_at
+            self.stats.started += 1
+            self.stats.wait_seconds += waited
+            self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+            job.future.set_result(True)
+
+        # 空になったテナントの状態は捨てる（次回は現在の仮想時刻から始まる）
+        for tenant_id in [t for t, q in self._tenants.items() if not q.jobs and q.running == 0]:
+            del self._tenants[tenant_id]
+
+    # --- メトリクス ---
+
+    def metrics(self) -> Dict[str, float]:
+        now = time.monotonic()
+        queued = [job for queue in self._tenants.values() for job in queue.jobs]
+        return {
+            **self.stats.as_dict(),
+            "running": self._running,
+            "queued": len(queued),
+            "tenants_queued": sum(1 for queue in self._tenants.values() if queue.jobs),
+            "max_tenant_queued": max((len(queue.jobs) for queue in self._tenants.values()), default=0),
+            "oldest_queued_seconds": max((now - job.enqueued_at for job in queued), default=0.0),
+        }
+
+
+# シングルトンインスタンス
+blog_generation_scheduler = BlogGenerationScheduler(
+    concurrency=settings.blog_generation_concurrency,
+    policy_ttl=settings.generation_tenant_policy_ttl,
+)
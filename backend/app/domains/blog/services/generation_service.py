@@ -31,13 +31,19 @@ from agents.items import (
 
 from openai import APIConnectionError, APITimeoutError, AsyncOpenAI
 
-from app.common.database import supabase
+from app.common.database import (
+    get_async_supabase_client,
+    run_in_db_thread,
+    supabase,
+)
 from app.domains.usage.service import usage_service
+from app.infrastructure.cancellation import GenerationCancelled, cancellation_registry
 import logging
 
 from app.core.config import settings
 from app.domains.blog.agents.definitions import build_blog_writer_agent
 from app.domains.blog.schemas import BlogCompletionOutput
+from app.domains.blog.services.event_publisher import blog_event_publisher
 from app.domains.blog.services.wordpress_mcp_service import (
     clear_mcp_client_cache,
     set_mcp_context,
@@ -328,8 +334,9 @@ class BlogGenerationService:
             )
 
             # アップロード済み画像を取得
-            db_images = (
-                supabase.table("blog_generation_state")
+            db = await get_async_supabase_client()
+            db_images = await (
+                db.table("blog_generation_state")
                 .select("uploaded_images")
                 .eq("id", process_id)
                 .single()
@@ -357,10 +364,14 @@ class BlogGenerationService:
             )
 
             # ログセッションを確保（ブログAI用）
-            log_session_id = self._get_or_create_log_session(
+            usage_org_id = await run_in_db_thread(
+                self._get_user_org_for_usage, user_id
+            )
+            log_session_id = await run_in_db_thread(
+                self._get_or_create_log_session,
                 process_id=process_id,
                 user_id=user_id,
-                organization_id=self._get_user_org_for_usage(user_id),
+                organization_id=usage_org_id,
                 wordpress_site_id=wordpress_site.get("id"),
                 initial_input={
                     "user_prompt": user_prompt,
@@ -380,6 +391,8 @@ class BlogGenerationService:
                 existing_conversation_history=None,
             )
 
+        except GenerationCancelled:
+            logger.info(f"生成を中断しました: process_id={process_id}")
         except Exception as e:
             logger.error(f"生成エラー: {e}", exc_info=True)
             await self._update_state(
@@ -393,6 +406,9 @@ class BlogGenerationService:
                 "generation_error",
                 {"error": str(e), "message": f"エラーが発生しました: {str(e)}"},
             )
+        finally:
+            # 実行終了時に未送信イベントを書き込み、連番の払い出し状態を破棄
+            await blog_event_publisher.release(process_id)
 
     async def continue_generation(
         self,
@@ -412,8 +428,9 @@ class BlogGenerationService:
         """
         try:
             # 現在の状態を取得
-            db_result = (
-                supabase.table("blog_generation_state")
+            db = await get_async_supabase_client()
+            db_result = await (
+                db.table("blog_generation_state")
                 .select("blog_context")
                 .eq("id", process_id)
                 .single()
@@ -472,10 +489,14 @@ class BlogGenerationService:
             )
 
             # ログセッションを確保（ブログAI用）
-            log_session_id = self._get_or_create_log_session(
+            usage_org_id = await run_in_db_thread(
+                self._get_user_org_for_usage, user_id
+            )
+            log_session_id = await run_in_db_thread(
+                self._get_or_create_log_session,
                 process_id=process_id,
                 user_id=user_id,
-                organization_id=self._get_user_org_for_usage(user_id),
+                organization_id=usage_org_id,
                 wordpress_site_id=wordpress_site.get("id"),
                 initial_input={
                     "user_prompt": blog_context.get("user_prompt"),
@@ -530,6 +551,8 @@ class BlogGenerationService:
                 existing_conversation_history=conversation_history,
             )
 
+        except GenerationCancelled:
+            logger.info(f"継続生成を中断しました: process_id={process_id}")
         except Exception as e:
             logger.error(f"継続生成エラー: {e}", exc_info=True)
             await self._update_state(
@@ -543,11 +566,15 @@ class BlogGenerationService:
                 "generation_error",
                 {"error": str(e), "message": f"エラーが発生しました: {str(e)}"},
             )
+        finally:
+            # 実行終了時に未送信イベントを書き込み、連番の払い出し状態を破棄
+            await blog_event_publisher.release(process_id)
 
     async def get_process_state(self, process_id: str) -> Optional[Dict[str, Any]]:
         """プロセス状態を取得"""
-        result = (
-            supabase.table("blog_generation_state")
+        db = await get_async_supabase_client()
+        result = await (
+            db.table("blog_generation_state")
             .select("*")
             .eq("id", process_id)
             .single()
@@ -557,8 +584,9 @@ class BlogGenerationService:
 
     async def cancel_generation(self, process_id: str) -> bool:
         """生成をキャンセル"""
-        result = (
-            supabase.table("blog_generation_state")
+        db = await get_async_supabase_client()
+        result = await (
+            db.table("blog_generation_state")
             .select("user_id")
             .eq("id", process_id)
             .single()
@@ -570,12 +598,18 @@ class BlogGenerationService:
 
         user_id = result.data.get("user_id")
         await self._update_state(process_id, status="cancelled")
+        # このインスタンスで実行中ならストリームを即座に止める（他インスタンスは状態のポーリングで検知する）
+        cancellation_registry.cancel(process_id)
         await self._publish_event(
             process_id,
             user_id,
             "generation_cancelled",
             {"message": "記事生成がキャンセルされました"},
         )
+        # 実行外で払い出した連番を残すと、他インスタンスが後から書いたイベントと連番が重複する。
+        # このインスタンスで実行中なら実行側の finally で破棄される
+        if cancellation_registry.get(process_id) is None:
+            await blog_event_publisher.release(process_id)
         return True
 
     # ===========================================================
@@ -632,50 +666,69 @@ class BlogGenerationService:
             getattr(settings, "blog_generation_stream_retry_delay_seconds", 1.5) or 1.5
         )
 
-        for attempt in range(1, max_attempts + 1):
-            try:
-                await self._run_agent_streamed(
-                    process_id=process_id,
-                    user_id=user_id,
-                    agent_input=agent_input,
-                    run_config=run_config,
-                    previous_response_id=previous_response_id,
-                    base_progress=base_progress,
-                    log_session_id=log_session_id,
-                    existing_conversation_history=existing_conversation_history,
-                )
-                return
-            except Exception as exc:
-                is_retryable = self._is_retryable_stream_exception(exc)
-                is_last_attempt = attempt >= max_attempts
-                if not is_retryable or is_last_attempt:
-                    raise
-
-                wait_seconds = min(base_delay * (2 ** (attempt - 1)), 8.0)
-                logger.warning(
-                    "Stream connection interrupted; retrying "
-                    f"(attempt {attempt + 1}/{max_attempts}, wait={wait_seconds:.1f}s): {exc}"
-                )
+        async with cancellation_registry.scope(
+            process_id, poll=lambda: self._cancel_reason(process_id)
+        ) as cancel_token:
+            for attempt in range(1, max_attempts + 1):
                 try:
-                    await self._update_state(
-                        process_id,
-                        status="in_progress",
-                        current_step_name="通信エラーが発生したため再試行しています",
-                        progress_percentage=max(base_progress, 20),
+                    await self._run_agent_streamed(
+                        process_id=process_id,
+                        user_id=user_id,
+                        agent_input=agent_input,
+                        run_config=run_config,
+                        previous_response_id=previous_response_id,
+                        base_progress=base_progress,
+                        log_session_id=log_session_id,
+                        existing_conversation_history=existing_conversation_history,
                     )
-                    await self._publish_event(
-                        process_id,
-                        user_id,
-                        "generation_warning",
-                        {
-                            "message": "通信が不安定なため自動再試行しています",
-                            "attempt": attempt + 1,
-                            "max_attempts": max_attempts,
-                        },
+                    return
+                except Exception as exc:
+                    is_retryable = self._is_retryable_stream_exception(exc)
+                    is_last_attempt = attempt >= max_attempts
+                    if not is_retryable or is_last_attempt:
+                        raise
+                    # キャンセル済みなら状態を in_progress に戻さずに終える
+                    cancel_token.raise_if_cancelled()
+
+                    wait_seconds = min(base_delay * (2 ** (attempt - 1)), 8.0)
+                    logger.warning(
+                        "Stream connection interrupted; retrying "
+                        f"(attempt {attempt + 1}/{max_attempts}, wait={wait_seconds:.1f}s): {exc}"
                     )
-                except Exception as notify_err:
-                    logger.debug(f"Retry notification failed: {notify_err}")
-                await asyncio.sleep(wait_seconds)
+                    try:
+                        await self._update_state(
+                            process_id,
+                            status="in_progress",
+                            current_step_name="通信エラーが発生したため再試行しています",
+                            progress_percentage=max(base_progress, 20),
+                        )
+                        await self._publish_event(
+                            process_id,
+                            user_id,
+                            "generation_warning",
+                            {
+                                "message": "通信が不安定なため自動再試行しています",
+                                "attempt": attempt + 1,
+                                "max_attempts": max_attempts,
+                            },
+                        )
+                    except Exception as notify_err:
+                        logger.debug(f"Retry notification failed: {notify_err}")
+                    await cancel_token.run(asyncio.sleep(wait_seconds))
+
+    async def _cancel_reason(self, process_id: str) -> Optional[str]:
+        """他インスタンスで受け付けたキャンセルを検出する"""
+        db = await get_async_supabase_client()
+        result = await (
+            db.table("blog_generation_state")
+            .select("status")
+            .eq("id", process_id)
+            .limit(1)
+            .execute()
+        )
+        if result.data and result.data[0].get("status") == "cancelled":
+            return "cancelled"
+        return None
 
     async def _run_agent_streamed(
         self,
@@ -719,7 +772,9 @@ class BlogGenerationService:
 
         if log_session_id and logging_service:
             try:
-                step_number = self._get_next_execution_step(log_session_id)
+                step_number = await run_in_db_thread(
+                    self._get_next_execution_step, log_session_id
+                )
                 execution_id = logging_service.create_execution_log(
                     session_id=log_session_id,
                     agent_name=self._agent.name,
@@ -771,6 +826,10 @@ class BlogGenerationService:
                 max_turns=settings.blog_generation_max_turns,
                 previous_response_id=previous_response_id,
             )
+            # キャンセルされたら次のイベントを待たずにストリーム（実行中のモデル呼び出し）を止める
+            cancel_token = cancellation_registry.get(process_id)
+            if cancel_token:
+                cancel_token.add_callback(result.cancel)
 
             tool_call_count = 0
             total_estimated_tools = 10
@@ -1067,6 +1126,9 @@ class BlogGenerationService:
                                 event.item.raw_item
                             )
 
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+
             # 最終結果を取得（構造化出力: BlogCompletionOutput）
             final_result: Optional[BlogCompletionOutput] = result.final_output
             logger.info(f"Agent実行完了: process_id={process_id}")
@@ -1112,7 +1174,7 @@ class BlogGenerationService:
                 cache_config=cache_config,
             )
 
-            self._flush_trace_events(trace_events)
+            await run_in_db_thread(self._flush_trace_events, trace_events)
 
             # ========================================
             # ユーザー質問検出 → 入力待ち遷移
@@ -1217,7 +1279,7 @@ class BlogGenerationService:
                     )
                 )
                 trace_sequence += 1
-                self._flush_trace_events(trace_events)
+                await run_in_db_thread(self._flush_trace_events, trace_events)
             if execution_id and logging_service:
                 try:
                     logging_service.update_execution_log(
@@ -2437,8 +2499,9 @@ class BlogGenerationService:
 
         # 生成成功時に使用量をカウント
         try:
-            org_id = self._get_user_org_for_usage(user_id)
-            usage_service.record_success(
+            org_id = await run_in_db_thread(self._get_user_org_for_usage, user_id)
+            await run_in_db_thread(
+                usage_service.record_success,
                 user_id=user_id,
                 process_id=process_id,
                 organization_id=org_id,
@@ -2533,7 +2596,8 @@ class BlogGenerationService:
         if blog_context is not None:
             update_data["blog_context"] = blog_context
 
-        supabase.table("blog_generation_state").update(update_data).eq(
+        db = await get_async_supabase_client()
+        await db.table("blog_generation_state").update(update_data).eq(
             "id", process_id
         ).execute()
 
@@ -2561,30 +2625,14 @@ class BlogGenerationService:
         event_type: str,
         event_data: Dict[str, Any],
     ) -> None:
-        """Realtimeイベントを発行"""
+        """Realtimeイベントを発行（連番はメモリ上で払い出し、INSERTはまとめて行う）"""
         try:
-            result = (
-                supabase.table("blog_process_events")
-                .select("event_sequence")
-                .eq("process_id", process_id)
-                .order("event_sequence", desc=True)
-                .limit(1)
-                .execute()
+            await blog_event_publisher.publish(
+                process_id,
+                user_id,
+                event_type,
+                event_data,
             )
-
-            next_sequence = 1
-            if result.data:
-                next_sequence = result.data[0]["event_sequence"] + 1
-
-            supabase.table("blog_process_events").insert(
-                {
-                    "process_id": process_id,
-                    "user_id": user_id,
-                    "event_type": event_type,
-                    "event_data": event_data,
-                    "event_sequence": next_sequence,
-                }
-            ).execute()
         except Exception as e:
             logger.warning(f"イベント発行失敗: {e}")
 
@@ -9,6 +9,7 @@ from datetime import datetime
 import uuid
 
 from app.common.database import supabase
+from app.domains.seo_article.services.edit_knowledge_cache import edit_knowledge_cache
 from app.domains.company.schemas import (
     CompanyInfoCreate, 
     CompanyInfoUpdate, 
@@ -59,6 +60,7 @@ class CompanyService:
             
             if result.data:
                 logger.info(f"Company created successfully: {company_dict['id']} for user {user_id}")
+                edit_knowledge_cache.invalidate_user(user_id)
                 return CompanyInfoResponse(**result.data[0])
             else:
                 raise Exception("Failed to create company")
@@ -191,6 +193,7 @@ class CompanyService:
 
             if result.data:
                 logger.info(f"Company updated successfully: {company_id} for user {user_id}")
+                edit_knowledge_cache.invalidate_user(user_id)
                 return CompanyInfoResponse(**result.data[0])
             else:
                 raise Exception("Failed to update company")
@@ -244,6 +247,7 @@ class CompanyService:
                 .execute()
 
             logger.info(f"Company deleted successfully: {company_id} for user {user_id}")
+            edit_knowledge_cache.invalidate_user(user_id)
             return True
 
         except HTTPException:
@@ -285,6 +289,7 @@ class CompanyService:
 
             if result.data:
                 logger.info(f"Default company set successfully: {request.company_id} for user {user_id}")
+                edit_knowledge_cache.invalidate_user(user_id)
                 return CompanyInfoResponse(**result.data[0])
             else:
                 raise Exception("Failed to set default company")
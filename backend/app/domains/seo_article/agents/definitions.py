@@ -15,7 +15,7 @@ from app.domains.seo_article.schemas import (
     ResearchQueryResult, ResearchReport, RevisedArticle, 
     GeneratedPersonasResponse, SerpKeywordAnalysisReport, 
     ArticleSectionWithImages, ThemeProposal, ClarificationNeeded,
-    ResearchPlan, Outline
+    ResearchPlan, Outline, SectionContinuityReport
 )
 from app.domains.seo_article.agents.tools import web_search_tool
 from app.domains.seo_article.context import ArticleContext
@@ -1538,6 +1538,27 @@ section_writer_with_images_agent = Agent[ArticleContext](
     output_type=ArticleSectionWithImages,
 )
 
+# 6-3. 並列執筆したセクションのつなぎ文を補うエージェント（PARALLEL_SECTION_WRITING）
+SECTION_CONTINUITY_AGENT_PROMPT = """
+あなたはSEO記事の編集者です。
+記事の各セクションは別々のライターが並行して執筆したため、セクション間の流れが途切れている可能性があります。
+各セクションの見出しと冒頭・末尾の抜粋を読み、次のセクションへの移行が唐突な箇所にだけ、
+前のセクションの末尾に追加する短いつなぎ文（1〜2文、`<p>` 要素1つ）を作成してください。
+
+**ルール:**
+- 既存の本文は書き換えない。つなぎ文は新しい事実・数値・固有名詞を含めない
+- 自然につながっている箇所、最後のセクションにはつなぎ文を作らない（空文字にするか省略する）
+- 見出しタグ、画像プレースホルダー、リンクは含めない
+- 記事のトーンと文体（です・ます調など）を抜粋に合わせる
+"""
+section_continuity_agent = Agent[ArticleContext](
+    name="SectionContinuityAgent",
+    instructions=SECTION_CONTINUITY_AGENT_PROMPT,
+    model=settings.writing_model,
+    model_settings=ModelSettings(max_tokens=4096),
+    output_type=SectionContinuityReport,
+)
+
 # 7. 推敲・編集エージェント
 EDITOR_AGENT_BASE_PROMPT = """
 あなたはプロの編集者兼SEOスペシャリストです。
@@ -35,6 +35,7 @@ class ArticleContext:
     flow_type: Optional[Literal["research_first", "outline_first"]] = None  # "research_first"（リサーチ先行） or "outline_first"（構成先行）
     auto_mode: bool = False  # ユーザー承認ステップを自動解決するか
     auto_selection_strategy: str = "best_match"  # first / best_match
+    bypass_research_cache: bool = False  # リサーチ結果のキャッシュを読まずに必ずリサーチするか
 
     # 会社情報 - 基本情報
     company_name: Optional[str] = None
@@ -122,6 +123,8 @@ class ArticleContext:
     error_message: Optional[str] = None
     last_agent_output: Optional[Union[AgentOutput, ArticleSection]] = None
     section_writer_history: List[Dict[str, Any]] = field(default_factory=list)
+    # セクション執筆の入力トークン概算（全履歴の場合 / 圧縮後に実際に送った分）
+    section_writer_token_report: Dict[str, int] = field(default_factory=dict)
 
     # --- Responses API conversation continuity (optional, for future use) ---
     responses_conversation_id: Optional[str] = None
@@ -159,6 +162,11 @@ class ArticleContext:
         elif self.persona_type and not self.persona_types:
             self.persona_types = [self.persona_type]
 
+        # 永続化の差分追跡用（"_" 始まりの属性は article_context に保存されない）
+        self._persisted_field_digests: Dict[str, str] = {}
+        self._persisted_list_lengths: Dict[str, int] = {}
+        self._delta_saves_since_checkpoint: int = 0
+
     def get_full_draft(self) -> str:
         return "\n".join(self.generated_sections_html)
 
@@ -204,5 +212,42 @@ class ArticleContext:
         self.final_article_id = None
         self.last_agent_output = None
         self.section_writer_history = []
+        self.section_writer_token_report = {}
+
+    # --- 永続化の差分追跡 ---
+    # article_context はトップレベルのキー単位で差分保存する。リスト要素の更新など
+    # in-place の変更も検知できるよう、代入の監視ではなく前回保存時のダイジェストと比較する。
+    def has_persisted_state(self) -> bool:
+        """DB上の article_context と対応付いたダイジェストを保持しているか"""
+        return bool(self.__dict__.get("_persisted_field_digests"))
+
+    def get_dirty_fields(self, field_digests: Dict[str, str]) -> List[str]:
+        """前回保存時から内容が変わったトップレベルのフィールド名を返す"""
+        persisted = self.__dict__.get("_persisted_field_digests") or {}
+        return [key for key, digest in field_digests.items() if persisted.get(key) != digest]
+
+    def get_persisted_list_state(self, key: str) -> Optional[tuple]:
+        """リスト型フィールドの前回保存時の (要素数, ダイジェスト) を返す"""
+        length = (self.__dict__.get("_persisted_list_lengths") or {}).get(key)
+        digest = (self.__dict__.get("_persisted_field_digests") or {}).get(key)
+        if length is None or digest is None:
+            return None
+        return length, digest
+
+    def mark_fields_persisted(
+        self,
+        field_digests: Dict[str, str],
+        list_lengths: Dict[str, int],
+        full: bool,
+    ) -> None:
+        """保存済みのダイジェストを記録する（full=True はチェックポイント扱い）"""
+        if full:
+            self._persisted_field_digests = dict(field_digests)
+            self._persisted_list_lengths = dict(list_lengths)
+            self._delta_saves_since_checkpoint = 0
+        else:
+            self._persisted_field_digests.update(field_digests)
+            self._persisted_list_lengths.update(list_lengths)
+            self._delta_saves_since_checkpoint += 1
 
     # yield_sse_event は article_service 内のヘルパー関数 _send_server_event に置き換え
@@ -10,7 +10,7 @@ This module provides:
 """
 
 import asyncio
-from fastapi import APIRouter, status, Depends, HTTPException, Query, BackgroundTasks, Request
+from fastapi import APIRouter, status, Depends, HTTPException, Query, BackgroundTasks, Request, Response
 from typing import List, Optional, Dict, Any, Literal
 import logging
 from datetime import datetime
@@ -37,6 +37,7 @@ from app.domains.company.service import CompanyService
 from app.domains.seo_article.services.flow_service import get_supabase_client
 from app.infrastructure.logging.service import LoggingService
 from app.domains.seo_article.services.version_service import get_version_service
+from app.domains.seo_article.services.edit_knowledge_cache import edit_knowledge_cache
 from app.domains.seo_article.services.article_agent_wrapper import (
     get_article_agent_service,
     AgentSessionAccessError,
@@ -45,8 +46,6 @@ from app.domains.seo_article.services.article_agent_wrapper import (
 
 # 静的: 1タグHTMLの出力検疫用設定
 SAFE_URL_SCHEMES = {"http", "https", "mailto", "tel"}
-_knowledge_cache: Dict[str, Dict[str, Any]] = {}
-_knowledge_cache_ttl_sec = 60
 
 security = HTTPBearer(auto_error=False)
 
@@ -155,11 +154,11 @@ class ProcessEventResponse(BaseModel):
 async def assemble_edit_knowledge(article_id: str, user_id: str, article_record: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """記事に紐づくコンテキスト、会社情報、スタイルテンプレート等を収集して返す。
 
-    60秒キャッシュにより同一記事の連続呼び出しを最適化。
+    edit_knowledge_cache（サイズ上限付き LRU、会社情報・スタイル・記事の変更で無効化）により
+    同一記事の連続呼び出しを最適化。
     """
-    cache_key = f"{user_id}:{article_id}"
-    cached = _knowledge_cache.get(cache_key)
-    if cached and (time.time() - cached.get("cached_at", 0) < _knowledge_cache_ttl_sec):
+    cached = edit_knowledge_cache.get(user_id, article_id)
+    if cached is not None:
         return cached
 
     supabase = get_supabase_client()
@@ -214,8 +213,13 @@ async def assemble_edit_knowledge(article_id: str, user_id: str, article_record:
         "context_keywords": getattr(context, "initial_keywords", []) if context else []
     }
 
-    knowledge["cached_at"] = time.time()
-    _knowledge_cache[cache_key] = knowledge
+    edit_knowledge_cache.put(
+        user_id,
+        article_id,
+        knowledge,
+        process_id=process_id,
+        style_template_id=(style_template or {}).get("id"),
+    )
     return knowledge
 
 
@@ -515,10 +519,12 @@ async def get_articles(
 
 @router.get("/all-processes", response_model=List[dict], status_code=status.HTTP_200_OK)
 async def get_all_processes(
+    response: Response,
     user_id: str = Depends(get_current_user_id_from_token),
     status_filter: Optional[str] = Query(None, description="Filter by status (completed, in_progress, error, etc.)"),
     limit: int = Query(20, description="Number of items to return"),
-    offset: int = Query(0, description="Number of items to skip")
+    offset: int = Query(0, description="Number of items to skip"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header of the previous page")
 ):
     """
     Get all processes (completed articles + in-progress/failed generation processes) for the user.
@@ -528,17 +534,27 @@ async def get_all_processes(
     - status_filter: Filter by status (optional)
     - limit: Maximum number of items to return (default: 20)
     - offset: Number of items to skip for pagination (default: 0)
+    - cursor: Keyset cursor for the next page (optional, preferred over offset for deep pages)
     
     **Returns:**
     - List of articles and generation processes with unified format
+    - X-Next-Cursor header when more items may follow
     """
+    if cursor:
+        try:
+            article_service.persistence_service.decode_process_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     try:
         processes = await article_service.get_all_user_processes(
             user_id=user_id,
             status_filter=status_filter,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
+        if limit > 0 and len(processes) == limit:
+            response.headers["X-Next-Cursor"] = article_service.persistence_service.encode_process_cursor(processes[-1])
         return processes
     except Exception as e:
         logger.error(f"Error getting all processes for user {user_id}: {e}")
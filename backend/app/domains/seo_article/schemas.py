@@ -76,6 +76,12 @@ class GenerateArticleRequest(BaseModel):
         description="オートモード時に候補を選ぶ戦略（first: 先頭固定, best_match: コンテキストに最も合うもの）"
     )
 
+    # --- リサーチキャッシュ ---
+    bypass_research_cache: bool = Field(
+        False,
+        description="同じ日の同じ検索クエリのリサーチ結果を再利用せず、必ずリサーチし直すかどうか"
+    )
+
     @field_validator("target_age_group", "persona_type", mode="before")
     @classmethod
     def _coerce_to_list(cls, v):
@@ -340,6 +346,15 @@ class ArticleSectionWithImages(BaseModel):
     order: int = Field(description="セクション順序")
     images: List[ImagePlaceholderData] = Field(default_factory=list, description="画像プレースホルダー")
 
+class SectionTransition(BaseModel):
+    """並列執筆したセクションの末尾に補うつなぎ文"""
+    section_index: int = Field(description="つなぎ文を末尾に追加するセクションのインデックス (0ベース)")
+    bridge_html: str = Field("", description="次のセクションへ自然につなぐ1〜2文の<p>要素。不要なら空文字")
+
+class SectionContinuityReport(BaseModel):
+    """並列執筆後の整合パスの結果"""
+    transitions: List[SectionTransition] = Field(default_factory=list, description="セクション間のつなぎ文")
+
 class RevisedArticle(BaseModel):
     """修正済み記事"""
     title: str = Field(description="記事タイトル")
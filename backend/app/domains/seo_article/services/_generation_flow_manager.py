@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import asyncio
+import copy
 import json
+import re
 import time
 import traceback
 import logging
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional, Union
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Tuple, Union
 from openai import BadRequestError, AuthenticationError
 from agents import Runner, RunConfig, Agent, trace
 from agents import tracing as agent_tracing
@@ -35,15 +37,22 @@ from app.domains.seo_article.schemas import (
     ThemeProposal, ResearchPlan, ResearchQueryResult, ResearchReport, Outline,
     RevisedArticle, ClarificationNeeded, StatusUpdate, ArticleSection, GeneratedPersonasResponse, ThemeProposal as ThemeIdea,
     SerpKeywordAnalysisReport,
-    ArticleSectionWithImages
+    ArticleSectionWithImages, SectionContinuityReport
 )
 from app.domains.seo_article.agents.definitions import (
     theme_agent, research_planner_agent, researcher_agent, research_synthesizer_agent,
     outline_agent, section_writer_agent, editor_agent, persona_generator_agent,
     serp_keyword_analysis_agent,
     section_writer_with_images_agent,
-    research_agent  # 統一版リサーチエージェント
+    section_continuity_agent,
+    research_agent,  # 統一版リサーチエージェント
+    build_enhanced_company_context,
 )
+from app.domains.seo_article.agents.tools import web_search_tool
+from app.domains.seo_article.services.process_event_bus import process_event_bus
+from app.domains.seo_article.services.research_cache import prompt_scope, research_cache, search_locale
+from app.domains.seo_article.services.section_history import build_section_writer_input, log_token_report
+from app.infrastructure.cancellation import raise_if_cancelled, run_cancellable
 
 console = Console()
 logger = logging.getLogger(__name__)
@@ -823,9 +832,8 @@ class GenerationFlowManager:
             try:
                 console.print(f"🔍 リサーチクエリ {query_index+1}/{total_queries}: {query.query}")
                 
-                current_agent = researcher_agent
                 agent_input = query.query
-                agent_output = await self.run_agent(current_agent, agent_input, context, run_config)
+                agent_output = await self.run_research_query(context, query, agent_input, run_config)
 
                 if isinstance(agent_output, ResearchQueryResult):
                     console.print(f"[green]✅ クエリ {query_index+1} のリサーチが完了しました。[/green]")
@@ -839,22 +847,15 @@ class GenerationFlowManager:
                 logger.error(f"Error in research query {query_index + 1}: {e}")
                 return query_index, None, False
         
-        # Execute all queries in parallel with concurrency limit
-        # Limit concurrent requests to prevent API rate limiting
-        semaphore = asyncio.Semaphore(5)  # Max 5 concurrent research queries
-        
-        async def execute_with_semaphore(query, query_index: int):
-            """Execute query with concurrency control"""
-            async with semaphore:
-                return await execute_single_query(query, query_index)
-        
+        # Execute all queries in parallel
+        # OpenAI API rate limits are enforced process-wide by openai_rate_limiter (per model RPM/TPM)
         tasks = [
-            execute_with_semaphore(query, i) 
+            execute_single_query(query, i)
             for i, query in enumerate(context.research_plan.queries)
         ]
         
-        # Wait for all queries to complete
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Wait for all queries to complete (a cancel aborts every in-flight query)
+        results = await run_cancellable(context.process_id, asyncio.gather(*tasks, return_exceptions=True))
         
         # Process results in original order
         successful_queries = 0
@@ -1011,14 +1012,14 @@ class GenerationFlowManager:
                 try:
                     console.print(f"[dim]エージェント {agent.name} 実行開始 (試行 {attempt + 1}/{settings.max_retries})...[/dim]")
                     
-                    # エージェント実行
-                    result = await Runner.run(
+                    # エージェント実行（プロセスがキャンセルされたら実行中のリクエストごと中断する）
+                    result = await run_cancellable(process_id, Runner.run(
                         starting_agent=agent,
                         input=input_data,
                         context=context,
                         run_config=run_config,
                         max_turns=10
-                    )
+                    ))
                     
                     console.print(f"[dim]エージェント {agent.name} 実行完了。[/dim]")
 
@@ -1046,7 +1047,7 @@ class GenerationFlowManager:
                         break
                     
                     delay = settings.initial_retry_delay * (2 ** attempt)
-                    await asyncio.sleep(delay)
+                    await run_cancellable(process_id, asyncio.sleep(delay))
 
             # リトライ上限到達時の処理
             if last_exception:
@@ -1067,7 +1068,7 @@ class GenerationFlowManager:
         """エージェント出力の検証と変換"""
         if isinstance(output, (ThemeProposal, Outline, RevisedArticle, ClarificationNeeded, StatusUpdate, 
                              ResearchPlan, ResearchQueryResult, ResearchReport, GeneratedPersonasResponse, 
-                             SerpKeywordAnalysisReport, ArticleSectionWithImages)):
+                             SerpKeywordAnalysisReport, ArticleSectionWithImages, SectionContinuityReport)):
             return output
         elif isinstance(output, str):
             # SectionWriterAgent / EditorAgent / ResearchAgent can return raw text
@@ -1568,9 +1569,8 @@ class GenerationFlowManager:
                         ))
                     
                     # Execute research query
-                    current_agent = researcher_agent
                     agent_input = f"以下のクエリについて詳細にリサーチしてください: {query.query if hasattr(query, 'query') else str(query)}"
-                    agent_output = await self.run_agent(current_agent, agent_input, context, run_config)
+                    agent_output = await self.run_research_query(context, query, agent_input, run_config)
 
                     if isinstance(agent_output, ResearchQueryResult):
                         console.print(f"[green]✅ クエリ {query_index+1} が完了しました。[/green]")
@@ -1590,8 +1590,8 @@ class GenerationFlowManager:
                 for i, query in enumerate(context.research_plan.queries)
             ]
             
-            # Wait for all queries to complete
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # Wait for all queries to complete (a cancel aborts every in-flight query)
+            results = await run_cancellable(context.process_id, asyncio.gather(*tasks, return_exceptions=True))
             
             # Process results in original order
             successful_queries = 0
@@ -1671,26 +1671,20 @@ class GenerationFlowManager:
             
             # Publish research synthesis completion event for Supabase Realtime
             try:
-                from .flow_service import get_supabase_client
-                supabase = get_supabase_client()
-                
-                result = supabase.rpc('create_process_event', {
-                    'p_process_id': getattr(context, 'process_id', 'unknown'),
-                    'p_event_type': 'research_synthesis_completed',
-                    'p_event_data': {
+                await process_event_bus.publish(
+                    process_id=getattr(context, 'process_id', 'unknown'),
+                    event_type='research_synthesis_completed',
+                    event_data={
                         'step': 'research_synthesizing',
                         'message': 'Research synthesis completed successfully',
                         'report_summary': getattr(agent_output, 'summary', ''),
                         'key_findings_count': len(getattr(agent_output, 'key_findings', [])),
                         'timestamp': datetime.now(timezone.utc).isoformat()
                     },
-                    'p_event_category': 'step_completion',
-                    'p_event_source': 'flow_manager'
-                }).execute()
-                
-                if result.data:
-                    logger.info(f"Published research_synthesis_completed event for process {getattr(context, 'process_id', 'unknown')}")
-                    
+                    event_category='step_completion',
+                    event_source='flow_manager',
+                )
+
             except Exception as e:
                 logger.error(f"Error publishing research_synthesis_completed event: {e}")
             
@@ -1777,13 +1771,10 @@ class GenerationFlowManager:
             
             # リサーチ完了イベントの発行
             try:
-                from .flow_service import get_supabase_client
-                supabase = get_supabase_client()
-                
-                result = supabase.rpc('create_process_event', {
-                    'p_process_id': getattr(context, 'process_id', 'unknown'),
-                    'p_event_type': 'research_synthesis_completed',
-                    'p_event_data': {
+                await process_event_bus.publish(
+                    process_id=getattr(context, 'process_id', 'unknown'),
+                    event_type='research_synthesis_completed',
+                    event_data={
                         'step': 'research',
                         'message': 'Research completed successfully',
                         'report_summary': tagged_text[:5000],  # 大きすぎる場合はSupabase制約を考慮し控えめに保存
@@ -1791,13 +1782,10 @@ class GenerationFlowManager:
                         'sources_count': 0,
                         'timestamp': datetime.now(timezone.utc).isoformat()
                     },
-                    'p_event_category': 'step_completion',
-                    'p_event_source': 'flow_manager'
-                }).execute()
-                
-                if result.data:
-                    logger.info(f"Published research_synthesis_completed event for process {getattr(context, 'process_id', 'unknown')}")
-                    
+                    event_category='step_completion',
+                    event_source='flow_manager',
+                )
+
             except Exception as e:
                 logger.error(f"Error publishing research_synthesis_completed event: {e}")
             
@@ -1861,26 +1849,20 @@ class GenerationFlowManager:
 
         # Publish outline generation start event for Supabase Realtime
         try:
-            from .flow_service import get_supabase_client
-            supabase = get_supabase_client()
-            
-            result = supabase.rpc('create_process_event', {
-                'p_process_id': getattr(context, 'process_id', 'unknown'),
-                'p_event_type': 'outline_generation_started',
-                'p_event_data': {
+            await process_event_bus.publish(
+                process_id=getattr(context, 'process_id', 'unknown'),
+                event_type='outline_generation_started',
+                event_data={
                     'step': 'outline_generating',
                     'message': 'Outline generation started',
                     'theme_title': getattr(context.selected_theme, 'title', 'Unknown'),
                     'target_length': context.target_length,
                     'timestamp': datetime.now(timezone.utc).isoformat()
                 },
-                'p_event_category': 'step_start',
-                'p_event_source': 'flow_manager'
-            }).execute()
-            
-            if result.data:
-                logger.info(f"Published outline_generation_started event for process {getattr(context, 'process_id', 'unknown')}")
-                
+                event_category='step_start',
+                event_source='flow_manager',
+            )
+
         except Exception as e:
             logger.error(f"Error publishing outline_generation_started event: {e}")
 
@@ -1932,13 +1914,10 @@ class GenerationFlowManager:
             
             # Publish outline generation completion event for Supabase Realtime
             try:
-                from .flow_service import get_supabase_client
-                supabase = get_supabase_client()
-                
-                result = supabase.rpc('create_process_event', {
-                    'p_process_id': getattr(context, 'process_id', 'unknown'),
-                    'p_event_type': 'outline_generation_completed',
-                    'p_event_data': {
+                await process_event_bus.publish(
+                    process_id=getattr(context, 'process_id', 'unknown'),
+                    event_type='outline_generation_completed',
+                    event_data={
                         'step': 'outline_generated',
                         'message': 'Outline generation completed successfully',
                         'outline_title': agent_output.title,
@@ -1946,13 +1925,10 @@ class GenerationFlowManager:
                         'suggested_tone': getattr(agent_output, 'suggested_tone', ''),
                         'timestamp': datetime.now(timezone.utc).isoformat()
                     },
-                    'p_event_category': 'step_completion',
-                    'p_event_source': 'flow_manager'
-                }).execute()
-                
-                if result.data:
-                    logger.info(f"Published outline_generation_completed event for process {getattr(context, 'process_id', 'unknown')}")
-                    
+                    event_category='step_completion',
+                    event_source='flow_manager',
+                )
+
             except Exception as e:
                 logger.error(f"Error publishing outline_generation_completed event: {e}")
         else:
@@ -1974,179 +1950,228 @@ class GenerationFlowManager:
         is_image_mode = getattr(context, 'image_mode', False)
         console.print(f"[cyan]{'画像モード' if is_image_mode else '通常モード'}でセクションを執筆します。[/cyan]")
         
-        for i, section in enumerate(sections):
-            console.print(f"✍️ セクション {i+1}/{total_sections}: {section.heading}")
-            
-            # Publish section start event for background processing
-            try:
-                from .flow_service import get_supabase_client
-                supabase = get_supabase_client()
-                
-                result = supabase.rpc('create_process_event', {
-                    'p_process_id': getattr(context, 'process_id', 'unknown'),
-                    'p_event_type': 'section_writing_started',
-                    'p_event_data': {
-                        'step': 'writing_sections',
-                        'section_index': i,
-                        'section_heading': section.heading,
-                        'total_sections': total_sections,
-                        'image_mode': is_image_mode,
-                        'message': f'Started writing section {i + 1}: {section.heading}',
-                        'timestamp': datetime.now(timezone.utc).isoformat()
-                    },
-                    'p_event_category': 'section_progress',
-                    'p_event_source': 'flow_manager_background'
-                }).execute()
-                
-                if result.data:
-                    logger.info(f"Published section_writing_started event for section {i + 1} (background)")
-                    
-            except Exception as e:
-                logger.error(f"Error publishing section_writing_started event: {e}")
+        if settings.parallel_section_writing:
+            completed = 0
+
+            async def on_section_started(i: int, section) -> None:
+                try:
+                    await process_event_bus.publish(
+                        process_id=getattr(context, 'process_id', 'unknown'),
+                        event_type='section_writing_started',
+                        event_data={
+                            'step': 'writing_sections',
+                            'section_index': i,
+                            'section_heading': section.heading,
+                            'total_sections': total_sections,
+                            'image_mode': is_image_mode,
+                            'parallel': True,
+                            'message': f'Started writing section {i + 1}: {section.heading}',
+                            'timestamp': datetime.now(timezone.utc).isoformat()
+                        },
+                        event_category='section_progress',
+                        event_source='flow_manager_background',
+                    )
+                except Exception as e:
+                    logger.error(f"Error publishing section_writing_started event: {e}")
+
+            async def on_section_completed(i: int, section, content: str, placeholders: List[Any]) -> None:
+                nonlocal completed
+                completed += 1
+                try:
+                    await process_event_bus.publish(
+                        process_id=getattr(context, 'process_id', 'unknown'),
+                        event_type='section_completed',
+                        event_data={
+                            'step': 'writing_sections',
+                            'section_index': i,
+                            'section_heading': section.heading,
+                            'section_content': content,
+                            'section_content_length': len(content),
+                            'completed_sections': completed,
+                            'total_sections': total_sections,
+                            'image_mode': is_image_mode,
+                            'placeholders_count': len(placeholders),
+                            'image_placeholders': [
+                                {
+                                    'placeholder_id': p.placeholder_id,
+                                    'description_jp': p.description_jp,
+                                    'prompt_en': p.prompt_en,
+                                    'alt_text': p.alt_text,
+                                }
+                                for p in placeholders
+                            ] if is_image_mode else [],
+                            'message': f'Completed section {i + 1}: {section.heading}',
+                            'progress_percentage': int((completed / total_sections) * 100),
+                            'batch_completion': True,
+                            'parallel': True,
+                            'timestamp': datetime.now(timezone.utc).isoformat()
+                        },
+                        event_category='section_completion',
+                        event_source='flow_manager_background',
+                    )
+                except Exception as e:
+                    logger.error(f"Error publishing section_completed event: {e}")
+
+            await self.write_sections_parallel(context, on_section_started, on_section_completed)
+        else:
+            for i, section in enumerate(sections):
+                raise_if_cancelled(context.process_id)
+                console.print(f"✍️ セクション {i+1}/{total_sections}: {section.heading}")
             
-            # コンテキストの現在のセクションインデックスを設定
-            context.current_section_index = i
+                # Publish section start event for background processing
+                try:
+                    await process_event_bus.publish(
+                        process_id=getattr(context, 'process_id', 'unknown'),
+                        event_type='section_writing_started',
+                        event_data={
+                            'step': 'writing_sections',
+                            'section_index': i,
+                            'section_heading': section.heading,
+                            'total_sections': total_sections,
+                            'image_mode': is_image_mode,
+                            'message': f'Started writing section {i + 1}: {section.heading}',
+                            'timestamp': datetime.now(timezone.utc).isoformat()
+                        },
+                        event_category='section_progress',
+                        event_source='flow_manager_background',
+                    )
+
+                except Exception as e:
+                    logger.error(f"Error publishing section_writing_started event: {e}")
             
-            # 画像モードに応じてエージェントを選択
-            if is_image_mode:
-                current_agent = section_writer_with_images_agent
-                console.print(f"[cyan]画像プレースホルダー対応エージェント ({current_agent.name}) を使用します。[/cyan]")
-            else:
-                current_agent = section_writer_agent
-                console.print(f"[cyan]通常エージェント ({current_agent.name}) を使用します。[/cyan]")
+                # コンテキストの現在のセクションインデックスを設定
+                context.current_section_index = i
             
-            # エージェント実行に必要な情報をコンテキストに設定（会話履歴を活用）
-            user_request_parts = [
-                f"前のセクション（もしあれば）に続けて、アウトラインのセクション {i + 1}「{section.heading}」の内容をHTMLで執筆してください。",
-                "提供された詳細リサーチ情報・企業情報・スタイルガイドを参照し、指定されたトーンに沿った自然な日本語で執筆してください。",
-                "出力はそのセクションのHTML本文のみを含め、追加の説明文や余計な前置きは入れないでください。"
-            ]
-            if is_image_mode:
-                user_request_parts.append("必要に応じて画像プレースホルダーを指定の形式で挿入してください。")
-            user_request = "\n".join(user_request_parts)
-            current_input_messages: List[Dict[str, Any]] = list(context.section_writer_history)
-            current_input_messages.append({
-                "role": "user",
-                "content": [{"type": "input_text", "text": user_request}]
-            })
-            agent_input = current_input_messages
-            agent_output = await self.run_agent(current_agent, agent_input, context, run_config)
+                # 画像モードに応じてエージェントを選択
+                if is_image_mode:
+                    current_agent = section_writer_with_images_agent
+                    console.print(f"[cyan]画像プレースホルダー対応エージェント ({current_agent.name}) を使用します。[/cyan]")
+                else:
+                    current_agent = section_writer_agent
+                    console.print(f"[cyan]通常エージェント ({current_agent.name}) を使用します。[/cyan]")
+            
+                # エージェント実行に必要な情報をコンテキストに設定（会話履歴を活用）
+                user_request_parts = [
+                    f"前のセクション（もしあれば）に続けて、アウトラインのセクション {i + 1}「{section.heading}」の内容をHTMLで執筆してください。",
+                    "提供された詳細リサーチ情報・企業情報・スタイルガイドを参照し、指定されたトーンに沿った自然な日本語で執筆してください。",
+                    "出力はそのセクションのHTML本文のみを含め、追加の説明文や余計な前置きは入れないでください。"
+                ]
+                if is_image_mode:
+                    user_request_parts.append("必要に応じて画像プレースホルダーを指定の形式で挿入してください。")
+                user_request = "\n".join(user_request_parts)
+                agent_input = build_section_writer_input(context, user_request)
+                agent_output = await self.run_agent(current_agent, agent_input, context, run_config)
 
-            # 出力処理
-            section_content_length = 0
-            if is_image_mode and isinstance(agent_output, ArticleSectionWithImages):
-                # ArticleSectionWithImagesをArticleSectionに変換
-                article_section = ArticleSection(
-                    title=agent_output.title,
-                    content=agent_output.content,
-                    order=agent_output.order
-                )
-                context.generated_sections.append(article_section)
-                section_content_length = len(agent_output.content)
-                if len(context.generated_sections_html) <= i:
-                    context.generated_sections_html.extend([""] * (i + 1 - len(context.generated_sections_html)))
-                context.generated_sections_html[i] = agent_output.content
+                # 出力処理
+                section_content_length = 0
+                if is_image_mode and isinstance(agent_output, ArticleSectionWithImages):
+                    # ArticleSectionWithImagesをArticleSectionに変換
+                    article_section = ArticleSection(
+                        title=agent_output.title,
+                        content=agent_output.content,
+                        order=agent_output.order
+                    )
+                    context.generated_sections.append(article_section)
+                    section_content_length = len(agent_output.content)
+                    if len(context.generated_sections_html) <= i:
+                        context.generated_sections_html.extend([""] * (i + 1 - len(context.generated_sections_html)))
+                    context.generated_sections_html[i] = agent_output.content
                 
-                # 画像プレースホルダー情報をコンテキストに保存
-                if not hasattr(context, 'image_placeholders'):
-                    context.image_placeholders = []
-                context.image_placeholders.extend(agent_output.image_placeholders)
+                    # 画像プレースホルダー情報をコンテキストに保存
+                    if not hasattr(context, 'image_placeholders'):
+                        context.image_placeholders = []
+                    context.image_placeholders.extend(agent_output.image_placeholders)
                 
-                console.print(f"[green]セクション {i+1} が完了しました（画像プレースホルダー {len(agent_output.image_placeholders)} 個含む）。[/green]")
+                    console.print(f"[green]セクション {i+1} が完了しました（画像プレースホルダー {len(agent_output.image_placeholders)} 個含む）。[/green]")
                 
-            elif not is_image_mode and isinstance(agent_output, ArticleSection):
-                context.generated_sections.append(agent_output)
-                section_content_length = len(agent_output.content)
-                if len(context.generated_sections_html) <= i:
-                    context.generated_sections_html.extend([""] * (i + 1 - len(context.generated_sections_html)))
-                context.generated_sections_html[i] = agent_output.content
-                console.print(f"[green]セクション {i+1} が完了しました。[/green]")
+                elif not is_image_mode and isinstance(agent_output, ArticleSection):
+                    context.generated_sections.append(agent_output)
+                    section_content_length = len(agent_output.content)
+                    if len(context.generated_sections_html) <= i:
+                        context.generated_sections_html.extend([""] * (i + 1 - len(context.generated_sections_html)))
+                    context.generated_sections_html[i] = agent_output.content
+                    console.print(f"[green]セクション {i+1} が完了しました。[/green]")
                 
-            elif isinstance(agent_output, str):
-                # 従来のHTML文字列形式の場合（旧形式対応）
-                article_section = ArticleSection(
-                    title=section.heading,
-                    content=agent_output,
-                    order=i
-                )
-                context.generated_sections.append(article_section)
-                section_content_length = len(agent_output)
-                if len(context.generated_sections_html) <= i:
-                    context.generated_sections_html.extend([""] * (i + 1 - len(context.generated_sections_html)))
-                context.generated_sections_html[i] = agent_output
-                console.print(f"[green]セクション {i+1} が完了しました（HTML文字列形式）。[/green]")
+                elif isinstance(agent_output, str):
+                    # 従来のHTML文字列形式の場合（旧形式対応）
+                    article_section = ArticleSection(
+                        title=section.heading,
+                        content=agent_output,
+                        order=i
+                    )
+                    context.generated_sections.append(article_section)
+                    section_content_length = len(agent_output)
+                    if len(context.generated_sections_html) <= i:
+                        context.generated_sections_html.extend([""] * (i + 1 - len(context.generated_sections_html)))
+                    context.generated_sections_html[i] = agent_output
+                    console.print(f"[green]セクション {i+1} が完了しました（HTML文字列形式）。[/green]")
                 
-            else:
-                console.print(f"[red]セクション {i+1} で予期しないエージェント出力タイプを受け取りました: {type(agent_output)}[/red]")
-                context.current_step = "error"
-                return
+                else:
+                    console.print(f"[red]セクション {i+1} で予期しないエージェント出力タイプを受け取りました: {type(agent_output)}[/red]")
+                    context.current_step = "error"
+                    return
             
-            # 会話履歴の追記（user → assistant）
-            try:
-                # 直前に積んだユーザー指示を履歴に反映
-                context.add_to_section_writer_history("user", user_request)
-                # アシスタント出力をテキスト化
-                assistant_content = (
-                    agent_output.content if hasattr(agent_output, 'content') else (
-                        agent_output if isinstance(agent_output, str) else ''
+                # 会話履歴の追記（user → assistant）
+                try:
+                    # 直前に積んだユーザー指示を履歴に反映
+                    context.add_to_section_writer_history("user", user_request)
+                    # アシスタント出力をテキスト化
+                    assistant_content = (
+                        agent_output.content if hasattr(agent_output, 'content') else (
+                            agent_output if isinstance(agent_output, str) else ''
+                        )
                     )
-                )
-                if assistant_content:
-                    context.add_to_section_writer_history("assistant", assistant_content)
-            except Exception as _:
-                # 履歴追記の失敗は致命的ではないため握りつぶす
-                pass
+                    if assistant_content:
+                        context.add_to_section_writer_history("assistant", assistant_content)
+                except Exception as _:
+                    # 履歴追記の失敗は致命的ではないため握りつぶす
+                    pass
 
-            # セクションインデックスを完了に合わせて更新（統一）
-            context.current_section_index = i + 1
+                # セクションインデックスを完了に合わせて更新（統一）
+                context.current_section_index = i + 1
 
-            # Publish section completion event for background processing
-            try:
-                from .flow_service import get_supabase_client
-                supabase = get_supabase_client()
-                
-                result = supabase.rpc('create_process_event', {
-                    'p_process_id': getattr(context, 'process_id', 'unknown'),
-                    'p_event_type': 'section_completed',
-                    'p_event_data': {
-                        'step': 'writing_sections',
-                        'section_index': i,
-                        'section_heading': section.heading,
-                        'section_content': (
-                            agent_output.content if hasattr(agent_output, 'content') else (
-                                agent_output if isinstance(agent_output, str) else ''
-                            )
-                        ),
-                        'section_content_length': section_content_length,
-                        'completed_sections': i + 1,
-                        'total_sections': total_sections,
-                        'image_mode': is_image_mode,
-                        'placeholders_count': len(getattr(agent_output, 'image_placeholders', [])) if hasattr(agent_output, 'image_placeholders') else 0,
-                        'image_placeholders': [
-                            {
-                                'placeholder_id': p.placeholder_id,
-                                'description_jp': p.description_jp,
-                                'prompt_en': p.prompt_en,
-                                'alt_text': p.alt_text,
-                            }
-                            for p in getattr(agent_output, 'image_placeholders', [])
-                        ] if is_image_mode else [],
-                        'message': f'Completed section {i + 1}: {section.heading}',
-                        'progress_percentage': int(((i + 1) / total_sections) * 100),
-                        'batch_completion': True,
-                        'timestamp': datetime.now(timezone.utc).isoformat()
-                    },
-                    'p_event_category': 'section_completion',
-                    'p_event_source': 'flow_manager_background'
-                }).execute()
-                
-                if result.data:
-                    logger.info(f"Published section_completed event for section {i + 1} (background)")
-                    
-            except Exception as e:
-                logger.error(f"Error publishing section_completed event: {e}")
+                # Publish section completion event for background processing
+                try:
+                    await process_event_bus.publish(
+                        process_id=getattr(context, 'process_id', 'unknown'),
+                        event_type='section_completed',
+                        event_data={
+                            'step': 'writing_sections',
+                            'section_index': i,
+                            'section_heading': section.heading,
+                            'section_content': (
+                                agent_output.content if hasattr(agent_output, 'content') else (
+                                    agent_output if isinstance(agent_output, str) else ''
+                                )
+                            ),
+                            'section_content_length': section_content_length,
+                            'completed_sections': i + 1,
+                            'total_sections': total_sections,
+                            'image_mode': is_image_mode,
+                            'placeholders_count': len(getattr(agent_output, 'image_placeholders', [])) if hasattr(agent_output, 'image_placeholders') else 0,
+                            'image_placeholders': [
+                                {
+                                    'placeholder_id': p.placeholder_id,
+                                    'description_jp': p.description_jp,
+                                    'prompt_en': p.prompt_en,
+                                    'alt_text': p.alt_text,
+                                }
+                                for p in getattr(agent_output, 'image_placeholders', [])
+                            ] if is_image_mode else [],
+                            'message': f'Completed section {i + 1}: {section.heading}',
+                            'progress_percentage': int(((i + 1) / total_sections) * 100),
+                            'batch_completion': True,
+                            'timestamp': datetime.now(timezone.utc).isoformat()
+                        },
+                        event_category='section_completion',
+                        event_source='flow_manager_background',
+                    )
+
+                except Exception as e:
+                    logger.error(f"Error publishing section_completed event: {e}")
 
         # 全セクション完了
+        log_token_report(context)
         # ドラフトを確定
         if not context.full_draft_html:
             context.full_draft_html = "\n\n".join(context.generated_sections_html)
@@ -2161,13 +2186,10 @@ class GenerationFlowManager:
         
         # Publish all sections completion event
         try:
-            from .flow_service import get_supabase_client
-            supabase = get_supabase_client()
-            
-            result = supabase.rpc('create_process_event', {
-                'p_process_id': getattr(context, 'process_id', 'unknown'),
-                'p_event_type': 'all_sections_completed',
-                'p_event_data': {
+            await process_event_bus.publish(
+                process_id=getattr(context, 'process_id', 'unknown'),
+                event_type='all_sections_completed',
+                event_data={
                     'step': 'writing_sections',
                     'total_sections': total_sections,
                     'image_mode': is_image_mode,
@@ -2177,13 +2199,10 @@ class GenerationFlowManager:
                     'next_step': 'editing',
                     'timestamp': datetime.now(timezone.utc).isoformat()
                 },
-                'p_event_category': 'step_completion',
-                'p_event_source': 'flow_manager_background'
-            }).execute()
-            
-            if result.data:
-                logger.info(f"Published all_sections_completed event for {total_sections} sections")
-                
+                event_category='step_completion',
+                event_source='flow_manager_background',
+            )
+
         except Exception as e:
             logger.error(f"Error publishing all_sections_completed event: {e}")
 
@@ -2619,6 +2638,7 @@ class GenerationFlowManager:
             context.current_section_index = 0
             context.generated_sections_html = []
             context.section_writer_history = []
+            context.section_writer_token_report = {}
             
             console.print(f"[yellow]セクションライティング初期化: {len(context.generated_outline.sections)}セクションを実行予定[/yellow]")
             
@@ -2661,6 +2681,7 @@ class GenerationFlowManager:
         
         # セクション完全性をチェック
         if self.service.utils.validate_section_completeness(context, context.generated_outline.sections, total_sections):
+            log_token_report(context)
             if getattr(context, "enable_final_editing", False):
                 context.current_step = "editing"
                 console.print(f"[green]全{total_sections}セクションの執筆が完了しました（{len(context.full_draft_html)}文字）。編集ステップに移ります。[/green]")
@@ -2670,6 +2691,10 @@ class GenerationFlowManager:
                 await self.finalize_without_editing(context, process_id, user_id, send_events=True)
             return
 
+        if settings.parallel_section_writing:
+            await self.handle_writing_sections_parallel(context, process_id, user_id)
+            return
+
         # 画像モードかどうかでエージェントを選択
         is_image_mode = getattr(context, 'image_mode', False)
         
@@ -2700,9 +2725,7 @@ class GenerationFlowManager:
                 )
 
             user_request = f"前のセクション（もしあれば）に続けて、アウトラインのセクション {target_index + 1}「{target_heading}」の内容をHTMLで執筆してください。"
-            current_input_messages: List[Dict[str, Any]] = list(context.section_writer_history)
-            current_input_messages.append({"role": "user", "content": [{"type": "input_text", "text": user_request}]})
-            agent_input = current_input_messages
+            agent_input = build_section_writer_input(context, user_request)
 
             # 画像モードの場合は通常のエージェント実行、そうでなければストリーミング実行
             if is_image_mode:
@@ -2808,13 +2831,10 @@ class GenerationFlowManager:
 
                 # Publish section start event for Supabase Realtime
                 try:
-                    from .flow_service import get_supabase_client
-                    supabase = get_supabase_client()
-                    
-                    result = supabase.rpc('create_process_event', {
-                        'p_process_id': getattr(context, 'process_id', 'unknown'),
-                        'p_event_type': 'section_writing_started',
-                        'p_event_data': {
+                    await process_event_bus.publish(
+                        process_id=getattr(context, 'process_id', 'unknown'),
+                        event_type='section_writing_started',
+                        event_data={
                             'step': 'writing_sections',
                             'section_index': target_index,
                             'section_heading': target_heading,
@@ -2822,13 +2842,10 @@ class GenerationFlowManager:
                             'message': f'Started writing section {target_index + 1}: {target_heading}',
                             'timestamp': datetime.now(timezone.utc).isoformat()
                         },
-                        'p_event_category': 'section_progress',
-                        'p_event_source': 'flow_manager'
-                    }).execute()
-                    
-                    if result.data:
-                        logger.info(f"Published section_writing_started event for section {target_index + 1}")
-                        
+                        event_category='section_progress',
+                        event_source='flow_manager',
+                    )
+
                 except Exception as e:
                     logger.error(f"Error publishing section_writing_started event: {e}")
 
@@ -2875,13 +2892,10 @@ class GenerationFlowManager:
                 
                 # Publish section completion event for Supabase Realtime (batch format)
                 try:
-                    from .flow_service import get_supabase_client
-                    supabase = get_supabase_client()
-                    
-                    result = supabase.rpc('create_process_event', {
-                        'p_process_id': getattr(context, 'process_id', 'unknown'),
-                        'p_event_type': 'section_completed',
-                        'p_event_data': {
+                    await process_event_bus.publish(
+                        process_id=getattr(context, 'process_id', 'unknown'),
+                        event_type='section_completed',
+                        event_data={
                             'step': 'writing_sections',
                             'section_index': target_index,
                             'section_heading': target_heading,
@@ -2903,13 +2917,10 @@ class GenerationFlowManager:
                             'batch_completion': True,  # Flag to indicate this is batch completion
                             'timestamp': datetime.now(timezone.utc).isoformat()
                         },
-                        'p_event_category': 'section_completion',
-                        'p_event_source': 'flow_manager'
-                    }).execute()
-                    
-                    if result.data:
-                        logger.info(f"Published section_completed event for section {target_index + 1} (batch processing)")
-                        
+                        event_category='section_completion',
+                        event_source='flow_manager',
+                    )
+
                 except Exception as e:
                     logger.error(f"Error publishing section_completed event: {e}")
                 
@@ -2937,6 +2948,103 @@ class GenerationFlowManager:
                     except Exception as ws_err:
                         console.print(f"[dim]WebSocket section completion event error (continuing): {ws_err}[/dim]")
 
+    async def handle_writing_sections_parallel(self, context: ArticleContext, process_id: Optional[str] = None, user_id: Optional[str] = None):
+        """セクション執筆ステップの並列版（PARALLEL_SECTION_WRITING）。残りのセクションをまとめて執筆する"""
+        is_image_mode = getattr(context, 'image_mode', False)
+        total_sections = len(context.generated_outline.sections)
+        completed = 0
+
+        await self.service.utils.send_server_event(context, StatusUpdatePayload(
+            step=context.current_step,
+            message=f"Writing {total_sections} sections in parallel",
+            image_mode=is_image_mode
+        ))
+
+        async def on_section_completed(i: int, section, content: str, placeholders: List[Any]) -> None:
+            nonlocal completed
+            completed += 1
+            heading = getattr(section, 'heading', f"Section {i + 1}")
+            if is_image_mode and placeholders:
+                await self.service.persistence_service.save_image_placeholders_to_db(context, placeholders, i)
+            try:
+                await process_event_bus.publish(
+                    process_id=getattr(context, 'process_id', 'unknown'),
+                    event_type='section_completed',
+                    event_data={
+                        'step': 'writing_sections',
+                        'section_index': i,
+                        'section_heading': heading,
+                        'section_content': content,
+                        'section_content_length': len(content),
+                        'completed_sections': completed,
+                        'total_sections': total_sections,
+                        'image_placeholders': [
+                            {
+                                'placeholder_id': p.placeholder_id,
+                                'description_jp': p.description_jp,
+                                'prompt_en': p.prompt_en,
+                                'alt_text': p.alt_text,
+                            }
+                            for p in placeholders
+                        ] if is_image_mode else [],
+                        'message': f'Completed section {i + 1}: {heading}',
+                        'progress_percentage': int((completed / total_sections) * 100),
+                        'batch_completion': True,
+                        'parallel': True,
+                        'timestamp': datetime.now(timezone.utc).isoformat()
+                    },
+                    event_category='section_completion',
+                    event_source='flow_manager',
+                )
+            except Exception as e:
+                logger.error(f"Error publishing section_completed event: {e}")
+
+            if context.websocket:
+                try:
+                    if is_image_mode:
+                        payload = SectionChunkPayload(
+                            section_index=i,
+                            heading=heading,
+                            html_content_chunk="",
+                            is_complete=True,
+                            section_complete_content=content,
+                            image_placeholders=[
+                                ImagePlaceholderData(
+                                    placeholder_id=p.placeholder_id,
+                                    description_jp=p.description_jp,
+                                    prompt_en=p.prompt_en,
+                                    alt_text=p.alt_text
+                                )
+                                for p in placeholders
+                            ],
+                            is_image_mode=True
+                        )
+                    else:
+                        payload = SectionChunkPayload(
+                            section_index=i,
+                            heading=heading,
+                            html_content_chunk=content,
+                            is_complete=True,
+                            batch_mode=True
+                        )
+                    await self.service.utils.send_server_event(context, payload)
+                except Exception as ws_err:
+                    console.print(f"[dim]WebSocket section completion event error (continuing): {ws_err}[/dim]")
+
+        with safe_custom_span("section_writing", data={
+            "parallel": "true",
+            "total_sections": str(total_sections)
+        }):
+            await self.write_sections_parallel(context, on_section_completed=on_section_completed)
+
+        # 次のループで validate_section_completeness により編集・完了へ進む
+        if process_id and user_id:
+            try:
+                await self.service.persistence_service.save_context_to_db(context, process_id=process_id, user_id=user_id)
+                logger.info(f"Context saved successfully after parallel writing of {total_sections} sections")
+            except Exception as save_err:
+                logger.error(f"Failed to save context after parallel section writing: {save_err}")
+
     async def finalize_without_editing(self, context: ArticleContext, process_id: Optional[str], user_id: Optional[str], send_events: bool = True):
         """編集ステップをスキップして記事を確定する。"""
         if not context.full_draft_html:
@@ -3564,6 +3672,26 @@ class GenerationFlowManager:
             context.error_message = str(e)
             raise
 
+    async def run_research_query(self, context: ArticleContext, query, agent_input: str, run_config: RunConfig):
+        """ResearcherAgent でクエリ1件をリサーチする（同じ日に同じ文脈で同じクエリを調べた結果があればそれを使う）"""
+        query_text = query.query if hasattr(query, 'query') else str(query)
+        locale = search_locale(web_search_tool.user_location)
+        # researcher のプロンプトに入る文脈（企業情報・記事テーマ・焦点）が同じ場合だけ共有する
+        scope = prompt_scope(
+            build_enhanced_company_context(context),
+            context.research_plan.topic if context.research_plan else None,
+            getattr(query, 'focus', None),
+        )
+        cached = await research_cache.get(query_text, locale, scope, bypass=getattr(context, "bypass_research_cache", False))
+        if cached is not None:
+            logger.info(f"Research cache hit for query: {query_text}")
+            return cached
+
+        agent_output = await self.run_agent(researcher_agent, agent_input, context, run_config)
+        if isinstance(agent_output, ResearchQueryResult):
+            await research_cache.put(query_text, locale, agent_output, scope)
+        return agent_output
+
     async def execute_single_research_query(self, context: ArticleContext, query, query_index: int):
         """Execute a single research query for background tasks"""
         try:
@@ -3580,10 +3708,9 @@ class GenerationFlowManager:
                 context.research_query_results = []
                 
             # Execute research for this query
-            current_agent = researcher_agent
             agent_input = f"以下のクエリについて詳細にリサーチしてください: {query.query if hasattr(query, 'query') else str(query)}"
             
-            agent_output = await self.run_agent(current_agent, agent_input, context, run_config)
+            agent_output = await self.run_research_query(context, query, agent_input, run_config)
             
             if isinstance(agent_output, ResearchQueryResult):
                 context.research_query_results.append(agent_output)
@@ -3646,12 +3773,7 @@ class GenerationFlowManager:
             if getattr(context, 'image_mode', False):
                 user_request_parts.append("必要に応じて画像プレースホルダーを指定の形式で挿入してください。")
             user_request = "\n".join(user_request_parts)
-            current_input_messages: List[Dict[str, Any]] = list(context.section_writer_history)
-            current_input_messages.append({
-                "role": "user",
-                "content": [{"type": "input_text", "text": user_request}]
-            })
-            agent_input = current_input_messages
+            agent_input = build_section_writer_input(context, user_request)
 
             agent_output = await self.run_agent(current_agent, agent_input, context, run_config)
             
@@ -3677,6 +3799,148 @@ class GenerationFlowManager:
             logger.error(f"Error writing section {section_index}: {e}")
             return f"<h2>{section.heading if hasattr(section, 'heading') else f'Section {section_index + 1}'}</h2>\n<p>セクション生成中にエラーが発生しました: {str(e)}</p>"
 
+    async def write_section_isolated(self, context: ArticleContext, section, section_index: int) -> Tuple[str, List[Any]]:
+        """Write one section without the shared section_writer_history (parallel mode).
+
+        The agent still receives the outline, research, persona and style guide through its
+        dynamic instructions; only the conversation history of earlier sections is omitted.
+        Returns the section HTML and its image placeholders.
+        """
+        process_id = getattr(context, 'process_id', 'unknown')
+        run_config = self._build_step_run_config(
+            context,
+            process_id,
+            "writing_sections",
+            {"section_index": str(section_index), "parallel": "true"}
+        )
+        current_agent = section_writer_with_images_agent if getattr(context, 'image_mode', False) else section_writer_agent
+
+        # The dynamic instructions read current_section_index, so each concurrent run gets its own view of the context
+        section_context = copy.copy(context)
+        section_context.current_section_index = section_index
+        section_context.section_writer_history = []
+
+        section_title = section.heading if hasattr(section, 'heading') else f"Section {section_index + 1}"
+        user_request_parts = [
+            f"アウトラインのセクション {section_index + 1}「{section_title}」の内容をHTMLで執筆してください。",
+            "各セクションは並行して執筆されます。前後のセクションの内容はアウトラインから想定し、他のセクションの見出しで扱う内容は書かないでください。",
+            "提供された詳細リサーチ情報・企業情報・スタイルガイドを参照し、指定されたトーンに沿った自然な日本語で執筆してください。",
+            "出力はそのセクションのHTML本文のみを含め、追加の説明文や余計な前置きは入れないでください。"
+        ]
+        if getattr(context, 'image_mode', False):
+            user_request_parts.append("必要に応じて画像プレースホルダーを指定の形式で挿入してください。")
+        agent_input = [{
+            "role": "user",
+            "content": [{"type": "input_text", "text": "\n".join(user_request_parts)}]
+        }]
+
+        try:
+            agent_output = await self.run_agent(current_agent, agent_input, section_context, run_config)
+        except Exception as e:
+            logger.error(f"Error writing section {section_index} in parallel mode: {e}")
+            return f"<h2>{section_title}</h2>\n<p>セクション生成中にエラーが発生しました: {str(e)}</p>", []
+
+        placeholders = list(getattr(agent_output, 'image_placeholders', None) or getattr(agent_output, 'images', None) or [])
+        if hasattr(agent_output, 'content'):
+            return agent_output.content, placeholders
+        elif isinstance(agent_output, str):
+            return agent_output, placeholders
+        logger.warning(f"Unexpected section output type: {type(agent_output)}")
+        return f"<h2>{section_title}</h2>\n<p>セクション生成に失敗しました。</p>", []
+
+    async def write_sections_parallel(
+        self,
+        context: ArticleContext,
+        on_section_started: Optional[Callable[[int, Any], Awaitable[None]]] = None,
+        on_section_completed: Optional[Callable[[int, Any, str, List[Any]], Awaitable[None]]] = None,
+    ) -> None:
+        """Write all unwritten outline sections concurrently (PARALLEL_SECTION_WRITING).
+
+        Sections are stored in outline order in generated_sections_html regardless of completion
+        order, image placeholders are appended in outline order, and a continuity pass adds short
+        bridges between adjacent sections afterwards. Sections that already have content (resume)
+        are kept as they are.
+        """
+        sections = context.generated_outline.sections
+        total_sections = len(sections)
+        sections_html = list(context.generated_sections_html[:total_sections])
+        sections_html.extend([""] * (total_sections - len(sections_html)))
+        section_placeholders: Dict[int, List[Any]] = {}
+        concurrency = max(1, settings.parallel_section_writing_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def write(section_index: int, section) -> None:
+            async with semaphore:
+                raise_if_cancelled(context.process_id)
+                if on_section_started:
+                    await on_section_started(section_index, section)
+                content, placeholders = await self.write_section_isolated(context, section, section_index)
+                sections_html[section_index] = content
+                section_placeholders[section_index] = placeholders
+                if on_section_completed:
+                    await on_section_completed(section_index, section, content, placeholders)
+
+        pending = [(i, section) for i, section in enumerate(sections) if not (sections_html[i] or "").strip()]
+        console.print(f"[cyan]{len(pending)}/{total_sections} セクションを並列に執筆します（同時実行数 {concurrency}）。[/cyan]")
+        await asyncio.gather(*(write(i, section) for i, section in pending))
+
+        if settings.parallel_section_continuity_pass and len(pending) > 0 and total_sections > 1:
+            sections_html = await self.apply_section_continuity_pass(context, sections, sections_html)
+
+        context.generated_sections_html = sections_html
+        context.generated_sections = [
+            ArticleSection(title=getattr(section, 'heading', f"Section {i + 1}"), content=sections_html[i], order=i)
+            for i, section in enumerate(sections)
+        ]
+        if section_placeholders:
+            if not hasattr(context, 'image_placeholders'):
+                context.image_placeholders = []
+            for i in sorted(section_placeholders):
+                context.image_placeholders.extend(section_placeholders[i])
+        context.current_section_index = total_sections
+
+    async def apply_section_continuity_pass(self, context: ArticleContext, sections, sections_html: List[str]) -> List[str]:
+        """Append short bridge sentences where independently written sections meet.
+
+        Only the head and tail of each section are sent, and existing HTML is never rewritten,
+        so section order and image placeholders are preserved. Failures keep the drafts as they are.
+        """
+        excerpt_chars = 300
+        lines = []
+        for i, section in enumerate(sections):
+            text = re.sub(r"<[^>]+>", " ", sections_html[i] or "")
+            text = re.sub(r"\s+", " ", text).strip()
+            lines.append(
+                f"[セクション {i}] {getattr(section, 'heading', '')}\n"
+                f"冒頭: {text[:excerpt_chars]}\n"
+                f"末尾: {text[-excerpt_chars:]}"
+            )
+        agent_input = "以下は記事のセクション一覧です（セクション番号は0始まり）。\n\n" + "\n\n".join(lines)
+        run_config = self._build_step_run_config(
+            context,
+            getattr(context, 'process_id', 'unknown'),
+            "writing_sections",
+            {"continuity_pass": "true"}
+        )
+        try:
+            report = await self.run_agent(section_continuity_agent, agent_input, context, run_config)
+        except Exception as e:
+            logger.warning(f"Section continuity pass failed; keeping sections as written: {e}")
+            return sections_html
+        if not isinstance(report, SectionContinuityReport):
+            return sections_html
+
+        updated = list(sections_html)
+        for transition in report.transitions:
+            bridge = (transition.bridge_html or "").strip()
+            index = transition.section_index
+            if not bridge or not 0 <= index < len(updated) - 1 or "IMAGE_PLACEHOLDER" in bridge or re.search(r"<h[1-6]", bridge):
+                continue
+            if not bridge.startswith("<p"):
+                bridge = f"<p>{bridge}</p>"
+            updated[index] = f"{updated[index].rstrip()}\n{bridge}"
+        return updated
+
     async def execute_editing_step(self, context: ArticleContext):
         """Execute editing step for background tasks"""
         try:
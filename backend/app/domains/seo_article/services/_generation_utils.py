@@ -15,6 +15,7 @@ from pydantic import ValidationError, BaseModel
 
 # 内部モジュールのインポート
 from app.core.config import settings
+from app.infrastructure.cancellation import cancellation_registry
 from app.domains.seo_article.schemas import (
     # Server event payloads
     SectionChunkPayload, SelectThemePayload, ApprovePayload, SelectPersonaPayload, EditAndProceedPayload, EditThemePayload, EditPlanPayload, EditOutlinePayload,
@@ -649,6 +650,7 @@ class GenerationUtils:
         stream_result = None
         last_exception = None
         start_time = time.time()
+        cancel_token = cancellation_registry.get(getattr(context, "process_id", None))
 
         for attempt in range(settings.max_retries):
             try:
@@ -660,6 +662,10 @@ class GenerationUtils:
                 accumulated_html = ""
 
                 async for event in stream_result.stream_events():
+                    # プロセスがキャンセルされたらストリームを閉じて執筆を打ち切る
+                    if cancel_token and cancel_token.cancelled:
+                        stream_result.cancel()
+                        cancel_token.raise_if_cancelled()
                     if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
                         delta = event.data.delta
                         accumulated_html += delta
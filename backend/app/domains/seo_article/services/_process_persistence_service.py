@@ -1,61 +1,52 @@
 # -*- coding: utf-8 -*-
+import base64
 import logging
-from typing import List, Dict, Any, Optional
+import re
+from collections import OrderedDict
+from typing import Iterable, List, Dict, Any, Optional, Set, Tuple
+from uuid import UUID
 from rich.console import Console
-from enum import Enum
 
 # 内部モジュールのインポート
+from app.common.database import get_async_supabase_client
 from app.core.config import settings
 from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.services.context_serializer import context_to_dict, digest, to_jsonable
+from app.domains.seo_article.services.edit_knowledge_cache import edit_knowledge_cache
 
 console = Console()
 logger = logging.getLogger(__name__)
 
+# 差分保存を行わず article_context 全体を書き込むステップ
+FULL_CHECKPOINT_STEPS = {"completed", "error"}
+
+# 保存済みスナップショットチャンクのハッシュを覚えておくプロセス数の上限
+SNAPSHOT_CHUNK_CACHE_PROCESSES = 256
+
+
 class ProcessPersistenceService:
     """プロセスの永続化とデータベース操作を担当するクラス"""
     
     def __init__(self, service):
         self.service = service  # ArticleGenerationServiceへの参照
+        # process_id -> DB に保存済みのスナップショットチャンクのハッシュ（送信を省略するため）
+        self._snapshot_chunk_hashes: "OrderedDict[str, Set[str]]" = OrderedDict()
 
     async def save_context_to_db(self, context: ArticleContext, process_id: Optional[str] = None, user_id: Optional[str] = None, organization_id: Optional[str] = None) -> str:
         """Save ArticleContext to database and return process_id"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
             from datetime import datetime, timezone
-            import json
-            supabase = get_supabase_client()
-            
-            def safe_serialize_value(value):
-                if value is None:
-                    return None
-                if isinstance(value, Enum):
-                    return value.value               # ★ Enumは値で保存
-                if isinstance(value, list):
-                    return [safe_serialize_value(v) for v in value]
-                if isinstance(value, dict):
-                    return {k: safe_serialize_value(v) for k, v in value.items()}
-                if hasattr(value, "model_dump"):
-                    return value.model_dump()
-                if hasattr(value, "__dict__"):
-                    return {k: safe_serialize_value(v) for k, v in value.__dict__.items()}
-                return value
+            supabase = await get_async_supabase_client()
             
             # Convert context to dict (excluding WebSocket and asyncio objects)
-            context_dict = {}
-            for key, value in context.__dict__.items():
-                if key not in ["websocket", "user_response_event"]:
-                    try:
-                        context_dict[key] = safe_serialize_value(value)
-                        # デバッグ: image_mode の値をログ出力
-                        if key == "image_mode":
-                            console.print(f"[cyan]DEBUG: Saving image_mode = {value} (type: {type(value)})[/cyan]")
-                    except Exception as e:
-                        console.print(f"[yellow]Warning: Failed to serialize {key}: {e}. Using string representation.[/yellow]")
-                        context_dict[key] = str(value)
-            
-            # Verify JSON serialization works
+            context_dict = context_to_dict(context)
+            # デバッグ: image_mode の値をログ出力
+            console.print(f"[cyan]DEBUG: Saving image_mode = {context.image_mode} (type: {type(context.image_mode)})[/cyan]")
+            
+            # Verify JSON serialization works (同時に差分検出用のダイジェストを作る)
             try:
-                json.dumps(context_dict)
+                field_digests = {key: digest(value) for key, value in context_dict.items()}
+                list_lengths = {key: len(value) for key, value in context_dict.items() if isinstance(value, list)}
             except Exception as e:
                 console.print(f"[red]Error: Context still not JSON serializable after processing: {e}[/red]")
                 raise e
@@ -81,7 +72,6 @@ class ProcessPersistenceService:
             if process_id:
                 # Update existing state
                 update_data = {
-                    "article_context": context_dict,
                     "status": map_step_to_status(context.current_step),
                     "current_step_name": context.current_step,
                     "updated_at": datetime.now(timezone.utc).isoformat()
@@ -136,13 +126,13 @@ class ProcessPersistenceService:
                             console.print(f"[cyan]Saving final article for process {process_id}[/cyan]")
                             
                             # 既存記事をチェック
-                            existing_article = supabase.table("articles").select("id").eq("generation_process_id", process_id).execute()
+                            existing_article = await supabase.table("articles").select("id").eq("generation_process_id", process_id).execute()
                             
                             if existing_article.data and len(existing_article.data) > 0:
                                 # 既存記事を更新
                                 article_id = existing_article.data[0]["id"]
                                 console.print(f"[yellow]Updating existing article {article_id}[/yellow]")
-                                article_result = supabase.table("articles").update(article_data).eq("id", article_id).execute()
+                                article_result = await supabase.table("articles").update(article_data).eq("id", article_id).execute()
                                 
                                 if article_result.data:
                                     update_data["article_id"] = article_id
@@ -152,7 +142,7 @@ class ProcessPersistenceService:
                             else:
                                 # 新規記事を作成
                                 console.print(f"[yellow]Creating new article for process {process_id}[/yellow]")
-                                article_result = supabase.table("articles").insert(article_data).execute()
+                                article_result = await supabase.table("articles").insert(article_data).execute()
                                 
                                 if article_result.data:
                                     article_id = article_result.data[0]["id"]
@@ -166,7 +156,7 @@ class ProcessPersistenceService:
                             # 最後の試み: 強制的に挿入
                             try:
                                 console.print(f"[yellow]Attempting force insert for process {process_id}[/yellow]")
-                                article_result = supabase.table("articles").insert(article_data).execute()
+                                article_result = await supabase.table("articles").insert(article_data).execute()
                                 if article_result.data:
                                     article_id = article_result.data[0]["id"]
                                     update_data["article_id"] = article_id
@@ -174,11 +164,32 @@ class ProcessPersistenceService:
                             except Exception as fallback_error:
                                 console.print(f"[red]Fallback article save also failed: {fallback_error}[/red]")
                 
-                supabase.table("generated_articles_state").update(update_data).eq("id", process_id).execute()
+                # 変更のあったトップレベルキーだけを jsonb マージで書き込み、一定回数ごとと
+                # 終了時は全体を書き込むチェックポイントにする
+                use_delta = (
+                    settings.context_delta_persistence
+                    and context.has_persisted_state()
+                    and context.current_step not in FULL_CHECKPOINT_STEPS
+                    and context._delta_saves_since_checkpoint < settings.context_checkpoint_interval
+                )
+                if use_delta:
+                    context_patch, context_append = self._build_context_delta(context, context_dict, field_digests)
+                    await supabase.rpc('update_article_context_delta', {
+                        'p_process_id': process_id,
+                        'p_context_patch': context_patch,
+                        'p_context_append': context_append,
+                        'p_state': update_data,
+                    }).execute()
+                    context.mark_fields_persisted(field_digests, list_lengths, full=False)
+                else:
+                    update_data["article_context"] = context_dict
+                    await supabase.table("generated_articles_state").update(update_data).eq("id", process_id).execute()
+                    context.mark_fields_persisted(field_digests, list_lengths, full=True)
+                edit_knowledge_cache.invalidate_process(process_id)
                 return process_id
             else:
                 # Get default flow ID for new states
-                flow_result = supabase.table("article_generation_flows").select("id").eq("name", "Default SEO Article Generation").eq("is_template", True).execute()
+                flow_result = await supabase.table("article_generation_flows").select("id").eq("name", "Default SEO Article Generation").eq("is_template", True).execute()
                 
                 if not flow_result.data:
                     raise Exception("Default flow template not found")
@@ -196,8 +207,9 @@ class ProcessPersistenceService:
                     "style_template_id": context.style_template_id  # Add style template ID to dedicated column
                 }
                 
-                result = supabase.table("generated_articles_state").insert(state_data).execute()
+                result = await supabase.table("generated_articles_state").insert(state_data).execute()
                 if result.data:
+                    context.mark_fields_persisted(field_digests, list_lengths, full=True)
                     return result.data[0]["id"]
                 else:
                     raise Exception("Failed to create generation state")
@@ -206,15 +218,35 @@ class ProcessPersistenceService:
             logger.error(f"Error saving context to database: {e}")
             raise
 
+    @staticmethod
+    def _build_context_delta(
+        context: ArticleContext,
+        context_dict: Dict[str, Any],
+        field_digests: Dict[str, str],
+    ) -> tuple[Dict[str, Any], Dict[str, List[Any]]]:
+        """変更されたキーを「置き換え」と「リスト末尾への追記」に振り分ける"""
+        context_patch: Dict[str, Any] = {}
+        context_append: Dict[str, List[Any]] = {}
+        for key in context.get_dirty_fields(field_digests):
+            value = context_dict[key]
+            persisted = context.get_persisted_list_state(key)
+            if isinstance(value, list) and persisted:
+                persisted_length, persisted_digest = persisted
+                # 既存要素が変わらず末尾に追加されただけなら追加分のみ送る
+                if len(value) > persisted_length and digest(value[:persisted_length]) == persisted_digest:
+                    context_append[key] = value[persisted_length:]
+                    continue
+            context_patch[key] = value
+        return context_patch, context_append
+
     async def load_context_from_db(self, process_id: str, user_id: str) -> Optional[ArticleContext]:
         """Load context from database for process persistence"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
             from app.domains.seo_article.schemas import AgeGroup, PersonaType
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             # Get the process state with user access control
-            result = supabase.table("generated_articles_state").select("*").eq("id", process_id).eq("user_id", user_id).execute()
+            result = await supabase.table("generated_articles_state").select("*").eq("id", process_id).eq("user_id", user_id).execute()
             
             if not result.data:
                 logger.warning(f"Process {process_id} not found for user {user_id}")
@@ -312,6 +344,7 @@ class ProcessPersistenceService:
                 flow_type=context_dict.get("flow_type", "research_first"),
                 auto_mode=context_dict.get("auto_mode", False),
                 auto_selection_strategy=context_dict.get("auto_selection_strategy", "best_match"),
+                bypass_research_cache=context_dict.get("bypass_research_cache", False),
                 enable_final_editing=context_dict.get("enable_final_editing", False),
                 websocket=None,  # Will be set when WebSocket connects
                 user_response_event=None,  # Will be set when WebSocket connects
@@ -342,6 +375,7 @@ class ProcessPersistenceService:
             context.full_draft_html = context_dict.get("full_draft_html")
             context.final_article_html = context_dict.get("final_article_html")
             context.section_writer_history = context_dict.get("section_writer_history", [])
+            context.section_writer_token_report = context_dict.get("section_writer_token_report") or {}
             # Restore conversation continuity fields (optional)
             try:
                 context.responses_conversation_id = context_dict.get("responses_conversation_id")
@@ -354,7 +388,7 @@ class ProcessPersistenceService:
             if context.style_template_id and not context.style_template_settings:
                 try:
                     logger.info(f"🔄 [LOAD_CONTEXT] Auto-hydrating style template {context.style_template_id}")
-                    res = supabase.table("style_guide_templates")\
+                    res = await supabase.table("style_guide_templates")\
                         .select("settings")\
                         .eq("id", context.style_template_id)\
                         .single()\
@@ -375,7 +409,7 @@ class ProcessPersistenceService:
                 ])
                 if missing_company_core or missing_extended:
                     console.print("[cyan]DEBUG: Attempting company_info auto-hydration (missing fields detected)\n[/cyan]")
-                    c_res = supabase.table("company_info").select("*").eq("user_id", user_id).eq("is_default", True).single().execute()
+                    c_res = await supabase.table("company_info").select("*").eq("user_id", user_id).eq("is_default", True).single().execute()
                     if c_res.data:
                         ci = c_res.data
                         context.company_name = context.company_name or ci.get("name")
@@ -393,6 +427,16 @@ class ProcessPersistenceService:
             except Exception as e:
                 logger.warning(f"[LOAD_CONTEXT] company_info auto-hydration failed: {e}")
 
+            # DB上の内容を基準に差分保存できるようにダイジェストを記録
+            try:
+                context.mark_fields_persisted(
+                    {key: digest(value) for key, value in context_dict.items()},
+                    {key: len(value) for key, value in context_dict.items() if isinstance(value, list)},
+                    full=True,
+                )
+            except Exception as e:
+                logger.warning(f"[LOAD_CONTEXT] Failed to record persisted context digests: {e}")
+
             logger.info(f"Successfully loaded context for process {process_id} from step {context.current_step}")
             return context
             
@@ -429,17 +473,16 @@ class ProcessPersistenceService:
     async def get_generation_process_state(self, process_id: str, user_id: str, user_jwt: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Get generation process state from database"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             # Get the process state with user access control
             logger.info(f"🔍 [DB_ACCESS] Looking for process {process_id} with user_id: {user_id}")
-            result = supabase.table("generated_articles_state").select("*").eq("id", process_id).eq("user_id", user_id).execute()
+            result = await supabase.table("generated_articles_state").select("*").eq("id", process_id).eq("user_id", user_id).execute()
             
             if not result.data:
                 logger.warning(f"🚫 [DB_ACCESS] Process {process_id} not found for user {user_id}")
                 # Additional debug: check if process exists with any user
-                all_result = supabase.table("generated_articles_state").select("id, user_id").eq("id", process_id).execute()
+                all_result = await supabase.table("generated_articles_state").select("id, user_id").eq("id", process_id).execute()
                 if all_result.data:
                     existing_user = all_result.data[0].get("user_id")
                     logger.warning(f"🔍 [DB_ACCESS] Process {process_id} EXISTS but with different user_id: {existing_user} (expected: {user_id})")
@@ -517,12 +560,11 @@ class ProcessPersistenceService:
             List of article dictionaries with basic information
         """
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             # Query for articles created by the user
             query = supabase.table("articles").select(
-                "id, title, content, keywords, target_audience, status, created_at, updated_at"
+                "id, title, excerpt, char_count, heading_count, keywords, target_audience, status, created_at, updated_at"
             ).eq("user_id", user_id)
             
             # Apply status filter if provided
@@ -532,25 +574,21 @@ class ProcessPersistenceService:
             # Apply pagination
             query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
             
-            result = query.execute()
+            result = await query.execute()
             
             articles = []
             for article in result.data:
-                # Extract short description from content (first 150 characters)
-                content = article.get("content", "")
-                # Strip HTML tags for short description
-                import re
-                plain_text = re.sub(r'<[^>]+>', '', content)
-                short_description = plain_text[:150] + "..." if len(plain_text) > 150 else plain_text
-                
+                # 保存時に計算済みの抜粋（HTML 除去済み）から short description を作る
                 articles.append({
                     "id": article["id"],
                     "title": article["title"],
-                    "shortdescription": short_description,
+                    "shortdescription": self._short_description(article, 150),
                     "postdate": article["created_at"].split("T")[0] if article["created_at"] else None,
                     "status": article["status"],
                     "keywords": article.get("keywords", []),
                     "target_audience": article.get("target_audience"),
+                    "char_count": article.get("char_count"),
+                    "heading_count": article.get("heading_count"),
                     "updated_at": article["updated_at"]
                 })
             
@@ -560,6 +598,18 @@ class ProcessPersistenceService:
             logger.error(f"Error retrieving articles for user {user_id}: {e}")
             raise
     
+    @staticmethod
+    def _short_description(article: Dict[str, Any], length: int) -> str:
+        """articles.excerpt / char_count（content 保存時にトリガーで計算）から一覧用の説明文を作る"""
+        excerpt = article.get("excerpt")
+        if excerpt is None:
+            # 計算列がまだ埋まっていない行は本文から作る
+            plain_text = re.sub(r'<[^>]+>', '', article.get("content") or "")
+            excerpt, char_count = plain_text[:length], len(plain_text)
+        else:
+            char_count = article.get("char_count") or len(excerpt)
+        return excerpt[:length] + "..." if char_count > length else excerpt[:length]
+
     async def get_article(self, article_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """
         Get detailed article information by ID.
@@ -572,16 +622,15 @@ class ProcessPersistenceService:
             Article dictionary with detailed information or None if not found
         """
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             # Query for article with user access control
-            result = supabase.table("articles").select("*").eq("id", article_id).eq("user_id", user_id).execute()
+            result = await supabase.table("articles").select("*").eq("id", article_id).eq("user_id", user_id).execute()
             
             # If no direct match, check if this might be a generation_process_id
             if not result.data:
                 # Try to find by generation_process_id (in case user is using wrong ID)
-                process_result = supabase.table("articles").select("*").eq("generation_process_id", article_id).eq("user_id", user_id).order("updated_at", desc=True).execute()
+                process_result = await supabase.table("articles").select("*").eq("generation_process_id", article_id).eq("user_id", user_id).order("updated_at", desc=True).execute()
                 if process_result.data:
                     result = process_result
             
@@ -597,21 +646,17 @@ class ProcessPersistenceService:
             
             article = articles[0]
             
-            # Extract short description from content
-            content = article.get("content", "")
-            import re
-            plain_text = re.sub(r'<[^>]+>', '', content)
-            short_description = plain_text[:300] + "..." if len(plain_text) > 300 else plain_text
-            
             return {
                 "id": article["id"],
                 "title": article["title"],
                 "content": article["content"],
-                "shortdescription": short_description,
+                "shortdescription": self._short_description(article, 300),
                 "postdate": article["created_at"].split("T")[0] if article["created_at"] else None,
                 "status": article["status"],
                 "keywords": article.get("keywords", []),
                 "target_audience": article.get("target_audience"),
+                "char_count": article.get("char_count"),
+                "heading_count": article.get("heading_count"),
                 "created_at": article["created_at"],
                 "updated_at": article["updated_at"],
                 "generation_process_id": article.get("generation_process_id")
@@ -626,7 +671,8 @@ class ProcessPersistenceService:
         user_id: str, 
         status_filter: Optional[str] = None,
         limit: int = 20,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Get all processes (completed articles + in-progress/failed generation processes) for a user.
@@ -636,137 +682,120 @@ class ProcessPersistenceService:
             status_filter: Optional status filter ('completed', 'in_progress', 'error', etc.)
             limit: Maximum number of items to return
             offset: Number of items to skip for pagination
+            cursor: Keyset cursor from encode_process_cursor() (items after it are returned)
             
         Returns:
             List of unified process dictionaries (articles + generation processes)
         """
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            import re
-            supabase = get_supabase_client()
-            
-            all_processes = []
-            
-            # 1. Get completed articles
-            articles_query = supabase.table("articles").select(
-                "id, title, content, keywords, target_audience, status, created_at, updated_at, generation_process_id"
-            ).eq("user_id", user_id)
-            
-            if status_filter and status_filter == "completed":
-                articles_query = articles_query.eq("status", "completed")
-            
-            articles_result = articles_query.order("created_at", desc=True).execute()
-            
-            for article in articles_result.data:
-                # Extract short description from content
-                content = article.get("content", "")
-                plain_text = re.sub(r'<[^>]+>', '', content)
-                short_description = plain_text[:150] + "..." if len(plain_text) > 150 else plain_text
-                
-                all_processes.append({
-                    "id": article["id"],
-                    "process_id": article.get("generation_process_id"),
-                    "title": article["title"],
-                    "shortdescription": short_description,
-                    "postdate": article["created_at"].split("T")[0] if article["created_at"] else None,
-                    "status": "completed",  # Articles are always completed
-                    "process_type": "article",
-                    "keywords": article.get("keywords", []),
-                    "target_audience": article.get("target_audience"),
-                    "updated_at": article["updated_at"],
-                    "can_resume": False,
-                    "is_recoverable": False
-                })
-            
-            # Collect generation_process_ids from articles to avoid duplication
-            existing_process_ids = set()
-            for article in articles_result.data:
-                if article.get("generation_process_id"):
-                    existing_process_ids.add(article["generation_process_id"])
+            supabase = await get_async_supabase_client()
+
+            # 記事と生成プロセスの統合・並び替え・ページングはDB側で行い、一覧に必要な列だけを受け取る
+            params: Dict[str, Any] = {
+                "p_user_id": user_id,
+                "p_status_filter": status_filter,
+                "p_limit": limit,
+                "p_offset": offset,
+            }
+            if cursor:
+                cursor_updated_at, cursor_id = self.decode_process_cursor(cursor)
+                params.update({"p_cursor_updated_at": cursor_updated_at, "p_cursor_id": cursor_id})
 
-            # 2. Get generation processes (including incomplete ones)
-            processes_query = supabase.table("generated_articles_state").select(
-                "id, status, article_context, current_step_name, progress_percentage, is_waiting_for_input, created_at, updated_at, error_message"
-            ).eq("user_id", user_id)
-            
-            # Only get non-completed processes (since completed ones have articles)
-            # Also exclude processes that already have corresponding articles
-            processes_query = processes_query.neq("status", "completed")
-            
-            if status_filter and status_filter != "completed":
-                processes_query = processes_query.eq("status", status_filter)
-            
-            processes_result = processes_query.order("updated_at", desc=True).execute()
-            
-            for process in processes_result.data:
-                # Skip processes that already have corresponding articles
-                if process["id"] in existing_process_ids:
-                    continue
-                    
-                # Skip completed processes (they should have articles)
-                if process["status"] == "completed":
-                    continue
-                    
-                context = process.get("article_context", {})
-                keywords = context.get("initial_keywords", [])
-                
-                # Generate title from keywords or step
-                if keywords:
-                    title = f"SEO記事: {', '.join(keywords[:3])}"
-                else:
-                    title = f"記事生成プロセス (ID: {process['id'][:8]}...)"
-                
-                # Generate description based on current step
-                current_step = process.get("current_step_name", "start")
-                step_descriptions = {
-                    "start": "生成開始",
-                    "keyword_analyzing": "キーワード分析中",
-                    "persona_generating": "ペルソナ生成中",
-                    "theme_generating": "テーマ生成中",
-                    "theme_proposed": "テーマ選択待ち",
-                    "researching": "リサーチ実行中",
-                    "outline_generating": "アウトライン生成中",
-                    "outline_generated": "アウトライン承認待ち",
-                    "writing_sections": "記事執筆中",
-                    "editing": "編集中",
-                    "error": "エラーが発生しました"
-                }
-                description = step_descriptions.get(current_step, f"ステップ: {current_step}")
-                
-                # Determine if process is recoverable
-                is_recoverable = process["status"] in ["user_input_required", "paused", "error"]
-                can_resume = is_recoverable and process.get("is_waiting_for_input", False)
-                
-                all_processes.append({
-                    "id": process["id"],
-                    "process_id": process["id"],
-                    "title": title,
-                    "shortdescription": description,
-                    "postdate": process["created_at"].split("T")[0] if process["created_at"] else None,
-                    "status": process["status"],
-                    "process_type": "generation",
-                    "keywords": keywords,
-                    "target_audience": context.get("custom_persona") or context.get("persona_type"),
-                    "updated_at": process["updated_at"],
-                    "current_step": current_step,
-                    "progress_percentage": process.get("progress_percentage", 0),
-                    "can_resume": can_resume,
-                    "is_recoverable": is_recoverable,
-                    "error_message": process.get("error_message")
-                })
-            
-            # 3. Sort all processes by updated_at (most recent first)
-            all_processes.sort(key=lambda x: x["updated_at"] or "", reverse=True)
-            
-            # 4. Apply pagination
-            paginated_processes = all_processes[offset:offset + limit]
-            
-            return paginated_processes
+            result = await supabase.rpc("get_user_process_list", params).execute()
+
+            return [self._format_process_list_row(row) for row in result.data or []]
             
         except Exception as e:
             logger.error(f"Error retrieving all processes for user {user_id}: {e}")
             raise
 
+    # 生成プロセスの現在ステップの一覧表示用説明
+    PROCESS_STEP_DESCRIPTIONS = {
+        "start": "生成開始",
+        "keyword_analyzing": "キーワード分析中",
+        "persona_generating": "ペルソナ生成中",
+        "theme_generating": "テーマ生成中",
+        "theme_proposed": "テーマ選択待ち",
+        "researching": "リサーチ実行中",
+        "outline_generating": "アウトライン生成中",
+        "outline_generated": "アウトライン承認待ち",
+        "writing_sections": "記事執筆中",
+        "editing": "編集中",
+        "error": "エラーが発生しました"
+    }
+
+    def _format_process_list_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """get_user_process_list の1行を一覧APIのレスポンス形式に変換する"""
+        created_at = row.get("created_at")
+        postdate = created_at.split("T")[0] if created_at else None
+
+        if row["process_type"] == "article":
+            plain_text = row.get("excerpt") or ""
+            short_description = plain_text[:150] + "..." if len(plain_text) > 150 else plain_text
+            return {
+                "id": row["id"],
+                "process_id": row.get("process_id"),
+                "title": row["title"],
+                "shortdescription": short_description,
+                "postdate": postdate,
+                "status": "completed",  # Articles are always completed
+                "process_type": "article",
+                "keywords": row.get("keywords"),
+                "target_audience": row.get("target_audience"),
+                "updated_at": row["updated_at"],
+                "can_resume": False,
+                "is_recoverable": False
+            }
+
+        keywords = row.get("keywords") or []
+        # Generate title from keywords or step
+        if keywords:
+            title = f"SEO記事: {', '.join(keywords[:3])}"
+        else:
+            title = f"記事生成プロセス (ID: {row['id'][:8]}...)"
+
+        current_step = row.get("current_step_name") or "start"
+        description = self.PROCESS_STEP_DESCRIPTIONS.get(current_step, f"ステップ: {current_step}")
+
+        # Determine if process is recoverable
+        is_recoverable = row["status"] in ["user_input_required", "paused", "error"]
+        can_resume = is_recoverable and bool(row.get("is_waiting_for_input"))
+
+        return {
+            "id": row["id"],
+            "process_id": row["id"],
+            "title": title,
+            "shortdescription": description,
+            "postdate": postdate,
+            "status": row["status"],
+            "process_type": "generation",
+            "keywords": keywords,
+            "target_audience": row.get("target_audience"),
+            "updated_at": row["updated_at"],
+            "current_step": current_step,
+            "progress_percentage": row.get("progress_percentage") or 0,
+            "can_resume": can_resume,
+            "is_recoverable": is_recoverable,
+            "error_message": row.get("error_message")
+        }
+
+    @staticmethod
+    def encode_process_cursor(item: Dict[str, Any]) -> str:
+        """一覧の最後の要素から次ページ取得用のキーセットカーソルを作る"""
+        raw = f"{item['updated_at']}|{item['id']}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_process_cursor(cursor: str) -> Tuple[str, str]:
+        """キーセットカーソルを (updated_at, id) に戻す"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+            updated_at, item_id = raw.rsplit("|", 1)
+            UUID(item_id)
+        except Exception as e:
+            raise ValueError(f"Invalid process list cursor: {cursor}") from e
+        return updated_at, item_id
+
     async def get_recoverable_processes(self, user_id: str, limit: int = 10) -> List[dict]:
         """
         Get processes that can be recovered/resumed for a user.
@@ -779,9 +808,8 @@ class ProcessPersistenceService:
             List of recoverable process dictionaries with recovery metadata
         """
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
             from datetime import datetime, timezone
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             # Define recoverable statuses
             recoverable_statuses = ['user_input_required', 'paused', 'error', 'resuming', 'auto_progressing']
@@ -792,7 +820,7 @@ class ProcessPersistenceService:
                 "is_waiting_for_input, created_at, updated_at, error_message, last_activity_at"
             ).eq("user_id", user_id).in_("status", recoverable_statuses)
             
-            result = query.order("updated_at", desc=True).limit(limit).execute()
+            result = await query.order("updated_at", desc=True).limit(limit).execute()
             
             recoverable_processes = []
             current_time = datetime.now(timezone.utc)
@@ -964,12 +992,11 @@ class ProcessPersistenceService:
             更新された記事の情報
         """
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
             from datetime import datetime, timezone
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             # まず記事が存在し、ユーザーがアクセス権限を持つことを確認
-            existing_result = supabase.table("articles").select("*").eq("id", article_id).eq("user_id", user_id).execute()
+            existing_result = await supabase.table("articles").select("*").eq("id", article_id).eq("user_id", user_id).execute()
             
             if not existing_result.data:
                 raise ValueError("Article not found or access denied")
@@ -1008,7 +1035,8 @@ class ProcessPersistenceService:
             
             # データベースを更新
             logger.info(f"Updating article {article_id} with fields: {list(update_fields.keys())}")
-            result = supabase.table("articles").update(update_fields).eq("id", article_id).eq("user_id", user_id).execute()
+            result = await supabase.table("articles").update(update_fields).eq("id", article_id).eq("user_id", user_id).execute()
+            edit_knowledge_cache.invalidate_article(article_id)
             
             if not result.data:
                 raise Exception(f"Failed to update article {article_id} - no rows affected")
@@ -1063,7 +1091,7 @@ class ProcessPersistenceService:
                 
                 try:
                     # ON CONFLICT DO UPDATEでupsert
-                    result = supabase.table("image_placeholders").upsert(
+                    result = await supabase.table("image_placeholders").upsert(
                         placeholder_data,
                         on_conflict="article_id,placeholder_id"
                     ).execute()
@@ -1085,9 +1113,8 @@ class ProcessPersistenceService:
     async def update_process_status(self, process_id: str, status: str, current_step: str = None, metadata: dict = None) -> None:
         """Update process status in database"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
             from datetime import datetime, timezone
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             update_data = {
                 "status": status,
@@ -1100,7 +1127,7 @@ class ProcessPersistenceService:
             if metadata:
                 update_data["process_metadata"] = metadata
             
-            result = supabase.table("generated_articles_state").update(update_data).eq("id", process_id).execute()
+            result = await supabase.table("generated_articles_state").update(update_data).eq("id", process_id).execute()
             
             if result.data:
                 logger.info(f"Successfully updated process {process_id} status to {status}")
@@ -1122,32 +1149,13 @@ class ProcessPersistenceService:
     async def add_step_to_history(self, process_id: str, step_name: str, status: str, data: dict = None) -> None:
         """Add step to history using database function for process tracking"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
-            
-            # Safe serialization function for history data
-            def safe_serialize_history_data(value):
-                """Safely serialize data for JSON storage"""
-                if value is None:
-                    return None
-                elif isinstance(value, (str, int, float, bool)):
-                    return value
-                elif isinstance(value, list):
-                    return [safe_serialize_history_data(item) for item in value]
-                elif isinstance(value, dict):
-                    return {k: safe_serialize_history_data(v) for k, v in value.items()}
-                elif hasattr(value, "model_dump"):
-                    return value.model_dump()
-                elif hasattr(value, "__dict__"):
-                    return {k: safe_serialize_history_data(v) for k, v in value.__dict__.items()}
-                else:
-                    return str(value)
+            supabase = await get_async_supabase_client()
             
             # Safely serialize the data parameter
-            safe_data = safe_serialize_history_data(data or {})
+            safe_data = to_jsonable(data or {})
             
             # Use the database function instead of direct table insert
-            supabase.rpc('add_step_to_history', {
+            await supabase.rpc('add_step_to_history', {
                 'process_id': process_id,
                 'step_name': step_name,
                 'step_status': status,
@@ -1166,8 +1174,7 @@ class ProcessPersistenceService:
         画像プレースホルダー情報をデータベースに保存
         """
         try:
-            from app.core.config import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             from datetime import datetime, timezone
             
             # 記事IDを取得（完成した記事から、または生成プロセスIDから推測）
@@ -1192,7 +1199,7 @@ class ProcessPersistenceService:
                     }
                     
                     # プレースホルダーをデータベースに保存（UPSERT）
-                    result = supabase.table("image_placeholders").upsert(
+                    result = await supabase.table("image_placeholders").upsert(
                         placeholder_data,
                         on_conflict="article_id,placeholder_id"
                     ).execute()
@@ -1215,8 +1222,7 @@ class ProcessPersistenceService:
         最終記事をデータベースに保存し、プレースホルダー情報も更新
         """
         try:
-            from app.core.config import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             import uuid
             from datetime import datetime, timezone
             
@@ -1241,7 +1247,7 @@ class ProcessPersistenceService:
             }
             
             # 記事をデータベースに保存
-            result = supabase.table("articles").insert(article_data).execute()
+            result = await supabase.table("articles").insert(article_data).execute()
             
             if not result.data:
                 raise Exception("記事の保存に失敗しました")
@@ -1265,11 +1271,10 @@ class ProcessPersistenceService:
         プレースホルダーのarticle_idを更新
         """
         try:
-            from app.core.config import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
 
             # generation_process_idで検索してarticle_idを更新
-            result = supabase.table("image_placeholders").update({
+            result = await supabase.table("image_placeholders").update({
                 "article_id": article_id
             }).eq("generation_process_id", process_id).execute()
 
@@ -1310,57 +1315,27 @@ class ProcessPersistenceService:
         """
         logger.info(f"💾 save_step_snapshot called: process_id={process_id}, step_name={step_name}")
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            import json
-            supabase = get_supabase_client()
-
-            # Serialize ArticleContext (reuse logic from save_context_to_db)
-            def safe_serialize_value(value):
-                """Recursively serialize any object to JSON-serializable format"""
-                if value is None:
-                    return None
-                elif isinstance(value, (str, int, float, bool)):
-                    return value
-                elif isinstance(value, list):
-                    return [safe_serialize_value(item) for item in value]
-                elif isinstance(value, dict):
-                    return {k: safe_serialize_value(v) for k, v in value.items()}
-                elif hasattr(value, "model_dump"):
-                    return value.model_dump()
-                elif hasattr(value, "__dict__"):
-                    return {k: safe_serialize_value(v) for k, v in value.__dict__.items()}
-                else:
-                    return str(value)
+            supabase = await get_async_supabase_client()
 
-            # Convert context to dict (excluding WebSocket and asyncio objects)
-            context_dict = {}
-            for key, value in article_context.__dict__.items():
-                if key not in ["websocket", "user_response_event"]:
-                    try:
-                        context_dict[key] = safe_serialize_value(value)
-                    except Exception as e:
-                        logger.warning(f"Failed to serialize {key} for snapshot: {e}. Using string representation.")
-                        context_dict[key] = str(value)
+            # Serialize ArticleContext (same serializer as save_context_to_db)
+            context_dict = context_to_dict(article_context)
 
-            # Verify JSON serialization
-            try:
-                json.dumps(context_dict)
-            except Exception as e:
-                logger.error(f"Context not JSON serializable for snapshot: {e}")
-                raise e
+            params = {
+                'p_process_id': process_id,
+                'p_step_name': step_name,
+                'p_step_description': step_description,
+                'p_step_category': step_category or self._get_step_category(step_name),
+                'p_snapshot_metadata': snapshot_metadata or {}
+            }
 
-            # Call database function to save snapshot - synchronous execution like existing code
-            result = supabase.rpc(
-                'save_step_snapshot',
-                {
-                    'p_process_id': process_id,
-                    'p_step_name': step_name,
-                    'p_article_context': context_dict,
-                    'p_step_description': step_description,
-                    'p_step_category': step_category or self._get_step_category(step_name),
-                    'p_snapshot_metadata': snapshot_metadata or {}
-                }
-            ).execute()
+            if settings.context_snapshot_chunking:
+                result = await self._save_chunked_snapshot(supabase, process_id, context_dict, params)
+            else:
+                # Call database function to save snapshot
+                result = await supabase.rpc(
+                    'save_step_snapshot',
+                    {**params, 'p_article_context': context_dict}
+                ).execute()
 
             snapshot_id = result.data
             logger.info(f"✅ Saved snapshot for step '{step_name}' (snapshot_id: {snapshot_id}, process_id: {process_id})")
@@ -1373,6 +1348,53 @@ class ProcessPersistenceService:
             # Don't raise - snapshot saving is non-critical
             return None
 
+    async def _save_chunked_snapshot(self, supabase, process_id: str, context_dict: Dict[str, Any], params: Dict[str, Any]):
+        """
+        トップレベルフィールドごとに内容ハッシュを取り、未保存のチャンクだけを送ってスナップショットを保存する。
+
+        SERP レポートやリサーチ結果など変化しないフィールドはプロセス内で1度だけ保存される。
+        """
+        chunk_refs: Dict[str, str] = {}
+        chunks: Dict[str, Any] = {}
+        for key, value in context_dict.items():
+            content_hash = digest(value)
+            chunk_refs[key] = content_hash
+            chunks.setdefault(content_hash, value)
+
+        known_hashes = self._snapshot_chunk_hashes.get(process_id, set())
+        new_chunks = {content_hash: value for content_hash, value in chunks.items() if content_hash not in known_hashes}
+
+        try:
+            result = await supabase.rpc(
+                'save_step_snapshot_chunked',
+                {**params, 'p_chunk_refs': chunk_refs, 'p_chunks': new_chunks}
+            ).execute()
+        except Exception as e:
+            # 別ワーカーでの保存や古いスナップショットの削除でキャッシュがずれた場合は全チャンクを送り直す
+            if len(new_chunks) == len(chunks) or "missing_context_chunks" not in str(e):
+                raise
+            logger.warning(f"Snapshot chunk cache for process {process_id} is stale, resending all chunks: {e}")
+            self._snapshot_chunk_hashes.pop(process_id, None)
+            new_chunks = chunks
+            result = await supabase.rpc(
+                'save_step_snapshot_chunked',
+                {**params, 'p_chunk_refs': chunk_refs, 'p_chunks': chunks}
+            ).execute()
+
+        self._remember_snapshot_chunks(process_id, chunks.keys())
+        logger.info(
+            f"📦 Snapshot chunks for process {process_id}: {len(chunk_refs)} fields, "
+            f"{len(new_chunks)} new / {len(chunks) - len(new_chunks)} reused"
+        )
+        return result
+
+    def _remember_snapshot_chunks(self, process_id: str, content_hashes: Iterable[str]) -> None:
+        known_hashes = self._snapshot_chunk_hashes.pop(process_id, set())
+        known_hashes.update(content_hashes)
+        self._snapshot_chunk_hashes[process_id] = known_hashes
+        while len(self._snapshot_chunk_hashes) > SNAPSHOT_CHUNK_CACHE_PROCESSES:
+            self._snapshot_chunk_hashes.popitem(last=False)
+
     async def get_snapshots_for_process(self, process_id: str, user_id: str) -> List[Dict[str, Any]]:
         """
         Get all available snapshots for a process.
@@ -1385,18 +1407,17 @@ class ProcessPersistenceService:
             List of snapshot dictionaries
         """
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
 
-            # First verify user has access to this process - synchronous execution
-            process_check = supabase.table("generated_articles_state").select("id").eq("id", process_id).eq("user_id", user_id).execute()
+            # First verify user has access to this process
+            process_check = await supabase.table("generated_articles_state").select("id").eq("id", process_id).eq("user_id", user_id).execute()
 
             if not process_check.data:
                 logger.warning(f"User {user_id} does not have access to process {process_id}")
                 return []
 
-            # Get available snapshots using database function - synchronous execution
-            result = supabase.rpc(
+            # Get available snapshots using database function
+            result = await supabase.rpc(
                 'get_available_snapshots',
                 {'p_process_id': process_id}
             ).execute()
@@ -1448,13 +1469,12 @@ class ProcessPersistenceService:
             Dictionary with restoration result including branch information
         """
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
 
             logger.info(f"🔄 Restoring from snapshot {snapshot_id} (create_new_branch={create_new_branch})")
 
-            # Get snapshot details to verify ownership - synchronous execution
-            snapshot_result = supabase.table("article_generation_step_snapshots").select(
+            # Get snapshot details to verify ownership
+            snapshot_result = await supabase.table("article_generation_step_snapshots").select(
                 "process_id, step_name, can_restore"
             ).eq("id", snapshot_id).execute()
 
@@ -1464,8 +1484,8 @@ class ProcessPersistenceService:
             snapshot = snapshot_result.data[0]
             process_id = snapshot["process_id"]
 
-            # Verify user has access to this process - synchronous execution
-            process_check = supabase.table("generated_articles_state").select("id").eq("id", process_id).eq("user_id", user_id).execute()
+            # Verify user has access to this process
+            process_check = await supabase.table("generated_articles_state").select("id").eq("id", process_id).eq("user_id", user_id).execute()
 
             if not process_check.data:
                 raise ValueError(f"User {user_id} does not have access to process {process_id}")
@@ -1474,8 +1494,8 @@ class ProcessPersistenceService:
             if not snapshot["can_restore"]:
                 raise ValueError(f"Snapshot {snapshot_id} cannot be restored")
 
-            # Call database function to restore with branch option - synchronous execution
-            result = supabase.rpc(
+            # Call database function to restore with branch option
+            result = await supabase.rpc(
                 'restore_from_snapshot',
                 {
                     'p_snapshot_id': snapshot_id,
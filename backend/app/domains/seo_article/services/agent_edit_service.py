@@ -25,6 +25,7 @@ from app.domains.seo_article.services.codex_patch import (
     parse_apply_patch,
 )
 from app.domains.seo_article.services.flow_service import get_supabase_client
+from app.domains.seo_article.services.edit_knowledge_cache import edit_knowledge_cache
 
 logger = logging.getLogger(__name__)
 
@@ -225,6 +226,7 @@ class AgentEditService:
 
             if not result.data:
                 raise Exception("Failed to save article")
+            edit_knowledge_cache.invalidate_article(article_id)
 
             logger.info(f"Saved article {article_id}")
 
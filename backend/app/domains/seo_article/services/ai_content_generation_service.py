@@ -10,7 +10,7 @@ import logging
 import base64
 import re
 from typing import Dict, Any, List, Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.core.config import settings
 # assemble_edit_knowledge will be imported dynamically to avoid circular imports
 
@@ -21,7 +21,7 @@ class AIContentGenerationService:
     """AIコンテンツ生成サービス"""
 
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.model = settings.ai_content_generation_model
         self.reasoning_effort = settings.ai_content_generation_reasoning_effort
         self.enable_web_search = settings.ai_content_enable_web_search
@@ -80,7 +80,7 @@ class AIContentGenerationService:
                 tools.append({"type": "web_search"})
 
             # レスポンス生成
-            response = self.client.responses.create(
+            response = await self.client.responses.create(
                 model=self.model,
                 input=input_messages,
                 tools=tools if tools else None,
@@ -37,6 +37,7 @@ from agents.stream_events import AgentUpdatedStreamEvent, RawResponsesStreamEven
 
 from app.domains.seo_article.services.flow_service import get_supabase_client
 from app.domains.seo_article.services.version_service import get_version_service
+from app.domains.seo_article.services.edit_knowledge_cache import edit_knowledge_cache
 from app.domains.seo_article.services import article_agent_service as agent_module
 
 logger = logging.getLogger(__name__)
@@ -1470,6 +1471,7 @@ class ArticleAgentService:
 
         if not result.data:
             raise Exception("Failed to save article")
+        edit_knowledge_cache.invalidate_article(session.article_id)
 
         if metadata is None:
             metadata = {}
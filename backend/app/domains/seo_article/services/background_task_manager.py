@@ -16,9 +16,20 @@ from datetime import datetime, timezone, timedelta
 
 from agents import tracing as agent_tracing
 
+from app.common.database import get_async_supabase_client
 from app.core.config import settings
 from app.domains.seo_article.context import ArticleContext
 from app.domains.seo_article.schemas import GenerateArticleRequest
+from app.domains.seo_article.services.process_event_bus import process_event_bus
+from app.domains.seo_article.services.section_history import log_token_report
+from app.domains.seo_article.services.speculative_execution import SpeculativeExecutor, SpeculativeRun
+from app.domains.seo_article.services.task_worker import BackgroundTaskWorker, TaskDrained
+from app.infrastructure.cancellation import (
+    GenerationCancelled,
+    cancellation_registry,
+    raise_if_cancelled,
+    run_cancellable,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +46,12 @@ class BackgroundTaskManager:
     
     def __init__(self, service):
         self.service = service
-        self.active_tasks: Dict[str, asyncio.Task] = {}
+        self.worker = BackgroundTaskWorker(self)
+        # 実行中タスク（ワーカーが管理する辞書をそのまま参照する）
+        self.active_tasks: Dict[str, asyncio.Task] = self.worker.running
         self.task_registry: Dict[str, Dict[str, Any]] = {}
+        # ユーザー入力待ちの間に次のステップを先に実行しておく（SPECULATIVE_EXECUTION=true の場合のみ）
+        self.speculation = SpeculativeExecutor(self)
         
     async def create_background_task(
         self,
@@ -49,8 +64,7 @@ class BackgroundTaskManager:
     ) -> str:
         """Create a new background task in the database"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             task_id = str(uuid.uuid4())
             
@@ -68,7 +82,7 @@ class BackgroundTaskManager:
                 "created_by": "background_task_manager"
             }
             
-            result = supabase.table("background_tasks").insert(task_record).execute()
+            result = await supabase.table("background_tasks").insert(task_record).execute()
             
             if result.data:
                 logger.info(f"Created background task {task_id} for process {process_id}")
@@ -106,23 +120,9 @@ class BackgroundTaskManager:
             )
             logger.info(f"✅ [BGT] Background task created with ID: {task_id}")
             
-            # Start task execution in background with proper error handling
-            logger.info("🚀 [BGT] Creating asyncio task for execution loop")
-            task = asyncio.create_task(self._execute_task_loop(task_id))
-            self.active_tasks[task_id] = task
-            logger.info("✅ [BGT] Asyncio task created and added to active_tasks")
-            
-            # Add done callback for cleanup
-            def cleanup_task(t):
-                logger.info(f"🧹 [BGT] Cleaning up task {task_id}")
-                self.active_tasks.pop(task_id, None)
-                if t.exception():
-                    logger.error(f"💥 [BGT] Background task {task_id} failed with exception: {t.exception()}")
-                else:
-                    logger.info(f"✅ [BGT] Background task {task_id} completed successfully")
-            
-            task.add_done_callback(cleanup_task)
-            logger.info(f"🏁 [BGT] Started background task {task_id} for process {process_id}")
+            # Dispatch task execution (claimed with a lease by this process or a standalone worker)
+            await self._dispatch_task(task_id)
+            logger.info(f"🏁 [BGT] Dispatched background task {task_id} for process {process_id}")
             
             return task_id
             
@@ -145,21 +145,13 @@ class BackgroundTaskManager:
                     "user_id": user_id
                 },
                 priority=6,  # Higher priority for resumes
-                max_retries=3
+                max_retries=3,
+                depends_on=await self._unfinished_task_ids(process_id)
             )
             
-            # Start task execution in background with proper error handling
-            task = asyncio.create_task(self._execute_task_loop(task_id))
-            self.active_tasks[task_id] = task
-            
-            # Add done callback for cleanup
-            def cleanup_task(t):
-                self.active_tasks.pop(task_id, None)
-                if t.exception():
-                    logger.error(f"Background task {task_id} failed with exception: {t.exception()}")
-            
-            task.add_done_callback(cleanup_task)
-            logger.info(f"Started background task {task_id} for process {process_id}")
+            # Dispatch task execution (claimed with a lease by this process or a standalone worker)
+            await self._dispatch_task(task_id)
+            logger.info(f"Dispatched background task {task_id} for process {process_id}")
             
             return task_id
             
@@ -183,21 +175,13 @@ class BackgroundTaskManager:
                     "user_input": user_input
                 },
                 priority=7,  # Highest priority for user responses
-                max_retries=3
+                max_retries=3,
+                depends_on=await self._unfinished_task_ids(process_id)
             )
             
-            # Start task execution in background with proper error handling
-            task = asyncio.create_task(self._execute_task_loop(task_id))
-            self.active_tasks[task_id] = task
-            
-            # Add done callback for cleanup
-            def cleanup_task(t):
-                self.active_tasks.pop(task_id, None)
-                if t.exception():
-                    logger.error(f"Background task {task_id} failed with exception: {t.exception()}")
-            
-            task.add_done_callback(cleanup_task)
-            logger.info(f"Started background task {task_id} for process {process_id}")
+            # Dispatch task execution (claimed with a lease by this process or a standalone worker)
+            await self._dispatch_task(task_id)
+            logger.info(f"Dispatched background task {task_id} for process {process_id}")
             
             return task_id
             
@@ -205,13 +189,58 @@ class BackgroundTaskManager:
             logger.error(f"Error continuing generation process {process_id}: {e}")
             raise
     
-    async def _execute_task_loop(self, task_id: str):
+    async def recover_orphaned_tasks(self) -> int:
+        """Startup sweeper: requeue running tasks left behind by stopped instances and start the worker loop (inline mode)"""
+        count = await self.worker.requeue_expired()
+        if settings.background_task_mode != "worker":
+            self.worker.ensure_started()
+        return count
+
+    async def drain(self) -> None:
+        """Shutdown: stop claiming, let running tasks stop at a step boundary and hand them back for resume"""
+        self.speculation.discard_all("shutdown")
+        await self.worker.stop(timeout=settings.background_task_drain_timeout)
+
+    async def _unfinished_task_ids(self, process_id: str) -> List[str]:
+        """Tasks of the process that must finish before a new one runs (keeps one task per process in flight)"""
+        try:
+            supabase = await get_async_supabase_client()
+            result = await supabase.table("background_tasks").select("id, status, lease_expires_at") \
+                .eq("process_id", process_id).in_("status", ["pending", "running"]).execute()
+            # リースのない running タスク（旧方式で実行され停止したもの）は完了しないので待たない
+            return [
+                row["id"] for row in (result.data or [])
+                if row["status"] == "pending" or row.get("lease_expires_at")
+            ]
+        except Exception as e:
+            logger.warning(f"Failed to load unfinished tasks for process {process_id}: {e}")
+            return []
+
+    async def _dispatch_task(self, task_id: str):
+        """Schedule a created task: claim runnable tasks by priority (inline mode) or leave it for the worker pool (worker mode)"""
+        if settings.background_task_mode == "worker":
+            logger.info(f"📮 [BGT] Task {task_id} queued for the worker pool")
+            return
+
+        try:
+            claimed = await self.worker.schedule_inline()
+            if task_id not in {row["id"] for row in claimed}:
+                # 空きスロットがない・前提タスクが未完了・より優先度の高いタスクがある場合は後で確保される
+                logger.info(f"⏳ [BGT] Task {task_id} queued (running: {len(self.active_tasks)})")
+        except Exception as e:
+            # リース用の RPC が使えない環境では従来どおりリースなしで実行する
+            logger.warning(f"⚠️ [BGT] Failed to claim task {task_id} ({e}); executing without a lease")
+            task = asyncio.create_task(self._execute_task_loop(task_id))
+            self.active_tasks[task_id] = task
+            task.add_done_callback(lambda t: self.active_tasks.pop(task_id, None))
+
+    async def _execute_task_loop(self, task_id: str, claimed_task: Optional[Dict[str, Any]] = None):
         """Execute a background task with proper error handling and retries"""
         try:
             logger.info(f"🚀 [TASK {task_id}] Starting execution of background task")
             
-            # Get task details from database
-            task_data = await self._get_task_data(task_id)
+            # Get task details (already loaded when the task was claimed with a lease)
+            task_data = claimed_task or await self._get_task_data(task_id)
             if not task_data:
                 logger.error(f"❌ [TASK {task_id}] Task not found in database")
                 return
@@ -221,32 +250,47 @@ class BackgroundTaskManager:
             
             logger.info(f"📋 [TASK {task_id}] Executing task of type '{task_type}' for process {process_id}")
             
-            # Update task status to running
-            await self._update_task_status(task_id, "running")
-            logger.info(f"✅ [TASK {task_id}] Task status updated to running")
+            # Update task status to running (claim_background_task(s) already did it for leased tasks)
+            if claimed_task is None:
+                await self._update_task_status(task_id, "running")
+                logger.info(f"✅ [TASK {task_id}] Task status updated to running")
             
             # Execute based on task type
             try:
-                if task_type == "generation_start":
-                    logger.info(f"🎬 [TASK {task_id}] Starting generation_start execution")
-                    await self._execute_generation_start(task_id, task_data)
-                    logger.info(f"🏁 [TASK {task_id}] generation_start execution completed")
-                elif task_type == "generation_continue":
-                    logger.info(f"▶️ [TASK {task_id}] Starting generation_continue execution")
-                    await self._execute_generation_continue(task_id, task_data)
-                    logger.info(f"🏁 [TASK {task_id}] generation_continue execution completed")
-                elif task_type == "generation_resume":
-                    logger.info(f"🔄 [TASK {task_id}] Starting generation_resume execution")
-                    await self._execute_generation_resume(task_id, task_data)
-                    logger.info(f"🏁 [TASK {task_id}] generation_resume execution completed")
-                else:
-                    logger.error(f"❌ [TASK {task_id}] Unknown task type: {task_type}")
-                    raise Exception(f"Unknown task type: {task_type}")
+                # キャンセル・一時停止（他インスタンスで受け付けたものを含む）を実行中のエージェントへ伝える
+                async with cancellation_registry.scope(
+                    process_id, poll=lambda: self._task_cancel_reason(task_id)
+                ):
+                    if task_type == "generation_start":
+                        logger.info(f"🎬 [TASK {task_id}] Starting generation_start execution")
+                        await self._execute_generation_start(task_id, task_data)
+                        logger.info(f"🏁 [TASK {task_id}] generation_start execution completed")
+                    elif task_type == "generation_continue":
+                        logger.info(f"▶️ [TASK {task_id}] Starting generation_continue execution")
+                        await self._execute_generation_continue(task_id, task_data)
+                        logger.info(f"🏁 [TASK {task_id}] generation_continue execution completed")
+                    elif task_type == "generation_resume":
+                        logger.info(f"🔄 [TASK {task_id}] Starting generation_resume execution")
+                        await self._execute_generation_resume(task_id, task_data)
+                        logger.info(f"🏁 [TASK {task_id}] generation_resume execution completed")
+                    else:
+                        logger.error(f"❌ [TASK {task_id}] Unknown task type: {task_type}")
+                        raise Exception(f"Unknown task type: {task_type}")
                 
                 # Mark task as completed
                 await self._update_task_status(task_id, "completed")
                 logger.info(f"✅ [TASK {task_id}] Task completed successfully")
                 
+            except GenerationCancelled as cancelled:
+                # The in-flight agent run was aborted; free the worker slot without retrying
+                logger.info(f"🛑 [TASK {task_id}] Stopped in-flight execution ({cancelled.reason})")
+                await self._update_task_status(task_id, "cancelled")
+                
+            except TaskDrained:
+                # Worker is shutting down: hand the task back so another instance resumes it from the saved context
+                logger.info(f"⏏️ [TASK {task_id}] Stopped at a step boundary for shutdown; releasing for resume")
+                await self.worker.release_for_resume([task_id])
+                
             except Exception as execution_error:
                 logger.error(f"💥 [TASK {task_id}] Error executing task: {execution_error}")
                 logger.exception(f"[TASK {task_id}] Full exception details:")
@@ -325,8 +369,12 @@ class BackgroundTaskManager:
             if not context:
                 raise Exception(f"Failed to load context for process {process_id}")
             
-            # Apply user input to context
-            await self._apply_user_input_to_context(context, user_input)
+            # Apply user input to context (or adopt the speculative run started while waiting for it)
+            speculation = await self.speculation.take(context, user_input)
+            if speculation:
+                await self._publish_speculative_step(speculation, process_id, task_id)
+            else:
+                await self._apply_user_input_to_context(context, user_input)
             
             # Save updated context
             await self.service.persistence_service.save_context_to_db(
@@ -419,6 +467,11 @@ class BackgroundTaskManager:
             
             step_counter = 0
             while context.current_step not in ['completed', 'error']:
+                # Safe point: the previous step's context has been saved, so stop here if the worker is draining
+                if self.worker.stopping:
+                    raise TaskDrained(f"Worker stopping at step {context.current_step}")
+                raise_if_cancelled(process_id)
+
                 step_counter += 1
                 current_step = context.current_step
                 logger.info(f"🔄 [TASK {task_id}] Loop iteration {step_counter}, current step: {current_step}")
@@ -449,6 +502,7 @@ class BackgroundTaskManager:
                         # Manual path: wait for user input
                         logger.info(f"⏸️ [TASK {task_id}] Waiting for user input...")
                         await self._handle_user_input_step(context, process_id, user_id, task_id)
+                        await self.speculation.start(context, process_id, task_id)
                         break  # Exit loop and wait for user input
 
                     # Publish step start event
@@ -511,12 +565,16 @@ class BackgroundTaskManager:
             else:
                 logger.info(f"⏸️ [TASK {task_id}] Generation flow ended at step: {context.current_step}")
                 
+        except TaskDrained:
+            raise
         except Exception as e:
             logger.error(f"💀 [TASK {task_id}] Error in generation flow for process {process_id}: {e}")
             logger.exception(f"[TASK {task_id}] Generation flow exception details:")
             await self._handle_generation_error(process_id, str(e), context.current_step)
             raise
         finally:
+            # バッファに残っている進捗イベントを書き出す
+            await process_event_bus.flush(process_id)
             if trace_obj:
                 try:
                     trace_obj.finish(reset_current=True)
@@ -593,6 +651,31 @@ class BackgroundTaskManager:
             logger.error(f"[TASK {task_id}] Error in step {step_name}: {e}")
             raise
     
+    async def _publish_speculative_step(self, speculation: SpeculativeRun, process_id: str, task_id: str):
+        """Publish the events of an adopted speculative step in the order a normal run would have"""
+        await self._publish_realtime_event(
+            process_id=process_id,
+            event_type="step_started",
+            event_data={
+                "step_name": speculation.speculated_step,
+                "message": f"Starting step: {speculation.speculated_step}",
+                "task_id": task_id,
+                "speculative": True,
+            }
+        )
+        await process_event_bus.replay(process_id, speculation.events)
+        await self._publish_realtime_event(
+            process_id=process_id,
+            event_type="step_completed",
+            event_data={
+                "step_name": speculation.speculated_step,
+                "next_step": speculation.context.current_step,
+                "message": f"Completed step: {speculation.speculated_step}, next: {speculation.context.current_step}",
+                "task_id": task_id,
+                "speculative": True,
+            }
+        )
+
     async def _execute_research_with_progress(self, context: ArticleContext, process_id: str):
         """Execute research with progress events (parallel execution)"""
         # 注意(legacy-flow): 進捗通知付きの実行経路は `research_plan` の存在を前提としており、
@@ -655,22 +738,15 @@ class BackgroundTaskManager:
                 await update_shared_progress()
                 return query_index, False
         
-        # Execute all queries in parallel with concurrency limit
-        # Limit concurrent requests to prevent API rate limiting
-        semaphore = asyncio.Semaphore(5)  # Max 5 concurrent research queries
-        
-        async def execute_with_semaphore(query, query_index: int):
-            """Execute query with concurrency control"""
-            async with semaphore:
-                return await execute_query_with_progress(query, query_index)
-        
+        # Execute all queries in parallel
+        # OpenAI API rate limits are enforced process-wide by openai_rate_limiter (per model RPM/TPM)
         tasks = [
-            execute_with_semaphore(query, i) 
+            execute_query_with_progress(query, i)
             for i, query in enumerate(context.research_plan.queries)
         ]
         
-        # Wait for all queries to complete
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Wait for all queries to complete (a cancel aborts every in-flight query)
+        results = await run_cancellable(process_id, asyncio.gather(*tasks, return_exceptions=True))
         
         # Process results and handle any failures
         successful_queries = 0
@@ -722,36 +798,43 @@ class BackgroundTaskManager:
         total_sections = len(context.generated_outline.sections)
         if not hasattr(context, 'generated_sections_html'):
             context.generated_sections_html = []
-        
-        for i, section in enumerate(context.generated_outline.sections):
-            # Publish section progress event
-            await self._publish_realtime_event(
-                process_id=process_id,
-                event_type="section_progress",
-                event_data={
-                    "current_section": i + 1,
-                    "total_sections": total_sections,
-                    "section_heading": section.heading if hasattr(section, 'heading') else f"Section {i+1}",
-                    "progress_percentage": int((i / total_sections) * 100)
-                }
-            )
+
+        if settings.parallel_section_writing:
+            await self._execute_parallel_section_writing_with_progress(context, process_id)
+        else:
+            for i, section in enumerate(context.generated_outline.sections):
+                raise_if_cancelled(process_id)
+
+                # Publish section progress event
+                await self._publish_realtime_event(
+                    process_id=process_id,
+                    event_type="section_progress",
+                    event_data={
+                        "current_section": i + 1,
+                        "total_sections": total_sections,
+                        "section_heading": section.heading if hasattr(section, 'heading') else f"Section {i+1}",
+                        "progress_percentage": int((i / total_sections) * 100)
+                    }
+                )
             
-            # Write the section using flow manager
-            section_content = await self.service.flow_manager.write_single_section(context, section, i)
-            context.generated_sections_html.append(section_content)
+                # Write the section using flow manager
+                section_content = await self.service.flow_manager.write_single_section(context, section, i)
+                context.generated_sections_html.append(section_content)
             
-            # Publish section completion event
-            await self._publish_realtime_event(
-                process_id=process_id,
-                event_type="section_completed",
-                event_data={
-                    "section_index": i,
-                    "section_heading": section.heading if hasattr(section, 'heading') else f"Section {i+1}",
-                    "section_content": section_content,
-                    "image_placeholders": getattr(context, 'image_placeholders', [])
-                }
-            )
+                # Publish section completion event
+                await self._publish_realtime_event(
+                    process_id=process_id,
+                    event_type="section_completed",
+                    event_data={
+                        "section_index": i,
+                        "section_heading": section.heading if hasattr(section, 'heading') else f"Section {i+1}",
+                        "section_content": section_content,
+                        "image_placeholders": getattr(context, 'image_placeholders', [])
+                    }
+                )
         
+        log_token_report(context)
+
         # Combine all sections
         context.full_draft_html = '\n\n'.join(context.generated_sections_html)
         if getattr(context, "enable_final_editing", False):
@@ -787,6 +870,50 @@ class BackgroundTaskManager:
             context.final_result_event_emitted = True
             return
     
+    async def _execute_parallel_section_writing_with_progress(self, context: ArticleContext, process_id: str):
+        """Write sections concurrently (PARALLEL_SECTION_WRITING), publishing the same progress events as the sequential loop"""
+        sections = context.generated_outline.sections
+        total_sections = len(sections)
+        completed = 0
+
+        async def on_section_started(i: int, section) -> None:
+            await self._publish_realtime_event(
+                process_id=process_id,
+                event_type="section_progress",
+                event_data={
+                    "current_section": i + 1,
+                    "total_sections": total_sections,
+                    "section_heading": section.heading if hasattr(section, 'heading') else f"Section {i+1}",
+                    "progress_percentage": int((completed / total_sections) * 100),
+                    "parallel": True,
+                }
+            )
+
+        async def on_section_completed(i: int, section, section_content: str, placeholders: List[Any]) -> None:
+            nonlocal completed
+            completed += 1
+            await self._publish_realtime_event(
+                process_id=process_id,
+                event_type="section_completed",
+                event_data={
+                    "section_index": i,
+                    "section_heading": section.heading if hasattr(section, 'heading') else f"Section {i+1}",
+                    "section_content": section_content,
+                    "image_placeholders": [
+                        p.model_dump() if hasattr(p, 'model_dump') else p for p in placeholders
+                    ],
+                    "completed_sections": completed,
+                    "total_sections": total_sections,
+                    "parallel": True,
+                }
+            )
+
+        await self.service.flow_manager.write_sections_parallel(
+            context,
+            on_section_started=on_section_started,
+            on_section_completed=on_section_completed,
+        )
+
     async def _auto_resolve_user_input_step(
         self,
         context: ArticleContext,
@@ -1383,25 +1510,18 @@ class BackgroundTaskManager:
             raise
     
     async def _publish_realtime_event(self, process_id: str, event_type: str, event_data: Dict[str, Any]):
-        """Publish event to realtime subscribers using database function"""
+        """Publish event to realtime subscribers via the buffered process event bus"""
         
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
-            
-            # Use the database function to create process event
-            result = supabase.rpc('create_process_event', {
-                'p_process_id': process_id,
-                'p_event_type': event_type,
-                'p_event_data': event_data,
-                'p_event_category': 'generation',
-                'p_event_source': 'background_task'
-            }).execute()
-            
-            if result.data:
-                logger.debug(f"Published realtime event {event_type} for process {process_id}")
-            else:
-                logger.warning(f"Failed to publish realtime event {event_type} for process {process_id}")
+            # 進捗イベントはバッファされ、一定間隔またはステップ境界でまとめて書き込まれる
+            await process_event_bus.publish(
+                process_id=process_id,
+                event_type=event_type,
+                event_data=event_data,
+                event_category='generation',
+                event_source='background_task',
+            )
+            logger.debug(f"Queued realtime event {event_type} for process {process_id}")
                 
         except Exception as e:
             logger.error(f"Error publishing realtime event {event_type} for process {process_id}: {e}")
@@ -1410,10 +1530,9 @@ class BackgroundTaskManager:
     async def _get_task_data(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get task data from database"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
-            result = supabase.table("background_tasks").select("*").eq("id", task_id).execute()
+            result = await supabase.table("background_tasks").select("*").eq("id", task_id).execute()
             
             if result.data:
                 return result.data[0]
@@ -1423,6 +1542,21 @@ class BackgroundTaskManager:
             logger.error(f"Error getting task data for {task_id}: {e}")
             return None
     
+    async def _task_cancel_reason(self, task_id: str) -> Optional[str]:
+        """Return why a running task should stop (cancelled / paused / lease lost), or None"""
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("background_tasks").select(
+            "status, worker_id"
+        ).eq("id", task_id).limit(1).execute()
+        if not result.data:
+            return None
+        row = result.data[0]
+        if row["status"] == "cancelled":
+            return "cancelled"
+        if self.worker.owns(task_id) and (row["status"] != "running" or row.get("worker_id") != self.worker.worker_id):
+            return "lease lost"
+        return None
+
     async def _update_task_status(
         self, 
         task_id: str, 
@@ -1431,25 +1565,32 @@ class BackgroundTaskManager:
     ):
         """Update task status in database"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             update_data = {
                 "status": status,
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }
             
+            query_worker_id = None
             if status == "running":
                 update_data["started_at"] = datetime.now(timezone.utc).isoformat()
-                update_data["worker_id"] = "background_task_manager"
+                update_data["worker_id"] = self.worker.worker_id
                 update_data["heartbeat_at"] = datetime.now(timezone.utc).isoformat()
             elif status in ["completed", "failed", "cancelled"]:
                 update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
+                update_data["lease_expires_at"] = None
+                # リースを失った（再キューされた）タスクの状態は上書きしない
+                self.worker.release_lease(task_id)
+                query_worker_id = self.worker.worker_id
             
             if error_message:
                 update_data["error_message"] = error_message
             
-            result = supabase.table("background_tasks").update(update_data).eq("id", task_id).execute()
+            query = supabase.table("background_tasks").update(update_data).eq("id", task_id)
+            if query_worker_id:
+                query = query.eq("worker_id", query_worker_id)
+            result = await query.execute()
             
             if result.data:
                 logger.debug(f"Updated task {task_id} status to {status}")
@@ -1468,22 +1609,21 @@ class BackgroundTaskManager:
                 new_retry_count = retry_count + 1
                 delay_minutes = min(2 ** new_retry_count, 30)  # Exponential backoff
                 
-                from app.domains.seo_article.services.flow_service import get_supabase_client
-                supabase = get_supabase_client()
+                supabase = await get_async_supabase_client()
                 
-                supabase.table("background_tasks").update({
+                # Release the lease; the worker pool picks the task up again once scheduled_for has passed
+                self.worker.release_lease(task_id)
+                await supabase.table("background_tasks").update({
                     "retry_count": new_retry_count,
                     "status": "pending",
                     "scheduled_for": (datetime.now(timezone.utc) + timedelta(minutes=delay_minutes)).isoformat(),
-                    "error_message": f"Retry {new_retry_count}/{max_retries}: {error_message}"
-                }).eq("id", task_id).execute()
+                    "error_message": f"Retry {new_retry_count}/{max_retries}: {error_message}",
+                    "worker_id": None,
+                    "lease_expires_at": None
+                }).eq("id", task_id).eq("worker_id", self.worker.worker_id).execute()
                 
                 logger.info(f"Scheduled retry {new_retry_count}/{max_retries} for task {task_id} in {delay_minutes} minutes")
                 
-                # Schedule retry execution
-                await asyncio.sleep(delay_minutes * 60)
-                await self._execute_task_loop(task_id)
-                
             else:
                 # Max retries exceeded, mark as permanently failed
                 process_id = task_data["process_id"]
@@ -1503,8 +1643,7 @@ class BackgroundTaskManager:
     async def pause_generation_process(self, process_id: str, user_id: str) -> bool:
         """Pause a running generation process"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             # Update process status to paused
             await self.service.persistence_service.update_process_status(
@@ -1517,9 +1656,12 @@ class BackgroundTaskManager:
             )
             
             # Cancel any running background tasks for this process
-            supabase.table("background_tasks").update({
+            # (the running one stops at its next agent call; it resumes from the last saved step)
+            await supabase.table("background_tasks").update({
                 "status": "cancelled"
-            }).eq("process_id", process_id).eq("status", "pending").execute()
+            }).eq("process_id", process_id).in_("status", ["pending", "running"]).execute()
+            cancellation_registry.cancel(process_id, "paused")
+            self.speculation.discard(process_id, "paused")
             
             # Publish pause event
             await self._publish_realtime_event(
@@ -1540,8 +1682,7 @@ class BackgroundTaskManager:
     async def cancel_generation_process(self, process_id: str, user_id: str) -> bool:
         """Cancel a generation process"""
         try:
-            from app.domains.seo_article.services.flow_service import get_supabase_client
-            supabase = get_supabase_client()
+            supabase = await get_async_supabase_client()
             
             # Update process status to cancelled
             await self.service.persistence_service.update_process_status(
@@ -1554,9 +1695,11 @@ class BackgroundTaskManager:
             )
             
             # Cancel all background tasks for this process
-            supabase.table("background_tasks").update({
+            await supabase.table("background_tasks").update({
                 "status": "cancelled"
             }).eq("process_id", process_id).in_("status", ["pending", "running"]).execute()
+            cancellation_registry.cancel(process_id, "cancelled")
+            self.speculation.discard(process_id, "cancelled")
             
             # Publish cancellation event
             await self._publish_realtime_event(
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+ArticleContext / ステップスナップショット / ステップ履歴 共通の JSON シリアライザ
+
+- 値のクラスごとに変換関数を一度だけ決定してキャッシュする（型判定の連鎖を毎回たどらない）
+- pydantic モデルは ``model_dump(mode="json")`` でまとめて変換する
+- JSON 文字列化には ``orjson`` を使う
+"""
+import hashlib
+import json
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# article_context に保存しない実行時オブジェクト
+NON_PERSISTED_CONTEXT_KEYS = frozenset({"websocket", "user_response_event"})
+
+_converters: Dict[type, Callable[[Any], Any]] = {}
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _enum_value(value: Enum) -> Any:
+    return to_jsonable(value.value)
+
+
+def _iso_format(value: Any) -> str:
+    return value.isoformat()
+
+
+def _sequence(value: Any) -> list:
+    return [to_jsonable(item) for item in value]
+
+
+def _mapping(value: Dict[Any, Any]) -> Dict[Any, Any]:
+    return {key: to_jsonable(item) for key, item in value.items()}
+
+
+def _pydantic_model(value: Any) -> Any:
+    try:
+        return value.model_dump(mode="json")
+    except Exception:
+        # JSON モードで扱えない型を含むモデルは Python モードから個別に変換する
+        return to_jsonable(value.model_dump())
+
+
+def _plain_object(value: Any) -> Any:
+    attributes = getattr(value, "__dict__", None)
+    if attributes is None:
+        return str(value)
+    return {key: to_jsonable(item) for key, item in attributes.items()}
+
+
+def _resolve_converter(cls: type) -> Callable[[Any], Any]:
+    # str / int を継承した Enum があるため、Enum の判定を先に行う
+    if issubclass(cls, Enum):
+        return _enum_value
+    if cls is bool or cls is type(None) or issubclass(cls, (str, int, float)):
+        return _identity
+    if issubclass(cls, (list, tuple, set, frozenset)):
+        return _sequence
+    if issubclass(cls, dict):
+        return _mapping
+    if issubclass(cls, (datetime, date, time)):
+        return _iso_format
+    if issubclass(cls, (UUID, Decimal)):
+        return str
+    if hasattr(cls, "model_dump"):
+        return _pydantic_model
+    return _plain_object
+
+
+def to_jsonable(value: Any) -> Any:
+    """任意の値を JSON に変換可能な値へ変換する"""
+    cls = value.__class__
+    converter = _converters.get(cls)
+    if converter is None:
+        converter = _resolve_converter(cls)
+        _converters[cls] = converter
+    return converter(value)
+
+
+def context_to_dict(context: Any) -> Dict[str, Any]:
+    """ArticleContext を article_context 用の dict に変換する（実行時オブジェクトと "_" 始まりの属性は除外）"""
+    context_dict: Dict[str, Any] = {}
+    for key, value in context.__dict__.items():
+        if key in NON_PERSISTED_CONTEXT_KEYS or key.startswith("_"):
+            continue
+        try:
+            context_dict[key] = to_jsonable(value)
+        except Exception as e:
+            logger.warning(f"Failed to serialize context field {key}: {e}. Using string representation.")
+            context_dict[key] = str(value)
+    return context_dict
+
+
+def dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """JSON バイト列に変換する"""
+    try:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    except TypeError:
+        # 64bit を超える整数など orjson が扱えない値は標準 json で、digest が変わらないよう同じ形式に揃える
+        return json.dumps(value, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def digest(value: Any) -> str:
+    """JSON 値のダイジェスト（jsonb のキー順に依存しないよう sort_keys）"""
+    return hashlib.blake2b(dumps(value, sort_keys=True), digest_size=16).hexdigest()
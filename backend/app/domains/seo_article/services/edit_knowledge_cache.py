@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+AI ブロック編集用ナレッジ（assemble_edit_knowledge の結果）のキャッシュ
+
+- エントリ数と概算バイト数の両方で上限を持つ LRU（TTL 付き）
+- 会社情報・スタイルテンプレート・記事・生成プロセスの変更時に該当エントリを明示的に無効化する
+- ヒット / ミス / 追い出し件数を数える
+
+キャッシュはワーカープロセスごとに持つ。他ワーカーでの変更は TTL 経過で反映される。
+"""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import settings
+from app.domains.seo_article.services.context_serializer import context_to_dict, dumps, to_jsonable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    knowledge: Dict[str, Any]
+    size: int
+    expires_at: float
+    user_id: str
+    article_id: str
+    process_id: Optional[str] = None
+    style_template_id: Optional[str] = None
+
+
+@dataclass
+class EditKnowledgeCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+def estimate_knowledge_size(knowledge: Dict[str, Any]) -> Optional[int]:
+    """ナレッジの概算サイズ（JSON 化したバイト数）。見積もれない場合は None"""
+    try:
+        payload = {key: value for key, value in knowledge.items() if key != "context"}
+        context = knowledge.get("context")
+        payload["context"] = context_to_dict(context) if context is not None else None
+        return len(dumps(to_jsonable(payload)))
+    except Exception as e:
+        logger.warning(f"edit knowledge size estimation failed: {e}")
+        return None
+
+
+class EditKnowledgeCache:
+    """user_id:article_id をキーにしたナレッジの LRU キャッシュ"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.stats = EditKnowledgeCacheStats()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    @staticmethod
+    def make_key(user_id: str, article_id: str) -> str:
+        return f"{user_id}:{article_id}"
+
+    def get(self, user_id: str, article_id: str) -> Optional[Dict[str, Any]]:
+        key = self.make_key(user_id, article_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry.knowledge
+
+    def put(
+        self,
+        user_id: str,
+        article_id: str,
+        knowledge: Dict[str, Any],
+        process_id: Optional[str] = None,
+        style_template_id: Optional[str] = None,
+    ) -> None:
+        key = self.make_key(user_id, article_id)
+        size = estimate_knowledge_size(knowledge)
+        if self.max_entries <= 0 or size is None or size > self.max_bytes:
+            # 1件で上限を超えるもの・サイズを見積もれないもの（0 として数えるとバイト上限が効かない）はキャッシュしない
+            self._remove(key)
+            return
+        self._remove(key)
+        self._entries[key] = _Entry(
+            knowledge=knowledge,
+            size=size,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            user_id=user_id,
+            article_id=article_id,
+            process_id=process_id,
+            style_template_id=style_template_id,
+        )
+        self.stats.entries += 1
+        self.stats.bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self.stats.bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats.evictions += 1
+
+    # --- 無効化フック ---
+
+    def invalidate_article(self, article_id: str) -> int:
+        """記事の更新・削除時"""
+        return self._invalidate_where(lambda entry: entry.article_id == article_id)
+
+    def invalidate_process(self, process_id: str) -> int:
+        """生成プロセスの ArticleContext 更新時"""
+        return self._invalidate_where(lambda entry: entry.process_id == process_id)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """会社情報やユーザー既定のスタイルテンプレートの変更時"""
+        return self._invalidate_where(lambda entry: entry.user_id == user_id)
+
+    def invalidate_style_template(self, template_id: str, user_id: Optional[str] = None) -> int:
+        """スタイルテンプレートの更新・削除時（既定テンプレートの変更も考慮して user_id のエントリも消す）"""
+        return self._invalidate_where(
+            lambda entry: entry.style_template_id == template_id or (user_id is not None and entry.user_id == user_id)
+        )
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.stats.entries = 0
+        self.stats.bytes = 0
+
+    def _invalidate_where(self, predicate) -> int:
+        keys: Set[str] = {key for key, entry in self._entries.items() if predicate(entry)}
+        for key in keys:
+            self._remove(key)
+        self.stats.invalidations += len(keys)
+        return len(keys)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.stats.entries -= 1
+            self.stats.bytes -= entry.size
+
+
+# シングルトンインスタンス
+edit_knowledge_cache = EditKnowledgeCache(
+    max_entries=settings.edit_knowledge_cache_max_entries,
+    max_bytes=settings.edit_knowledge_cache_max_bytes,
+    ttl_seconds=settings.edit_knowledge_cache_ttl,
+)
@@ -11,12 +11,13 @@ This service handles dynamic execution of article generation flows:
 
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
-from supabase import create_client, Client
+from supabase import Client
 from pydantic import BaseModel, Field
 import logging
 
-from app.core.config import settings
+from app.common.database import supabase as shared_supabase_client
 from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.services.context_serializer import context_to_dict
 from app.domains.seo_article.agents.definitions import (
     theme_agent, research_planner_agent, researcher_agent, research_synthesizer_agent,
     outline_agent, section_writer_agent, editor_agent, persona_generator_agent,
@@ -30,8 +31,12 @@ def get_supabase_client() -> Client:
     
     Note: Using service role key bypasses RLS, so we implement 
     user access control manually in the query logic
+
+    呼び出しごとにクライアント（と HTTP 接続）を作り直さないよう、
+    app.common.database の共有クライアントを返す。
+    async def からは get_async_supabase_client() を利用すること。
     """
-    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+    return shared_supabase_client
 
 # Pydantic models for flow operations
 class FlowStepType:
@@ -579,15 +584,7 @@ class ArticleFlowService:
         """Save ArticleContext to database"""
         try:
             # Convert context to dict (excluding WebSocket and asyncio objects)
-            context_dict = {}
-            for key, value in context.__dict__.items():
-                if key not in ["websocket", "user_response_event"]:
-                    if hasattr(value, "model_dump"):
-                        context_dict[key] = value.model_dump()
-                    elif isinstance(value, (str, int, float, bool, list, dict, type(None))):
-                        context_dict[key] = value
-                    else:
-                        context_dict[key] = str(value)
+            context_dict = context_to_dict(context)
             
             update_data = {
                 "article_context": context_dict,
@@ -101,10 +101,11 @@ class ArticleGenerationService:
         user_id: str, 
         status_filter: Optional[str] = None,
         limit: int = 20,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get all processes (completed articles + in-progress/failed generation processes) for a user."""
-        return await self.persistence_service.get_all_user_processes(user_id, status_filter, limit, offset)
+        return await self.persistence_service.get_all_user_processes(user_id, status_filter, limit, offset, cursor)
 
     async def get_recoverable_processes(self, user_id: str, limit: int = 10) -> List[dict]:
         """Get processes that can be recovered/resumed for a user."""
@@ -208,6 +209,7 @@ class ArticleGenerationService:
                 flow_type=request_dict.get("flow_type", "research_first"),  # フロー設定を追加
                 auto_mode=request_dict.get("auto_mode", False),
                 auto_selection_strategy=request_dict.get("auto_selection_strategy", "best_match") or "best_match",
+                bypass_research_cache=request_dict.get("bypass_research_cache", False),
                 enable_final_editing=request_dict.get("enable_final_editing", False),
                 websocket=None,  # Background mode
                 user_response_event=None,  # Background mode
@@ -11,6 +11,7 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
 
 from app.common.database import supabase
+from app.domains.seo_article.services.edit_knowledge_cache import edit_knowledge_cache
 
 logger = logging.getLogger(__name__)
 
@@ -79,6 +80,7 @@ class ArticleManagementService:
         """記事を削除"""
         try:
             result = self.supabase.table("articles").delete().eq("id", article_id).eq("user_id", user_id).execute()
+            edit_knowledge_cache.invalidate_article(article_id)
             
             return len(result.data) > 0
         except Exception as e:
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+process_events の書き込みバッファ（write-behind イベントバス）
+
+進捗イベントのたびに ``create_process_event`` RPC を呼ぶ代わりに、プロセス単位で
+イベントをバッファし、一定間隔またはステップ境界で ``create_process_events_batch``
+RPC にまとめて書き込む。
+
+- 同一プロセス内の発行順序はそのまま ``event_sequence`` に反映される
+- ``research_progress`` などの進捗イベントは、未送信の古いものを最新のもので置き換える
+- バッファ総数が上限に達した場合は ``publish()`` 側でフラッシュを待つ（バックプレッシャー）
+- ``capture()`` の内側（同じ asyncio タスクとその子タスク）で発行されたイベントはバッファに積まずに
+  手元に保持し、後から ``replay()`` で発行する（投機実行の結果を採用するまでイベントを出さないため）
+"""
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.common.database import get_async_supabase_client
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 未送信分は最新の値だけ届けばよい進捗イベント
+COALESCED_EVENT_TYPES = frozenset({
+    "research_progress",
+    "section_progress",
+})
+
+# 発行後すぐにフラッシュするイベント（ステップ境界・ユーザー入力待ち・終端）
+FLUSH_EVENT_TYPES = frozenset({
+    "step_completed",
+    "all_sections_completed",
+    "user_input_required",
+    "generation_completed",
+    "generation_error",
+    "generation_paused",
+    "generation_cancelled",
+})
+
+# 書き込み失敗時に再送を試みる回数
+MAX_FLUSH_ATTEMPTS = 3
+
+# capture() 中に発行されたイベントの保持先
+_captured_events: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("captured_process_events", default=None)
+
+
+@dataclass
+class _PendingEvent:
+    event_type: str
+    event_data: Dict[str, Any]
+    event_category: str
+    event_source: str
+    attempts: int = 0
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "event_type": self.event_type,
+            "event_data": self.event_data,
+            "event_category": self.event_category,
+            "event_source": self.event_source,
+        }
+
+
+class ProcessEventBus:
+    """プロセスイベントをバッファしてまとめて書き込むイベントバス"""
+
+    def __init__(self, flush_interval: float, max_buffered: int):
+        self.flush_interval = flush_interval
+        self.max_buffered = max(1, max_buffered)
+        self._buffers: Dict[str, List[_PendingEvent]] = {}
+        self._buffered_count = 0
+        # プロセスごとのフラッシュを直列化し、バッチ間の順序を保つ
+        self._flush_locks: Dict[str, asyncio.Lock] = {}
+        self._flush_waiters: Dict[str, int] = {}
+        self._flusher_task: Optional[asyncio.Task] = None
+
+    @property
+    def buffered_count(self) -> int:
+        return self._buffered_count
+
+    async def publish(
+        self,
+        process_id: Optional[str],
+        event_type: str,
+        event_data: Dict[str, Any],
+        event_category: str = "generation",
+        event_source: str = "background_task",
+        flush: bool = False,
+    ) -> None:
+        """イベントをバッファに積む。``flush=True`` または境界イベントなら即座に書き込む"""
+        if not process_id:
+            return
+
+        captured = _captured_events.get()
+        if captured is not None:
+            captured.append({
+                "event_type": event_type,
+                "event_data": event_data,
+                "event_category": event_category,
+                "event_source": event_source,
+            })
+            return
+
+        # バッファが一杯なら書き込みが追いつくまで待つ
+        if self._buffered_count >= self.max_buffered:
+            await self.flush()
+
+        buffer = self._buffers.setdefault(process_id, [])
+        if event_type in COALESCED_EVENT_TYPES:
+            for index, pending in enumerate(buffer):
+                if pending.event_type == event_type:
+                    del buffer[index]
+                    self._buffered_count -= 1
+                    break
+
+        buffer.append(_PendingEvent(
+            event_type=event_type,
+            event_data=event_data,
+            event_category=event_category,
+            event_source=event_source,
+        ))
+        self._buffered_count += 1
+
+        if flush or event_type in FLUSH_EVENT_TYPES:
+            await self.flush(process_id)
+        else:
+            self._ensure_flusher()
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Dict[str, Any]]]:
+        """この中で発行されたイベントを発行せずにリストへ集める"""
+        events: List[Dict[str, Any]] = []
+        token = _captured_events.set(events)
+        try:
+            yield events
+        finally:
+            _captured_events.reset(token)
+
+    async def replay(self, process_id: str, events: List[Dict[str, Any]]) -> None:
+        """capture() で集めたイベントを発行順に発行する"""
+        for event in events:
+            await self.publish(process_id, **event)
+
+    async def flush(self, process_id: Optional[str] = None) -> None:
+        """指定プロセス（省略時は全プロセス）のバッファを書き込む"""
+        process_ids = [process_id] if process_id else list(self._buffers)
+        for pid in process_ids:
+            await self._flush_process(pid)
+
+    async def close(self) -> None:
+        """残っているイベントを書き込み、定期フラッシュを停止する"""
+        await self.flush()
+        if self._flusher_task and not self._flusher_task.done():
+            self._flusher_task.cancel()
+        self._flusher_task = None
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._buffers:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _flush_process(self, process_id: str) -> None:
+        lock = self._flush_locks.setdefault(process_id, asyncio.Lock())
+        self._flush_waiters[process_id] = self._flush_waiters.get(process_id, 0) + 1
+        try:
+            async with lock:
+                batch = self._buffers.pop(process_id, None)
+                if batch:
+                    self._buffered_count -= len(batch)
+                    await self._write_batch(process_id, batch)
+        finally:
+            self._flush_waiters[process_id] -= 1
+            if self._flush_waiters[process_id] == 0:
+                del self._flush_waiters[process_id]
+                self._flush_locks.pop(process_id, None)
+
+    async def _write_batch(self, process_id: str, batch: List[_PendingEvent]) -> None:
+        try:
+            supabase = await get_async_supabase_client()
+            await supabase.rpc('create_process_events_batch', {
+                'p_process_id': process_id,
+                'p_events': [event.to_payload() for event in batch],
+            }).execute()
+            logger.debug(f"Flushed {len(batch)} process events for process {process_id}")
+        except Exception as e:
+            # 失敗したバッチは後から積まれたイベントより前に戻し、順序を保ったまま再送する
+            retry = []
+            for event in batch:
+                event.attempts += 1
+                if event.attempts < MAX_FLUSH_ATTEMPTS:
+                    retry.append(event)
+            if retry:
+                self._buffers[process_id] = retry + self._buffers.get(process_id, [])
+                self._buffered_count += len(retry)
+                self._ensure_flusher()
+            dropped = len(batch) - len(retry)
+            logger.error(
+                f"Error flushing {len(batch)} process events for process {process_id} "
+                f"(requeued={len(retry)}, dropped={dropped}): {e}"
+            )
+
+
+# Global event bus instance
+process_event_bus = ProcessEventBus(
+    flush_interval=settings.process_event_flush_interval,
+    max_buffered=settings.process_event_buffer_size,
+)
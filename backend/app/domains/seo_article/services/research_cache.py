@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+リサーチクエリ結果（ResearchQueryResult）のキャッシュ
+
+同じキーワード群の記事を別々のユーザーが作成すると、ほぼ同じ検索クエリで ResearcherAgent
+（Web 検索）を何度も実行することになる。クエリ単位の結果をローカルの SQLite キャッシュに保存し、
+
+- キーは「正規化したクエリ」「検索の地域」「日付バケット（既定 1 日）」「プロンプトのスコープ」
+  （同じ日の同じクエリは共有し、日付が変われば検索し直す）
+- ResearcherAgent のプロンプトには企業情報・記事テーマ・クエリの焦点が入り、結果もそれに合わせて
+  調整されるので、これらのハッシュ（``prompt_scope``）をキーに含める（別の企業の記事とは共有しない）
+- 正規化は NFKC・小文字化・空白の統一のみ（語順は検索結果に影響するので変えない）
+- TTL と合計バイト数の上限で追い出す
+- ``RESEARCH_CACHE_ENABLED=false`` で全体を無効化、生成リクエストの ``bypass_research_cache`` で
+  プロセス単位に読み込みを飛ばせる（結果は書き込むので次回以降は使われる）
+"""
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from typing import Optional
+
+from app.core.config import settings
+from app.domains.seo_article.schemas import ResearchQueryResult
+from app.infrastructure.persistent_cache import PersistentCache
+
+logger = logging.getLogger(__name__)
+
+_SPACE_RE = re.compile(r"\s+")
+# 語の前後に付いた記号（「」や引用符、句読点）は検索結果に影響しないので落とす
+_EDGE_PUNCT = "\"'「」『』()（）[]【】、。,.!！?？"
+
+
+def normalize_query(query: str) -> str:
+    """表記ゆれを吸収したクエリ"""
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    words = [word.strip(_EDGE_PUNCT) for word in _SPACE_RE.split(text)]
+    return " ".join(word for word in words if word)
+
+
+def prompt_scope(*parts: Optional[str]) -> str:
+    """プロンプトに入るクエリ以外の文脈（企業情報・記事テーマ・焦点など）のハッシュ"""
+    raw = "\x00".join(part or "" for part in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def search_locale(user_location) -> str:
+    """WebSearchTool の user_location（dict またはモデル）から国コードを取り出す"""
+    if isinstance(user_location, dict):
+        return user_location.get("country") or ""
+    return getattr(user_location, "country", None) or ""
+
+
+def date_bucket(now: Optional[float] = None) -> int:
+    bucket_seconds = max(settings.research_cache_date_bucket_days, 1) * 86400
+    return int((time.time() if now is None else now) // bucket_seconds)
+
+
+def make_key(query: str, locale: str, bucket: int, scope: str = "") -> str:
+    raw = f"{locale}\n{bucket}\n{scope}\n{normalize_query(query)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResearchCache:
+    def __init__(self, store: PersistentCache):
+        self.store = store
+        self.bypassed = 0
+
+    async def get(self, query: str, locale: str, scope: str = "", bypass: bool = False) -> Optional[ResearchQueryResult]:
+        if not settings.research_cache_enabled:
+            return None
+        if bypass:
+            self.bypassed += 1
+            return None
+        cached = await self.store.aget(make_key(query, locale, date_bucket(), scope))
+        if cached is None:
+            return None
+        try:
+            return ResearchQueryResult.model_validate(cached)
+        except Exception as e:
+            logger.warning(f"Discarding invalid research cache entry for query '{query}': {e}")
+            return None
+
+    async def put(self, query: str, locale: str, result: ResearchQueryResult, scope: str = "") -> None:
+        if not settings.research_cache_enabled:
+            return
+        await self.store.aset(make_key(query, locale, date_bucket(), scope), result.model_dump(mode="json"))
+
+    def metrics(self):
+        return {**self.store.metrics(), "bypassed": self.bypassed}
+
+
+# シングルトンインスタンス
+research_cache = ResearchCache(PersistentCache(
+    path=settings.local_cache_path,
+    namespace="research_query",
+    max_bytes=settings.research_cache_max_bytes,
+    default_ttl=settings.research_cache_ttl,
+))
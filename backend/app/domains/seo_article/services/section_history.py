@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+セクション執筆エージェントに渡す会話履歴の圧縮
+
+``section_writer_history`` はリサーチ情報などの system メッセージと、セクションごとの
+user（執筆依頼）/ assistant（執筆したHTML）の組で構成される。全履歴をそのまま渡すと
+後半のセクションほど入力トークンが増える（セクション数の2乗で増加）ため、
+
+- system / developer メッセージは先頭にそのまま残す
+- 直近 ``section_writer_history_window`` セクション分の組はそのまま残す
+- それより前のセクションは見出しと本文冒頭だけの要約メッセージ1件に置き換える
+
+要約は本文から決定的に作るので、一度要約されたセクションは以降の入力でも同じバイト列になり、
+先頭（system + 要約済みセクション）が変わらないためプロンプトキャッシュが効く。
+保存される ``section_writer_history`` 自体は圧縮しない（入力を組み立てる時だけ圧縮する）。
+
+圧縮前後の入力トークン数の概算は ``context.section_writer_token_report`` に積算する。
+"""
+import html
+import json
+import logging
+import re
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.infrastructure.openai_rate_limiter import BYTES_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+STABLE_ROLES = ("system", "developer")
+
+_HEADING_RE = re.compile(r"<h[1-6][^>]*>(.*?)</h[1-6]>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """メッセージ列の入力トークン数の概算（レート制限と同じ UTF-8 バイト数ベース）"""
+    return len(json.dumps(messages, ensure_ascii=False).encode("utf-8")) // BYTES_PER_TOKEN
+
+
+def summarize_section(section_html: str, summary_chars: int) -> str:
+    """執筆済みセクションを見出しと本文冒頭だけにする"""
+    heading_match = _HEADING_RE.search(section_html)
+    heading = _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub("", heading_match.group(1)))).strip() if heading_match else ""
+    body = section_html[heading_match.end():] if heading_match else section_html
+    text = _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", body))).strip()
+    if len(text) > summary_chars:
+        text = text[:summary_chars].rstrip() + "…"
+    return f"[執筆済みセクションの要約] {heading}\n{text}" if heading else f"[執筆済みセクションの要約]\n{text}"
+
+
+def compact_section_history(
+    history: List[Dict[str, Any]],
+    window: int,
+    summary_chars: int,
+) -> List[Dict[str, Any]]:
+    """直近 window セクション以外を要約に置き換えた履歴を返す（history は変更しない）"""
+    stable: List[Dict[str, Any]] = []
+    turns: List[List[Dict[str, Any]]] = []
+    for message in history:
+        role = message.get("role")
+        if role in STABLE_ROLES:
+            stable.append(message)
+        elif role == "user" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+
+    window = max(window, 0)
+    split = max(len(turns) - window, 0)
+    summaries = []
+    for turn in turns[:split]:
+        section_html = "\n".join(message_text(m) for m in turn if m.get("role") == "assistant")
+        if not section_html:
+            continue
+        summaries.append({
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": summarize_section(section_html, summary_chars)}],
+        })
+    recent = [message for turn in turns[split:] for message in turn]
+    return stable + summaries + recent
+
+
+def build_section_writer_input(context, user_request: str) -> List[Dict[str, Any]]:
+    """セクション執筆エージェントへの入力（圧縮した履歴 + 今回の執筆依頼）を組み立てる"""
+    request_message = {"role": "user", "content": [{"type": "input_text", "text": user_request}]}
+    full_messages = list(context.section_writer_history) + [request_message]
+    if settings.section_writer_history_compaction:
+        messages = compact_section_history(
+            full_messages[:-1],
+            window=settings.section_writer_history_window,
+            summary_chars=settings.section_writer_history_summary_chars,
+        ) + [request_message]
+    else:
+        messages = full_messages
+    _record_token_usage(context, full_messages, messages)
+    return messages
+
+
+def _record_token_usage(context, full_messages: List[Dict[str, Any]], sent_messages: List[Dict[str, Any]]) -> None:
+    full_tokens = estimate_tokens(full_messages)
+    sent_tokens = estimate_tokens(sent_messages)
+    report = context.section_writer_token_report
+    report["sections"] = report.get("sections", 0) + 1
+    report["full_history_input_tokens"] = report.get("full_history_input_tokens", 0) + full_tokens
+    report["compacted_input_tokens"] = report.get("compacted_input_tokens", 0) + sent_tokens
+    report["saved_input_tokens"] = report["full_history_input_tokens"] - report["compacted_input_tokens"]
+    logger.debug(
+        f"Section writer input for process {getattr(context, 'process_id', None)}: "
+        f"{sent_tokens} tokens (full history {full_tokens})"
+    )
+
+
+def log_token_report(context) -> None:
+    """記事1本分の履歴トークン数（圧縮前 / 圧縮後）をログに出す"""
+    report = getattr(context, "section_writer_token_report", None) or {}
+    if not report.get("sections"):
+        return
+    full_tokens = report["full_history_input_tokens"]
+    sent_tokens = report["compacted_input_tokens"]
+    ratio = (1 - sent_tokens / full_tokens) * 100 if full_tokens else 0.0
+    logger.info(
+        f"Section writer input tokens for process {getattr(context, 'process_id', None)}: "
+        f"{sent_tokens} sent / {full_tokens} with full history over {report['sections']} sections "
+        f"({ratio:.0f}% saved, estimated)"
+    )
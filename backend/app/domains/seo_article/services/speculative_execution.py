@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+ユーザー入力待ちの間の投機実行
+
+``persona_generated`` / ``theme_proposed`` / ``outline_generated`` でユーザーの選択を待っている間、
+自動モードと同じ選択ロジック（``_build_auto_user_input``）で最も選ばれそうな入力を予測し、
+その入力を適用した後の次のステップ（テーマ生成・リサーチ・アウトライン生成）をコンテキストの複製上で
+先に実行しておく。
+
+- 複製は ``user_id`` を持たないので DB には保存されず、発行したイベントも ``process_event_bus.capture()``
+  で保持しておく（ユーザーには見えない）
+- ユーザーの入力が予測と一致すれば、複製の状態を本来のコンテキストに反映し、保持していたイベントを発行する。
+  まだ実行中なら完了を待つ（最初から実行するより待ち時間が短い）
+- 一致しない・失敗した・期限切れ・一時停止/キャンセルされた場合は破棄し、通常どおり入力を適用して実行する
+
+投機実行はこのインスタンスのメモリ上にのみ存在する。続行タスクが別インスタンスで実行された場合は
+使われず、``SPECULATIVE_EXECUTION_TTL`` 経過後に破棄される。
+"""
+import asyncio
+import copy
+import dataclasses
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.services.process_event_bus import process_event_bus
+
+logger = logging.getLogger(__name__)
+
+# 投機実行を始めるユーザー入力待ちステップ
+SPECULATIVE_STEPS = frozenset({
+    "persona_generated",
+    "theme_proposed",
+    "outline_generated",
+})
+
+# 予測した入力を適用した後、先に実行してよいステップ（セクション執筆は高コストかつ進捗イベントが多いので対象外）
+SPECULATIVE_NEXT_STEPS = frozenset({
+    "theme_generating",
+    "researching",
+    "outline_generating",
+})
+
+# 複製・反映の対象外にするフィールド（接続・待機状態とプロセスの識別情報）
+_INTERACTION_FIELDS = frozenset({
+    "websocket",
+    "user_response_event",
+    "expected_user_input",
+    "user_response",
+    "user_id",
+    "process_id",
+    "trace_id",
+})
+
+
+def fork_context(context: ArticleContext) -> ArticleContext:
+    """投機実行用にコンテキストを複製する（DB に保存されないよう user_id は持たせない）"""
+    forked = copy.copy(context)
+    for context_field in dataclasses.fields(context):
+        if context_field.name in _INTERACTION_FIELDS:
+            continue
+        setattr(forked, context_field.name, copy.deepcopy(getattr(context, context_field.name)))
+    forked.websocket = None
+    forked.user_response_event = None
+    forked.expected_user_input = None
+    forked.user_response = None
+    forked.user_id = None
+    # 永続化の差分追跡は元のコンテキストと共有しない
+    forked._persisted_field_digests = {}
+    forked._persisted_list_lengths = {}
+    forked._delta_saves_since_checkpoint = 0
+    return forked
+
+
+def apply_forked_state(context: ArticleContext, forked: ArticleContext) -> None:
+    """投機実行した複製の状態を本来のコンテキストに反映する"""
+    for context_field in dataclasses.fields(context):
+        if context_field.name in _INTERACTION_FIELDS:
+            continue
+        setattr(context, context_field.name, getattr(forked, context_field.name))
+
+
+def input_matches(predicted: Dict[str, Any], user_input: Dict[str, Any]) -> bool:
+    """ユーザーの入力が予測した入力と同じ選択か（payload は予測したキーだけを比較する）"""
+    if predicted.get("response_type") != user_input.get("response_type"):
+        return False
+    payload = user_input.get("payload") or {}
+    return all(payload.get(key) == value for key, value in (predicted.get("payload") or {}).items())
+
+
+@dataclass
+class SpeculativeRun:
+    process_id: str
+    base_step: str
+    predicted_input: Dict[str, Any]
+    context: ArticleContext
+    speculated_step: str
+    started_at: float = field(default_factory=time.monotonic)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.started_at
+
+
+@dataclass
+class SpeculativeExecutionStats:
+    started: int = 0
+    committed: int = 0
+    discarded: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.__dict__)
+
+
+class SpeculativeExecutor:
+    """プロセスごとに最大1件の投機実行を管理する"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.runs: Dict[str, SpeculativeRun] = {}
+        self.stats = SpeculativeExecutionStats()
+
+    async def start(self, context: ArticleContext, process_id: str, task_id: str) -> Optional[SpeculativeRun]:
+        """ユーザー入力待ちに入ったプロセスの次のステップを投機実行する"""
+        if not settings.speculative_execution or context.current_step not in SPECULATIVE_STEPS:
+            return None
+
+        self.discard(process_id, "superseded")
+        self._discard_expired()
+        running = sum(1 for run in self.runs.values() if run.task and not run.task.done())
+        if running >= settings.speculative_execution_max_runs:
+            self.stats.skipped += 1
+            logger.info(f"Skipping speculative execution for process {process_id}: {running} runs in flight")
+            return None
+
+        base_step = context.current_step
+        try:
+            predicted_input, decision = await self.manager._build_auto_user_input(context, base_step)
+            forked = fork_context(context)
+            await self.manager._apply_user_input_to_context(forked, predicted_input)
+        except Exception as e:
+            self.stats.skipped += 1
+            logger.info(f"Skipping speculative execution for process {process_id} at {base_step}: {e}")
+            return None
+
+        if forked.current_step not in SPECULATIVE_NEXT_STEPS:
+            self.stats.skipped += 1
+            return None
+
+        run = SpeculativeRun(
+            process_id=process_id,
+            base_step=base_step,
+            predicted_input=predicted_input,
+            context=forked,
+            speculated_step=forked.current_step,
+        )
+        run.task = asyncio.create_task(self._execute(run, task_id))
+        run.task.add_done_callback(self._log_result)
+        self.runs[process_id] = run
+        self.stats.started += 1
+        logger.info(
+            f"🔮 [TASK {task_id}] Speculatively executing {run.speculated_step} for process {process_id} "
+            f"with predicted input {predicted_input.get('response_type')} ({decision})"
+        )
+        return run
+
+    async def take(self, context: ArticleContext, user_input: Dict[str, Any]) -> Optional[SpeculativeRun]:
+        """入力が予測と一致すれば投機実行の結果をコンテキストに反映して返す。使えなければ破棄して None"""
+        process_id = context.process_id
+        run = self.runs.pop(process_id, None) if process_id else None
+        if run is None:
+            return None
+
+        if run.base_step != context.current_step:
+            self._cancel(run, "step_changed")
+            return None
+        if not input_matches(run.predicted_input, user_input):
+            self._cancel(run, "input_mismatch")
+            return None
+        if run.age > settings.speculative_execution_ttl:
+            self._cancel(run, "expired")
+            return None
+
+        try:
+            await asyncio.wait({run.task})
+        except BaseException:
+            run.task.cancel()
+            raise
+
+        if run.task.cancelled() or run.task.exception() is not None or run.context.current_step == "error":
+            self.stats.failed += 1
+            logger.info(f"Speculative {run.speculated_step} for process {process_id} did not finish; running it normally")
+            return None
+
+        apply_forked_state(context, run.context)
+        self.stats.committed += 1
+        logger.info(
+            f"✅ Committed speculative {run.speculated_step} for process {process_id} "
+            f"(started {run.age:.1f}s ago, next step: {context.current_step})"
+        )
+        return run
+
+    def discard(self, process_id: str, reason: str) -> bool:
+        """プロセスの投機実行を破棄する（一時停止・キャンセル・再度の入力待ちなど）"""
+        run = self.runs.pop(process_id, None)
+        if run is None:
+            return False
+        self._cancel(run, reason)
+        return True
+
+    def discard_all(self, reason: str) -> None:
+        for process_id in list(self.runs):
+            self.discard(process_id, reason)
+
+    def metrics(self) -> Dict[str, float]:
+        return {**self.stats.as_dict(), "runs": len(self.runs)}
+
+    async def _execute(self, run: SpeculativeRun, task_id: str) -> None:
+        with process_event_bus.capture() as events:
+            run.events = events
+            await self.manager._execute_single_step_with_events(
+                run.context, run.process_id, None, f"{task_id}:speculative"
+            )
+
+    def _discard_expired(self) -> None:
+        for process_id, run in list(self.runs.items()):
+            if run.age > settings.speculative_execution_ttl:
+                self.discard(process_id, "expired")
+
+    def _cancel(self, run: SpeculativeRun, reason: str) -> None:
+        if run.task and not run.task.done():
+            run.task.cancel()
+        self.stats.discarded += 1
+        logger.info(f"🗑️ Discarded speculative {run.speculated_step} for process {run.process_id} ({reason})")
+
+    @staticmethod
+    def _log_result(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.info(f"Speculative execution failed: {task.exception()}")
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+background_tasks のリース付きワーカー
+
+- タスクは ``claim_background_tasks`` RPC（FOR UPDATE SKIP LOCKED）で確保し、
+  ``lease_expires_at`` までのリースを持つ。複数の API インスタンス・ワーカープロセスが同じテーブルを共有しても
+  同じタスクを二重に実行しない
+- 実行中はハートビートでリースを延長する。延長できなかったタスク（キャンセル・他ワーカーへの再割り当て）は
+  ローカルの asyncio タスクを停止する
+- ``requeue_expired_background_tasks`` でリース切れ（プロセス停止・スケールイン）のタスクを pending に戻す
+
+スケジューリング:
+- 確保は priority の高い順（同順位は作成順）。depends_on の前提タスクが完了するまで依存タスクは確保しない
+- 空きスロットのうち ``background_worker_interactive_slots`` 個は、ユーザーが待っている
+  generation_continue / generation_resume 専用に残す（一括の generation_start で埋まらないようにする）。
+  予約は ``concurrency - 1`` 個までで、generation_start 用に少なくとも1スロットは残す
+- タスクの完了時にすぐ次の確保を行い、依存タスクや待機中のタスクを待たせない
+- 同順位のタスクはテナント（組織、個人契約ならユーザー）単位の重み付き公平順で確保し、
+  plan_tiers の同時実行上限を超えるテナントのタスクは確保しない（migration 側の ``claim_background_tasks``）
+
+BACKGROUND_TASK_MODE=inline（既定）では API プロセスがタスク作成直後に確保を行い、
+同時にリトライ・再キューされたタスクを拾うポーリングループも動かす。
+BACKGROUND_TASK_MODE=worker では API はタスクを登録するだけで、``python worker.py`` のワーカーが実行する。
+
+停止時（``stop()``）は新規の確保をやめ、実行中のタスクにはステップの区切りで ``TaskDrained`` を送出させて
+pending に戻す。猶予時間内に区切りに達しなかったタスクは中断して pending に戻し、別のインスタンスが
+保存済みの ArticleContext から再開する。
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from app.common.database import get_async_supabase_client
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TASK_TYPES = ["generation_start", "generation_continue", "generation_resume"]
+# ユーザーの操作を受けて作成されるタスク（予約スロットを使える）
+INTERACTIVE_TASK_TYPES = ["generation_continue", "generation_resume"]
+
+
+class TaskDrained(Exception):
+    """ワーカー停止のため、ステップの区切りで生成フローを中断したことを示す"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class BackgroundTaskWorker:
+    """background_tasks を確保・実行・ハートビートするワーカー"""
+
+    def __init__(
+        self,
+        manager,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        heartbeat_interval: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        interactive_slots: Optional[int] = None,
+    ):
+        self.manager = manager
+        self.worker_id = worker_id or default_worker_id()
+        self.hostname = socket.gethostname()
+        self.concurrency = concurrency or settings.background_worker_concurrency
+        self.lease_seconds = lease_seconds or settings.background_task_lease_seconds
+        self.heartbeat_interval = heartbeat_interval or settings.background_task_heartbeat_interval
+        self.poll_interval = poll_interval or settings.background_worker_poll_interval
+        interactive_slots = (
+            interactive_slots if interactive_slots is not None else settings.background_worker_interactive_slots
+        )
+        # 予約で全スロットが埋まると generation_start が確保されなくなるため、少なくとも1つは残す
+        self.interactive_slots = max(0, min(interactive_slots, self.concurrency - 1))
+        # task_id -> 実行中の asyncio タスク
+        self.running: Dict[str, asyncio.Task] = {}
+        # 終了ステータスを書き込んだ（ハートビート不要の）タスク
+        self._released: Set[str] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._claim_lock = asyncio.Lock()
+        # タスク完了・新規タスク作成時にポーリングを待たずに確保させる
+        self._wakeup = asyncio.Event()
+        # /metrics 用のテナント別キュー集計（background_task_queue_stats）
+        self.queue_stats: Dict[str, float] = {}
+        self._queue_stats_at = 0.0
+
+    # --- 確保 ---
+
+    async def claim_batch(self, limit: int, task_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """実行可能な pending タスクを優先度順に最大 limit 件確保する"""
+        if limit <= 0:
+            return []
+        supabase = await get_async_supabase_client()
+        result = await supabase.rpc("claim_background_tasks", {
+            "p_worker_id": self.worker_id,
+            "p_worker_hostname": self.hostname,
+            "p_limit": limit,
+            "p_lease_seconds": self.lease_seconds,
+            "p_task_types": task_types or TASK_TYPES,
+        }).execute()
+        return result.data or []
+
+    async def claim_runnable(self) -> List[Dict[str, Any]]:
+        """空きスロット分のタスクを確保して実行を開始する（確保 RPC の失敗は呼び出し元に送出）"""
+        async with self._claim_lock:
+            free = self.concurrency - len(self.running)
+            if free <= 0 or self._stopping:
+                return []
+            # 予約スロットを除いた分は全種別から優先度順に確保し、残りは対話的なタスクだけに使う
+            claimed = await self.claim_batch(free - self.interactive_slots)
+            claimed += await self.claim_batch(free - len(claimed), INTERACTIVE_TASK_TYPES)
+            for task_row in claimed:
+                self.spawn(task_row)
+            return claimed
+
+    def wake(self) -> None:
+        """ポーリング間隔を待たずに次の確保を行わせる"""
+        self._wakeup.set()
+
+    async def requeue_expired(self) -> int:
+        """リース切れ・ハートビートの途絶えた running タスクを pending に戻す"""
+        try:
+            supabase = await get_async_supabase_client()
+            result = await supabase.rpc("requeue_expired_background_tasks", {
+                "p_stale_seconds": settings.background_task_stale_seconds,
+            }).execute()
+            count = result.data or 0
+            if count:
+                logger.warning(f"[WORKER {self.worker_id}] Requeued {count} orphaned background tasks")
+            return count
+        except Exception as e:
+            logger.warning(f"[WORKER {self.worker_id}] Failed to requeue expired tasks: {e}")
+            return 0
+
+    async def release_for_resume(self, task_ids: List[str]) -> int:
+        """停止時に実行中のタスクを pending に戻し、他のインスタンスで再開できるようにする"""
+        if not task_ids:
+            return 0
+        for task_id in task_ids:
+            self.release_lease(task_id)
+        try:
+            supabase = await get_async_supabase_client()
+            result = await supabase.rpc("release_background_tasks", {
+                "p_worker_id": self.worker_id,
+                "p_task_ids": task_ids,
+            }).execute()
+            count = result.data or 0
+            logger.info(f"[WORKER {self.worker_id}] Released {count} background tasks for resume")
+            return count
+        except Exception as e:
+            # 戻せなかったタスクはリース期限切れ後に再キューされる
+            logger.warning(f"[WORKER {self.worker_id}] Failed to release background tasks: {e}")
+            return 0
+
+    async def refresh_queue_stats(self, max_age: Optional[float] = None) -> Dict[str, float]:
+        """テナント別の待機・実行中タスク数を集計する（max_age 秒以内に集計済みならそれを返す）"""
+        if max_age is None:
+            max_age = settings.background_task_queue_stats_max_age
+        if self.queue_stats and time.monotonic() - self._queue_stats_at < max_age:
+            return self.queue_stats
+        try:
+            supabase = await get_async_supabase_client()
+            result = await supabase.rpc("background_task_queue_stats", {}).execute()
+        except Exception as e:
+            logger.warning(f"[WORKER {self.worker_id}] Failed to fetch queue stats: {e}")
+            return self.queue_stats
+        rows = result.data or []
+        self.queue_stats = {
+            "pending": sum(row.get("pending") or 0 for row in rows),
+            "running": sum(row.get("running") or 0 for row in rows),
+            "tenants_pending": sum(1 for row in rows if row.get("pending")),
+            "max_tenant_pending": max((row.get("pending") or 0 for row in rows), default=0),
+            "max_tenant_running": max((row.get("running") or 0 for row in rows), default=0),
+            "oldest_pending_seconds": max((row.get("oldest_pending_seconds") or 0.0 for row in rows), default=0.0),
+        }
+        self._queue_stats_at = time.monotonic()
+        return self.queue_stats
+
+    # --- 実行 ---
+
+    def spawn(self, task_row: Dict[str, Any]) -> asyncio.Task:
+        """確保済みタスクを実行する asyncio タスクを作る"""
+        task_id = task_row["id"]
+        task = asyncio.create_task(self.manager._execute_task_loop(task_id, claimed_task=task_row))
+        self.running[task_id] = task
+
+        def cleanup_task(t: asyncio.Task):
+            if self.running.get(task_id) is t:
+                self.running.pop(task_id, None)
+            self._released.discard(task_id)
+            # 空いたスロットと、このタスクに依存していたタスクをすぐに確保する
+            self._wakeup.set()
+            if t.cancelled():
+                logger.warning(f"[WORKER {self.worker_id}] Background task {task_id} was stopped")
+            elif t.exception():
+                logger.error(f"[WORKER {self.worker_id}] Background task {task_id} failed with exception: {t.exception()}")
+
+        task.add_done_callback(cleanup_task)
+        return task
+
+    async def schedule_inline(self) -> List[Dict[str, Any]]:
+        """API プロセス内でタスク作成直後に呼ぶ。優先度順に確保し、ポーリングループを起動しておく"""
+        claimed = await self.claim_runnable()
+        self.ensure_started()
+        return claimed
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping
+
+    def release_lease(self, task_id: str) -> None:
+        """終了ステータスを書き込む前に呼ぶ。以降はハートビートの対象外にする"""
+        self._released.add(task_id)
+
+    def owns(self, task_id: str) -> bool:
+        return task_id in self.running
+
+    # --- ハートビート ---
+
+    async def heartbeat_once(self) -> None:
+        task_ids = [task_id for task_id in self.running if task_id not in self._released]
+        if not task_ids:
+            return
+        try:
+            supabase = await get_async_supabase_client()
+            result = await supabase.rpc("heartbeat_background_tasks", {
+                "p_worker_id": self.worker_id,
+                "p_task_ids": task_ids,
+                "p_lease_seconds": self.lease_seconds,
+            }).execute()
+        except Exception as e:
+            # 一時的な失敗ではタスクを止めない（リース期限内に次のハートビートで延長される）
+            logger.warning(f"[WORKER {self.worker_id}] Heartbeat failed: {e}")
+            return
+
+        extended = set(result.data or [])
+        for task_id in task_ids:
+            if task_id in extended or task_id in self._released:
+                continue
+            task = self.running.get(task_id)
+            if task and not task.done():
+                logger.warning(
+                    f"[WORKER {self.worker_id}] Lease lost for task {task_id} (cancelled or reassigned); stopping it"
+                )
+                task.cancel()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.heartbeat_once()
+
+    def _start_heartbeat(self) -> None:
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    # --- ポーリングループ ---
+
+    def ensure_started(self) -> None:
+        """inline モードでポーリングループを（未起動なら）バックグラウンドで起動する"""
+        if not self._stopping and (self._loop_task is None or self._loop_task.done()):
+            self._loop_task = asyncio.create_task(self.run_forever())
+
+    async def run_forever(self) -> None:
+        """確保 → 実行 → ハートビート → 期限切れ再キュー を繰り返す"""
+        logger.info(
+            f"[WORKER {self.worker_id}] Started (concurrency={self.concurrency}, lease={self.lease_seconds}s)"
+        )
+        self._start_heartbeat()
+        last_requeue = 0.0
+        while not self._stopping:
+            now = time.monotonic()
+            if now - last_requeue >= self.lease_seconds / 2:
+                last_requeue = now
+                await self.requeue_expired()
+            self._wakeup.clear()
+            try:
+                await self.claim_runnable()
+            except Exception as e:
+                logger.warning(f"[WORKER {self.worker_id}] Failed to claim background tasks: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """新規確保を止め、実行中タスクがステップの区切りで停止するのを待つ。
+        timeout を過ぎたタスクは中断して pending に戻す"""
+        self._stopping = True
+        self._wakeup.set()
+        running = dict(self.running)
+        if running:
+            logger.info(f"[WORKER {self.worker_id}] Draining {len(running)} running tasks")
+            # 待機中もハートビートは続けてリースを保持する
+            await asyncio.wait(running.values(), timeout=timeout)
+            interrupted = [task_id for task_id, task in running.items() if not task.done()]
+            for task_id in interrupted:
+                running[task_id].cancel()
+            if interrupted:
+                await asyncio.gather(*(running[task_id] for task_id in interrupted), return_exceptions=True)
+                await self.release_for_resume(interrupted)
+        for task in (self._loop_task, self._heartbeat_task):
+            if task and not task.done():
+                task.cancel()
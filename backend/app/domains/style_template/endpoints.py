@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from app.common.database import supabase
 from app.common.auth import get_current_user_id_from_token
+from app.domains.seo_article.services.edit_knowledge_cache import edit_knowledge_cache
 import logging
 import uuid
 
@@ -157,6 +158,9 @@ async def create_style_template(
         }
         
         result = supabase.table("style_guide_templates").insert(insert_data).execute()
+        if template_data.is_default:
+            # 既定テンプレートが変わるので AI 編集用ナレッジを作り直す
+            edit_knowledge_cache.invalidate_user(user_id)
         
         if result.data:
             return StyleTemplateResponse(**result.data[0])
@@ -230,6 +234,7 @@ async def update_style_template(
             return StyleTemplateResponse(**template)
         
         result = supabase.table("style_guide_templates").update(update_data).eq("id", template_id).execute()
+        edit_knowledge_cache.invalidate_style_template(template_id, user_id)
         
         if result.data:
             return StyleTemplateResponse(**result.data[0])
@@ -293,6 +298,7 @@ async def delete_style_template(
         
         # Soft delete by setting is_active to false
         result = supabase.table("style_guide_templates").update({"is_active": False}).eq("id", template_id).execute()
+        edit_knowledge_cache.invalidate_style_template(template_id, user_id)
         
         if result.data:
             return {"message": "Style template deleted successfully"}
@@ -349,6 +355,7 @@ async def set_default_template(
         
         # Set this template as default (trigger will handle unsetting others)
         result = supabase.table("style_guide_templates").update({"is_default": True}).eq("id", template_id).execute()
+        edit_knowledge_cache.invalidate_style_template(template_id, user_id)
         
         if result.data:
             return {"message": "Default template updated successfully"}
@@ -9,7 +9,7 @@ from app.common.auth import get_current_user_id_from_token
 from app.common.admin_auth import get_admin_user_email_from_token
 from app.domains.usage.service import usage_service
 from app.domains.usage.schemas import UsageInfo, AdminUsageStats, AdminUserUsage
-from app.common.database import supabase
+from app.common.database import run_in_db_thread, supabase
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +22,10 @@ async def get_current_usage(
 ):
     """現在の使用量を取得"""
     # ユーザーの組織を確認（チームプランの場合）
-    org_id = _get_user_active_org(user_id)
-    return usage_service.get_current_usage(user_id=user_id, organization_id=org_id)
+    org_id = await run_in_db_thread(_get_user_active_org, user_id)
+    return await run_in_db_thread(
+        usage_service.get_current_usage, user_id=user_id, organization_id=org_id
+    )
 
 
 # =====================================================
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+生成プロセスの協調的キャンセル
+
+- 実行中のプロセスごとに ``CancellationToken`` を登録し、エージェント実行・リサーチの並列実行・
+  セクション執筆ループ・ブログのストリームループがトークンを参照する
+- キャンセル要求を受けたインスタンスでは ``cancellation_registry.cancel()`` で即座に通知する。
+  別インスタンスで実行中の場合に備え、``scope(poll=...)`` で DB 上の状態を一定間隔で確認する
+- ``GenerationCancelled`` は ``asyncio.CancelledError`` のサブクラスなので、各所の ``except Exception`` に
+  握りつぶされずに実行中のステップから抜ける
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCancelled(asyncio.CancelledError):
+    """プロセスのキャンセル・一時停止により実行を打ち切ったことを示す"""
+
+    def __init__(self, process_id: str, reason: str = "cancelled"):
+        super().__init__(f"Generation {process_id} {reason}")
+        self.process_id = process_id
+        self.reason = reason
+
+
+class CancellationToken:
+    """1つの実行中プロセスのキャンセル状態"""
+
+    def __init__(self, process_id: str):
+        self.process_id = process_id
+        self.reason: Optional[str] = None
+        self._event = asyncio.Event()
+        self._callbacks: List[Callable[[], Any]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if self.cancelled:
+            return
+        self.reason = reason
+        self._event.set()
+        logger.info(f"Cancellation requested for process {self.process_id} ({reason})")
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed for process {self.process_id}: {e}")
+
+    def add_callback(self, callback: Callable[[], Any]) -> None:
+        """キャンセル時に呼ぶ処理を登録する（ストリームの cancel など）。キャンセル済みなら即座に呼ぶ"""
+        self._callbacks.append(callback)
+        if self.cancelled:
+            callback()
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise GenerationCancelled(self.process_id, self.reason or "cancelled")
+
+    async def run(self, awaitable: Awaitable[Any]) -> Any:
+        """awaitable を実行し、完了前にキャンセルされたら中断して GenerationCancelled を送出する"""
+        if self.cancelled:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            self.raise_if_cancelled()
+        task = asyncio.ensure_future(awaitable)
+        waiter = asyncio.ensure_future(self._event.wait())
+        try:
+            await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            task.cancel()
+            raise
+        finally:
+            waiter.cancel()
+        if not self.cancelled:
+            return task.result()
+        task.cancel()
+        # 中断した処理の後始末（HTTP ストリームのクローズなど）を待つ
+        await asyncio.gather(task, return_exceptions=True)
+        self.raise_if_cancelled()
+
+
+class CancellationRegistry:
+    """process_id ごとの実行中トークン"""
+
+    def __init__(self):
+        self._tokens: Dict[str, CancellationToken] = {}
+
+    def get(self, process_id: Optional[str]) -> Optional[CancellationToken]:
+        return self._tokens.get(process_id) if process_id else None
+
+    def cancel(self, process_id: str, reason: str = "cancelled") -> bool:
+        """このインスタンスで実行中ならキャンセルする"""
+        token = self._tokens.get(process_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    @asynccontextmanager
+    async def scope(
+        self,
+        process_id: str,
+        poll: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        """実行中の間トークンを登録する。poll は他インスタンスでのキャンセルを検出して理由を返す関数"""
+        token = CancellationToken(process_id)
+        self._tokens[process_id] = token
+        watcher = asyncio.create_task(self._watch(token, poll, poll_interval)) if poll else None
+        try:
+            yield token
+        finally:
+            if watcher:
+                watcher.cancel()
+            if self._tokens.get(process_id) is token:
+                self._tokens.pop(process_id, None)
+
+    async def _watch(
+        self,
+        token: CancellationToken,
+        poll: Callable[[], Awaitable[Optional[str]]],
+        poll_interval: Optional[float],
+    ) -> None:
+        interval = poll_interval or settings.cancellation_poll_interval
+        while not token.cancelled:
+            await asyncio.sleep(interval)
+            try:
+                reason = await poll()
+            except Exception as e:
+                logger.debug(f"Cancellation poll failed for process {token.process_id}: {e}")
+                continue
+            if reason:
+                token.cancel(reason)
+
+
+async def run_cancellable(process_id: Optional[str], awaitable: Awaitable[Any]) -> Any:
+    """process_id のトークンが登録されていればキャンセル可能な形で実行する"""
+    token = cancellation_registry.get(process_id)
+    if token is None:
+        return await awaitable
+    return await token.run(awaitable)
+
+
+def raise_if_cancelled(process_id: Optional[str]) -> None:
+    token = cancellation_registry.get(process_id)
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+# シングルトンインスタンス
+cancellation_registry = CancellationRegistry()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+競合記事スクレイピングのホスト単位のスケジューラ
+
+複数の記事生成が同時に走ると、SERP の上位サイトが重なって同じホストへ一度にリクエストが集中する。
+
+- robots.txt はホストごとにパースして TTL 付きでキャッシュする（同じホストの同時取得は 1 回にまとめる）。
+  取得できなかった場合（ネットワークエラー）は短い TTL で「制限なし」として扱う
+- ページの取得はホストごとの同時実行数（``SCRAPING_PER_HOST_CONNECTIONS``）を守り、
+  開始間隔を robots.txt の Crawl-delay（上限 ``SCRAPING_MAX_CRAWL_DELAY``）または
+  ``SCRAPING_MIN_HOST_INTERVAL`` の大きい方だけ空ける
+- 同じ URL（正規化後）のスクレイピングが同時に走った場合は 1 回の取得・パース結果を共有する
+- ホスト単位の状態（robots.txt・同時実行枠）は ``_MAX_HOSTS`` ホストまで保持し、古いものから捨てる
+  （同時実行枠は使用中・待機中でなく、Crawl-delay の待ちも残っていないホストだけを捨てる）
+
+状態はワーカープロセスごとに持つ（インスタンス間の調整はしない）。
+"""
+import asyncio
+import logging
+import time
+import urllib.robotparser
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.infrastructure.external_apis.scrape_cache import normalize_url
+from app.infrastructure.external_apis.scraping_engine import scraping_engine
+
+logger = logging.getLogger(__name__)
+
+# robots.txt・同時実行枠を保持するホスト数の上限（古いものから捨てる）
+_MAX_HOSTS = 2048
+# robots.txt の取得自体に失敗した場合に「制限なし」とみなす期間（秒）
+_ROBOTS_ERROR_TTL = 600
+
+
+@dataclass
+class _RobotsEntry:
+    parser: Optional[urllib.robotparser.RobotFileParser]  # None は robots.txt なし（制限なし）
+    expires_at: float
+
+
+@dataclass
+class _HostSlot:
+    semaphore: asyncio.Semaphore
+    next_start: float = 0.0  # 次のリクエストを開始できる時刻（time.monotonic）
+    users: int = 0  # 枠を使用中・待機中のリクエスト数
+
+    def idle(self, now: float) -> bool:
+        return self.users == 0 and self.next_start <= now
+
+
+@dataclass
+class CrawlSchedulerStats:
+    robots_hits: int = 0
+    robots_fetches: int = 0
+    robots_errors: int = 0
+    disallowed: int = 0
+    deduplicated: int = 0
+    crawl_delay_waits: int = 0
+    crawl_delay_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.__dict__)
+
+
+def base_url_of(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+
+class CrawlScheduler:
+    def __init__(self):
+        self.stats = CrawlSchedulerStats()
+        self._robots: "OrderedDict[str, _RobotsEntry]" = OrderedDict()
+        self._robots_inflight: Dict[str, "asyncio.Task[_RobotsEntry]"] = {}
+        self._url_inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self._hosts: "OrderedDict[str, _HostSlot]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> None:
+        # 別のイベントループ（スクリプトやテストの asyncio.run）ではループに紐づく状態を作り直す
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._robots_inflight = {}
+            self._url_inflight = {}
+            self._hosts = OrderedDict()
+
+    # --- robots.txt ---
+
+    async def robot_parser(self, base_url: str, user_agent: str) -> Optional[urllib.robotparser.RobotFileParser]:
+        """ホストの robots.txt パーサー（キャッシュがなければ取得する）"""
+        self._bind_loop()
+        base_url = base_url.rstrip("/").lower()
+        entry = self._robots.get(base_url)
+        if entry is not None and entry.expires_at > time.time():
+            self._robots.move_to_end(base_url)
+            self.stats.robots_hits += 1
+            return entry.parser
+
+        task = self._robots_inflight.get(base_url)
+        if task is None:
+            task = asyncio.create_task(self._fetch_robots(base_url, user_agent))
+            self._robots_inflight[base_url] = task
+            task.add_done_callback(lambda _: self._robots_inflight.pop(base_url, None))
+        else:
+            self.stats.robots_hits += 1
+        entry = await asyncio.shield(task)
+        return entry.parser
+
+    async def can_fetch(self, url: str, user_agent: str) -> bool:
+        parser = await self.robot_parser(base_url_of(url), user_agent)
+        if parser is None or parser.can_fetch(user_agent, url):
+            return True
+        self.stats.disallowed += 1
+        return False
+
+    async def _fetch_robots(self, base_url: str, user_agent: str) -> _RobotsEntry:
+        robots_url = f"{base_url}/robots.txt"
+        self.stats.robots_fetches += 1
+        ttl = settings.scraping_robots_ttl
+        parser: Optional[urllib.robotparser.RobotFileParser] = None
+        try:
+            # urllib.robotparser.RobotFileParser.read() はブロッキングする urllib.request を使うので、
+            # 共有の非同期クライアントで内容を取得してから parse() に渡す
+            response = await scraping_engine.fetch(robots_url, headers={"User-Agent": user_agent})
+            if response.status_code == 200:
+                parser = urllib.robotparser.RobotFileParser(robots_url)
+                parser.parse(response.content.decode(response.encoding or "utf-8", errors="replace").splitlines())
+            else:
+                logger.debug(f"robots.txt not available at {robots_url} (status {response.status_code}); assuming allowed")
+        except Exception as e:
+            self.stats.robots_errors += 1
+            ttl = min(ttl, _ROBOTS_ERROR_TTL)
+            logger.info(f"Failed to fetch robots.txt from {robots_url}: {e}. Assuming allowed.")
+
+        entry = _RobotsEntry(parser=parser, expires_at=time.time() + ttl)
+        self._robots[base_url] = entry
+        self._robots.move_to_end(base_url)
+        while len(self._robots) > _MAX_HOSTS:
+            self._robots.popitem(last=False)
+        return entry
+
+    def _crawl_delay(self, base_url: str, user_agent: str) -> float:
+        delay = settings.scraping_min_host_interval
+        entry = self._robots.get(base_url)
+        if entry is not None and entry.parser is not None:
+            try:
+                robots_delay = entry.parser.crawl_delay(user_agent)
+            except Exception:
+                robots_delay = None
+            if robots_delay:
+                delay = max(delay, min(float(robots_delay), settings.scraping_max_crawl_delay))
+        return delay
+
+    # --- ホスト単位の同時実行数と開始間隔 ---
+
+    @asynccontextmanager
+    async def host_slot(self, url: str, user_agent: str) -> AsyncIterator[None]:
+        """ホストごとの同時実行数と Crawl-delay を守ってリクエストを開始する"""
+        self._bind_loop()
+        base_url = base_url_of(url)
+        slot = self._hosts.get(base_url)
+        if slot is None:
+            self._evict_idle_hosts()
+            slot = _HostSlot(semaphore=asyncio.Semaphore(max(settings.scraping_per_host_connections, 1)))
+            self._hosts[base_url] = slot
+        else:
+            self._hosts.move_to_end(base_url)
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                delay = self._crawl_delay(base_url, user_agent)
+                if delay > 0:
+                    now = time.monotonic()
+                    # 開始時刻を予約してから待つ（同じホストの後続は次の枠を予約する）
+                    start = max(now, slot.next_start)
+                    slot.next_start = start + delay
+                    if start > now:
+                        self.stats.crawl_delay_waits += 1
+                        self.stats.crawl_delay_seconds += start - now
+                        await asyncio.sleep(start - now)
+                yield
+        finally:
+            slot.users -= 1
+
+    def _evict_idle_hosts(self) -> None:
+        """上限に達していれば、使われていないホストの枠を古い順に捨てる（使用中のホストは残す）"""
+        if len(self._hosts) < _MAX_HOSTS:
+            return
+        now = time.monotonic()
+        for base_url in list(self._hosts):
+            if len(self._hosts) < _MAX_HOSTS:
+                break
+            if self._hosts[base_url].idle(now):
+                del self._hosts[base_url]
+
+    # --- 同じ URL の取得をまとめる ---
+
+    async def run_once(self, url: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """同じ URL に対する ``func`` の同時実行を 1 回にまとめ、結果を共有する"""
+        self._bind_loop()
+        key = normalize_url(url)
+        task = self._url_inflight.get(key)
+        if task is not None:
+            self.stats.deduplicated += 1
+        else:
+            task = asyncio.ensure_future(func())
+            self._url_inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_url(key, done))
+        # 待っている側がキャンセルされても、共有している取得は止めない
+        return await asyncio.shield(task)
+
+    def _finish_url(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._url_inflight.get(key) is task:
+            del self._url_inflight[key]
+        # 待っている側が全員キャンセルされた場合でも例外が未取得の警告にならないようにする
+        if not task.cancelled():
+            task.exception()
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            **self.stats.as_dict(),
+            "robots_hosts": len(self._robots),
+            "slot_hosts": len(self._hosts),
+            "inflight_urls": len(self._url_inflight),
+        }
+
+
+# シングルトンインスタンス
+crawl_scheduler = CrawlScheduler()
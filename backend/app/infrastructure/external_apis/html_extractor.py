@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+"""
+競合記事 HTML の抽出エンジン
+
+BeautifulSoup で ``select()`` / ``decompose()`` を何度も実行し、要素とその親の ``get_text()`` を
+比較していた処理は、深い DOM ではテキストを何度もなめるため要素数の 2 乗に近い時間がかかっていた。
+
+- 1 回のパースで軽量な木を作る（lxml があれば lxml のターゲットパーサー、なければ標準ライブラリの
+  html.parser。どちらも同じ木構築クラスにイベントを渡す）
+- 本文要素の候補（article / main / class・id に content などを含む要素）、title、メタデータは
+  パース中に記録する
+- 本文要素から 1 回だけ木を走査し（再帰しないので深い DOM でもスタックを使い切らない）、
+  見出しとセクション文字数、本文テキスト、画像・動画・テーブル・リスト・リンク数を同時に求める
+- 不要要素（nav / footer / 広告など）は削除せず、走査時に部分木ごと飛ばす
+
+セクション文字数は従来と同じく「見出しの後続の兄弟要素のうち、次の同位以上の見出しの手前まで」の
+文字数（スペース除く）。各要素の部分木の文字数を走査中に積み上げ、兄弟の累積和の差で求める。
+本文テキストはブロック要素（p / li / div など）の境界で区切った文書順のテキストで、各テキストノードを
+1 回だけ数える（20 文字以下の区切りが続く場合はリスト項目やセルとして 1 行にまとめる）。
+"""
+import codecs
+import json
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    from lxml import etree as _lxml_etree
+
+    LXML_AVAILABLE = True
+except ImportError:  # pragma: no cover - 依存関係による
+    _lxml_etree = None
+    LXML_AVAILABLE = False
+
+# 本文要素の候補（優先順）: (タグ, 属性, 属性値に含まれる文字列)
+_CONTENT_SELECTORS: Tuple[Tuple[str, Optional[str], Optional[str]], ...] = (
+    ("article", None, None),
+    ("main", None, None),
+    ("div", "class", "content"),
+    ("div", "class", "post"),
+    ("div", "class", "entry"),
+    ("div", "class", "article"),
+    ("section", "class", "content"),
+    ("section", "class", "post"),
+    ("section", "class", "entry"),
+    ("div", "id", "content"),
+    ("div", "id", "main"),
+)
+_UNWANTED_TAGS = frozenset({"nav", "footer", "header", "aside", "form", "script", "style"})
+# 広告・レコメンド枠（div の class / id の部分一致）
+_AD_CLASS_PARTS = ("ad", "OUTBRAIN", "recommend")
+_HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_BLOCK_TAGS = frozenset({
+    "p", "div", "li", "td", "th", "dd", "dt", "blockquote", "pre", "section", "article", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+})
+_VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr",
+})
+_VIDEO_DOMAINS = ("youtube.com", "youtu.be", "vimeo.com", "dailymotion.com")
+_AUTHOR_CLASS_RE = re.compile(r"author", re.I)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([A-Za-z0-9_\-]+)", re.I)
+# Shift_JIS と表示されていても実際は Windows の拡張文字（cp932）を含むページが多い
+_ENCODING_ALIASES = {"shift_jis": "cp932", "shift-jis": "cp932", "sjis": "cp932", "x-sjis": "cp932", "windows-31j": "cp932"}
+
+# 本文テキストの上限（文字数）と、ブロックとして採用する最小文字数
+_MAX_CONTENT_CHARS = 15000
+_MIN_BLOCK_CHARS = 20
+_END = object()
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "parent", "children", "index", "count")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["_Node"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children: List[Any] = []  # _Node または str
+        self.index = 0  # 親の children 内の位置
+        self.count = 0  # 部分木の文字数（走査時に積み上げる）
+
+
+def _char_count(text: str) -> int:
+    """get_text(separator=' ', strip=True) の結果からスペースを除いた文字数と同じ数え方"""
+    return len(text.strip().replace(" ", ""))
+
+
+class _TreeBuilder:
+    """パーサーのイベント（start / end / data）から木を作り、走査前に必要な要素を記録する"""
+
+    def __init__(self):
+        self.document = _Node("#document", {}, None)
+        self._stack: List[_Node] = [self.document]
+        self._open: Dict[str, int] = {}
+        self.candidates: List[Optional[_Node]] = [None] * len(_CONTENT_SELECTORS)
+        self.body: Optional[_Node] = None
+        self.title: Optional[_Node] = None
+        self.author_meta: Optional[Dict[str, str]] = None
+        self.author_element: Optional[_Node] = None
+        self.published_meta: Optional[Dict[str, str]] = None
+        self.modified_meta: Optional[Dict[str, str]] = None
+        self.ld_json_scripts: List[_Node] = []
+
+    def start(self, tag: str, attrs: Dict[str, str]) -> None:
+        tag = tag.lower() if isinstance(tag, str) else ""
+        parent = self._stack[-1]
+        node = _Node(tag, attrs, parent)
+        node.index = len(parent.children)
+        parent.children.append(node)
+        self._stack.append(node)
+        self._open[tag] = self._open.get(tag, 0) + 1
+        self._record(node)
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if not self._open.get(tag):
+            return  # 対応する開始タグがない終了タグは無視する
+        while len(self._stack) > 1:
+            node = self._stack.pop()
+            self._open[node.tag] -= 1
+            if node.tag == tag:
+                break
+
+    def data(self, text: str) -> None:
+        children = self._stack[-1].children
+        if children and isinstance(children[-1], str):
+            children[-1] += text
+        else:
+            children.append(text)
+
+    def close(self) -> "_TreeBuilder":
+        return self
+
+    def _record(self, node: _Node) -> None:
+        tag, attrs = node.tag, node.attrs
+        for i, (selector_tag, attr, part) in enumerate(_CONTENT_SELECTORS):
+            if self.candidates[i] is None and tag == selector_tag and (attr is None or part in attrs.get(attr, "")):
+                self.candidates[i] = node
+        if tag == "body" and self.body is None:
+            self.body = node
+        elif tag == "title" and self.title is None:
+            self.title = node
+        elif tag == "meta":
+            if self.author_meta is None and attrs.get("name") == "author":
+                self.author_meta = attrs
+            prop = attrs.get("property")
+            if self.published_meta is None and prop == "article:published_time":
+                self.published_meta = attrs
+            elif self.modified_meta is None and prop == "article:modified_time":
+                self.modified_meta = attrs
+        elif tag == "script" and attrs.get("type") == "application/ld+json":
+            self.ld_json_scripts.append(node)
+        if self.author_element is None and tag in ("div", "span", "p") and _AUTHOR_CLASS_RE.search(attrs.get("class", "")):
+            self.author_element = node
+
+    def content_root(self) -> Optional[_Node]:
+        for candidate in self.candidates:
+            if candidate is not None:
+                return candidate
+        return self.body
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, builder: _TreeBuilder):
+        super().__init__(convert_charrefs=True)
+        self.builder = builder
+
+    def handle_starttag(self, tag, attrs):
+        self.builder.start(tag, {name: value if value is not None else "" for name, value in attrs})
+        if tag in _VOID_TAGS:
+            self.builder.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.builder.start(tag, {name: value if value is not None else "" for name, value in attrs})
+        self.builder.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in _VOID_TAGS:
+            self.builder.end(tag)
+
+    def handle_data(self, data):
+        self.builder.data(data)
+
+
+class _LxmlTarget:
+    """lxml のターゲットパーサー用アダプタ（属性を dict に変換して木構築クラスに渡す）"""
+
+    def __init__(self, builder: _TreeBuilder):
+        self.builder = builder
+
+    def start(self, tag, attrib):
+        self.builder.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.builder.end(tag)
+
+    def data(self, data):
+        self.builder.data(data)
+
+    def close(self):
+        return self.builder
+
+
+def decode_html(content: bytes, encoding: Optional[str] = None) -> str:
+    """Content-Type の charset → meta charset → UTF-8 の順に試してデコードする"""
+    if content.startswith(codecs.BOM_UTF8):
+        return content[len(codecs.BOM_UTF8):].decode("utf-8", errors="replace")
+    candidates = [encoding] if encoding else []
+    match = _META_CHARSET_RE.search(content[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii"))
+    candidates.append("utf-8")
+    for candidate in candidates:
+        name = _ENCODING_ALIASES.get(candidate.lower(), candidate)
+        try:
+            codecs.lookup(name)
+            return content.decode(name)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return content.decode("utf-8", errors="replace")
+
+
+def parse_html(text: str, backend: Optional[str] = None) -> _TreeBuilder:
+    """HTML をパースして木を作る（backend は "lxml" / "html.parser"、省略時は lxml があれば lxml）"""
+    if backend is None:
+        backend = "lxml" if LXML_AVAILABLE else "html.parser"
+    if backend == "lxml":
+        if not LXML_AVAILABLE:
+            raise RuntimeError("lxml is not installed")
+        builder = _TreeBuilder()
+        parser = _lxml_etree.HTMLParser(target=_LxmlTarget(builder), recover=True, no_network=True)
+        try:
+            parser.feed(text)
+            return parser.close()
+        except Exception:
+            # 空のドキュメントなど lxml が扱えない入力は html.parser でやり直す
+            pass
+    builder = _TreeBuilder()
+    parser = _StdlibParser(builder)
+    parser.feed(text)
+    parser.close()
+    return builder
+
+
+def _text_of(node: Optional[_Node], separator: str = "") -> str:
+    """get_text(separator, strip=True) 相当（メタデータ用。小さな部分木にだけ使う）"""
+    if node is None:
+        return ""
+    parts: List[str] = []
+    stack: List[Any] = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            stripped = item.strip()
+            if stripped:
+                parts.append(stripped)
+        else:
+            stack.extend(reversed(item.children))
+    return separator.join(parts)
+
+
+def _is_unwanted(node: _Node, parent: _Node) -> bool:
+    tag, attrs = node.tag, node.attrs
+    if tag in _UNWANTED_TAGS:
+        return True
+    if attrs.get("aria-hidden") == "true" or "noprint" in attrs.get("class", "").split():
+        return True
+    if tag == "figcaption" and parent.tag == "figure":
+        return True
+    if tag == "div":
+        css_class = attrs.get("class", "")
+        if any(part in css_class for part in _AD_CLASS_PARTS) or "ad" in attrs.get("id", ""):
+            return True
+    return False
+
+
+class _Heading:
+    __slots__ = ("node", "level", "parts", "limit")
+
+    def __init__(self, node: _Node, level: int):
+        self.node = node
+        self.level = level
+        self.parts: List[str] = []
+        self.limit: Optional[_Node] = None  # 次の同位以上の見出し
+
+
+def extract_article(
+    content: bytes,
+    encoding: Optional[str] = None,
+    current_url: str = "",
+    backend: Optional[str] = None,
+) -> Dict[str, Any]:
+    """HTML から見出し（セクション文字数付き）・本文・各種カウント・メタデータを抽出する"""
+    tree = parse_html(decode_html(content, encoding), backend)
+    title = _text_of(tree.title) if tree.title is not None else "タイトル取得できず"
+    root = tree.content_root()
+    if root is None:
+        return {"title": title, "headings": [], "content": "", "char_count": 0, "image_count": 0}
+
+    headings: List[_Heading] = []
+    open_headings: List[_Heading] = []
+    pending_limits: List[_Heading] = []
+    lines: List[str] = []
+    segment: List[str] = []
+    counts = {"image": 0, "video": 0, "table": 0, "list_item": 0}
+    external_links = 0
+    internal_links = 0
+    current_domain = urlparse(current_url).netloc if current_url else ""
+
+    # 反復的な深さ優先走査（enter / leave を明示的に処理する）
+    stack: List[Tuple[_Node, Any]] = [(root, iter(root.children))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, _END)
+        if child is _END:
+            stack.pop()
+            if stack:
+                stack[-1][0].count += node.count
+            tag = node.tag
+            if tag in _HEADING_LEVELS and open_headings and open_headings[-1].node is node:
+                open_headings.pop()
+            if tag in _BLOCK_TAGS and segment:
+                lines.append(" ".join(segment))
+                segment.clear()
+            continue
+
+        if isinstance(child, str):
+            stripped = child.strip()
+            if stripped:
+                node.count += len(stripped.replace(" ", ""))
+                for heading in open_headings:
+                    heading.parts.append(stripped)
+                segment.append(stripped)
+            continue
+
+        if _is_unwanted(child, node):
+            continue  # 部分木ごと飛ばす（文字数 0 として扱う）
+
+        tag, attrs = child.tag, child.attrs
+        level = _HEADING_LEVELS.get(tag)
+        if level is not None:
+            heading = _Heading(child, level)
+            while pending_limits and pending_limits[-1].level >= level:
+                pending_limits.pop().limit = child
+            pending_limits.append(heading)
+            headings.append(heading)
+            open_headings.append(heading)
+        elif tag == "img":
+            src = attrs.get("src")
+            if src and not src.startswith("data:"):
+                counts["image"] += 1
+        elif tag == "video":
+            counts["video"] += 1
+        elif tag == "iframe":
+            src = attrs.get("src", "")
+            if src and any(domain in src for domain in _VIDEO_DOMAINS):
+                counts["video"] += 1
+        elif tag == "table":
+            counts["table"] += 1
+        elif tag == "li":
+            counts["list_item"] += 1
+        elif tag == "a" and "href" in attrs:
+            href = attrs["href"]
+            if href.startswith("http"):
+                if urlparse(href).netloc != current_domain:
+                    external_links += 1
+                else:
+                    internal_links += 1
+            elif href.startswith("/") or not href.startswith("#"):
+                internal_links += 1  # 相対パスは内部リンクとみなす
+
+        if tag in _BLOCK_TAGS and segment:
+            lines.append(" ".join(segment))
+            segment.clear()
+        stack.append((child, iter(child.children)))
+
+    if segment:
+        lines.append(" ".join(segment))
+    structured_headings = _build_heading_tree(headings)
+    content_text, char_count = _collect_content(lines)
+
+    return {
+        "title": title,
+        "headings": structured_headings,
+        "content": content_text.strip(),
+        "char_count": char_count,
+        "image_count": counts["image"],
+        "video_count": counts["video"],
+        "table_count": counts["table"],
+        "list_item_count": counts["list_item"],
+        "external_link_count": external_links,
+        "internal_link_count": internal_links,
+        **_extract_metadata(tree),
+    }
+
+
+def _build_heading_tree(headings: List[_Heading]) -> List[Dict[str, Any]]:
+    structured: List[Dict[str, Any]] = []
+    parent_stack: List[Tuple[int, List[Dict[str, Any]]]] = [(0, structured)]
+    prefix_sums: Dict[int, List[int]] = {}
+
+    for heading in headings:
+        text = "".join(heading.parts)
+        if not text or len(text) >= 200:
+            continue
+        node = {
+            "level": heading.level,
+            "text": text,
+            "children": [],
+            "char_count_section": _section_char_count(heading, prefix_sums),
+        }
+        while parent_stack[-1][0] >= heading.level:
+            parent_stack.pop()
+        parent_stack[-1][1].append(node)
+        parent_stack.append((heading.level, node["children"]))
+    return structured
+
+
+def _section_char_count(heading: _Heading, prefix_sums: Dict[int, List[int]]) -> int:
+    """見出しの後続の兄弟のうち、次の同位以上の見出しの手前までの文字数"""
+    parent = heading.node.parent
+    prefix = prefix_sums.get(id(parent))
+    if prefix is None:
+        prefix = [0]
+        for sibling in parent.children:
+            prefix.append(prefix[-1] + (_char_count(sibling) if isinstance(sibling, str) else sibling.count))
+        prefix_sums[id(parent)] = prefix
+    start = heading.node.index + 1
+    end = len(parent.children)
+    limit = heading.limit
+    if limit is not None and limit.parent is parent and limit.index >= start:
+        end = limit.index
+    return prefix[end] - prefix[start]
+
+
+def _merge_short_lines(lines: List[str]) -> List[str]:
+    """20 文字以下の行が続く部分（リスト項目・テーブルのセルなど）を 1 行にまとめる"""
+    merged: List[str] = []
+    short_run: List[str] = []
+    for line in lines:
+        if len(line) <= _MIN_BLOCK_CHARS:
+            short_run.append(line)
+            continue
+        if short_run:
+            merged.append(" ".join(short_run))
+            short_run = []
+        merged.append(line)
+    if short_run:
+        merged.append(" ".join(short_run))
+    return merged
+
+
+def _collect_content(lines: List[str]) -> Tuple[str, int]:
+    parts: List[str] = []
+    seen = set()
+    total = 0
+    for text in _merge_short_lines(lines):
+        if len(text) <= _MIN_BLOCK_CHARS or text[:100] in seen:
+            continue
+        parts.append(text)
+        seen.add(text[:100])
+        total += len(text)
+        if total > _MAX_CONTENT_CHARS:
+            break
+    return "\n\n".join(parts), len("".join(parts).replace(" ", ""))
+
+
+def _extract_metadata(tree: _TreeBuilder) -> Dict[str, Any]:
+    author_info = None
+    if tree.author_meta is not None:
+        author_info = tree.author_meta.get("content")
+    elif tree.author_element is not None:
+        author_info = _text_of(tree.author_element)
+
+    schema_types: List[Any] = []
+    for script in tree.ld_json_scripts:
+        # script.string 相当（子が 1 つの文字列のときだけ）
+        if len(script.children) != 1 or not isinstance(script.children[0], str):
+            continue
+        try:
+            ld_data = json.loads(script.children[0])
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if isinstance(ld_data, dict) and "@type" in ld_data:
+            schema_types.append(ld_data["@type"])
+        elif isinstance(ld_data, list):
+            for item in ld_data:
+                if isinstance(item, dict) and "@type" in item:
+                    schema_types.append(item["@type"])
+
+    return {
+        "author_info": author_info,
+        "publish_date": tree.published_meta.get("content") if tree.published_meta else None,
+        "modified_date": tree.modified_meta.get("content") if tree.modified_meta else None,
+        "schema_types": schema_types,
+    }
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+競合記事スクレイピング結果（パース済みの見出し・文字数・各種カウント）のキャッシュ
+
+- キーは正規化した URL（スキーム・ホストの小文字化、既定ポート・フラグメント・計測用パラメータの除去、
+  クエリの並べ替え）
+- 生の HTML や BeautifulSoup のオブジェクトは保存せず、JSON にできるパース結果だけを保存する
+- 2 段構成: ワーカー内のメモリ LRU（バイト数上限）→ ローカルディスクの SQLite（PersistentCache）
+  ``SCRAPE_CACHE_BACKEND`` で ``sqlite``（既定）/ ``memory``（メモリのみ）/ ``none``（無効）を選ぶ
+- TTL（既定 1 日）と合計バイト数の上限で追い出し、メモリ / ディスクそれぞれのヒット数を数える
+- 取得・パースに失敗した URL はキャッシュしない（次回の記事作成で取り直す）
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.core.config import settings
+from app.infrastructure.persistent_cache import PersistentCache
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# 同じページでも流入元ごとに付く計測用パラメータ
+_TRACKING_PARAMS = {"gclid", "fbclid", "yclid", "msclkid", "_ga", "ref"}
+
+
+def normalize_url(url: str) -> str:
+    """同じページを指す URL の表記ゆれを吸収する"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+@dataclass
+class ScrapeCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    memory_evictions: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class ScrapeCache:
+    """メモリ LRU とディスク（任意）の 2 段キャッシュ"""
+
+    def __init__(self, store: Optional[PersistentCache], memory_max_bytes: int, ttl: float, enabled: bool = True):
+        self.store = store
+        self.memory_max_bytes = memory_max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self.stats = ScrapeCacheStats()
+        # key -> (パース結果の JSON, サイズ, 期限)。呼び出し側の変更が共有されないよう JSON で持つ
+        self._memory: "OrderedDict[str, Tuple[str, int, float]]" = OrderedDict()
+        self._memory_bytes = 0
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        key = normalize_url(url)
+        cached = self._memory_get(key)
+        if cached is not None:
+            self.stats.memory_hits += 1
+            return cached
+        if self.store is not None:
+            entry = await self.store.aget_entry(key)
+            if entry is not None:
+                self.stats.disk_hits += 1
+                # ディスクの残り期限のままメモリに載せる
+                self._memory_put(key, entry.value, entry.expires_at)
+                return entry.value
+        self.stats.misses += 1
+        return None
+
+    async def put(self, url: str, result: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        key = normalize_url(url)
+        self._memory_put(key, result, time.time() + self.ttl)
+        if self.store is not None:
+            await self.store.aset(key, result, ttl=self.ttl)
+        self.stats.writes += 1
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._memory_bytes = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats.memory_hits + self.stats.disk_hits + self.stats.misses
+        metrics: Dict[str, Any] = {
+            **self.stats.as_dict(),
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "hit_rate": (self.stats.memory_hits + self.stats.disk_hits) / lookups if lookups else 0.0,
+        }
+        if self.store is not None:
+            # ディスク層はメモリ上の集計値を返すので、/metrics から呼んでも SQLite を待たない
+            disk = self.store.metrics()
+            metrics["disk_entries"] = disk["entries"]
+            metrics["disk_bytes"] = disk["bytes"]
+            metrics["disk_errors"] = disk["errors"]
+        return metrics
+
+    # --- メモリ LRU ---
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        if item[2] <= time.time():
+            self._memory_pop(key)
+            return None
+        self._memory.move_to_end(key)
+        return json.loads(item[0])
+
+    def _memory_put(self, key: str, result: Dict[str, Any], expires_at: float) -> None:
+        payload = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+        size = len(payload.encode("utf-8"))
+        if size > self.memory_max_bytes:
+            return
+        self._memory_pop(key)
+        self._memory[key] = (payload, size, expires_at)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            oldest = next(iter(self._memory))
+            self._memory_pop(oldest)
+            self.stats.memory_evictions += 1
+
+    def _memory_pop(self, key: str) -> None:
+        item = self._memory.pop(key, None)
+        if item is not None:
+            self._memory_bytes -= item[1]
+
+
+def _build_scrape_cache() -> ScrapeCache:
+    backend = settings.scrape_cache_backend.lower()
+    store = None
+    if backend == "sqlite":
+        store = PersistentCache(
+            path=settings.local_cache_path,
+            namespace="scrape_result",
+            max_bytes=settings.scrape_cache_max_bytes,
+            default_ttl=settings.scrape_cache_ttl,
+        )
+    elif backend not in ("memory", "none"):
+        logger.warning(f"Unknown SCRAPE_CACHE_BACKEND '{backend}', falling back to memory only")
+    return ScrapeCache(
+        store=store,
+        memory_max_bytes=settings.scrape_cache_memory_max_bytes,
+        ttl=settings.scrape_cache_ttl,
+        enabled=backend != "none",
+    )
+
+
+# シングルトンインスタンス
+scrape_cache = _build_scrape_cache()
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+競合記事スクレイピング用の非同期 HTTP エンジン
+
+- プロセス共通の ``httpx.AsyncClient`` を使い回し、keep-alive / HTTP/2 で接続を再利用する
+  （h2 がインストールされていない環境では HTTP/1.1）
+- 全体の接続数は httpx の Limits で制限する（ホストごとの同時リクエスト数と開始間隔は
+  呼び出し側が crawl_scheduler.host_slot で守る）
+- レスポンスは ``SCRAPING_MAX_RESPONSE_BYTES`` までしか読まない
+- HTML のパースは既定のスレッドプール（画像生成などと共有）ではなく、パース専用の小さなプールで実行する
+- フェーズ別の所要時間（接続[DNS 解決を含む] / TLS / 応答待ち / ダウンロード / パース）を積算する。
+  DNS 解決は httpcore の接続確立に含まれ、単独では計測できない
+"""
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - 依存関係による
+    HTTP2_AVAILABLE = False
+
+
+@dataclass
+class FetchResult:
+    url: str  # リダイレクト後の URL
+    status_code: int
+    content: bytes
+    encoding: Optional[str]  # Content-Type の charset（なければパーサーに判定させる）
+    http_version: str
+    truncated: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class ScrapingStats:
+    requests: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    bytes: int = 0
+    new_connections: int = 0
+    connect_seconds: float = 0.0
+    tls_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    download_seconds: float = 0.0
+    parses: int = 0
+    parse_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.__dict__)
+
+
+class _PhaseTrace:
+    """httpcore のトレースイベントから接続・TLS・応答待ちの時間を取り出す"""
+
+    def __init__(self):
+        self.started: Dict[str, float] = {}
+        self.timings: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        now = time.perf_counter()
+        if event_name.endswith(".started"):
+            self.started[event_name[:-len(".started")]] = now
+            return
+        if not event_name.endswith(".complete"):
+            return
+        name = event_name[:-len(".complete")]
+        started = self.started.get(name)
+        if started is None:
+            return
+        if name == "connection.connect_tcp":
+            self.timings["connect"] = now - started
+        elif name == "connection.start_tls":
+            self.timings["tls"] = now - started
+        elif name.endswith(".receive_response_headers"):
+            request_started = self.started.get(name.replace("receive_response_headers", "send_request_headers"), started)
+            self.timings["wait"] = now - request_started
+
+
+class ScrapingEngine:
+    """共有クライアントでページを取得し、専用プールでパースする"""
+
+    def __init__(self):
+        self.stats = ScrapingStats()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._parse_executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            # 別のイベントループ（スクリプトやテストの asyncio.run）では作り直す
+            self._client = httpx.AsyncClient(
+                http2=settings.scraping_http2 and HTTP2_AVAILABLE,
+                follow_redirects=True,
+                timeout=httpx.Timeout(settings.scraping_timeout, connect=settings.scraping_connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.scraping_max_connections,
+                    max_keepalive_connections=settings.scraping_max_connections,
+                    keepalive_expiry=settings.scraping_keepalive_expiry,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """URL を取得する（httpx の例外はそのまま送出する）"""
+        client = self._get_client()
+        trace = _PhaseTrace()
+        max_bytes = settings.scraping_max_response_bytes
+        self.stats.requests += 1
+        try:
+            async with client.stream("GET", url, headers=headers, extensions={"trace": trace}) as response:
+                download_started = time.perf_counter()
+                chunks = []
+                received = 0
+                truncated = False
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    received += len(chunk)
+                    if received >= max_bytes:
+                        truncated = True
+                        break
+                trace.timings["download"] = time.perf_counter() - download_started
+                content = b"".join(chunks)[:max_bytes]
+                result = FetchResult(
+                    url=str(response.url),
+                    status_code=response.status_code,
+                    content=content,
+                    encoding=response.charset_encoding,
+                    http_version=response.http_version,
+                    truncated=truncated,
+                    timings=trace.timings,
+                )
+        except httpx.TimeoutException:
+            self.stats.errors += 1
+            self.stats.timeouts += 1
+            raise
+        except httpx.HTTPError:
+            self.stats.errors += 1
+            raise
+
+        self.stats.bytes += len(result.content)
+        if "connect" in result.timings:
+            self.stats.new_connections += 1
+        self.stats.connect_seconds += result.timings.get("connect", 0.0)
+        self.stats.tls_seconds += result.timings.get("tls", 0.0)
+        self.stats.wait_seconds += result.timings.get("wait", 0.0)
+        self.stats.download_seconds += result.timings.get("download", 0.0)
+        return result
+
+    async def parse(self, func: Callable[..., Any], *args: Any) -> Any:
+        """パース処理を専用のスレッドプールで実行する"""
+        if self._parse_executor is None:
+            self._parse_executor = ThreadPoolExecutor(
+                max_workers=max(settings.scraping_parse_workers, 1),
+                thread_name_prefix="scrape-parse",
+            )
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._parse_executor, functools.partial(func, *args)
+            )
+        finally:
+            self.stats.parses += 1
+            self.stats.parse_seconds += time.perf_counter() - started
+
+    def metrics(self) -> Dict[str, float]:
+        return self.stats.as_dict()
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None and self._client_loop is asyncio.get_running_loop():
+            await client.aclose()
+        if self._parse_executor is not None:
+            self._parse_executor.shutdown(wait=False)
+            self._parse_executor = None
+
+
+# シングルトンインスタンス
+scraping_engine = ScrapingEngine()
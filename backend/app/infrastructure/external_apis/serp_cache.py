@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+SerpAPI の検索結果（レスポンス）のキャッシュ
+
+同じ日に複数のユーザーが同じキーワードで記事を作ると、そのたびに SerpAPI のクレジットを消費する。
+レスポンスをローカルの SQLite キャッシュ（PersistentCache）に保存し、
+
+- キーは「正規化したクエリ」「gl / hl / location」「device」「日付バケット（既定 1 日）」
+- 保存から ``SERP_CACHE_FRESH_SECONDS`` 以内はそのまま返す
+- それを過ぎた（同じ日付バケット内の）エントリは古い結果をすぐ返し、裏で取り直す（stale-while-revalidate）
+- 同じキーの取得が同時に走った場合は 1 回の API 呼び出しを共有する
+- エラーのレスポンスは保存しない
+- キャッシュで済んだ API 呼び出しの回数を ``saved_calls`` として数える
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+from app.infrastructure.persistent_cache import PersistentCache
+
+logger = logging.getLogger(__name__)
+
+_SPACE_RE = re.compile(r"\s+")
+# キーに含めるパラメータ（api_key などは含めない）
+_KEY_PARAMS = ("engine", "gl", "hl", "location", "google_domain", "device")
+
+
+def normalize_query(query: str) -> str:
+    """全角・半角、大文字・小文字、空白の違いを吸収する（語順は検索結果に影響するので変えない）"""
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def date_bucket(now: Optional[float] = None) -> int:
+    bucket_seconds = max(settings.serp_cache_date_bucket_days, 1) * 86400
+    return int((time.time() if now is None else now) // bucket_seconds)
+
+
+def make_key(params: Dict[str, Any], bucket: int) -> str:
+    parts = [normalize_query(str(params.get("q", "")))]
+    parts.extend(f"{name}={params.get(name, '')}" for name in _KEY_PARAMS)
+    parts.append(str(bucket))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SerpCacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    shared_fetches: int = 0
+    revalidations: int = 0
+    revalidation_errors: int = 0
+    api_calls: int = 0
+
+    @property
+    def saved_calls(self) -> int:
+        return self.hits + self.stale_hits + self.shared_fetches
+
+    def as_dict(self) -> Dict[str, int]:
+        return {**self.__dict__, "saved_calls": self.saved_calls}
+
+
+Fetcher = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class SerpResponseCache:
+    def __init__(self, store: PersistentCache):
+        self.store = store
+        self.stats = SerpCacheStats()
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._revalidating: Set[str] = set()
+        self._background: Set[asyncio.Task] = set()
+
+    async def get_or_fetch(self, params: Dict[str, Any], fetch: Fetcher) -> Dict[str, Any]:
+        """キャッシュがあれば返し、なければ ``fetch`` で取得して保存する"""
+        if not settings.serp_cache_enabled:
+            return await self._call(fetch)
+
+        key = make_key(params, date_bucket())
+        entry = await self.store.aget_entry(key)
+        if entry is not None:
+            if entry.age <= settings.serp_cache_fresh_seconds:
+                self.stats.hits += 1
+            else:
+                self.stats.stale_hits += 1
+                self._revalidate(key, fetch, params.get("q"))
+            return entry.value
+
+        self.stats.misses += 1
+        return await self._fetch_shared(key, fetch)
+
+    def metrics(self) -> Dict[str, Any]:
+        # PersistentCache はメモリ上の集計値を返すので、/metrics から呼んでも SQLite を待たない
+        usage = self.store.usage()
+        return {
+            **self.stats.as_dict(),
+            "entries": usage["entries"],
+            "bytes": usage["bytes"],
+            "revalidating": len(self._revalidating),
+        }
+
+    async def _call(self, fetch: Fetcher) -> Dict[str, Any]:
+        self.stats.api_calls += 1
+        return await fetch()
+
+    async def _fetch_shared(self, key: str, fetch: Fetcher) -> Dict[str, Any]:
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats.shared_fetches += 1
+            return await asyncio.shield(inflight)
+
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            results = await self._call(fetch)
+            if results and "error" not in results:
+                await self.store.aset(key, results)
+            future.set_result(results)
+            return results
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 待っている呼び出し元がいなければ例外は取り出されないので、警告を出さないよう消費しておく
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _revalidate(self, key: str, fetch: Fetcher, query: Optional[str]) -> None:
+        if key in self._revalidating or key in self._inflight:
+            return
+        self._revalidating.add(key)
+
+        async def run():
+            try:
+                self.stats.revalidations += 1
+                results = await self._fetch_shared(key, fetch)
+                if not results or "error" in results:
+                    # 取り直しに失敗しても古いエントリは TTL まで使い続ける
+                    self.stats.revalidation_errors += 1
+            except Exception as e:
+                self.stats.revalidation_errors += 1
+                logger.warning(f"SerpAPI cache revalidation failed for query '{query}': {e}")
+            finally:
+                self._revalidating.discard(key)
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+# シングルトンインスタンス
+serp_cache = SerpResponseCache(PersistentCache(
+    path=settings.local_cache_path,
+    namespace="serpapi_response",
+    max_bytes=settings.serp_cache_max_bytes,
+    default_ttl=settings.serp_cache_ttl,
+))
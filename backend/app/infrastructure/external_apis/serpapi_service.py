@@ -1,15 +1,18 @@
 import json
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
-import requests
-from bs4 import BeautifulSoup, NavigableString
+import httpx
 from serpapi.google_search import GoogleSearch  # type: ignore[import-untyped]
 from app.core.config import settings
+from app.infrastructure.external_apis.crawl_scheduler import crawl_scheduler
+from app.infrastructure.external_apis.html_extractor import extract_article
+from app.infrastructure.external_apis.scrape_cache import scrape_cache
+from app.infrastructure.external_apis.serp_cache import serp_cache
+from app.infrastructure.external_apis.scraping_engine import scraping_engine
 import urllib.robotparser
 from urllib.parse import urlparse
 import time # ★ 追加: 時間計測用
-import re # ★ 追加: 正規表現用（著者情報抽出など）
 
 # スクレイピング時のデフォルトユーザーエージェント
 USER_AGENT = "Mozilla/5.0 (compatible; ShintairikuBot/1.0; +https://shintairiku.com/bot)"
@@ -65,10 +68,7 @@ class SerpAPIService:
     def __init__(self):
         # 設定から正しく読み込み
         self.api_key = settings.serpapi_key
-        self.robot_parsers: Dict[str, Optional[urllib.robotparser.RobotFileParser]] = {} # robots.txtパーサーのキャッシュ
-        self.scraping_cache: Dict[str, Dict[str, Any]] = {} # スクレイピング結果のキャッシュ
-        self.cache_timestamp: Dict[str, float] = {} # キャッシュタイムスタンプ
-        self.cache_ttl = 3600  # 1時間のTTL
+        self.scraping_cache = scrape_cache # スクレイピング結果のキャッシュ（メモリ + ローカルディスク、プロセス共通）
         
     def _ensure_api_key(self):
         """APIキーが設定されているかチェックし、なければ例外を発生させる"""
@@ -140,7 +140,8 @@ class SerpAPIService:
         """
         print(f"Attempting to call actual SerpAPI for query: {query}")
         try:
-            results = await self._call_serpapi_real(query)
+            # 同じ日・同じクエリ/地域/デバイスの結果はキャッシュから返す（analyze_keywords 経由の呼び出しすべてで共有）
+            results = await serp_cache.get_or_fetch(self._search_params(query), lambda: self._call_serpapi_real(query))
             if "error" in results:
                 print(f"SerpAPI call resulted in an error for query '{query}'. Error: {results['error']}")
                 return results 
@@ -151,55 +152,8 @@ class SerpAPIService:
             return {"error": f"Unexpected exception in _get_search_results: {str(e)}", "query": query}
         
     async def _get_robot_parser(self, base_url: str) -> Optional[urllib.robotparser.RobotFileParser]:
-        """指定されたベースURLのrobots.txtを取得してパーサーを返す。キャッシュも利用。"""
-        if base_url in self.robot_parsers:
-            # キャッシュされたパーサーがNone（取得失敗や存在しない）の場合もそのまま返す
-            return self.robot_parsers[base_url]
-
-        robots_url = f"{base_url.rstrip('/')}/robots.txt"
-        parser = urllib.robotparser.RobotFileParser()
-        # parser.set_url(robots_url) # set_urlはread()の中で呼ばれるので通常不要
-
-        try:
-            print(f"Fetching robots.txt from: {robots_url}")
-            # requests.getはブロッキングするので、非同期実行
-            # response = await asyncio.to_thread(
-            #     lambda: requests.get(robots_url, headers={"User-Agent": self.USER_AGENT}, timeout=5)
-            # )
-            # urllib.robotparser.RobotFileParser.read() は内部で urllib.request を使うが、
-            # それもブロッキングするので to_thread で包む
-            
-            # parser.read() を直接非同期化する代わりに、まずrobots.txtの内容を取得
-            response_content = None
-            try:
-                response = await asyncio.to_thread(
-                    lambda: requests.get(robots_url, headers={"User-Agent": self.USER_AGENT}, timeout=5)
-                )
-                if response.status_code == 200:
-                    response_content = response.text
-                else:
-                    print(f"Failed to fetch robots.txt from {robots_url}, status: {response.status_code}. Assuming allowed.")
-                    self.robot_parsers[base_url] = None 
-                    return None
-            except Exception as fetch_exc:
-                 print(f"Exception fetching robots.txt from {robots_url}: {fetch_exc}. Assuming allowed.")
-                 self.robot_parsers[base_url] = None
-                 return None
-
-            if response_content:
-                # parser.parse()は文字列のリストを期待する
-                parser.parse(response_content.splitlines())
-                self.robot_parsers[base_url] = parser
-                return parser
-            else: # response_content がNoneのままの場合（上記でNoneが返された場合）
-                # このケースは上のstatus_code != 200 や exception fetch でカバーされるはず
-                self.robot_parsers[base_url] = None
-                return None
-                
-        except Exception as e: # parse時の予期せぬエラー
-            print(f"Error parsing robots.txt content from {robots_url}: {e}. Assuming allowed.")
-            self.robot_parsers[base_url] = None 
-            return None
+        """指定されたベースURLのrobots.txtパーサーを返す（ホストごとに TTL 付きでキャッシュ、プロセス共通）"""
+        return await crawl_scheduler.robot_parser(base_url, self.USER_AGENT)
 
     async def _can_fetch(self, url: str, user_agent: str) -> bool:
         """指定されたURLをスクレイピングしてよいかrobots.txtに基づいて判断する"""
@@ -208,14 +162,8 @@ class SerpAPIService:
             if not parsed_url.scheme or not parsed_url.netloc:
                 print(f"Invalid URL for robots.txt check: {url}. Assuming not allowed.")
                 return False
-            base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-            
-            parser = await self._get_robot_parser(base_url)
-            if parser:
-                return parser.can_fetch(user_agent, url)
-            
-            print(f"No valid robots.txt parser for {base_url}, assuming allowed for {url} (default policy).")
-            return True # robots.txtがない、または取得/パース失敗時のデフォルトポリシー
+            # robots.txtがない、または取得/パース失敗時は許可（デフォルトポリシー）
+            return await crawl_scheduler.can_fetch(url, user_agent)
         except Exception as e:
             print(f"Error in _can_fetch for URL {url}: {e}. Assuming not allowed for safety.")
             return False
@@ -333,14 +281,9 @@ class SerpAPIService:
         
         return scraped_articles[:num_articles]
     
-    # 実際のSerpAPI呼び出し用の関数（後で実装）
-    async def _call_serpapi_real(self, query: str) -> Dict[str, Any]:
-        """
-        実際のSerpAPI呼び出し（後で実装予定）
-        """
-        self._ensure_api_key()
-        params = {
-            "api_key": self.api_key,
+    def _search_params(self, query: str) -> Dict[str, Any]:
+        """SerpAPI の検索パラメータ（api_key 以外。キャッシュのキーにも使う）"""
+        return {
             "engine": "google",
             "q": query,
             "location": "Japan",
@@ -349,6 +292,14 @@ class SerpAPIService:
             "hl": "ja",
             "device": "desktop"
         }
+
+    # 実際のSerpAPI呼び出し用の関数（後で実装）
+    async def _call_serpapi_real(self, query: str) -> Dict[str, Any]:
+        """
+        実際のSerpAPI呼び出し（後で実装予定）
+        """
+        self._ensure_api_key()
+        params = {"api_key": self.api_key, **self._search_params(query)}
         
         print(f"Calling SerpAPI with query: {query}, API Key: {'*' * (len(str(settings.serpapi_key)) - 4) + str(settings.serpapi_key)[-4:] if settings.serpapi_key else 'NOT_SET'}") # APIキーの一部のみ表示
 
@@ -406,290 +357,40 @@ class SerpAPIService:
         return classified_headings
     
 
-    def _add_char_counts_to_headings_recursive(
-        self,
-        heading_node_list: List[Dict[str, Any]], 
-        all_heading_tags_in_document: List[Any] # Flat list of all H tags in the order they appear
-    ):
-        """
-        見出しノードのリストにセクション文字数を再帰的に追加する。
-        'char_count_section' は、その見出しから次の同位または上位の見出しまでの
-        間のテキスト（下位見出しのテキストも含むgrossカウント）の文字数。
-        """
-        tag_to_document_index_map = {tag: i for i, tag in enumerate(all_heading_tags_in_document)}
-
-        for node in heading_node_list:
-            if 'tag' not in node or not hasattr(node['tag'], 'name'):
-                node['char_count_section'] = 0
-                if node.get('children'):
-                    self._add_char_counts_to_headings_recursive(node['children'], all_heading_tags_in_document)
-                continue
-
-            current_tag = node['tag']
-            current_tag_doc_index = tag_to_document_index_map.get(current_tag)
-
-            section_limit_tag = None
-            if current_tag_doc_index is not None:
-                for i in range(current_tag_doc_index + 1, len(all_heading_tags_in_document)):
-                    potential_next_tag = all_heading_tags_in_document[i]
-                    if int(potential_next_tag.name[1:]) <= node['level']:
-                        section_limit_tag = potential_next_tag
-                        break
-            
-            text_content_parts = []
-            for sibling_element in current_tag.next_siblings:
-                if section_limit_tag and sibling_element == section_limit_tag:
-                    break 
-                
-                if hasattr(sibling_element, 'name') and sibling_element.name in ['script', 'style', 'nav', 'header', 'footer', 'aside', 'form']:
-                    continue
-                
-                if isinstance(sibling_element, NavigableString):
-                    stripped_text = str(sibling_element).strip()
-                    if stripped_text:
-                        text_content_parts.append(stripped_text)
-                elif hasattr(sibling_element, 'get_text'):
-                    stripped_text = sibling_element.get_text(separator=' ', strip=True)
-                    if stripped_text:
-                        text_content_parts.append(stripped_text)
-            
-            full_section_text = " ".join(text_content_parts)
-            # 文字数はスペースを除いたものをカウント（任意、一貫性のため）
-            node['char_count_section'] = len(full_section_text.replace(" ", ""))
-
-            if node.get('children'):
-                self._add_char_counts_to_headings_recursive(node['children'], all_heading_tags_in_document)
-
-
-    def _is_cache_valid(self, url: str) -> bool:
-        """キャッシュが有効かチェック"""
-        if url not in self.cache_timestamp:
-            return False
-        return (time.time() - self.cache_timestamp[url]) < self.cache_ttl
-
     async def _scrape_url_real(self, url: str) -> Optional[Dict[str, Any]]:
         """ 実際のURLスクレイピング（キャッシュ対応） """
         # キャッシュチェック
-        if url in self.scraping_cache and self._is_cache_valid(url):
+        cached = await self.scraping_cache.get(url)
+        if cached is not None:
             print(f"Cache hit: {url}")
-            return self.scraping_cache[url]
-        
-        current_url = url
-        try:
-            headers = {'User-Agent': self.USER_AGENT}
-            # タイムアウトを5秒に短縮
-            response = await asyncio.to_thread(
-                lambda: requests.get(current_url, headers=headers, timeout=5, allow_redirects=True)
-            )
-            
-            if response.history:
-                current_url = response.url
-            if response.status_code != 200:
-                return None
-            
-            response.encoding = response.apparent_encoding
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title_tag = soup.find('title')
-            title = title_tag.get_text(strip=True) if title_tag else "タイトル取得できず"
-            
-            main_content_selectors = [
-                'article', 'main',
-                'div[class*="content"]', 'div[class*="post"]', 'div[class*="entry"]', 'div[class*="article"]',
-                'section[class*="content"]', 'section[class*="post"]', 'section[class*="entry"]',
-                'div[id*="content"]', 'div[id*="main"]',
-            ]
-            content_element = None
-            for selector in main_content_selectors:
-                content_element = soup.select_one(selector)
-                if content_element:
-                    break
-            
-            if not content_element:
-                content_element = soup.body
-            if not content_element:
-                return {"title": title, "headings": [], "content": "", "char_count": 0, "image_count": 0}
+            return cached
 
-            # 不要要素の除去 (文字数カウント前に実行)
-            for unwanted_selector in ['nav', 'footer', 'header', 'aside', 'form', 'script', 'style', '.noprint', '[aria-hidden="true"]', 'figure > figcaption']:
-                for tag in content_element.select(unwanted_selector):
-                    tag.decompose()
-            for ad_selector in ['div[class*="ad"]', 'div[id*="ad"]', 'div[class*="OUTBRAIN"]', 'div[class*="recommend"]', 'aside[class*="related"]']:
-                for tag in content_element.select(ad_selector):
-                    tag.decompose()
+        # 並行する記事生成で同じ URL を同時にスクレイピングする場合は 1 回の取得・パースを共有する
+        return await crawl_scheduler.run_once(url, lambda: self._fetch_and_parse(url))
 
-            # 見出しタグの抽出 (除去処理後に行う)
-            all_heading_tags_in_content_element = content_element.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            
-            structured_headings: List[Dict[str, Any]] = []
-            parent_stack: List[Tuple[int, List[Dict[str, Any]]]] = [(0, structured_headings)]
-
-            for tag_object in all_heading_tags_in_content_element: # tag_object を直接使用
-                if not hasattr(tag_object, 'name') or not tag_object.name:
-                    continue
-                level = int(tag_object.name[1:])
-                text = tag_object.get_text(strip=True)
-                if not text or len(text) >= 200:
-                    continue
-
-                current_heading_node = {"level": level, "text": text, "children": [], "tag": tag_object} # ★ tag オブジェクトを保存
-
-                while parent_stack[-1][0] >= level:
-                    parent_stack.pop()
-                parent_stack[-1][1].append(current_heading_node)
-                children_list: List[Dict[str, Any]] = current_heading_node["children"]
-                parent_stack.append((level, children_list))
-            
-            # 意味的分類（ルールベースのみ）
-            classified_final_headings = await self._classify_headings_semantically(structured_headings, original_url=current_url)
-            
-            # ★ セクション文字数カウントの追加
-            if classified_final_headings and all_heading_tags_in_content_element:
-                self._add_char_counts_to_headings_recursive(classified_final_headings, all_heading_tags_in_content_element)
+    async def _fetch_and_parse(self, url: str) -> Optional[Dict[str, Any]]:
+        """ ホストごとの同時実行数と Crawl-delay を守って取得・パースし、キャッシュに保存する """
+        try:
+            async with crawl_scheduler.host_slot(url, self.USER_AGENT):
+                fetched = await scraping_engine.fetch(url, headers={'User-Agent': self.USER_AGENT})
+            if fetched.status_code != 200:
+                return None
 
-            # 記事全体のテキスト抽出と文字数カウント (これは変更なし)
-            text_blocks = []
-            for element in content_element.find_all(['p', 'div', 'li', 'span', 'td', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'], recursive=True):
-                if not hasattr(element, 'find_all'):
-                    continue
-                # スクリプト/スタイルは既に除去されているはずだが念のため
-                for unwanted_tag in element.find_all(['script', 'style'], recursive=False):
-                    unwanted_tag.decompose()
-                block_text = element.get_text(separator=' ', strip=True)
-                if block_text and len(block_text) > 20:
-                    parent_text = element.parent.get_text(separator=' ', strip=True) if element.parent else ""
-                    if parent_text != block_text or (hasattr(element, 'name') and element.name in ['p', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                        text_blocks.append(block_text)
-            
-            final_content_parts = []
-            seen_content_parts = set()
-            for block in text_blocks:
-                first_part = block[:100]
-                if first_part not in seen_content_parts:
-                    final_content_parts.append(block)
-                    seen_content_parts.add(first_part)
-                    if sum(len(p) for p in final_content_parts) > 15000:
-                        break
+            # HTML のパースは専用のスレッドプールで行う
+            result = await scraping_engine.parse(self._parse_article_html, fetched.content, fetched.encoding, fetched.url)
+            if result.get("headings"):
+                # 意味的分類（ルールベースのみ）
+                result["headings"] = await self._classify_headings_semantically(result["headings"], original_url=fetched.url)
             
-            content_text = "\n\n".join(final_content_parts)
-            char_count = len("".join(final_content_parts).replace(" ","")) # スペース除外で統一
-            
-            img_tags = content_element.find_all('img')
-            image_count = len([img for img in img_tags if hasattr(img, 'get') and img.get('src') and isinstance(img.get('src'), str) and not img.get('src', '').startswith('data:')])
-            
-            # ★ 新しいコンテンツフォーマット分析
-            # 動画数の計算（video + YouTubeなどのiframe）
-            video_tags = content_element.find_all('video')
-            iframe_tags = content_element.find_all('iframe')
-            video_iframes = [iframe for iframe in iframe_tags 
-                           if hasattr(iframe, 'get') and iframe.get('src') and isinstance(iframe.get('src'), str) and any(domain in iframe.get('src', '') 
-                               for domain in ['youtube.com', 'youtu.be', 'vimeo.com', 'dailymotion.com'])]
-            video_count = len(video_tags) + len(video_iframes)
-            
-            # テーブル数
-            table_count = len(content_element.find_all('table'))
-            
-            # リスト項目総数
-            list_items = content_element.find_all('li')
-            list_item_count = len(list_items)
-            
-            # リンク分析（外部・内部）
-            all_links = content_element.find_all('a', href=True)
-            external_links = []
-            internal_links = []
-            current_domain = urlparse(current_url).netloc if current_url else ""
-            
-            for link in all_links:
-                if not hasattr(link, 'get'):
-                    continue
-                href = link.get('href', '')
-                if not isinstance(href, str):
-                    continue
-                if href.startswith('http'):
-                    link_domain = urlparse(href).netloc
-                    if link_domain != current_domain:
-                        external_links.append(href)
-                    else:
-                        internal_links.append(href)
-                elif href.startswith('/') or not href.startswith('#'):
-                    internal_links.append(href)  # 相対パスは内部リンクとみなす
-            
-            external_link_count = len(external_links)
-            internal_link_count = len(internal_links)
-            
-            # ★ メタデータ抽出（基本版）
-            author_info = None
-            publish_date = None
-            modified_date = None
-            
-            # 著者情報の抽出
-            author_meta = soup.find('meta', attrs={'name': 'author'})
-            if author_meta and hasattr(author_meta, 'get'):
-                author_content = author_meta.get('content')
-                if isinstance(author_content, str):
-                    author_info = author_content
-            else:
-                # クラス名で著者情報を探す
-                author_elements = soup.find_all(['div', 'span', 'p'], class_=re.compile(r'author', re.I))
-                if author_elements:
-                    author_info = author_elements[0].get_text(strip=True)
-            
-            # 公開日・更新日の抽出
-            pub_meta = soup.find('meta', attrs={'property': 'article:published_time'})
-            if pub_meta and hasattr(pub_meta, 'get'):
-                pub_content = pub_meta.get('content')
-                if isinstance(pub_content, str):
-                    publish_date = pub_content
-            
-            mod_meta = soup.find('meta', attrs={'property': 'article:modified_time'})
-            if mod_meta and hasattr(mod_meta, 'get'):
-                mod_content = mod_meta.get('content')
-                if isinstance(mod_content, str):
-                    modified_date = mod_content
-            
-            # ★ 構造化データ（Schema.org）の抽出
-            schema_types = []
-            ld_json_scripts = soup.find_all('script', type='application/ld+json')
-            for script in ld_json_scripts:
-                try:
-                    if hasattr(script, 'string') and script.string and isinstance(script.string, str):
-                        ld_data = json.loads(script.string)
-                        if isinstance(ld_data, dict) and '@type' in ld_data:
-                            schema_types.append(ld_data['@type'])
-                        elif isinstance(ld_data, list):
-                            for item in ld_data:
-                                if isinstance(item, dict) and '@type' in item:
-                                    schema_types.append(item['@type'])
-                except (json.JSONDecodeError, AttributeError, TypeError):
-                    continue
-            
-            result = {
-                "title": title,
-                "headings": classified_final_headings,
-                "content": content_text.strip(),
-                "char_count": char_count,
-                "image_count": image_count,
-                # ★ 新しいフィールド
-                "video_count": video_count,
-                "table_count": table_count,
-                "list_item_count": list_item_count,
-                "external_link_count": external_link_count,
-                "internal_link_count": internal_link_count,
-                "author_info": author_info,
-                "publish_date": publish_date,
-                "modified_date": modified_date,
-                "schema_types": schema_types
-            }
-            
-            # キャッシュに保存
-            self.scraping_cache[url] = result
-            self.cache_timestamp[url] = time.time()
+            # キャッシュに保存（パース結果のみ。生の HTML は保存しない）
+            await self.scraping_cache.put(url, result)
             
             return result
             
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             print(f"タイムアウト: {url}")
             return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"リクエストエラー {url}: {e}")
             return None
         except Exception as e:
@@ -698,6 +399,11 @@ class SerpAPIService:
             traceback.print_exc()
             return None
 
+    def _parse_article_html(self, content: bytes, encoding: Optional[str], current_url: str) -> Dict[str, Any]:
+        """ 取得した HTML から見出し・本文・各種カウントを抽出する（スレッドプールで実行される同期処理） """
+        # lxml があれば lxml、なければ html.parser で 1 回パースし、1 回の走査で全項目を求める
+        return extract_article(content, encoding, current_url)
+
 # サービスのインスタンス（遅延ロード）
 _serpapi_service_instance = None
 
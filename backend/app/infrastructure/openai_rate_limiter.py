@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAI API のプロセス全体レート制限（モデル別のトークンバケット）
+
+- モデルごとに requests/分 と tokens/分 の2つのバケットを持ち、リクエスト送信前に両方から取り出す
+- レスポンスの ``x-ratelimit-*`` ヘッダー（組織全体の上限・残量）でバケットを補正する。
+  他ワーカーの消費分も残量に反映されるため、ワーカー間でも上限を超えにくい
+- 429 の ``retry-after`` を受けたモデルは、その時間だけ全リクエストを待たせる
+- OPENAI_RATE_LIMIT_SHARED=true の場合、非同期の呼び出しは Supabase 上の共有バケット
+  （reserve_openai_rate_budget RPC）で全ワーカー共通に予約する
+- 同期クライアントがイベントループ上で呼ばれた場合は time.sleep でループ全体を止めないよう、
+  待たずに送信して警告を出す（非同期クライアントか asyncio.to_thread を使うこと）
+
+Agents SDK・AsyncOpenAI・OpenAI（同期）はいずれも httpx で送信するため、
+``install_openai_rate_limiter()`` で httpx の send をラップして api.openai.com 宛てのリクエストを一括で制御する。
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional, Set, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 入力トークン数の概算（UTF-8 の日本語は1文字3バイト・おおよそ1トークン）
+BYTES_PER_TOKEN = 3
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+_installed = False
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """``x-ratelimit-reset-*`` の値（例: "1s", "6m0s", "20ms"）を秒に変換する"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def parse_limit_overrides(value: str) -> Dict[str, Tuple[int, int]]:
+    """``"gpt-5-mini=500:500000,gpt-4o-mini=5000:2000000"`` 形式のモデル別上限（RPM:TPM）を読む"""
+    overrides: Dict[str, Tuple[int, int]] = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        model, limits = item.split("=", 1)
+        try:
+            rpm, tpm = limits.split(":", 1)
+            overrides[model.strip()] = (int(rpm), int(tpm))
+        except ValueError:
+            logger.warning(f"Invalid OPENAI_RATE_LIMITS entry: {item}")
+    return overrides
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _retry_after(headers: Mapping[str, str]) -> float:
+    """429 のレスポンスから再送までの秒数を求める"""
+    if headers.get("retry-after-ms"):
+        seconds = parse_reset_duration(f"{headers['retry-after-ms']}ms")
+    else:
+        seconds = parse_reset_duration(headers.get("retry-after"))
+    if not seconds:
+        seconds = max(
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests")) or 0.0,
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens")) or 0.0,
+        )
+    return seconds or 1.0
+
+
+@dataclass
+class TokenBucket:
+    """1分あたり capacity 個補充されるトークンバケット"""
+    capacity: float
+    level: float
+    updated_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self, now: float) -> None:
+        elapsed = max(now - self.updated_at, 0.0)
+        self.level = min(self.capacity, self.level + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_for(self, amount: float) -> float:
+        """amount を取り出せるまでの秒数（refill 済みの前提）"""
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+
+    def sync(self, limit: Optional[int], remaining: Optional[int], now: float) -> None:
+        """API が返した上限・残量に合わせる（残量は減らす方向にだけ反映する）"""
+        self.refill(now)
+        if limit and limit > 0:
+            self.capacity = float(limit)
+            self.level = min(self.level, self.capacity)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+@dataclass
+class ModelBudget:
+    requests: TokenBucket
+    tokens: TokenBucket
+    blocked_until: float = 0.0
+
+
+@dataclass
+class OpenAIRateLimiterStats:
+    requests: int = 0
+    throttled_requests: int = 0
+    wait_seconds: float = 0.0
+    rate_limited_responses: int = 0
+    sync_calls_on_loop: int = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.__dict__)
+
+
+class OpenAIRateLimiter:
+    """モデル別の RPM / TPM バケット"""
+
+    def __init__(
+        self,
+        default_rpm: int,
+        default_tpm: int,
+        overrides: Optional[Dict[str, Tuple[int, int]]] = None,
+        shared: bool = False,
+    ):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.overrides = overrides or {}
+        self.shared = shared
+        self.stats = OpenAIRateLimiterStats()
+        self._budgets: Dict[str, ModelBudget] = {}
+        # 同期クライアントはスレッドから呼ばれるため、バケットの更新はロックで保護する
+        self._lock = threading.Lock()
+        self._last_shared_sync: Dict[str, float] = {}
+        self._reported_loop_models: Set[str] = set()
+
+    def _limits(self, model: str) -> Tuple[int, int]:
+        if model in self.overrides:
+            return self.overrides[model]
+        # スナップショット名（gpt-4o-mini-2024-07-18 など）は前方一致で基本モデルの設定を使う
+        for name, limits in self.overrides.items():
+            if model.startswith(name):
+                return limits
+        return self.default_rpm, self.default_tpm
+
+    def budget(self, model: str) -> ModelBudget:
+        budget = self._budgets.get(model)
+        if budget is None:
+            rpm, tpm = self._limits(model)
+            budget = ModelBudget(requests=TokenBucket(rpm, rpm), tokens=TokenBucket(tpm, tpm))
+            self._budgets[model] = budget
+        return budget
+
+    def reserve(self, model: str, tokens: int, now: Optional[float] = None) -> float:
+        """1リクエスト + tokens を予約する。取り出せた場合は 0、足りない場合は待つべき秒数を返す"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            budget = self.budget(model)
+            if budget.blocked_until > now:
+                return budget.blocked_until - now
+            budget.requests.refill(now)
+            budget.tokens.refill(now)
+            wait = max(budget.requests.wait_for(1), budget.tokens.wait_for(tokens))
+            if wait > 0:
+                return wait
+            budget.requests.level -= 1
+            budget.tokens.level -= min(tokens, budget.tokens.capacity)
+            return 0.0
+
+    async def acquire(self, model: str, tokens: int) -> float:
+        """予約できるまで待つ。待った秒数を返す"""
+        waited = 0.0
+        while True:
+            wait = await self._reserve_shared(model, tokens) if self.shared else None
+            if wait is None:
+                wait = self.reserve(model, tokens)
+            if wait <= 0:
+                self._count(waited)
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def acquire_sync(self, model: str, tokens: int) -> float:
+        on_loop = _on_event_loop()
+        waited = 0.0
+        while True:
+            wait = self.reserve(model, tokens)
+            if wait <= 0:
+                self._count(waited)
+                return waited
+            if on_loop:
+                # イベントループ上で time.sleep すると他のリクエストまで止まるので、待たずに送る
+                self._report_sync_on_loop(model)
+                self._count(waited)
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def observe(self, model: str, status_code: int, headers: Mapping[str, str], now: Optional[float] = None) -> None:
+        """レスポンスヘッダーの上限・残量と 429 の待ち時間をバケットに反映する"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            budget = self.budget(model)
+            budget.requests.sync(
+                _int_header(headers, "x-ratelimit-limit-requests"),
+                _int_header(headers, "x-ratelimit-remaining-requests"),
+                now,
+            )
+            budget.tokens.sync(
+                _int_header(headers, "x-ratelimit-limit-tokens"),
+                _int_header(headers, "x-ratelimit-remaining-tokens"),
+                now,
+            )
+            if status_code == 429:
+                self.stats.rate_limited_responses += 1
+                retry_after = _retry_after(headers)
+                budget.blocked_until = max(budget.blocked_until, now + retry_after)
+                logger.warning(f"OpenAI rate limited for model {model}; pausing requests for {retry_after:.1f}s")
+
+    def _report_sync_on_loop(self, model: str) -> None:
+        with self._lock:
+            self.stats.sync_calls_on_loop += 1
+            if model in self._reported_loop_models:
+                return
+            self._reported_loop_models.add(model)
+        logger.warning(
+            f"Sync OpenAI client called on the event loop for model {model}; sending without rate limit wait. "
+            "Use AsyncOpenAI or asyncio.to_thread()."
+        )
+
+    def _count(self, waited: float) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            if waited > 0:
+                self.stats.throttled_requests += 1
+                self.stats.wait_seconds += waited
+
+    # --- 全ワーカー共有バケット ---
+
+    async def _reserve_shared(self, model: str, tokens: int) -> Optional[float]:
+        """共有バケットで予約する。失敗時は None を返してローカルのバケットを使う"""
+        try:
+            from app.common.database import get_async_supabase_client
+
+            with self._lock:
+                budget = self.budget(model)
+                blocked = budget.blocked_until - time.monotonic()
+            if blocked > 0:
+                return blocked
+            supabase = await get_async_supabase_client()
+            result = await supabase.rpc("reserve_openai_rate_budget", {
+                "p_model": model,
+                "p_rpm": int(budget.requests.capacity),
+                "p_tpm": int(budget.tokens.capacity),
+                "p_tokens": tokens,
+            }).execute()
+            return float(result.data or 0.0)
+        except Exception as e:
+            logger.warning(f"Shared OpenAI rate budget unavailable, using local limiter: {e}")
+            return None
+
+    async def sync_shared(self, model: str, headers: Mapping[str, str]) -> None:
+        """残量ヘッダーを共有バケットに反映する（モデルごとに1秒に1回まで）"""
+        now = time.monotonic()
+        if now - self._last_shared_sync.get(model, 0.0) < 1.0:
+            return
+        self._last_shared_sync[model] = now
+        remaining_requests = _int_header(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _int_header(headers, "x-ratelimit-remaining-tokens")
+        if remaining_requests is None and remaining_tokens is None:
+            return
+        try:
+            from app.common.database import get_async_supabase_client
+
+            supabase = await get_async_supabase_client()
+            await supabase.rpc("sync_openai_rate_budget", {
+                "p_model": model,
+                "p_remaining_requests": remaining_requests,
+                "p_remaining_tokens": remaining_tokens,
+            }).execute()
+        except Exception as e:
+            logger.debug(f"Failed to sync shared OpenAI rate budget: {e}")
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False  # ワーカースレッド等、イベントループ外からの呼び出し
+    return True
+
+
+def describe_request(request: httpx.Request) -> Optional[Tuple[str, int]]:
+    """OpenAI へのリクエストからモデル名と概算トークン数を取り出す（モデル指定のないリクエストは対象外）"""
+    if request.method != "POST":
+        return None
+    try:
+        content = request.content
+    except httpx.RequestNotRead:
+        return None
+    if not content or not content.lstrip().startswith(b"{"):
+        return None
+    try:
+        body: Dict[str, Any] = json.loads(content)
+    except ValueError:
+        return None
+    model = body.get("model")
+    if not isinstance(model, str):
+        return None
+    output_tokens = body.get("max_output_tokens") or body.get("max_completion_tokens") or body.get("max_tokens") or 0
+    if not isinstance(output_tokens, int):
+        output_tokens = 0
+    return model, len(content) // BYTES_PER_TOKEN + output_tokens
+
+
+def _is_openai(request: httpx.Request) -> bool:
+    return (request.url.host or "").lower().endswith("openai.com")
+
+
+def install_openai_rate_limiter() -> None:
+    """httpx の send をラップし、OpenAI 宛てのリクエストをレート制限に通す（複数回呼ばれても一度だけ）"""
+    global _installed
+    if _installed or not settings.openai_rate_limit_enabled:
+        return
+    _installed = True
+
+    original_sync_send = httpx.Client.send
+    original_async_send = httpx.AsyncClient.send
+
+    def send(self, request, *args, **kwargs):
+        described = describe_request(request) if _is_openai(request) else None
+        if described is None:
+            return original_sync_send(self, request, *args, **kwargs)
+        model, tokens = described
+        openai_rate_limiter.acquire_sync(model, tokens)
+        response = original_sync_send(self, request, *args, **kwargs)
+        openai_rate_limiter.observe(model, response.status_code, response.headers)
+        return response
+
+    async def async_send(self, request, *args, **kwargs):
+        described = describe_request(request) if _is_openai(request) else None
+        if described is None:
+            return await original_async_send(self, request, *args, **kwargs)
+        model, tokens = described
+        await openai_rate_limiter.acquire(model, tokens)
+        response = await original_async_send(self, request, *args, **kwargs)
+        openai_rate_limiter.observe(model, response.status_code, response.headers)
+        if openai_rate_limiter.shared:
+            await openai_rate_limiter.sync_shared(model, response.headers)
+        return response
+
+    httpx.Client.send = send
+    httpx.AsyncClient.send = async_send
+
+
+# シングルトンインスタンス
+openai_rate_limiter = OpenAIRateLimiter(
+    default_rpm=settings.openai_rate_limit_rpm,
+    default_tpm=settings.openai_rate_limit_tpm,
+    overrides=parse_limit_overrides(settings.openai_rate_limits),
+    shared=settings.openai_rate_limit_shared,
+)
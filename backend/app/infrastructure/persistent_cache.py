@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+ローカルディスク（SQLite）上の TTL・サイズ上限付きキャッシュ
+
+- 値は JSON で保存する。キーは名前空間（キャッシュの用途）ごとに独立
+- 期限切れのエントリは読み出し時と書き込み時の追い出しで削除する
+- 名前空間ごとの合計バイト数が上限を超えたら、最後に参照された時刻が古いものから削除する（LRU）
+- 同じホスト上のワーカープロセス間では同じファイルを共有する（WAL モード）。
+  Cloud Run のインスタンス間では共有されない
+- SQLite の操作に失敗した場合はキャッシュなしとして扱い、呼び出し元の処理は止めない
+- エントリ数と合計バイト数は書き込み・削除のたびにメモリ上で更新し、/metrics では SQLite に問い合わせない
+  （他プロセスによる変更は次の書き込み時の追い出しで集計し直す）
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_entries_accessed_idx ON cache_entries (namespace, accessed_at);
+CREATE INDEX IF NOT EXISTS cache_entries_expires_idx ON cache_entries (namespace, expires_at);
+"""
+
+
+@dataclass
+class PersistentCacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    created_at: float
+    expires_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class PersistentCache:
+    """1つの名前空間を扱う SQLite キャッシュ（同じファイルを複数の名前空間で共有できる）"""
+
+    def __init__(self, path: str, namespace: str, max_bytes: int, default_ttl: float):
+        self.path = path
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stats = PersistentCacheStats()
+        # SQLite の操作中に保持する
+        self._lock = threading.Lock()
+        # stats と使用量の更新用。/metrics がイベントループ上で SQLite の操作を待たないよう _lock とは分ける
+        self._stats_lock = threading.Lock()
+        self._entries = 0
+        self._bytes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # --- 同期 API（スレッドから呼ぶ） ---
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """期限内のエントリを返す（期限切れは削除してミス扱い）"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, size, created_at, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is None:
+                    self._count(misses=1)
+                    return None
+                value, size, created_at, expires_at = row
+                if expires_at <= now:
+                    conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    conn.commit()
+                    self._count(entries=-1, size=-size, expirations=1, misses=1)
+                    return None
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key),
+                )
+                conn.commit()
+            entry = CacheEntry(value=json.loads(value), created_at=created_at, expires_at=expires_at)
+        except Exception as e:
+            self._record_error("get", e)
+            self._count(misses=1)
+            return None
+        self._count(hits=1)
+        return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """値を保存し、上限を超えた分を追い出す。1件で上限を超える値は保存しない"""
+        try:
+            payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        except (TypeError, ValueError) as e:
+            self._record_error("encode", e)
+            return False
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return False
+
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries "
+                    "(namespace, key, value, size, created_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, payload, size, now, expires_at, now),
+                )
+                self._evict(conn, now)
+                conn.commit()
+        except Exception as e:
+            self._record_error("set", e)
+            return False
+        self._count(writes=1)
+        return True
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT size FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+                ).fetchone()
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                conn.commit()
+                if row is not None:
+                    self._count(entries=-1, size=-row[0])
+        except Exception as e:
+            self._record_error("delete", e)
+
+    def clear(self) -> None:
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+                conn.commit()
+                self._set_usage(0, 0)
+        except Exception as e:
+            self._record_error("clear", e)
+
+    def usage(self) -> Dict[str, int]:
+        """名前空間のエントリ数と合計バイト数（メモリ上の集計値を返し、SQLite には問い合わせない）"""
+        with self._stats_lock:
+            return {"entries": self._entries, "bytes": self._bytes}
+
+    def metrics(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = self.stats.as_dict()
+            usage = {"entries": self._entries, "bytes": self._bytes}
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            **usage,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+        }
+
+    # --- 非同期 API（イベントループを止めないようスレッドで実行する） ---
+
+    async def aget_entry(self, key: str) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self.get_entry, key)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return await asyncio.to_thread(self.set, key, value, ttl)
+
+    # --- 内部処理 ---
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._set_usage(*self._query_usage(conn))
+            self._conn = conn
+        return self._conn
+
+    def _query_usage(self, conn: sqlite3.Connection) -> Tuple[int, int]:
+        return conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+
+    def _count(self, entries: int = 0, size: int = 0, **counters: int) -> None:
+        """使用量の増減と stats のカウンタを加算する"""
+        with self._stats_lock:
+            self._entries += entries
+            self._bytes += size
+            for name, delta in counters.items():
+                setattr(self.stats, name, getattr(self.stats, name) + delta)
+
+    def _set_usage(self, entries: int, total: int) -> None:
+        with self._stats_lock:
+            self._entries = entries
+            self._bytes = total
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, now)
+        ).rowcount
+
+        # 他プロセスの書き込みも含めて使用量を集計し直す
+        entries, total = self._query_usage(conn)
+        victims = []
+        if total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at ASC",
+                (self.namespace,),
+            ).fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append((self.namespace, key))
+                total -= size
+            conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+        self._set_usage(entries - len(victims), total)
+        self._count(expirations=max(expired, 0), evictions=len(victims))
+
+    def _record_error(self, operation: str, error: Exception) -> None:
+        self._count(errors=1)
+        if self._conn is not None:
+            try:
+                with self._lock:
+                    self._conn.rollback()
+            except Exception:
+                pass
+        logger.warning(f"Persistent cache '{self.namespace}' {operation} failed ({self.path}): {error}")
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+リクエスト単位の上流呼び出し計測
+
+- httpx.Client / httpx.AsyncClient の send をラップし、Supabase (PostgREST/Storage)・OpenAI・Clerk
+  などへの呼び出し回数とレイテンシを、リクエストごとの ContextVar に記録する
+  （supabase-py / openai / Agents SDK / ClerkClient はいずれも内部で httpx を使うため一箇所で捕捉できる）
+- RequestMetricsMiddleware がリクエスト終了時に ``Server-Timing`` ヘッダーを付け、ルート単位で集計する
+- 集計は ``render_prometheus()`` で Prometheus テキスト形式として /metrics から返す
+
+ストリーミングレスポンスの上流呼び出しは、レスポンスヘッダーを返すまで（TTFB）の時間を計測する。
+集計はワーカープロセスごと。
+"""
+import contextvars
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SUPABASE = "supabase"
+OPENAI = "openai"
+CLERK = "clerk"
+OTHER_HTTP = "http"
+
+
+@dataclass
+class _UpstreamTotals:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class RequestTrace:
+    """1リクエスト中の上流呼び出し"""
+    started_at: float = field(default_factory=time.perf_counter)
+    upstreams: Dict[str, _UpstreamTotals] = field(default_factory=dict)
+
+    def record(self, upstream: str, seconds: float, error: bool) -> None:
+        totals = self.upstreams.setdefault(upstream, _UpstreamTotals())
+        totals.calls += 1
+        totals.seconds += seconds
+        if error:
+            totals.errors += 1
+
+    def server_timing(self) -> str:
+        parts = [
+            f'{name};dur={totals.seconds * 1000:.1f};desc="{totals.calls} calls"'
+            for name, totals in sorted(self.upstreams.items())
+        ]
+        parts.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+@dataclass
+class _RouteTotals:
+    requests: int = 0
+    seconds: float = 0.0
+    upstream_calls: Dict[str, int] = field(default_factory=dict)
+    upstream_seconds: Dict[str, float] = field(default_factory=dict)
+    # 1リクエストあたりの最大呼び出し回数（N+1 の検出用）
+    upstream_max_calls: Dict[str, int] = field(default_factory=dict)
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+# 同期クライアントはスレッドプールから呼ばれるため、集計の更新はロックで保護する
+_lock = threading.Lock()
+_upstream_totals: Dict[str, _UpstreamTotals] = {}
+_route_totals: Dict[Tuple[str, str, str], _RouteTotals] = {}
+_gauge_sources: Dict[str, Callable[[], Dict[str, float]]] = {}
+_installed = False
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower() if url else ""
+
+
+def classify_upstream(host: str) -> str:
+    """ホスト名から上流の種類を判定する"""
+    host = (host or "").lower()
+    if host and (host == _host(settings.supabase_url) or host.endswith(".supabase.co")):
+        return SUPABASE
+    if host.endswith("openai.com"):
+        return OPENAI
+    if host.endswith("clerk.com") or host.endswith("clerk.accounts.dev") or (
+        settings.clerk_frontend_api and host == settings.clerk_frontend_api.lower()
+    ):
+        return CLERK
+    return OTHER_HTTP
+
+
+def record_upstream_call(upstream: str, seconds: float, error: bool = False) -> None:
+    """上流呼び出しを現在のリクエストと全体集計に記録する"""
+    with _lock:
+        totals = _upstream_totals.setdefault(upstream, _UpstreamTotals())
+        totals.calls += 1
+        totals.seconds += seconds
+        if error:
+            totals.errors += 1
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record(upstream, seconds, error)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def register_gauge_source(prefix: str, source: Callable[[], Dict[str, float]]) -> None:
+    """/metrics に出力する値の取得関数を登録する（キャッシュのヒット数など）"""
+    _gauge_sources[prefix] = source
+
+
+def install_http_instrumentation() -> None:
+    """httpx の send をラップする（複数回呼ばれても一度だけ）"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    original_sync_send = httpx.Client.send
+    original_async_send = httpx.AsyncClient.send
+
+    def send(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        error = True
+        try:
+            response = original_sync_send(self, request, *args, **kwargs)
+            error = response.status_code >= 500
+            return response
+        finally:
+            record_upstream_call(classify_upstream(request.url.host), time.perf_counter() - started, error)
+
+    async def async_send(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        error = True
+        try:
+            response = await original_async_send(self, request, *args, **kwargs)
+            error = response.status_code >= 500
+            return response
+        finally:
+            record_upstream_call(classify_upstream(request.url.host), time.perf_counter() - started, error)
+
+    httpx.Client.send = send
+    httpx.AsyncClient.send = async_send
+
+
+def _finish_request(method: str, route: str, status_code: int, trace: RequestTrace) -> None:
+    elapsed = time.perf_counter() - trace.started_at
+    with _lock:
+        totals = _route_totals.setdefault((method, route, str(status_code)), _RouteTotals())
+        totals.requests += 1
+        totals.seconds += elapsed
+        for upstream, upstream_totals in trace.upstreams.items():
+            totals.upstream_calls[upstream] = totals.upstream_calls.get(upstream, 0) + upstream_totals.calls
+            totals.upstream_seconds[upstream] = totals.upstream_seconds.get(upstream, 0.0) + upstream_totals.seconds
+            totals.upstream_max_calls[upstream] = max(totals.upstream_max_calls.get(upstream, 0), upstream_totals.calls)
+
+    db_calls = trace.upstreams.get(SUPABASE)
+    threshold = settings.request_metrics_db_call_warn_threshold
+    if db_calls and threshold > 0 and db_calls.calls >= threshold:
+        logger.warning(
+            f"{method} {route}: {db_calls.calls} Supabase calls in one request "
+            f"({db_calls.seconds * 1000:.0f}ms) - possible N+1"
+        )
+
+
+class RequestMetricsMiddleware:
+    """リクエストごとに RequestTrace を用意し、Server-Timing ヘッダーの付与とルート別集計を行う ASGI ミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                with _lock:
+                    server_timing = trace.server_timing()
+                headers.append((b"server-timing", server_timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            _finish_request(scope.get("method", ""), route, status_code, trace)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """集計を Prometheus テキスト形式で返す"""
+    lines: List[str] = []
+    with _lock:
+        upstreams = {name: _UpstreamTotals(**totals.__dict__) for name, totals in _upstream_totals.items()}
+        routes = list(_route_totals.items())
+
+        lines.append("# TYPE upstream_calls_total counter")
+        lines.extend(f'upstream_calls_total{{upstream="{name}"}} {t.calls}' for name, t in sorted(upstreams.items()))
+        lines.append("# TYPE upstream_call_errors_total counter")
+        lines.extend(f'upstream_call_errors_total{{upstream="{name}"}} {t.errors}' for name, t in sorted(upstreams.items()))
+        lines.append("# TYPE upstream_call_duration_seconds_sum counter")
+        lines.extend(
+            f'upstream_call_duration_seconds_sum{{upstream="{name}"}} {t.seconds:.6f}' for name, t in sorted(upstreams.items())
+        )
+
+        lines.append("# TYPE http_requests_total counter")
+        lines.append("# TYPE http_request_duration_seconds_sum counter")
+        lines.append("# TYPE http_request_upstream_calls_total counter")
+        lines.append("# TYPE http_request_upstream_duration_seconds_sum counter")
+        lines.append("# TYPE http_request_upstream_calls_max gauge")
+        for (method, route, status_code), totals in sorted(routes):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status_code}"'
+            lines.append(f"http_requests_total{{{labels}}} {totals.requests}")
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {totals.seconds:.6f}")
+            for upstream in sorted(totals.upstream_calls):
+                upstream_labels = f'{labels},upstream="{upstream}"'
+                lines.append(f"http_request_upstream_calls_total{{{upstream_labels}}} {totals.upstream_calls[upstream]}")
+                lines.append(
+                    f"http_request_upstream_duration_seconds_sum{{{upstream_labels}}} {totals.upstream_seconds[upstream]:.6f}"
+                )
+                lines.append(f"http_request_upstream_calls_max{{{upstream_labels}}} {totals.upstream_max_calls[upstream]}")
+
+    for prefix, source in sorted(_gauge_sources.items()):
+        try:
+            values = source()
+        except Exception as e:
+            logger.warning(f"metrics source {prefix} failed: {e}")
+            continue
+        for key, value in sorted(values.items()):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """集計をリセットする（テスト用）"""
+    with _lock:
+        _upstream_totals.clear()
+        _route_totals.clear()
@@ -1,19 +1,60 @@
 # -*- coding: utf-8 -*-
+import logging
+import secrets
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 # 新しいインポートパス
 from app.api.router import api_router
 from app.core.config import settings
 from app.core.exceptions import exception_handlers
+from app.domains.blog.services.generation_scheduler import blog_generation_scheduler
+from app.domains.seo_article.endpoints import article_service
+from app.domains.seo_article.services.edit_knowledge_cache import edit_knowledge_cache
+from app.domains.seo_article.services.process_event_bus import process_event_bus
+from app.domains.seo_article.services.research_cache import research_cache
+from app.infrastructure.external_apis.crawl_scheduler import crawl_scheduler
+from app.infrastructure.external_apis.scrape_cache import scrape_cache
+from app.infrastructure.external_apis.serp_cache import serp_cache
+from app.infrastructure.external_apis.scraping_engine import scraping_engine
+from app.infrastructure.openai_rate_limiter import install_openai_rate_limiter, openai_rate_limiter
+from app.infrastructure.request_metrics import (
+    RequestMetricsMiddleware,
+    install_http_instrumentation,
+    register_gauge_source,
+    render_prometheus,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 起動時: 停止したインスタンスが残した running タスクを再キューし、タスクの確保を始める
+    try:
+        await article_service.background_task_manager.recover_orphaned_tasks()
+    except Exception as e:
+        logger.warning(f"Failed to recover orphaned background tasks: {e}")
+    yield
+    # 停止時: 新規タスクの確保をやめ、実行中のタスクをステップの区切りで止めて他インスタンスに引き継ぐ
+    try:
+        await article_service.background_task_manager.drain()
+    except Exception as e:
+        logger.warning(f"Failed to drain background tasks: {e}")
+    await process_event_bus.close()
+    await scraping_engine.aclose()
+
 
 # FastAPIアプリケーションの初期化
 app = FastAPI(
     title="Marketing Automation API",
     description="Comprehensive API for marketing automation including SEO article generation, organization management, and workflow automation.",
     version="2.0.0",
-    exception_handlers=exception_handlers
+    exception_handlers=exception_handlers,
+    lifespan=lifespan,
 )
 
 # CORS設定
@@ -25,8 +66,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # /articles/all-processes のキーセットページング用カーソル
+    expose_headers=["X-Next-Cursor"],
 )
 
+# OpenAI API 呼び出しのモデル別レート制限（全パイプライン共通）
+install_openai_rate_limiter()
+
+# リクエストごとの上流呼び出し計測（Server-Timing ヘッダー / /metrics）
+if settings.request_metrics_enabled:
+    install_http_instrumentation()
+    app.add_middleware(RequestMetricsMiddleware)
+    register_gauge_source("edit_knowledge_cache", edit_knowledge_cache.stats.as_dict)
+    register_gauge_source("process_event_bus", lambda: {"buffered_events": process_event_bus.buffered_count})
+    register_gauge_source("openai_rate_limiter", openai_rate_limiter.stats.as_dict)
+    register_gauge_source("background_task_queue", lambda: article_service.background_task_manager.worker.queue_stats)
+    register_gauge_source("blog_generation_queue", blog_generation_scheduler.metrics)
+    register_gauge_source("speculative_execution", article_service.background_task_manager.speculation.metrics)
+    register_gauge_source("research_cache", research_cache.metrics)
+    register_gauge_source("scraping", scraping_engine.metrics)
+    register_gauge_source("crawl_scheduler", crawl_scheduler.metrics)
+    register_gauge_source("scrape_cache", scrape_cache.metrics)
+    register_gauge_source("serpapi_cache", serp_cache.metrics)
+
 # ★ APIルーターをまとめてインクルード（プレフィックスなしで互換性維持）
 app.include_router(api_router)
 
@@ -49,6 +111,19 @@ async def health_check():
     """APIのヘルスチェックエンドポイント。"""
     return {"status": "healthy", "message": "API is running", "version": "2.0.0"}
 
+@app.get("/metrics", tags=["Health"], summary="計測メトリクス", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """ルート別・上流別の呼び出し回数とレイテンシ（Prometheus テキスト形式、ワーカーごとの集計）。"""
+    # METRICS_TOKEN を設定した場合だけ公開する（テナント別の集計を含むため未認証では公開しない）
+    if not settings.request_metrics_enabled or not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    authorization = request.headers.get("authorization", "")
+    if not secrets.compare_digest(authorization, f"Bearer {settings.metrics_token}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    # テナント別のキュー集計は DB から取得する（worker モードでも API プロセスから見えるように）
+    await article_service.background_task_manager.worker.refresh_queue_stats()
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # CORSプリフライトリクエストはCORSMiddlewareが自動的に処理するため、
 # 個別のOPTIONSハンドラーは不要です
 
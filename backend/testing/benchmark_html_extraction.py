@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+競合記事 HTML 抽出のベンチマーク（tests/fixtures/html の保存済みページ）
+
+ページごと・パーサーごとに extract_article の所要時間（中央値）を表示する。
+--scale を付けると、入れ子の深さを変えた合成ページで所要時間が深さに比例することも確認する。
+
+Usage:
+  cd backend && PYTHONPATH=. uv run python testing/benchmark_html_extraction.py
+  cd backend && PYTHONPATH=. uv run python testing/benchmark_html_extraction.py --repeat 50 --scale
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from app.infrastructure.external_apis.html_extractor import LXML_AVAILABLE, extract_article
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "html"
+
+
+def measure(content: bytes, backend: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        extract_article(content, None, "https://www.example.jp/", backend=backend)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def nested_page(depth: int) -> bytes:
+    body = "<h2>見出し</h2>" + "<p>" + "本文のテキストです。" * 10 + "</p>"
+    return ("<html><body><article>" + "<div>" * depth + body * 20 + "</div>" * depth + "</article></body></html>").encode("utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scale", action="store_true", help="入れ子の深さを変えた合成ページも計測する")
+    args = parser.parse_args()
+
+    backends = ["html.parser"] + (["lxml"] if LXML_AVAILABLE else [])
+    if not LXML_AVAILABLE:
+        print("lxml is not installed; measuring html.parser only")
+
+    print(f"{'page':<40}{'KB':>8}" + "".join(f"{backend + ' ms':>16}" for backend in backends))
+    for path in sorted(FIXTURES.glob("*.html")):
+        content = path.read_bytes()
+        row = f"{path.name:<40}{len(content) / 1024:>8.1f}"
+        for backend in backends:
+            row += f"{measure(content, backend, args.repeat):>16.2f}"
+        print(row)
+
+    if args.scale:
+        print()
+        print(f"{'nesting depth':<40}{'KB':>8}" + "".join(f"{backend + ' ms':>16}" for backend in backends))
+        for depth in (100, 500, 1000, 2000, 4000):
+            content = nested_page(depth)
+            row = f"{depth:<40}{len(content) / 1024:>8.1f}"
+            for backend in backends:
+                row += f"{measure(content, backend, max(args.repeat // 4, 1)):>16.2f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
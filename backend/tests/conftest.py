@@ -0,0 +1,99 @@
+import inspect
+from typing import Any, Callable, List, Optional
+
+import pytest
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeRequest:
+    """``rpc()`` / ``table()`` が返すクエリビルダー（フィルタや並び順は記録せず自身を返す）"""
+
+    def __init__(self, client: "FakeSupabaseClient", target: str, operation: Optional[str] = None, payload: Any = None):
+        self._client = client
+        self.target = target  # テーブル名または RPC 名
+        self.operation = operation  # "rpc" / "select" / "insert" / "update" / "upsert" / "delete"
+        self.payload = payload  # RPC のパラメータまたは書き込む行
+
+    def _chain(self, *_args, **_kwargs):
+        return self
+
+    eq = neq = in_ = gt = gte = lt = lte = is_ = order = limit = range = single = maybe_single = _chain
+
+    def select(self, *_args, **_kwargs):
+        self.operation = self.operation or "select"
+        return self
+
+    def _write(self, operation: str, payload: Any = None):
+        self.operation = operation
+        self.payload = payload
+        return self
+
+    def insert(self, payload, *_args, **_kwargs):
+        return self._write("insert", payload)
+
+    def update(self, payload, *_args, **_kwargs):
+        return self._write("update", payload)
+
+    def upsert(self, payload, *_args, **_kwargs):
+        return self._write("upsert", payload)
+
+    def delete(self, *_args, **_kwargs):
+        return self._write("delete")
+
+    async def execute(self):
+        return await self._client.execute(self)
+
+
+Handler = Callable[[FakeRequest], Any]
+
+
+class FakeSupabaseClient:
+    """get_async_supabase_client() の代わりに使うメモリ上の非同期クライアント
+
+    実行したクエリを ``calls`` に記録し、``handler(request)`` の戻り値（コルーチンなら await した値）を
+    ``execute()`` の ``data`` として返す。``fail_next`` 回分の ``execute()`` は一時的なエラーで失敗させる。
+    """
+
+    def __init__(self, handler: Optional[Handler] = None):
+        self.handler = handler
+        self.calls: List[FakeRequest] = []
+        self.fail_next = 0
+
+    def rpc(self, name: str, params: Any = None) -> FakeRequest:
+        return FakeRequest(self, name, "rpc", params)
+
+    def table(self, name: str) -> FakeRequest:
+        return FakeRequest(self, name)
+
+    def targets(self) -> List[str]:
+        return [request.target for request in self.calls]
+
+    async def execute(self, request: FakeRequest) -> FakeResult:
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RuntimeError("temporary failure")
+        self.calls.append(request)
+        data = self.handler(request) if self.handler is not None else None
+        if inspect.isawaitable(data):
+            data = await data
+        return FakeResult(data)
+
+
+@pytest.fixture
+def fake_supabase(monkeypatch):
+    """``fake_supabase(module, handler=None)`` で module の get_async_supabase_client を差し替え、クライアントを返す"""
+
+    def install(module, handler: Optional[Handler] = None) -> FakeSupabaseClient:
+        client = FakeSupabaseClient(handler)
+
+        async def fake_get_client():
+            return client
+
+        monkeypatch.setattr(module, "get_async_supabase_client", fake_get_client)
+        return client
+
+    return install
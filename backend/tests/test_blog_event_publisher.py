@@ -0,0 +1,85 @@
+import asyncio
+
+from app.domains.blog.services import event_publisher as publisher_module
+from app.domains.blog.services import generation_service as service_module
+from app.domains.blog.services.event_publisher import BlogEventPublisher
+from app.domains.blog.services.generation_service import BlogGenerationService
+from app.infrastructure.cancellation import cancellation_registry
+
+
+class _EventTable:
+    """blog_process_events の最終シーケンス番号の取得と挿入を再現する"""
+
+    def __init__(self, last_sequence=0):
+        self.last_sequence = last_sequence
+        self.select_calls = 0
+        self.inserts = []
+
+    async def handle(self, request):
+        if request.operation == "select":
+            self.select_calls += 1
+            await asyncio.sleep(0)
+            return [{"event_sequence": self.last_sequence}] if self.last_sequence else []
+        self.inserts.append(list(request.payload))
+        return request.payload
+
+
+def test_parallel_events_get_unique_sequences_with_single_seed(fake_supabase):
+    table = _EventTable(last_sequence=7)
+    fake_supabase(publisher_module, table.handle)
+    publisher = BlogEventPublisher(flush_interval=60)
+
+    async def scenario():
+        sequences = await asyncio.gather(*[
+            publisher.publish("p1", "u1", "tool_call_started", {"index": index})
+            for index in range(20)
+        ])
+        await publisher.release("p1")
+        return sequences
+
+    sequences = asyncio.run(scenario())
+
+    assert sorted(sequences) == list(range(8, 28))
+    assert table.select_calls == 1
+    assert len(table.inserts) == 1
+    assert [row["event_sequence"] for row in table.inserts[0]] == sequences
+
+
+def test_terminal_event_flushes_and_release_reseeds(fake_supabase):
+    table = _EventTable()
+    fake_supabase(publisher_module, table.handle)
+    publisher = BlogEventPublisher(flush_interval=60)
+
+    async def scenario():
+        await publisher.publish("p1", "u1", "generation_started", {})
+        await publisher.publish("p1", "u1", "user_input_required", {})
+        assert len(table.inserts) == 1
+        await publisher.release("p1")
+        table.last_sequence = 2
+        return await publisher.publish("p1", "u1", "generation_resumed", {}, flush=True)
+
+    assert asyncio.run(scenario()) == 3
+    assert table.select_calls == 2
+    assert [[row["event_sequence"] for row in rows] for rows in table.inserts] == [[1, 2], [3]]
+
+
+def test_cancel_outside_run_releases_sequence(fake_supabase, monkeypatch):
+    table = _EventTable(last_sequence=4)
+    fake_supabase(publisher_module, table.handle)
+    fake_supabase(service_module, lambda request: {"user_id": "u1"} if request.operation == "select" else None)
+    publisher = BlogEventPublisher(flush_interval=60)
+    monkeypatch.setattr(service_module, "blog_event_publisher", publisher)
+    # エージェントの構築は不要なので __init__ を通さない
+    service = BlogGenerationService.__new__(BlogGenerationService)
+
+    async def scenario():
+        assert await service.cancel_generation("p1")
+        released = "p1" not in publisher._next_sequence
+        # このインスタンスで実行中の場合は、実行側の release まで連番を保持する
+        async with cancellation_registry.scope("p2"):
+            assert await service.cancel_generation("p2")
+            kept = "p2" in publisher._next_sequence
+        return released, kept
+
+    assert asyncio.run(scenario()) == (True, True)
+    assert [[row["event_sequence"] for row in rows] for rows in table.inserts] == [[5], [5]]
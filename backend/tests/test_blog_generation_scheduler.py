@@ -0,0 +1,145 @@
+import asyncio
+
+from app.domains.blog.services.generation_scheduler import BlogGenerationScheduler, TenantPolicy
+
+
+class _Runs:
+    """開始順を記録し、release されるまで実行中のままにする"""
+
+    def __init__(self):
+        self.started = []
+        self.release = asyncio.Event()
+
+    async def generate(self, process_id):
+        self.started.append(process_id)
+        await self.release.wait()
+
+
+async def _start_all(scheduler, runs, jobs):
+    tasks = [
+        asyncio.create_task(scheduler.run(tenant, process_id, runs.generate, process_id=process_id))
+        for tenant, process_id in jobs
+    ]
+    await asyncio.sleep(0)
+    return tasks
+
+
+async def _finish_one(runs):
+    """実行中のジョブを1件ずつ終わらせる"""
+    runs.release.set()
+    await asyncio.sleep(0)
+    runs.release.clear()
+    await asyncio.sleep(0)
+
+
+def test_small_tenant_is_not_starved_by_bulk_run():
+    bulk = TenantPolicy("org:bulk", weight=1, max_running=None)
+    small = TenantPolicy("user:small", weight=1, max_running=None)
+
+    async def scenario():
+        scheduler = BlogGenerationScheduler(concurrency=1, policy_ttl=60)
+        runs = _Runs()
+        tasks = await _start_all(scheduler, runs, [(bulk, f"b{i}") for i in range(5)])
+        tasks += await _start_all(scheduler, runs, [(small, "s1")])
+        for _ in range(6):
+            await _finish_one(runs)
+        await asyncio.gather(*tasks)
+        return runs.started
+
+    started = asyncio.run(scenario())
+    # 先にまとめて積んだテナントがいても、後から来たテナントは次の枠で開始する
+    assert started[:3] == ["b0", "s1", "b1"]
+    assert sorted(started) == ["b0", "b1", "b2", "b3", "b4", "s1"]
+
+
+def test_weights_and_tenant_caps():
+    heavy = TenantPolicy("org:heavy", weight=2, max_running=None)
+    light = TenantPolicy("org:light", weight=1, max_running=None)
+    capped = TenantPolicy("org:capped", weight=10, max_running=1)
+
+    async def scenario():
+        scheduler = BlogGenerationScheduler(concurrency=1, policy_ttl=60)
+        runs = _Runs()
+        tasks = await _start_all(scheduler, runs, [(heavy, "h0")])
+        tasks += await _start_all(
+            scheduler, runs, [(light, "l1"), (light, "l2"), (heavy, "h1"), (heavy, "h2"), (heavy, "h3")]
+        )
+        for _ in range(6):
+            await _finish_one(runs)
+        await asyncio.gather(*tasks)
+        weighted = list(runs.started)
+
+        scheduler = BlogGenerationScheduler(concurrency=3, policy_ttl=60)
+        runs = _Runs()
+        tasks = await _start_all(scheduler, runs, [(capped, "c1"), (capped, "c2"), (light, "l1")])
+        capped_started = list(runs.started)
+        metrics = scheduler.metrics()
+        for _ in range(3):
+            await _finish_one(runs)
+        await asyncio.gather(*tasks)
+        return weighted, capped_started, metrics
+
+    weighted, capped_started, metrics = asyncio.run(scenario())
+    # 重み 2 のテナントは重み 1 のテナントの2倍の頻度で開始する
+    assert weighted == ["h0", "l1", "h1", "h2", "l2", "h3"]
+    # 上限 1 のテナントは空き枠があっても2件目を待たせる
+    assert capped_started == ["c1", "l1"]
+    assert metrics["queued"] == 1
+    assert metrics["running"] == 2
+    assert metrics["tenants_queued"] == 1
+
+
+def test_discard_drops_queued_job():
+    tenant = TenantPolicy("user:a", max_running=1)
+
+    async def scenario():
+        scheduler = BlogGenerationScheduler(concurrency=1, policy_ttl=60)
+        runs = _Runs()
+        tasks = await _start_all(scheduler, runs, [(tenant, "p1"), (tenant, "p2")])
+        assert scheduler.discard("p2")
+        assert not scheduler.discard("p1")
+        await _finish_one(runs)
+        await asyncio.gather(*tasks)
+        return runs.started, scheduler.metrics()
+
+    started, metrics = asyncio.run(scenario())
+    assert started == ["p1"]
+    assert metrics["running"] == 0
+    assert metrics["queued"] == 0
+
+
+def test_resolve_tenant_uses_plan_and_falls_back(monkeypatch):
+    from app.domains.blog.services import generation_scheduler as scheduler_module
+
+    calls = []
+
+    class _Client:
+        def rpc(self, name, params):
+            calls.append((name, params))
+            rows = [{"tenant_id": "org:o1", "weight": 5, "max_running": 4}] if params["p_organization_id"] else None
+
+            class _Query:
+                async def execute(self):
+                    if rows is None:
+                        raise RuntimeError("rpc missing")
+                    return type("Result", (), {"data": rows})()
+
+            return _Query()
+
+    async def fake_get_client():
+        return _Client()
+
+    monkeypatch.setattr(scheduler_module, "get_async_supabase_client", fake_get_client)
+
+    async def scenario():
+        scheduler = BlogGenerationScheduler(concurrency=1, policy_ttl=60)
+        org = await scheduler.resolve_tenant("u1", "o1")
+        await scheduler.resolve_tenant("u1", "o1")
+        personal = await scheduler.resolve_tenant("u2", None)
+        return org, personal
+
+    org, personal = asyncio.run(scenario())
+    assert org == TenantPolicy("org:o1", weight=5, max_running=4)
+    assert personal == TenantPolicy("user:u2")
+    # キャッシュ済みのテナントは RPC を呼ばない
+    assert len(calls) == 2
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from app.domains.seo_article.services.background_task_manager import BackgroundTaskManager
+from app.infrastructure.cancellation import (
+    CancellationRegistry,
+    GenerationCancelled,
+    cancellation_registry,
+    run_cancellable,
+)
+
+
+def test_cancel_aborts_in_flight_call():
+    registry = CancellationRegistry()
+    interrupted = []
+
+    async def slow_call():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            interrupted.append(True)
+            raise
+
+    async def scenario():
+        async with registry.scope("p1") as token:
+            asyncio.get_running_loop().call_later(0.01, registry.cancel, "p1", "paused")
+            with pytest.raises(GenerationCancelled) as excinfo:
+                await token.run(slow_call())
+            assert excinfo.value.reason == "paused"
+            # キャンセル後のステップは開始前に打ち切られる
+            with pytest.raises(GenerationCancelled):
+                token.raise_if_cancelled()
+        return registry.get("p1")
+
+    assert asyncio.run(scenario()) is None
+    assert interrupted == [True]
+    # 各所の except Exception に握りつぶされない
+    assert not issubclass(GenerationCancelled, Exception)
+
+
+def test_poll_detects_cancellation_from_another_instance():
+    registry = CancellationRegistry()
+    polls = []
+
+    async def poll():
+        polls.append(True)
+        return "cancelled" if len(polls) >= 2 else None
+
+    async def scenario():
+        started = time.monotonic()
+        async with registry.scope("p1", poll=poll, poll_interval=0.01) as token:
+            with pytest.raises(GenerationCancelled):
+                await token.run(asyncio.sleep(60))
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 1
+    assert len(polls) == 2
+
+
+def test_run_cancellable_without_token_just_awaits():
+    async def scenario():
+        return await run_cancellable("unregistered", asyncio.sleep(0, result="done"))
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_cancelled_task_frees_slot_without_retry(monkeypatch):
+    manager = BackgroundTaskManager(service=None)
+    statuses = []
+
+    async def fake_start(task_id, task_data):
+        await run_cancellable(task_data["process_id"], asyncio.sleep(60))
+
+    async def fake_update(task_id, status, error_message=None):
+        statuses.append(status)
+
+    async def fake_failure(*args):
+        raise AssertionError("cancelled tasks must not be retried")
+
+    async def fake_reason(task_id):
+        return None
+
+    monkeypatch.setattr(manager, "_execute_generation_start", fake_start)
+    monkeypatch.setattr(manager, "_update_task_status", fake_update)
+    monkeypatch.setattr(manager, "_handle_task_failure", fake_failure)
+    monkeypatch.setattr(manager, "_task_cancel_reason", fake_reason)
+
+    async def scenario():
+        claimed = {"id": "t1", "process_id": "p1", "task_type": "generation_start", "task_data": {}}
+        task = asyncio.create_task(manager._execute_task_loop("t1", claimed))
+        await asyncio.sleep(0.01)
+        cancellation_registry.cancel("p1")
+        await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(scenario())
+    assert statuses == ["cancelled"]
+    assert cancellation_registry.get("p1") is None
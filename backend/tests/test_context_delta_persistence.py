@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+from app.core.config import settings
+from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.services import _process_persistence_service as persistence_module
+from app.domains.seo_article.services._process_persistence_service import ProcessPersistenceService
+
+PROCESS_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def _install_fake_client(fake_supabase):
+    return fake_supabase(persistence_module, lambda request: [{"id": PROCESS_ID}])
+
+
+def _context_writes(client):
+    """記事本体以外への書き込み（update / insert / RPC）の (対象, ペイロード)"""
+    return [(call.target, call.payload) for call in client.calls if call.payload is not None and call.target != "articles"]
+
+
+def _bytes_written(client) -> int:
+    return sum(len(json.dumps(payload, ensure_ascii=False).encode("utf-8")) for _, payload in _context_writes(client))
+
+
+def _simulate_article(monkeypatch, fake_supabase, delta_enabled: bool, sections: int = 30):
+    """リサーチ後にセクションを1つずつ書き、都度保存する記事生成を模擬する"""
+    monkeypatch.setattr(settings, "context_delta_persistence", delta_enabled)
+    monkeypatch.setattr(settings, "context_checkpoint_interval", 10)
+    client = _install_fake_client(fake_supabase)
+    service = ProcessPersistenceService(service=None)
+    context = ArticleContext(initial_keywords=["札幌", "注文住宅"], target_length=12000)
+
+    async def scenario():
+        context.current_step = "researching"
+        context.research_sources_text = "出典テキスト " * 6000
+        await service.save_context_to_db(context, process_id=PROCESS_ID, user_id="user")
+        context.current_step = "writing_sections"
+        for index in range(sections):
+            html = f"<h2>見出し{index}</h2>" + "<p>本文テキスト</p>" * 150
+            context.generated_sections_html.append(html)
+            context.add_to_section_writer_history("assistant", html)
+            context.current_section_index = index + 1
+            await service.save_context_to_db(context, process_id=PROCESS_ID, user_id="user")
+        context.current_step = "completed"
+        await service.save_context_to_db(context, process_id=PROCESS_ID, user_id="user")
+
+    asyncio.run(scenario())
+    return client
+
+
+def test_delta_save_sends_only_changed_top_level_keys(monkeypatch, fake_supabase):
+    monkeypatch.setattr(settings, "context_delta_persistence", True)
+    monkeypatch.setattr(settings, "context_checkpoint_interval", 10)
+    client = _install_fake_client(fake_supabase)
+    service = ProcessPersistenceService(service=None)
+    context = ArticleContext(initial_keywords=["kw"])
+
+    async def scenario():
+        await service.save_context_to_db(context, process_id=PROCESS_ID, user_id="user")
+        # in-place の変更も差分として検出される
+        context.generated_sections_html.append("<p>a</p>")
+        await service.save_context_to_db(context, process_id=PROCESS_ID, user_id="user")
+
+    asyncio.run(scenario())
+
+    (first_target, first_payload), (second_target, second_payload) = _context_writes(client)
+    assert first_target == "generated_articles_state" and "article_context" in first_payload
+    assert second_target == "update_article_context_delta"
+    assert second_payload["p_context_patch"] == {}
+    # リスト末尾への追加は追加分だけが送られる
+    assert second_payload["p_context_append"] == {"generated_sections_html": ["<p>a</p>"]}
+    assert second_payload["p_state"]["current_step_name"] == "start"
+
+
+def test_rewritten_list_item_replaces_whole_key(monkeypatch, fake_supabase):
+    monkeypatch.setattr(settings, "context_delta_persistence", True)
+    client = _install_fake_client(fake_supabase)
+    service = ProcessPersistenceService(service=None)
+    context = ArticleContext(generated_sections_html=["<p>a</p>"])
+
+    async def scenario():
+        await service.save_context_to_db(context, process_id=PROCESS_ID, user_id="user")
+        context.generated_sections_html[0] = "<p>b</p>"
+        context.current_step = "writing_sections"
+        await service.save_context_to_db(context, process_id=PROCESS_ID, user_id="user")
+
+    asyncio.run(scenario())
+
+    patch = _context_writes(client)[-1][1]["p_context_patch"]
+    assert patch == {"generated_sections_html": ["<p>b</p>"], "current_step": "writing_sections"}
+
+
+def test_checkpoint_interval_forces_full_write(monkeypatch, fake_supabase):
+    client = _simulate_article(monkeypatch, fake_supabase, delta_enabled=True, sections=12)
+    targets = [target for target, _ in _context_writes(client)]
+    # 初回 + 10回の差分ごと + 完了時に全体を書き込む
+    assert targets.count("generated_articles_state") == 3
+    assert targets[-1] == "generated_articles_state"
+
+
+def test_bytes_written_per_article_benchmark(monkeypatch, fake_supabase):
+    full = _bytes_written(_simulate_article(monkeypatch, fake_supabase, delta_enabled=False))
+    delta = _bytes_written(_simulate_article(monkeypatch, fake_supabase, delta_enabled=True))
+    print(f"\narticle_context bytes written per article: full={full:,} delta={delta:,} ({delta / full:.1%})")
+    assert delta < full * 0.3
@@ -0,0 +1,126 @@
+import json
+import time
+from enum import Enum
+
+from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.schemas import (
+    AgeGroup,
+    ArticleSection,
+    SerpAnalysisArticleData,
+    SerpKeywordAnalysisReport,
+    ThemeProposalData,
+)
+from app.domains.seo_article.services import context_serializer
+from app.domains.seo_article.services.context_serializer import context_to_dict, dumps, to_jsonable
+
+
+def _legacy_serialize_value(value):
+    """置き換え前の save_context_to_db 内のシリアライザ（比較用）"""
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, list):
+        return [_legacy_serialize_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _legacy_serialize_value(v) for k, v in value.items()}
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if hasattr(value, "__dict__"):
+        return {k: _legacy_serialize_value(v) for k, v in value.__dict__.items()}
+    return value
+
+
+def _legacy_context_to_dict(context):
+    return {
+        key: _legacy_serialize_value(value)
+        for key, value in context.__dict__.items()
+        if key not in ["websocket", "user_response_event"] and not key.startswith("_")
+    }
+
+
+def _build_article_context(sections: int = 30) -> ArticleContext:
+    context = ArticleContext(
+        initial_keywords=["札幌", "注文住宅", "工務店"],
+        target_age_group=AgeGroup.THIRTIES,
+        target_length=15000,
+        company_name="株式会社サンプル",
+        company_description="札幌市を中心に注文住宅を手掛ける工務店です。" * 5,
+    )
+    context.serp_analysis_report = SerpKeywordAnalysisReport(
+        search_query="札幌 注文住宅",
+        keyword="札幌 注文住宅",
+        analyzed_articles=[
+            SerpAnalysisArticleData(
+                url=f"https://example.com/articles/{index}",
+                title=f"札幌で注文住宅を建てるなら知っておきたいこと {index}",
+                headings=[f"見出し{index}-{h}" for h in range(12)],
+                content_preview="上位記事の本文プレビュー。" * 40,
+                char_count=8000 + index,
+                image_count=6,
+                source_type="organic_result",
+                position=index + 1,
+            )
+            for index in range(10)
+        ],
+        main_themes=["土地探し", "予算", "断熱性能"],
+        common_headings=["費用相場", "工務店の選び方"],
+    )
+    context.generated_themes = [
+        ThemeProposalData(title=f"テーマ{index}", description="テーマの説明" * 10, keywords=["札幌", "注文住宅"])
+        for index in range(3)
+    ]
+    context.selected_theme = context.generated_themes[0]
+    context.research_sources_text = "出典テキスト " * 4000
+    context.current_step = "writing_sections"
+    for index in range(sections):
+        html = f"<h2>見出し{index}</h2>" + "<p>本文テキスト。札幌の家づくりについて解説します。</p>" * 40
+        context.generated_sections.append(ArticleSection(title=f"見出し{index}", content=html, order=index))
+        context.generated_sections_html.append(html)
+        context.add_to_section_writer_history("user", f"セクション {index + 1} を執筆してください。")
+        context.add_to_section_writer_history("assistant", html)
+    context.current_section_index = sections
+    return context
+
+
+def test_converters_are_cached_per_class():
+    context_serializer._converters.clear()
+    to_jsonable([ArticleSection(title="a", content="b", order=1), AgeGroup.TWENTIES])
+    assert ArticleSection in context_serializer._converters
+    assert AgeGroup in context_serializer._converters
+    assert to_jsonable(AgeGroup.TWENTIES) == AgeGroup.TWENTIES.value
+
+
+def test_context_to_dict_matches_legacy_output():
+    context = _build_article_context()
+    context._persisted_field_digests = {"ignored": "x"}
+
+    serialized = context_to_dict(context)
+
+    assert "websocket" not in serialized and "_persisted_field_digests" not in serialized
+    assert json.loads(dumps(serialized)) == json.loads(json.dumps(_legacy_context_to_dict(context)))
+
+
+def test_serializer_micro_benchmark_30_sections():
+    context = _build_article_context(sections=30)
+    rounds = 20
+
+    def measure(serialize):
+        # ノイズを避けるため数回計測した最小値を使う
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                serialize()
+            timings.append((time.perf_counter() - started) / rounds)
+        return min(timings)
+
+    legacy_convert = measure(lambda: _legacy_context_to_dict(context))
+    compiled_convert = measure(lambda: context_to_dict(context))
+    legacy_total = measure(lambda: json.dumps(_legacy_context_to_dict(context)))
+    compiled_total = measure(lambda: dumps(context_to_dict(context)))
+    print(
+        f"\n30-section context: convert legacy={legacy_convert * 1000:.2f}ms compiled={compiled_convert * 1000:.2f}ms, "
+        f"convert+dump legacy={legacy_total * 1000:.2f}ms compiled={compiled_total * 1000:.2f}ms"
+    )
+    # 実行環境の負荷で結果が揺れるため、所要時間は比較せず表示だけにする（-s で確認）
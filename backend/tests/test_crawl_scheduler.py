@@ -0,0 +1,136 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.infrastructure.external_apis import crawl_scheduler as crawl_scheduler_module
+from app.infrastructure.external_apis.crawl_scheduler import CrawlScheduler
+
+ROBOTS = b"User-agent: *\nDisallow: /private/\nCrawl-delay: 1\n"
+USER_AGENT = "TestBot/1.0"
+
+
+def _fake_fetch(monkeypatch, body=ROBOTS, status_code=200):
+    calls = []
+
+    async def fetch(url, headers=None):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(status_code=status_code, content=body, encoding="utf-8")
+
+    monkeypatch.setattr(crawl_scheduler_module.scraping_engine, "fetch", fetch)
+    return calls
+
+
+def test_robots_rules_are_cached_per_host(monkeypatch):
+    monkeypatch.setattr(settings, "scraping_robots_ttl", 3600)
+    calls = _fake_fetch(monkeypatch)
+    scheduler = CrawlScheduler()
+
+    async def scenario():
+        concurrent = await asyncio.gather(
+            scheduler.can_fetch("https://example.com/a", USER_AGENT),
+            scheduler.can_fetch("https://example.com/b", USER_AGENT),
+        )
+        private = await scheduler.can_fetch("https://EXAMPLE.com/private/x", USER_AGENT)
+        return concurrent, private
+
+    concurrent, private = asyncio.run(scenario())
+    assert concurrent == [True, True]
+    assert private is False
+    assert calls == ["https://example.com/robots.txt"]
+    metrics = scheduler.metrics()
+    assert metrics["robots_fetches"] == 1
+    assert metrics["robots_hits"] == 2
+    assert metrics["disallowed"] == 1
+
+
+def test_missing_robots_allows_everything(monkeypatch):
+    _fake_fetch(monkeypatch, body=b"", status_code=404)
+    scheduler = CrawlScheduler()
+    assert asyncio.run(scheduler.can_fetch("https://example.com/private/x", USER_AGENT)) is True
+
+
+def test_host_slot_spaces_requests_by_crawl_delay(monkeypatch):
+    monkeypatch.setattr(settings, "scraping_per_host_connections", 2)
+    monkeypatch.setattr(settings, "scraping_min_host_interval", 0)
+    monkeypatch.setattr(settings, "scraping_max_crawl_delay", 0.05)  # robots.txt の 1 秒を上限で切り詰める
+    _fake_fetch(monkeypatch)
+    scheduler = CrawlScheduler()
+    started = []
+
+    async def request(url):
+        async with scheduler.host_slot(url, USER_AGENT):
+            started.append((url, time.monotonic()))
+
+    async def scenario():
+        await scheduler.robot_parser("https://example.com", USER_AGENT)
+        await asyncio.gather(*(request(f"https://example.com/{i}") for i in range(3)), request("https://other.example.com/"))
+
+    asyncio.run(scenario())
+    times = sorted(t for url, t in started if url.startswith("https://example.com"))
+    assert times[1] - times[0] >= 0.04
+    assert times[2] - times[1] >= 0.04
+    assert scheduler.metrics()["crawl_delay_waits"] == 2
+
+
+def test_concurrent_scrapes_of_same_url_share_one_run():
+    scheduler = CrawlScheduler()
+    runs = []
+
+    async def scrape():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"title": "記事"}
+
+    async def scenario():
+        return await asyncio.gather(
+            scheduler.run_once("https://example.com/a?utm_source=x", scrape),
+            scheduler.run_once("https://example.com/a", scrape),
+            scheduler.run_once("https://example.com/b", scrape),
+        )
+
+    results = asyncio.run(scenario())
+    assert results == [{"title": "記事"}] * 3
+    assert len(runs) == 2
+    assert scheduler.metrics()["deduplicated"] == 1
+    assert scheduler.metrics()["inflight_urls"] == 0
+
+
+def test_host_slot_limits_concurrency_per_host(monkeypatch):
+    monkeypatch.setattr(settings, "scraping_per_host_connections", 1)
+    monkeypatch.setattr(settings, "scraping_min_host_interval", 0)
+    scheduler = CrawlScheduler()
+    active = {"a.example.com": 0, "b.example.com": 0}
+    peak = {"a.example.com": 0, "b.example.com": 0}
+
+    async def request(host, path):
+        async with scheduler.host_slot(f"https://{host}/{path}", USER_AGENT):
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(request(host, i) for host in active for i in range(3)))
+
+    asyncio.run(scenario())
+    assert peak == {"a.example.com": 1, "b.example.com": 1}
+
+
+def test_idle_host_slots_are_evicted(monkeypatch):
+    monkeypatch.setattr(settings, "scraping_min_host_interval", 0)
+    monkeypatch.setattr(crawl_scheduler_module, "_MAX_HOSTS", 2)
+    scheduler = CrawlScheduler()
+
+    async def scenario():
+        async with scheduler.host_slot("https://busy.example.com/", USER_AGENT):
+            for i in range(4):
+                async with scheduler.host_slot(f"https://host{i}.example.com/", USER_AGENT):
+                    pass
+            # 使用中のホストは捨てない
+            assert "https://busy.example.com" in scheduler._hosts
+
+    asyncio.run(scenario())
+    assert scheduler.metrics()["slot_hosts"] == 2
+    assert list(scheduler._hosts) == ["https://busy.example.com", "https://host3.example.com"]
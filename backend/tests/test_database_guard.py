@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+import httpx
+import pytest
+
+from app.common import database
+from app.common.database import (
+    SyncDatabaseCallOnEventLoopError,
+    _guard_sync_request,
+    run_in_db_thread,
+)
+from app.core.config import settings
+
+
+def _request() -> httpx.Request:
+    return httpx.Request("GET", "http://localhost/rest/v1/articles")
+
+
+@pytest.fixture(autouse=True)
+def _reset_reported_sites():
+    database._reported_call_sites.clear()
+    yield
+    database._reported_call_sites.clear()
+
+
+def test_guard_ignores_calls_outside_event_loop(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "db_loop_guard_mode", "raise")
+    _guard_sync_request(_request())
+    assert not caplog.records
+
+
+def test_guard_warns_once_per_call_site_on_event_loop(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "db_loop_guard_mode", "warn")
+
+    async def call_twice():
+        for _ in range(2):
+            _guard_sync_request(_request())
+
+    with caplog.at_level(logging.WARNING, logger="app.common.database"):
+        asyncio.run(call_twice())
+    messages = [r.getMessage() for r in caplog.records]
+    assert len(messages) == 1
+    assert "/rest/v1/articles" in messages[0]
+
+
+def test_guard_raise_mode(monkeypatch):
+    monkeypatch.setattr(settings, "db_loop_guard_mode", "raise")
+
+    async def call():
+        _guard_sync_request(_request())
+
+    with pytest.raises(SyncDatabaseCallOnEventLoopError):
+        asyncio.run(call())
+
+
+def test_run_in_db_thread_leaves_the_loop(monkeypatch):
+    monkeypatch.setattr(settings, "db_loop_guard_mode", "raise")
+
+    def sync_query(value):
+        _guard_sync_request(_request())
+        return value * 2
+
+    assert asyncio.run(run_in_db_thread(sync_query, 21)) == 42
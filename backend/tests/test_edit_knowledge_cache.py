@@ -0,0 +1,84 @@
+from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.services import edit_knowledge_cache as cache_module
+from app.domains.seo_article.services.edit_knowledge_cache import EditKnowledgeCache, estimate_knowledge_size
+
+
+def _knowledge(text: str = "本文") -> dict:
+    return {
+        "context": ArticleContext(initial_keywords=["札幌"], research_sources_text=text),
+        "company": {"name": "株式会社サンプル"},
+        "style_template": None,
+        "serp": None,
+        "persona": None,
+        "theme": None,
+        "context_keywords": ["札幌"],
+    }
+
+
+def test_hits_misses_and_lru_eviction_by_entry_count():
+    cache = EditKnowledgeCache(max_entries=2, max_bytes=10_000_000, ttl_seconds=60)
+    cache.put("u", "a1", _knowledge())
+    cache.put("u", "a2", _knowledge())
+    assert cache.get("u", "a1") is not None  # a1 が最近使われた側になる
+    cache.put("u", "a3", _knowledge())
+
+    assert cache.get("u", "a2") is None
+    assert cache.get("u", "a1") is not None and cache.get("u", "a3") is not None
+    stats = cache.stats.as_dict()
+    assert stats["hits"] == 3 and stats["misses"] == 1 and stats["evictions"] == 1
+    assert stats["entries"] == 2
+
+
+def test_byte_budget_evicts_and_skips_oversized_entries():
+    small = _knowledge("短い")
+    large = _knowledge("長い本文" * 5000)
+    budget = estimate_knowledge_size(small) * 2 + 10
+    cache = EditKnowledgeCache(max_entries=100, max_bytes=budget, ttl_seconds=60)
+
+    cache.put("u", "a1", small)
+    cache.put("u", "a2", _knowledge("短い"))
+    cache.put("u", "a3", _knowledge("短い"))
+    assert cache.stats.entries == 2 and cache.stats.bytes <= budget
+
+    cache.put("u", "big", large)
+    assert cache.get("u", "big") is None
+
+
+def test_entries_that_cannot_be_sized_are_not_cached(monkeypatch):
+    cache = EditKnowledgeCache(max_entries=10, max_bytes=10_000_000, ttl_seconds=60)
+    cache.put("u", "a1", _knowledge())
+
+    def fail(value):
+        raise TypeError("not serializable")
+
+    monkeypatch.setattr(cache_module, "dumps", fail)
+    assert estimate_knowledge_size(_knowledge()) is None
+    cache.put("u", "a1", _knowledge())
+    assert cache.get("u", "a1") is None
+    assert cache.stats.entries == 0 and cache.stats.bytes == 0
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = EditKnowledgeCache(max_entries=10, max_bytes=10_000_000, ttl_seconds=60)
+    cache.put("u", "a1", _knowledge())
+    now[0] += 61
+    assert cache.get("u", "a1") is None
+    assert cache.stats.entries == 0
+
+
+def test_invalidation_hooks():
+    cache = EditKnowledgeCache(max_entries=10, max_bytes=10_000_000, ttl_seconds=60)
+    cache.put("u1", "a1", _knowledge(), process_id="p1", style_template_id="s1")
+    cache.put("u1", "a2", _knowledge(), process_id="p2")
+    cache.put("u2", "a3", _knowledge(), process_id="p3", style_template_id="s1")
+    cache.put("u3", "a4", _knowledge(), process_id="p4")
+
+    assert cache.invalidate_article("a2") == 1
+    assert cache.invalidate_process("p4") == 1
+    # 組織共有のテンプレートは他ユーザーのエントリからも消える
+    assert cache.invalidate_style_template("s1") == 2
+    cache.put("u1", "a1", _knowledge())
+    assert cache.invalidate_user("u1") == 1
+    assert cache.stats.entries == 0 and cache.stats.bytes == 0
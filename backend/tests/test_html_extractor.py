@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pytest
+
+from app.infrastructure.external_apis.html_extractor import LXML_AVAILABLE, decode_html, extract_article
+
+FIXTURES = Path(__file__).parent / "fixtures" / "html"
+BACKENDS = ["html.parser"] + (["lxml"] if LXML_AVAILABLE else [])
+
+ARTICLE = """
+<html><head><title> テスト記事 </title></head><body>
+<nav><h2>メニュー</h2></nav>
+<article>
+  <h2>費用</h2>
+  <p>あいうえお かきくけこ</p>
+  <h3>内訳</h3>
+  <p>さしすせそ</p>
+  <div class="ad-banner"><p>広告の文章は数えない</p></div>
+  <h2>まとめ</h2>
+  <p>たちつてと</p>
+  <img src="/a.png"><img src="data:image/png;base64,AAAA">
+  <a href="https://example.com/x">内部</a><a href="https://other.example.org/">外部</a><a href="#top">目次</a>
+</article>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_headings_and_section_char_counts(backend):
+    result = extract_article(ARTICLE.encode("utf-8"), "utf-8", "https://example.com/article", backend=backend)
+    assert result["title"] == "テスト記事"
+    headings = result["headings"]
+    assert [(h["level"], h["text"]) for h in headings] == [(2, "費用"), (2, "まとめ")]
+    assert [(h["level"], h["text"]) for h in headings[0]["children"]] == [(3, "内訳")]
+    # 「費用」は次の h2 までの p と h3（広告枠は除く）、「内訳」は次の h2 までの p
+    assert headings[0]["char_count_section"] == len("あいうえおかきくけこ") + len("内訳") + len("さしすせそ")
+    assert headings[0]["children"][0]["char_count_section"] == len("さしすせそ")
+    assert headings[1]["char_count_section"] == len("たちつてと") + len("内部外部目次")
+    assert "tag" not in headings[0]
+    assert result["image_count"] == 1
+    assert result["external_link_count"] == 1
+    assert result["internal_link_count"] == 1
+    assert "広告" not in result["content"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_wordpress_fixture(backend):
+    result = extract_article((FIXTURES / "wordpress_article.html").read_bytes(), None, "https://www.example.jp/articles/sapporo-cost/", backend=backend)
+    assert result["title"] == "札幌で注文住宅を建てる費用相場｜内訳と予算の決め方"
+    h1 = result["headings"][0]
+    assert [h["text"] for h in h1["children"]] == ["札幌の注文住宅の費用相場", "費用の内訳", "予算の決め方", "まとめ"]
+    assert [h["text"] for h in h1["children"][0]["children"]] == ["土地ありの場合", "土地なしの場合"]
+    assert all(h["char_count_section"] > 0 for h in h1["children"])
+    assert "おすすめ記事" not in [h["text"] for h in h1["children"]]  # レコメンド枠は除外
+    assert (result["image_count"], result["video_count"], result["table_count"]) == (1, 1, 1)
+    assert result["list_item_count"] == 6
+    assert result["author_info"] == "住まいの窓口 編集部"
+    assert result["publish_date"] == "2024-03-01T09:00:00+09:00"
+    assert result["modified_date"] == "2024-05-20T12:30:00+09:00"
+    assert result["schema_types"] == ["Article", "BreadcrumbList", "FAQPage"]
+    assert "【PR】" not in result["content"]
+    assert "フラット35利用者調査" in result["content"]
+    # 各テキストは 1 回だけ数える（入れ子の div で本文が重複しない）
+    assert result["content"].count("フラット35利用者調査") == 1
+    assert result["char_count"] == len(result["content"].replace("\n\n", "").replace(" ", ""))
+
+
+def test_shift_jis_page_falls_back_to_body():
+    content = (FIXTURES / "shift_jis_body_fallback.html").read_bytes()
+    assert "髙橋" in decode_html(content)
+    result = extract_article(content, None, "https://www.example.com/seo/")
+    assert result["title"] == "ＳＥＯ対策の基本｜初心者向けガイド"
+    assert [h["text"] for h in result["headings"][0]["children"]] == ["キーワード選定", "コンテンツ作成", "内部対策"]
+    assert result["image_count"] == 1
+
+
+def test_deep_nesting_does_not_recurse():
+    depth = 5000
+    html = "<html><body><article>" + "<div>" * depth + "<h2>見出し</h2><p>" + "本文" * 20 + "</p>" + "</div>" * depth + "</article></body></html>"
+    result = extract_article(html.encode("utf-8"), "utf-8", "", backend="html.parser")
+    assert result["headings"][0]["char_count_section"] == 40
+    assert result["char_count"] == 40
+
+
+@pytest.mark.skipif(not LXML_AVAILABLE, reason="lxml is not installed")
+@pytest.mark.parametrize("name", sorted(path.name for path in FIXTURES.glob("*.html")))
+def test_backends_agree_on_fixtures(name):
+    content = (FIXTURES / name).read_bytes()
+    lxml_result = extract_article(content, None, "https://www.example.jp/", backend="lxml")
+    stdlib_result = extract_article(content, None, "https://www.example.jp/", backend="html.parser")
+    assert lxml_result["headings"] == stdlib_result["headings"]
+    assert lxml_result["char_count"] == stdlib_result["char_count"]
+    assert lxml_result["image_count"] == stdlib_result["image_count"]
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import httpx
+
+from app.infrastructure import openai_rate_limiter as limiter_module
+from app.infrastructure.openai_rate_limiter import (
+    OpenAIRateLimiter,
+    describe_request,
+    install_openai_rate_limiter,
+    parse_limit_overrides,
+    parse_reset_duration,
+)
+
+
+def test_parse_helpers():
+    assert parse_reset_duration("6m0s") == 360
+    assert parse_reset_duration("1.5s") == 1.5
+    assert parse_reset_duration("20ms") == 0.02
+    assert parse_reset_duration("7") == 7
+    assert parse_limit_overrides("gpt-5-mini=500:500000, bad, gpt-4o=10:30000") == {
+        "gpt-5-mini": (500, 500000),
+        "gpt-4o": (10, 30000),
+    }
+
+
+def test_request_and_token_buckets():
+    limiter = OpenAIRateLimiter(default_rpm=60, default_tpm=600, overrides={"gpt-4o": (2, 100000)})
+    # RPM 60 -> 1秒に1リクエスト補充
+    assert limiter.reserve("gpt-5-mini", 500, now=0.0) == 0
+    # トークン残り 100、200 トークン必要 -> 100 / (600/60) = 10 秒
+    assert limiter.reserve("gpt-5-mini", 200, now=0.0) == 10
+    assert limiter.reserve("gpt-5-mini", 200, now=10.0) == 0
+
+    # スナップショット名には基本モデルの上限が使われる
+    assert limiter.reserve("gpt-4o-2024-08-06", 1, now=0.0) == 0
+    assert limiter.reserve("gpt-4o-2024-08-06", 1, now=0.0) == 0
+    assert limiter.reserve("gpt-4o-2024-08-06", 1, now=0.0) == 30
+
+
+def test_headers_and_429_adjust_budget():
+    limiter = OpenAIRateLimiter(default_rpm=1000, default_tpm=1_000_000)
+    limiter.observe("gpt-5-mini", 200, {
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-limit-tokens": "60000",
+        "x-ratelimit-remaining-tokens": "50000",
+    }, now=0.0)
+    # 他ワーカーの消費で残量 0 -> 1リクエスト分の補充（1秒）を待つ
+    assert limiter.reserve("gpt-5-mini", 10, now=0.0) == 1
+
+    limiter.observe("gpt-5-mini", 429, {"retry-after-ms": "2500"}, now=5.0)
+    assert limiter.reserve("gpt-5-mini", 10, now=5.0) == 2.5
+    assert limiter.reserve("gpt-5-mini", 10, now=7.5) == 0
+    assert limiter.stats.rate_limited_responses == 1
+
+
+def test_describe_request_estimates_tokens():
+    body = json.dumps({"model": "gpt-5-mini", "input": "あ" * 300, "max_output_tokens": 1000}).encode()
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses", content=body)
+    model, tokens = describe_request(request)
+    assert model == "gpt-5-mini"
+    assert tokens == len(body) // 3 + 1000
+    # モデル指定のないリクエスト（トレースの送信など）は対象外
+    assert describe_request(httpx.Request("POST", "https://api.openai.com/v1/traces/ingest", json={"data": []})) is None
+    assert describe_request(httpx.Request("GET", "https://api.openai.com/v1/models")) is None
+
+
+def test_openai_requests_wait_for_budget(monkeypatch):
+    limiter = OpenAIRateLimiter(default_rpm=60, default_tpm=1_000_000)
+    monkeypatch.setattr(limiter_module, "openai_rate_limiter", limiter)
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        # 待った分だけバケットを補充する
+        for budget in limiter._budgets.values():
+            budget.requests.updated_at -= seconds
+            budget.tokens.updated_at -= seconds
+
+    monkeypatch.setattr(limiter_module.asyncio, "sleep", fake_sleep)
+    install_openai_rate_limiter()
+    limiter.budget("gpt-5-mini").requests.level = 1
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(2):
+                await client.post("https://api.openai.com/v1/responses", json={"model": "gpt-5-mini", "input": "hi"})
+            # OpenAI 以外は制限しない
+            await client.post("https://example.com/v1/responses", json={"model": "gpt-5-mini"})
+
+    asyncio.run(scenario())
+    assert len(sleeps) == 1 and 0.9 < sleeps[0] <= 1.0
+    assert limiter.stats.requests == 2 and limiter.stats.throttled_requests == 1
+
+
+def test_sync_acquire_does_not_sleep_on_event_loop(monkeypatch):
+    limiter = OpenAIRateLimiter(default_rpm=1, default_tpm=1_000_000)
+    sleeps = []
+    monkeypatch.setattr(limiter_module.time, "sleep", sleeps.append)
+
+    async def scenario():
+        limiter.acquire_sync("gpt-5-mini", 10)
+        # 2回目は予約できないが、イベントループを止めないよう待たずに戻る
+        return limiter.acquire_sync("gpt-5-mini", 10)
+
+    assert asyncio.run(scenario()) == 0
+    assert sleeps == []
+    assert limiter.stats.sync_calls_on_loop == 1
+    assert limiter.stats.requests == 2
@@ -0,0 +1,113 @@
+import asyncio
+
+from app.core.config import settings
+from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.schemas import (
+    ArticleSectionWithImages,
+    ImagePlaceholderData,
+    OutlineData,
+    OutlineSectionData,
+    SectionContinuityReport,
+    SectionTransition,
+)
+from app.domains.seo_article.services._generation_flow_manager import GenerationFlowManager
+
+
+class _FakeFlowManager(GenerationFlowManager):
+    """run_agent をメモリ上で再現し、後ろのセクションほど早く終わるようにする"""
+
+    def __init__(self, transitions=()):
+        super().__init__(service=None)
+        self.transitions = list(transitions)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.section_inputs = {}
+        self.completion_order = []
+
+    def _build_step_run_config(self, context, process_id, current_step, extra_metadata=None):
+        return None
+
+    async def run_agent(self, agent, input_data, context, run_config):
+        if agent.name == "SectionContinuityAgent":
+            return SectionContinuityReport(transitions=self.transitions)
+        index = context.current_section_index
+        self.section_inputs[index] = input_data
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01 * (5 - index))
+        self.in_flight -= 1
+        self.completion_order.append(index)
+        return ArticleSectionWithImages(
+            title=f"s{index}",
+            content=f"<h2>s{index}</h2><p>body {index}</p>",
+            order=index,
+            images=[ImagePlaceholderData(
+                placeholder_id=f"section{index + 1}_img01",
+                description_jp="説明",
+                prompt_en="prompt",
+                alt_text="alt",
+            )],
+        )
+
+
+def _context(section_count=4, **kwargs):
+    context = ArticleContext(image_mode=True, **kwargs)
+    context.generated_outline = OutlineData(
+        title="サンプル記事",
+        suggested_tone="",
+        top_level_heading=2,
+        sections=[OutlineSectionData(heading=f"見出し{i}", level=2) for i in range(section_count)],
+    )
+    context.add_to_section_writer_history("system", "以前の履歴")
+    return context
+
+
+def test_sections_are_written_concurrently_and_kept_in_outline_order(monkeypatch):
+    monkeypatch.setattr(settings, "parallel_section_writing_concurrency", 4)
+    monkeypatch.setattr(settings, "parallel_section_continuity_pass", True)
+    manager = _FakeFlowManager(transitions=[
+        SectionTransition(section_index=0, bridge_html="次に詳しく見ていきます。"),
+        SectionTransition(section_index=1, bridge_html="<h3>不正</h3>"),
+        SectionTransition(section_index=3, bridge_html="<p>最後には付けない</p>"),
+    ])
+    context = _context()
+    completed = []
+
+    async def on_section_completed(i, section, content, placeholders):
+        completed.append((i, section.heading, [p.placeholder_id for p in placeholders]))
+
+    asyncio.run(manager.write_sections_parallel(context, on_section_completed=on_section_completed))
+
+    assert manager.max_in_flight == 4
+    assert manager.completion_order == [3, 2, 1, 0]
+    assert [i for i, _, _ in completed] == [3, 2, 1, 0]
+    assert completed[0] == (3, "見出し3", ["section4_img01"])
+    # 各セクションは履歴を持ち回らず、自分のインデックスで執筆する
+    assert all(len(messages) == 1 for messages in manager.section_inputs.values())
+    assert context.section_writer_history[0]["content"][0]["text"] == "以前の履歴"
+
+    assert context.generated_sections_html == [
+        "<h2>s0</h2><p>body 0</p>\n<p>次に詳しく見ていきます。</p>",
+        "<h2>s1</h2><p>body 1</p>",
+        "<h2>s2</h2><p>body 2</p>",
+        "<h2>s3</h2><p>body 3</p>",
+    ]
+    assert [s.order for s in context.generated_sections] == [0, 1, 2, 3]
+    assert [p.placeholder_id for p in context.image_placeholders] == [
+        "section1_img01", "section2_img01", "section3_img01", "section4_img01",
+    ]
+    assert context.current_section_index == 4
+
+
+def test_resume_only_writes_missing_sections(monkeypatch):
+    monkeypatch.setattr(settings, "parallel_section_writing_concurrency", 2)
+    monkeypatch.setattr(settings, "parallel_section_continuity_pass", False)
+    manager = _FakeFlowManager()
+    context = _context(section_count=3, generated_sections_html=["<p>done</p>", ""])
+
+    asyncio.run(manager.write_sections_parallel(context))
+
+    assert sorted(manager.section_inputs) == [1, 2]
+    assert manager.max_in_flight == 2
+    assert context.generated_sections_html[0] == "<p>done</p>"
+    assert context.generated_sections_html[1:] == ["<h2>s1</h2><p>body 1</p>", "<h2>s2</h2><p>body 2</p>"]
@@ -0,0 +1,100 @@
+import threading
+import time
+
+from app.infrastructure.persistent_cache import PersistentCache
+
+
+def _cache(tmp_path, **kwargs):
+    options = {"namespace": "test", "max_bytes": 1024, "default_ttl": 60}
+    options.update(kwargs)
+    return PersistentCache(path=str(tmp_path / "cache.sqlite3"), **options)
+
+
+def test_round_trip_and_expiry(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get("k") is None
+    assert cache.set("k", {"title": "東京", "items": [1, 2]})
+    assert cache.get("k") == {"title": "東京", "items": [1, 2]}
+
+    cache.set("old", "v", ttl=-1)
+    assert cache.get("old") is None
+    assert cache.stats.expirations == 1
+    assert cache.metrics()["hit_rate"] == 1 / 3
+
+    # 同じファイルでも名前空間が違えば別のキャッシュ
+    other = _cache(tmp_path, namespace="other")
+    assert other.get("k") is None
+    # 別インスタンス（別ワーカー）からも読める
+    assert _cache(tmp_path).get("k") == {"title": "東京", "items": [1, 2]}
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, max_bytes=250)
+    value = "x" * 100  # JSON で 102 バイト
+    cache.set("a", value)
+    time.sleep(0.01)
+    cache.set("b", value)
+    time.sleep(0.01)
+    assert cache.get("a") == value  # a を最近参照したことにする
+    time.sleep(0.01)
+    cache.set("c", value)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == value
+    assert cache.get("c") == value
+    assert cache.stats.evictions == 1
+    assert cache.usage() == {"entries": 2, "bytes": 204}
+
+    # 1件で上限を超える値は保存しない
+    assert not cache.set("huge", "x" * 300)
+    assert cache.get("huge") is None
+
+
+def test_errors_degrade_to_misses(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = PersistentCache(path=str(blocker / "cache.sqlite3"), namespace="test", max_bytes=1024, default_ttl=60)
+    assert not cache.set("k", "v")
+    assert cache.get("k") is None
+    assert cache.stats.errors == 2
+
+
+def test_metrics_use_tracked_usage_without_querying_sqlite(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("a", "x" * 100)
+    cache.set("b", "y" * 10)
+    cache.set("c", "z", ttl=-1)
+    assert cache.get("c") is None  # 期限切れの削除
+    cache.delete("b")
+
+    # /metrics はイベントループ上で呼ばれるため、SQLite に触れずに集計値を返す
+    def fail_connect():
+        raise AssertionError("metrics must not touch SQLite")
+
+    cache._connect = fail_connect
+    metrics = cache.metrics()
+    assert (metrics["entries"], metrics["bytes"]) == (1, 102)
+    assert metrics["writes"] == 3 and metrics["expirations"] == 1
+
+    # 既存ファイルを開いたインスタンスは接続時に集計する
+    reopened = _cache(tmp_path)
+    assert reopened.get("a") == "x" * 100
+    assert reopened.usage() == {"entries": 1, "bytes": 102}
+
+
+def test_counters_are_consistent_across_threads(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("k", "v")
+
+    def lookups():
+        for index in range(100):
+            cache.get("k" if index % 2 else "missing")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"]) == (400, 400)
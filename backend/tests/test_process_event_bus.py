@@ -0,0 +1,75 @@
+import asyncio
+
+from app.domains.seo_article.services import process_event_bus as bus_module
+from app.domains.seo_article.services.process_event_bus import ProcessEventBus
+
+
+def _event_types(call):
+    return [event["event_type"] for event in call.payload["p_events"]]
+
+
+def test_progress_events_are_coalesced_and_order_is_kept(fake_supabase):
+    client = fake_supabase(bus_module)
+    bus = ProcessEventBus(flush_interval=60, max_buffered=100)
+
+    async def scenario():
+        await bus.publish("p1", "research_started", {})
+        for completed in range(1, 4):
+            await bus.publish("p1", "research_progress", {"completed_queries": completed})
+        await bus.publish("p1", "section_completed", {"section_index": 0})
+        assert client.calls == []
+        await bus.close()
+
+    asyncio.run(scenario())
+
+    assert len(client.calls) == 1
+    params = client.calls[0].payload
+    assert client.calls[0].target == "create_process_events_batch"
+    assert params["p_process_id"] == "p1"
+    assert _event_types(client.calls[0]) == ["research_started", "research_progress", "section_completed"]
+    assert params["p_events"][1]["event_data"] == {"completed_queries": 3}
+
+
+def test_boundary_events_flush_immediately(fake_supabase):
+    client = fake_supabase(bus_module)
+    bus = ProcessEventBus(flush_interval=60, max_buffered=100)
+
+    async def scenario():
+        await bus.publish("p1", "step_started", {})
+        await bus.publish("p1", "step_completed", {})
+        assert bus.buffered_count == 0
+
+    asyncio.run(scenario())
+
+    assert [_event_types(call) for call in client.calls] == [["step_started", "step_completed"]]
+
+
+def test_full_buffer_applies_backpressure(fake_supabase):
+    client = fake_supabase(bus_module)
+    bus = ProcessEventBus(flush_interval=60, max_buffered=2)
+
+    async def scenario():
+        for index in range(5):
+            await bus.publish("p1", "section_started", {"index": index})
+            assert bus.buffered_count <= 2
+        await bus.close()
+
+    asyncio.run(scenario())
+
+    indexes = [event["event_data"]["index"] for call in client.calls for event in call.payload["p_events"]]
+    assert indexes == [0, 1, 2, 3, 4]
+
+
+def test_failed_batch_is_requeued_ahead_of_newer_events(fake_supabase):
+    client = fake_supabase(bus_module)
+    client.fail_next = 1
+    bus = ProcessEventBus(flush_interval=60, max_buffered=100)
+
+    async def scenario():
+        await bus.publish("p1", "step_started", {})
+        await bus.flush("p1")
+        await bus.publish("p1", "step_completed", {})
+
+    asyncio.run(scenario())
+
+    assert [_event_types(call) for call in client.calls] == [["step_started", "step_completed"]]
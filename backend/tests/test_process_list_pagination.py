@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.domains.seo_article.services import _process_persistence_service as persistence_module
+from app.domains.seo_article.services._process_persistence_service import ProcessPersistenceService
+
+ARTICLE_ID = "11111111-1111-1111-1111-111111111111"
+PROCESS_ID = "22222222-2222-2222-2222-222222222222"
+
+
+def _install_fake_client(fake_supabase, rows):
+    def handle(request):
+        assert request.operation == "rpc", f"一覧取得でテーブル {request.target} を直接読んではいけない"
+        return rows
+
+    return fake_supabase(persistence_module, handle)
+
+
+def _rows():
+    return [
+        {
+            "id": PROCESS_ID,
+            "process_type": "generation",
+            "process_id": PROCESS_ID,
+            "title": None,
+            "excerpt": None,
+            "status": "user_input_required",
+            "keywords": ["札幌", "注文住宅", "工務店", "断熱"],
+            "target_audience": "30代夫婦",
+            "current_step_name": "theme_proposed",
+            "progress_percentage": None,
+            "is_waiting_for_input": True,
+            "error_message": None,
+            "created_at": "2026-10-15T09:00:00+00:00",
+            "updated_at": "2026-10-16T09:00:00+00:00",
+        },
+        {
+            "id": ARTICLE_ID,
+            "process_type": "article",
+            "process_id": None,
+            "title": "札幌の注文住宅",
+            "excerpt": "あ" * 151,
+            "status": "completed",
+            "keywords": None,
+            "target_audience": None,
+            "current_step_name": None,
+            "progress_percentage": None,
+            "is_waiting_for_input": None,
+            "error_message": None,
+            "created_at": "2026-10-14T09:00:00+00:00",
+            "updated_at": "2026-10-15T09:00:00+00:00",
+        },
+    ]
+
+
+def test_rows_are_formatted_like_the_legacy_list(fake_supabase):
+    client = _install_fake_client(fake_supabase, _rows())
+    service = ProcessPersistenceService(service=None)
+
+    process, article = asyncio.run(service.get_all_user_processes("user", limit=2))
+
+    assert [(call.target, call.payload) for call in client.calls] == [(
+        "get_user_process_list",
+        {"p_user_id": "user", "p_status_filter": None, "p_limit": 2, "p_offset": 0},
+    )]
+    assert process["title"] == "SEO記事: 札幌, 注文住宅, 工務店"
+    assert process["shortdescription"] == "テーマ選択待ち"
+    assert process["can_resume"] is True and process["progress_percentage"] == 0
+    assert article["shortdescription"] == "あ" * 150 + "..."
+    assert article["postdate"] == "2026-10-14"
+    assert article["can_resume"] is False
+
+
+def test_cursor_round_trip_is_passed_as_keyset(fake_supabase):
+    client = _install_fake_client(fake_supabase, [])
+    service = ProcessPersistenceService(service=None)
+    last_item = {"id": ARTICLE_ID, "updated_at": "2026-10-15T09:00:00+00:00"}
+
+    cursor = ProcessPersistenceService.encode_process_cursor(last_item)
+    asyncio.run(service.get_all_user_processes("user", status_filter="error", limit=20, cursor=cursor))
+
+    params = client.calls[0].payload
+    assert params["p_cursor_updated_at"] == "2026-10-15T09:00:00+00:00"
+    assert params["p_cursor_id"] == ARTICLE_ID
+    assert params["p_status_filter"] == "error"
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        ProcessPersistenceService.decode_process_cursor("not-a-cursor")
+
+
+def test_short_description_uses_precomputed_excerpt():
+    article = {"excerpt": "い" * 300, "char_count": 5000, "content": None}
+    assert ProcessPersistenceService._short_description(article, 150) == "い" * 150 + "..."
+    assert ProcessPersistenceService._short_description({"excerpt": "短い本文", "char_count": 4}, 150) == "短い本文"
+    # トリガー導入前の行は本文から作る
+    legacy = {"excerpt": None, "content": "<h2>見出し</h2><p>本文</p>"}
+    assert ProcessPersistenceService._short_description(legacy, 150) == "見出し本文"
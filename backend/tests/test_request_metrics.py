@@ -0,0 +1,69 @@
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.infrastructure import request_metrics
+from app.infrastructure.request_metrics import (
+    RequestMetricsMiddleware,
+    classify_upstream,
+    install_http_instrumentation,
+    render_prometheus,
+)
+
+
+def _upstream_transport():
+    return httpx.MockTransport(lambda request: httpx.Response(200, json={"host": request.url.host}))
+
+
+def _build_app() -> FastAPI:
+    install_http_instrumentation()
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: str):
+        async with httpx.AsyncClient(transport=_upstream_transport()) as client:
+            for _ in range(3):
+                await client.get("https://demo.supabase.co/rest/v1/articles")
+            await client.post("https://api.openai.com/v1/responses")
+        return {"item_id": item_id}
+
+    @app.get("/sync")
+    def read_sync():
+        # 同期エンドポイント（スレッドプール実行）からの呼び出しもリクエストに紐づく
+        with httpx.Client(transport=_upstream_transport()) as client:
+            client.get("https://api.clerk.com/v1/users")
+        return {}
+
+    return app
+
+
+def test_classify_upstream():
+    assert classify_upstream("abc.supabase.co") == "supabase"
+    assert classify_upstream("api.openai.com") == "openai"
+    assert classify_upstream("api.clerk.com") == "clerk"
+    assert classify_upstream("serpapi.com") == "http"
+
+
+def test_server_timing_header_and_route_metrics(monkeypatch):
+    monkeypatch.setattr(settings, "request_metrics_db_call_warn_threshold", 0)
+    request_metrics.reset_metrics()
+    client = TestClient(_build_app())
+
+    first = client.get("/items/1")
+    client.get("/items/2")
+    sync = client.get("/sync")
+
+    timing = first.headers["server-timing"]
+    # ヘッダーはレスポンス開始時点までの呼び出しを含む
+    assert 'supabase;dur=' in timing and 'desc="3 calls"' in timing
+    assert 'openai;dur=' in timing and "total;dur=" in timing
+    assert 'clerk;dur=' in sync.headers["server-timing"]
+
+    metrics = render_prometheus()
+    labels = 'method="GET",route="/items/{item_id}",status="200"'
+    assert f"http_requests_total{{{labels}}} 2" in metrics
+    assert f'http_request_upstream_calls_total{{{labels},upstream="supabase"}} 6' in metrics
+    assert f'http_request_upstream_calls_max{{{labels},upstream="supabase"}} 3' in metrics
+    assert 'http_request_upstream_calls_total{method="GET",route="/sync",status="200",upstream="clerk"} 1' in metrics
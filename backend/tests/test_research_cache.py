@@ -0,0 +1,61 @@
+import asyncio
+
+from app.core.config import settings
+from app.domains.seo_article.schemas import ResearchQueryResult, SourceSnippet
+from app.domains.seo_article.services.research_cache import (
+    ResearchCache,
+    make_key,
+    normalize_query,
+    prompt_scope,
+    search_locale,
+)
+from app.infrastructure.persistent_cache import PersistentCache
+
+
+def test_query_normalization_and_key():
+    assert normalize_query("札幌　注文住宅 「費用」") == "札幌 注文住宅 費用"
+    assert normalize_query("ＳＥＯ  対策") == "seo 対策"
+    assert make_key("札幌 注文住宅", "JP", 100) == make_key("札幌　注文住宅", "JP", 100)
+    # 語順は検索結果に影響するので別のキーにする
+    assert make_key("札幌 注文住宅", "JP", 100) != make_key("注文住宅 札幌", "JP", 100)
+    assert make_key("札幌 注文住宅", "JP", 100) != make_key("札幌 注文住宅", "US", 100)
+    assert make_key("札幌 注文住宅", "JP", 100) != make_key("札幌 注文住宅", "JP", 101)
+    scope_a = prompt_scope("企業名: A工務店", "札幌の注文住宅", "費用相場")
+    scope_b = prompt_scope("企業名: B工務店", "札幌の注文住宅", "費用相場")
+    assert scope_a == prompt_scope("企業名: A工務店", "札幌の注文住宅", "費用相場")
+    assert make_key("札幌 注文住宅", "JP", 100, scope_a) != make_key("札幌 注文住宅", "JP", 100, scope_b)
+    assert search_locale({"type": "approximate", "country": "JP"}) == "JP"
+    assert search_locale(None) == ""
+
+
+def test_results_are_shared_until_bypassed(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "research_cache_enabled", True)
+    cache = ResearchCache(PersistentCache(str(tmp_path / "cache.sqlite3"), "research_query", 1024 * 1024, 60))
+    result = ResearchQueryResult(
+        query="札幌 注文住宅 費用",
+        results=[SourceSnippet(title="相場", url="https://example.com", snippet="平均3,000万円")],
+        summary="費用の目安",
+    )
+
+    scope = prompt_scope("企業名: A工務店", "札幌の注文住宅", "費用相場")
+
+    async def scenario():
+        miss = await cache.get("札幌 注文住宅 費用", "JP", scope)
+        await cache.put("札幌 注文住宅 費用", "JP", result, scope)
+        hit = await cache.get("札幌　注文住宅　費用", "JP", scope)
+        bypassed = await cache.get("札幌 注文住宅 費用", "JP", scope, bypass=True)
+        other_locale = await cache.get("札幌 注文住宅 費用", "US", scope)
+        other_company = await cache.get("札幌 注文住宅 費用", "JP", prompt_scope("企業名: B工務店", "札幌の注文住宅", "費用相場"))
+        return miss, hit, bypassed, other_locale, other_company
+
+    miss, hit, bypassed, other_locale, other_company = asyncio.run(scenario())
+    assert miss is None
+    assert hit == result
+    assert bypassed is None
+    assert other_locale is None
+    assert other_company is None
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 3
+    assert metrics["bypassed"] == 1
+    assert metrics["entries"] == 1
@@ -0,0 +1,92 @@
+import asyncio
+
+from app.infrastructure.external_apis.scrape_cache import ScrapeCache, normalize_url
+from app.infrastructure.persistent_cache import PersistentCache
+
+
+def _result(title="費用の相場"):
+    return {
+        "title": title,
+        "headings": [{"level": 2, "text": "相場", "children": [], "char_count_section": 120, "semantic_type": "body"}],
+        "content": "本文",
+        "char_count": 1200,
+        "image_count": 3,
+    }
+
+
+def test_url_normalization():
+    assert normalize_url("HTTPS://Example.com:443/a?b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("https://example.com/a?utm_source=x&gclid=y") == "https://example.com/a"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+
+    def make_cache():
+        return ScrapeCache(PersistentCache(path, "scrape_result", 1024 * 1024, 60), memory_max_bytes=1024 * 1024, ttl=60)
+
+    async def scenario():
+        first, second = make_cache(), make_cache()
+        await first.put("https://example.com/a?utm_source=x", _result())
+        memory_hit = await first.get("https://example.com/a")
+        disk_hit = await second.get("https://EXAMPLE.com/a#section")
+        promoted = await second.get("https://example.com/a")
+        miss = await second.get("https://example.com/b")
+        return first, second, memory_hit, disk_hit, promoted, miss
+
+    first, second, memory_hit, disk_hit, promoted, miss = asyncio.run(scenario())
+    assert memory_hit == disk_hit == promoted == _result()
+    assert miss is None
+    assert first.metrics()["memory_hits"] == 1
+    assert second.metrics()["disk_hits"] == 1
+    assert second.metrics()["memory_hits"] == 1
+    assert second.metrics()["misses"] == 1
+
+
+def test_metrics_do_not_query_disk_tier(tmp_path):
+    store = PersistentCache(str(tmp_path / "cache.sqlite3"), "scrape_result", 1024 * 1024, 60)
+    cache = ScrapeCache(store, memory_max_bytes=1024 * 1024, ttl=60)
+    asyncio.run(cache.put("https://example.com/a", _result()))
+
+    def fail_connect():
+        raise AssertionError("metrics must not touch SQLite")
+
+    store._connect = fail_connect
+    metrics = cache.metrics()
+    assert metrics["disk_entries"] == 1
+    assert metrics["disk_bytes"] > 0
+    assert metrics["disk_errors"] == 0
+
+
+def test_memory_tier_evicts_by_bytes_and_returns_copies():
+    cache = ScrapeCache(None, memory_max_bytes=400, ttl=60)
+
+    async def scenario():
+        for i in range(4):
+            await cache.put(f"https://example.com/{i}", _result(f"記事{i}"))
+        hit = await cache.get("https://example.com/3")
+        hit["headings"].clear()
+        again = await cache.get("https://example.com/3")
+        evicted = await cache.get("https://example.com/0")
+        return again, evicted
+
+    again, evicted = asyncio.run(scenario())
+    assert again == _result("記事3")
+    assert evicted is None
+    metrics = cache.metrics()
+    assert metrics["memory_evictions"] >= 1
+    assert metrics["memory_bytes"] <= 400
+    assert "disk_entries" not in metrics
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ScrapeCache(None, memory_max_bytes=1024, ttl=60, enabled=False)
+
+    async def scenario():
+        await cache.put("https://example.com/a", _result())
+        return await cache.get("https://example.com/a")
+
+    assert asyncio.run(scenario()) is None
+    assert cache.metrics()["memory_entries"] == 0
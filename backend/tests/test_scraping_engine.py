@@ -0,0 +1,58 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+from app.infrastructure.external_apis.scraping_engine import ScrapingEngine, _PhaseTrace
+
+
+def _engine_with_transport(handler):
+    engine = ScrapingEngine()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+    engine._get_client = lambda: client
+    return engine, client
+
+
+def test_fetch_truncates_large_responses(monkeypatch):
+    monkeypatch.setattr(settings, "scraping_max_response_bytes", 1024)
+
+    def handler(request):
+        return httpx.Response(200, content=b"a" * 4096, headers={"Content-Type": "text/html; charset=utf-8"})
+
+    async def scenario():
+        engine, client = _engine_with_transport(handler)
+        result = await engine.fetch("https://example.com/article")
+        await client.aclose()
+        return engine, result
+
+    engine, result = asyncio.run(scenario())
+    assert result.status_code == 200
+    assert result.truncated
+    assert len(result.content) == 1024
+    assert result.encoding == "utf-8"
+    assert "download" in result.timings
+    assert engine.metrics()["bytes"] == 1024
+
+
+def test_phase_trace_and_parse_pool():
+    async def scenario():
+        trace = _PhaseTrace()
+        for event in (
+            "connection.connect_tcp.started",
+            "connection.connect_tcp.complete",
+            "connection.start_tls.started",
+            "connection.start_tls.complete",
+            "http11.send_request_headers.started",
+            "http11.receive_response_headers.started",
+            "http11.receive_response_headers.complete",
+        ):
+            await trace(event, {})
+        engine = ScrapingEngine()
+        parsed = await engine.parse(lambda content: content.decode("utf-8").upper(), b"<h2>title</h2>")
+        await engine.aclose()
+        return trace, engine, parsed
+
+    trace, engine, parsed = asyncio.run(scenario())
+    assert set(trace.timings) == {"connect", "tls", "wait"}
+    assert parsed == "<H2>TITLE</H2>"
+    assert engine.metrics()["parses"] == 1
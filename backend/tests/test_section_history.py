@@ -0,0 +1,64 @@
+from app.core.config import settings
+from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.services.section_history import (
+    build_section_writer_input,
+    compact_section_history,
+    estimate_tokens,
+    summarize_section,
+)
+
+
+def _history(section_count):
+    context = ArticleContext()
+    context.add_to_section_writer_history("system", "リサーチ情報" * 50)
+    for i in range(section_count):
+        context.add_to_section_writer_history("user", f"セクション {i + 1} を執筆してください。")
+        context.add_to_section_writer_history(
+            "assistant", f"<h2>見出し{i}</h2><p>{'本文' * 200}</p><!-- IMAGE_PLACEHOLDER: s{i}|説明|prompt -->"
+        )
+    return context
+
+
+def test_summary_keeps_heading_and_opening():
+    summary = summarize_section("<h2>費用の&amp;目安</h2>\n<p>結論から言うと <b>30万円</b> です。</p><p>詳細</p>", 12)
+    assert summary == "[執筆済みセクションの要約] 費用の&目安\n結論から言うと 30万円…"
+
+
+def test_recent_sections_verbatim_and_prefix_stable():
+    context = _history(5)
+    compacted = compact_section_history(context.section_writer_history, window=2, summary_chars=50)
+
+    # system + 要約3件 + 直近2セクションの user/assistant
+    assert [m["role"] for m in compacted] == ["system"] + ["assistant"] * 3 + ["user", "assistant"] * 2
+    assert compacted[0] is context.section_writer_history[0]
+    assert compacted[-4:] == context.section_writer_history[-4:]
+    assert compacted[1]["content"][0]["text"].startswith("[執筆済みセクションの要約] 見出し0")
+
+    # 次のセクションでも、要約済みの先頭部分はバイト単位で変わらない
+    context.add_to_section_writer_history("user", "セクション 6 を執筆してください。")
+    context.add_to_section_writer_history("assistant", "<h2>見出し5</h2><p>本文</p>")
+    next_compacted = compact_section_history(context.section_writer_history, window=2, summary_chars=50)
+    assert next_compacted[:4] == compacted[:4]
+    assert len(next_compacted) == len(compacted) + 1
+
+
+def test_build_input_records_token_report(monkeypatch):
+    monkeypatch.setattr(settings, "section_writer_history_compaction", True)
+    monkeypatch.setattr(settings, "section_writer_history_window", 1)
+    monkeypatch.setattr(settings, "section_writer_history_summary_chars", 40)
+    context = _history(6)
+
+    messages = build_section_writer_input(context, "セクション 7 を執筆してください。")
+
+    assert messages[-1]["content"][0]["text"] == "セクション 7 を執筆してください。"
+    assert len(context.section_writer_history) == 13  # 保存される履歴は圧縮しない
+    report = context.section_writer_token_report
+    assert report["sections"] == 1
+    assert report["compacted_input_tokens"] == estimate_tokens(messages)
+    assert report["compacted_input_tokens"] < report["full_history_input_tokens"] / 2
+    assert report["saved_input_tokens"] == report["full_history_input_tokens"] - report["compacted_input_tokens"]
+
+    monkeypatch.setattr(settings, "section_writer_history_compaction", False)
+    messages = build_section_writer_input(context, "セクション 7 を執筆してください。")
+    assert len(messages) == 14
+    assert report["sections"] == 2
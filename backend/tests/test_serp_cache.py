@@ -0,0 +1,112 @@
+import asyncio
+
+from app.core.config import settings
+from app.infrastructure.external_apis.serp_cache import SerpResponseCache, make_key
+from app.infrastructure.persistent_cache import PersistentCache
+
+PARAMS = {"engine": "google", "q": "札幌 注文住宅", "gl": "jp", "hl": "ja", "device": "desktop"}
+
+
+def _cache(tmp_path):
+    return SerpResponseCache(PersistentCache(str(tmp_path / "cache.sqlite3"), "serpapi_response", 1024 * 1024, 3600))
+
+
+class _Api:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def search(self):
+        self.calls += 1
+        await self.release.wait()
+        return {"organic_results": [{"link": f"https://example.com/{self.calls}"}]}
+
+
+def test_key_depends_on_locale_device_and_day():
+    key = make_key(PARAMS, 100)
+    assert key == make_key({**PARAMS, "q": "札幌　注文住宅 "}, 100)
+    assert key != make_key({**PARAMS, "gl": "us"}, 100)
+    assert key != make_key({**PARAMS, "device": "mobile"}, 100)
+    assert key != make_key(PARAMS, 101)
+
+
+def test_fresh_hits_and_concurrent_misses_share_one_call(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "serp_cache_enabled", True)
+    monkeypatch.setattr(settings, "serp_cache_fresh_seconds", 3600)
+    cache = _cache(tmp_path)
+
+    async def scenario():
+        api = _Api()
+        api.release.clear()
+        first = [asyncio.create_task(cache.get_or_fetch(PARAMS, api.search)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        api.release.set()
+        concurrent = await asyncio.gather(*first)
+        cached = await cache.get_or_fetch({**PARAMS, "q": "札幌 注文住宅 "}, api.search)
+        return api, concurrent, cached
+
+    api, concurrent, cached = asyncio.run(scenario())
+    assert api.calls == 1
+    assert all(result == concurrent[0] for result in concurrent)
+    assert cached == concurrent[0]
+    metrics = cache.metrics()
+    assert metrics["api_calls"] == 1
+    assert metrics["saved_calls"] == 3
+    assert metrics["entries"] == 1
+
+
+def test_stale_entry_is_served_while_revalidating(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "serp_cache_enabled", True)
+    cache = _cache(tmp_path)
+
+    async def scenario():
+        api = _Api()
+        original = await cache.get_or_fetch(PARAMS, api.search)
+        monkeypatch.setattr(settings, "serp_cache_fresh_seconds", 0)
+        stale = await cache.get_or_fetch(PARAMS, api.search)
+        await asyncio.gather(*cache._background)
+        monkeypatch.setattr(settings, "serp_cache_fresh_seconds", 3600)
+        refreshed = await cache.get_or_fetch(PARAMS, api.search)
+        return api, original, stale, refreshed
+
+    api, original, stale, refreshed = asyncio.run(scenario())
+    assert stale == original
+    assert refreshed != original
+    assert api.calls == 2
+    metrics = cache.metrics()
+    assert metrics["stale_hits"] == 1
+    assert metrics["revalidations"] == 1
+    assert metrics["hits"] == 1
+
+
+def test_errors_are_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "serp_cache_enabled", True)
+    cache = _cache(tmp_path)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        return {"error": "Invalid API key"}
+
+    async def scenario():
+        await cache.get_or_fetch(PARAMS, failing)
+        return await cache.get_or_fetch(PARAMS, failing)
+
+    assert asyncio.run(scenario()) == {"error": "Invalid API key"}
+    assert len(calls) == 2
+    assert cache.metrics()["entries"] == 0
+
+
+def test_metrics_do_not_query_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "serp_cache_enabled", True)
+    cache = _cache(tmp_path)
+    asyncio.run(cache.get_or_fetch(PARAMS, _Api().search))
+
+    def fail_connect():
+        raise AssertionError("metrics must not touch SQLite")
+
+    cache.store._connect = fail_connect
+    metrics = cache.metrics()
+    assert metrics["entries"] == 1
+    assert metrics["bytes"] > 0
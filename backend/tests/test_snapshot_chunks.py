@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+from app.core.config import settings
+from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.services import _process_persistence_service as persistence_module
+from app.domains.seo_article.services._process_persistence_service import ProcessPersistenceService
+from app.domains.seo_article.services.context_serializer import context_to_dict
+
+PROCESS_ID = "00000000-0000-0000-0000-000000000002"
+
+
+class _ChunkStore:
+    """save_step_snapshot_chunked が参照するチャンクの保存状態を再現する"""
+
+    def __init__(self):
+        self.stored_chunks = set()
+        self.chunk_payloads = {}
+        self.snapshots = 0
+
+    def handle(self, request):
+        params = request.payload
+        if request.target == "save_step_snapshot_chunked":
+            missing = set(params["p_chunk_refs"].values()) - self.stored_chunks - set(params["p_chunks"])
+            if missing:
+                raise RuntimeError(f"missing_context_chunks: {','.join(sorted(missing))}")
+            self.stored_chunks.update(params["p_chunks"])
+            self.chunk_payloads.update(params["p_chunks"])
+        self.snapshots += 1
+        return f"snapshot-{self.snapshots}"
+
+
+def _install_fake_client(monkeypatch, fake_supabase, chunking: bool):
+    store = _ChunkStore()
+    monkeypatch.setattr(settings, "context_snapshot_chunking", chunking)
+    return fake_supabase(persistence_module, store.handle), store
+
+
+def _bytes_written(client) -> int:
+    return sum(len(json.dumps(call.payload, ensure_ascii=False).encode("utf-8")) for call in client.calls)
+
+
+def _build_context() -> ArticleContext:
+    context = ArticleContext(initial_keywords=["札幌", "注文住宅"], target_length=12000)
+    context.research_sources_text = "出典テキスト " * 6000
+    context.serp_analysis_report = {"keyword": "札幌 注文住宅", "articles": ["上位記事の本文" * 200] * 10}
+    return context
+
+
+def _snapshot_user_input_steps(service: ProcessPersistenceService, context: ArticleContext) -> None:
+    async def scenario():
+        for step in ["persona_generated", "theme_proposed", "outline_generated"]:
+            context.current_step = step
+            context.selected_detailed_persona = f"{step} を経たペルソナ"
+            await service.save_step_snapshot(PROCESS_ID, step, context)
+
+    asyncio.run(scenario())
+
+
+def test_unchanged_fields_are_sent_once_and_reassemble(monkeypatch, fake_supabase):
+    client, store = _install_fake_client(monkeypatch, fake_supabase, chunking=True)
+    service = ProcessPersistenceService(service=None)
+    context = _build_context()
+
+    _snapshot_user_input_steps(service, context)
+
+    assert client.targets() == ["save_step_snapshot_chunked"] * 3
+    first, second = client.calls[0].payload, client.calls[1].payload
+    # 2回目以降は current_step / selected_detailed_persona の新しい値だけが送られる
+    assert len(second["p_chunks"]) == 2
+    assert first["p_chunk_refs"]["research_sources_text"] == second["p_chunk_refs"]["research_sources_text"]
+
+    refs = client.calls[-1].payload["p_chunk_refs"]
+    assembled = {key: store.chunk_payloads[content_hash] for key, content_hash in refs.items()}
+    assert assembled == json.loads(json.dumps(context_to_dict(context)))
+
+
+def test_stale_chunk_cache_resends_all_chunks(monkeypatch, fake_supabase):
+    client, store = _install_fake_client(monkeypatch, fake_supabase, chunking=True)
+    service = ProcessPersistenceService(service=None)
+    context = _build_context()
+
+    async def scenario():
+        await service.save_step_snapshot(PROCESS_ID, "persona_generated", context)
+        # DB 側でチャンクが消えた（古いスナップショットの削除など）
+        store.stored_chunks.clear()
+        context.current_step = "theme_proposed"
+        return await service.save_step_snapshot(PROCESS_ID, "theme_proposed", context)
+
+    snapshot_id = asyncio.run(scenario())
+
+    assert snapshot_id is not None
+    retry_params = client.calls[-1].payload
+    assert set(retry_params["p_chunks"]) == set(retry_params["p_chunk_refs"].values())
+
+
+def test_snapshot_bytes_written_benchmark(monkeypatch, fake_supabase):
+    legacy_client, _ = _install_fake_client(monkeypatch, fake_supabase, chunking=False)
+    _snapshot_user_input_steps(ProcessPersistenceService(service=None), _build_context())
+    chunked_client, _ = _install_fake_client(monkeypatch, fake_supabase, chunking=True)
+    _snapshot_user_input_steps(ProcessPersistenceService(service=None), _build_context())
+
+    assert legacy_client.targets() == ["save_step_snapshot"] * 3
+    full = _bytes_written(legacy_client)
+    chunked = _bytes_written(chunked_client)
+    print(f"\nsnapshot bytes written for 3 user-input steps: full={full:,} chunked={chunked:,} ({chunked / full:.1%})")
+    assert chunked < full * 0.5
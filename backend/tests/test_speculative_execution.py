@@ -0,0 +1,111 @@
+import asyncio
+
+from app.core.config import settings
+from app.domains.seo_article.context import ArticleContext
+from app.domains.seo_article.services.process_event_bus import process_event_bus
+from app.domains.seo_article.services.speculative_execution import SpeculativeExecutor
+
+
+class _FakeManager:
+    """テーマ選択の予測・適用とリサーチステップの実行をメモリ上で再現する"""
+
+    def __init__(self, predicted_index=1):
+        self.predicted_index = predicted_index
+        self.release = asyncio.Event()
+        self.executed = []
+
+    async def _build_auto_user_input(self, context, step):
+        return (
+            {"response_type": "select_theme", "payload": {"selected_index": self.predicted_index}},
+            {"selected_index": self.predicted_index, "reason": "best_match_score=3"},
+        )
+
+    async def _apply_user_input_to_context(self, context, user_input):
+        context.selected_theme = context.generated_themes[user_input["payload"]["selected_index"]]
+        context.reset_after_theme_selection()
+        context.current_step = "researching"
+
+    async def _execute_single_step_with_events(self, context, process_id, user_id, task_id):
+        self.executed.append((context.selected_theme, user_id))
+        await process_event_bus.publish(process_id, "research_synthesis_completed", {"theme": context.selected_theme})
+        await self.release.wait()
+        context.research_sources_text = f"research for {context.selected_theme}"
+        context.current_step = "outline_generating"
+
+
+def _context():
+    context = ArticleContext(process_id="p1", user_id="u1")
+    context.generated_themes = ["theme-a", "theme-b"]
+    context.current_step = "theme_proposed"
+    context.research_sources_text = "old"
+    return context
+
+
+def test_matching_input_commits_speculative_research(monkeypatch):
+    monkeypatch.setattr(settings, "speculative_execution", True)
+
+    async def scenario():
+        manager = _FakeManager(predicted_index=1)
+        executor = SpeculativeExecutor(manager)
+        context = _context()
+        run = await executor.start(context, "p1", "t1")
+        await asyncio.sleep(0)
+
+        # 投機実行中も本来のコンテキストとイベントバスには何も反映されない
+        assert context.current_step == "theme_proposed"
+        assert context.research_sources_text == "old"
+        assert "p1" not in process_event_bus._buffers
+
+        manager.release.set()
+        taken = await executor.take(context, {"response_type": "select_theme", "payload": {"selected_index": 1}})
+        return manager, executor, context, run, taken
+
+    manager, executor, context, run, taken = asyncio.run(scenario())
+    assert taken is run
+    assert manager.executed == [("theme-b", None)]  # 複製は DB に保存しない
+    assert context.selected_theme == "theme-b"
+    assert context.research_sources_text == "research for theme-b"
+    assert context.current_step == "outline_generating"
+    assert context.user_id == "u1"
+    assert [event["event_type"] for event in run.events] == ["research_synthesis_completed"]
+    assert executor.metrics()["committed"] == 1
+    assert executor.metrics()["runs"] == 0
+
+
+def test_different_choice_discards_speculation(monkeypatch):
+    monkeypatch.setattr(settings, "speculative_execution", True)
+
+    async def scenario():
+        manager = _FakeManager(predicted_index=1)
+        executor = SpeculativeExecutor(manager)
+        context = _context()
+        run = await executor.start(context, "p1", "t1")
+        await asyncio.sleep(0)
+        taken = await executor.take(context, {"response_type": "select_theme", "payload": {"selected_index": 0}})
+        await asyncio.sleep(0)
+        return executor, context, run, taken
+
+    executor, context, run, taken = asyncio.run(scenario())
+    assert taken is None
+    assert run.task.cancelled()
+    assert context.current_step == "theme_proposed"
+    assert context.research_sources_text == "old"
+    assert executor.metrics()["discarded"] == 1
+
+
+def test_disabled_or_unsupported_step_does_not_start(monkeypatch):
+    monkeypatch.setattr(settings, "speculative_execution", False)
+
+    async def scenario():
+        executor = SpeculativeExecutor(_FakeManager())
+        disabled = await executor.start(_context(), "p1", "t1")
+        monkeypatch.setattr(settings, "speculative_execution", True)
+        context = _context()
+        context.current_step = "writing_sections"
+        unsupported = await executor.start(context, "p1", "t1")
+        return executor, disabled, unsupported
+
+    executor, disabled, unsupported = asyncio.run(scenario())
+    assert disabled is None
+    assert unsupported is None
+    assert executor.runs == {}
@@ -0,0 +1,266 @@
+import asyncio
+
+from app.domains.seo_article.services import task_worker as worker_module
+from app.domains.seo_article.services.task_worker import BackgroundTaskWorker
+
+
+class _TaskQueue:
+    """background_tasks の確保・ハートビート RPC をメモリ上で再現する"""
+
+    def __init__(self):
+        self.tasks = {}
+
+    def add(self, task_id, task_type="generation_start", priority=5, depends_on=()):
+        self.tasks[task_id] = {
+            "id": task_id,
+            "task_type": task_type,
+            "priority": priority,
+            "depends_on": list(depends_on),
+            "status": "pending",
+            "worker_id": None,
+            "order": len(self.tasks),
+        }
+
+    def _runnable(self, task, task_types):
+        return (
+            task["status"] == "pending"
+            and task["task_type"] in task_types
+            and all(self.tasks[dep]["status"] in ("completed", "cancelled") for dep in task["depends_on"])
+        )
+
+    def handle(self, request):
+        name, params = request.target, request.payload
+        if name == "claim_background_tasks":
+            candidates = sorted(
+                (task for task in self.tasks.values() if self._runnable(task, params["p_task_types"])),
+                key=lambda task: (-task["priority"], task["order"]),
+            )[:params["p_limit"]]
+            for task in candidates:
+                task.update(status="running", worker_id=params["p_worker_id"])
+            return [dict(task) for task in candidates]
+        if name == "heartbeat_background_tasks":
+            return [
+                task_id for task_id in params["p_task_ids"]
+                if self.tasks[task_id]["status"] == "running" and self.tasks[task_id]["worker_id"] == params["p_worker_id"]
+            ]
+        if name == "requeue_expired_background_tasks":
+            return 0
+        if name == "background_task_queue_stats":
+            return [
+                {"tenant_id": "org:bulk", "pending": 28, "running": 2, "oldest_pending_seconds": 40.0},
+                {"tenant_id": "user:small", "pending": 0, "running": 1, "oldest_pending_seconds": 0.0},
+            ]
+        if name == "release_background_tasks":
+            released = 0
+            for task_id in params["p_task_ids"]:
+                task = self.tasks[task_id]
+                if task["status"] == "running" and task["worker_id"] == params["p_worker_id"]:
+                    task.update(status="pending", worker_id=None)
+                    released += 1
+            return released
+        raise AssertionError(name)
+
+
+class _FakeManager:
+    def __init__(self, queue):
+        self.queue = queue
+        self.executed = []
+        self.release = asyncio.Event()
+
+    async def _execute_task_loop(self, task_id, claimed_task=None):
+        self.executed.append((task_id, claimed_task["worker_id"]))
+        await self.release.wait()
+        self.queue.tasks[task_id]["status"] = "completed"
+
+
+def _install_queue(fake_supabase):
+    queue = _TaskQueue()
+    return queue, fake_supabase(worker_module, queue.handle)
+
+
+def _worker(manager, worker_id, **kwargs) -> BackgroundTaskWorker:
+    options = {
+        "concurrency": 2,
+        "lease_seconds": 60,
+        "heartbeat_interval": 60,
+        "poll_interval": 0.01,
+        "interactive_slots": 0,
+    }
+    options.update(kwargs)
+    return BackgroundTaskWorker(manager, worker_id=worker_id, **options)
+
+
+def test_each_task_is_claimed_by_only_one_worker(fake_supabase):
+    queue, _ = _install_queue(fake_supabase)
+    for task_id in ("t1", "t2", "t3"):
+        queue.add(task_id)
+
+    async def scenario():
+        manager = _FakeManager(queue)
+        first, second = _worker(manager, "w1"), _worker(manager, "w2")
+        await asyncio.gather(first.claim_runnable(), second.claim_runnable())
+        await asyncio.sleep(0)
+        manager.release.set()
+        await first.stop(timeout=1)
+        await second.stop(timeout=1)
+        return manager.executed
+
+    executed = asyncio.run(scenario())
+    assert sorted(task_id for task_id, _ in executed) == ["t1", "t2", "t3"]
+
+
+def test_interactive_tasks_take_priority_and_reserved_slots(fake_supabase):
+    queue, _ = _install_queue(fake_supabase)
+    for task_id in ("s1", "s2", "s3"):
+        queue.add(task_id)
+    queue.add("c1", task_type="generation_continue", priority=7)
+
+    async def scenario():
+        manager = _FakeManager(queue)
+        worker = _worker(manager, "w1", concurrency=3, interactive_slots=1)
+        first = [row["id"] for row in await worker.claim_runnable()]
+
+        # 一括タスクは予約スロットを使えない
+        queue.add("s4")
+        assert await worker.claim_runnable() == []
+        queue.add("c2", task_type="generation_continue", priority=7)
+        second = [row["id"] for row in await worker.claim_runnable()]
+
+        manager.release.set()
+        await worker.stop(timeout=1)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ["c1", "s1"]
+    assert second == ["c2"]
+
+
+def test_single_slot_worker_still_claims_bulk_tasks(fake_supabase):
+    queue, _ = _install_queue(fake_supabase)
+    queue.add("s1")
+
+    async def scenario():
+        manager = _FakeManager(queue)
+        # 予約数が同時実行数以上でも、generation_start が確保できなくなってはいけない
+        worker = _worker(manager, "w1", concurrency=1, interactive_slots=1)
+        claimed = [row["id"] for row in await worker.claim_runnable()]
+        manager.release.set()
+        await worker.stop(timeout=1)
+        return worker.interactive_slots, claimed
+
+    assert asyncio.run(scenario()) == (0, ["s1"])
+
+
+def test_dependents_run_after_prerequisites_complete(fake_supabase):
+    queue, client = _install_queue(fake_supabase)
+    queue.add("t1")
+    queue.add("t2", task_type="generation_continue", priority=7, depends_on=["t1"])
+
+    async def scenario():
+        manager = _FakeManager(queue)
+        worker = _worker(manager, "w1", poll_interval=60)
+        worker.ensure_started()
+        await asyncio.sleep(0.01)
+        before = sorted(worker.running)
+        # t1 の完了でポーリング間隔を待たずに t2 が確保される
+        manager.release.set()
+        await asyncio.sleep(0.01)
+        await worker.stop(timeout=1)
+        return before, manager.executed
+
+    before, executed = asyncio.run(scenario())
+    assert before == ["t1"]
+    assert [task_id for task_id, _ in executed] == ["t1", "t2"]
+    assert "requeue_expired_background_tasks" in client.targets()
+
+
+def test_lost_lease_stops_local_task_and_released_tasks_are_skipped(fake_supabase):
+    queue, _ = _install_queue(fake_supabase)
+    queue.add("t1")
+    queue.add("t2")
+
+    async def scenario():
+        manager = _FakeManager(queue)
+        worker = _worker(manager, "w1")
+        await worker.claim_runnable()
+        t1, t2 = worker.running["t1"], worker.running["t2"]
+        await asyncio.sleep(0)
+
+        # t1 はユーザーがキャンセル、t2 は終了ステータスを書き込み済み
+        queue.tasks["t1"]["status"] = "cancelled"
+        queue.tasks["t2"]["status"] = "completed"
+        worker.release_lease("t2")
+        await worker.heartbeat_once()
+        await asyncio.sleep(0)
+
+        cancelled = t1.cancelled()
+        still_running = not t2.done()
+        manager.release.set()
+        await worker.stop(timeout=1)
+        return cancelled, still_running, dict(worker.running)
+
+    cancelled, still_running, running = asyncio.run(scenario())
+    assert cancelled and still_running
+    assert running == {}
+
+
+class _SteppingManager:
+    """ステップの区切りで worker.stopping を確認する生成フローの代わり（"stuck" は区切りに達しない）"""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.worker = None
+        self.drained = []
+
+    async def _execute_task_loop(self, task_id, claimed_task=None):
+        while True:
+            await asyncio.sleep(0 if task_id != "stuck" else 60)
+            if self.worker.stopping:
+                # BackgroundTaskManager は TaskDrained を受けてタスクを pending に戻す
+                self.drained.append(task_id)
+                await self.worker.release_for_resume([task_id])
+                return
+
+
+def test_stop_drains_at_step_boundary_and_releases_interrupted_tasks(fake_supabase):
+    queue, _ = _install_queue(fake_supabase)
+    queue.add("stepping")
+    queue.add("stuck")
+
+    async def scenario():
+        manager = _SteppingManager(queue)
+        worker = _worker(manager, "w1")
+        manager.worker = worker
+        await worker.claim_runnable()
+        await worker.stop(timeout=0.05)
+        # 停止後は新しいタスクを確保しない
+        queue.add("late")
+        assert await worker.claim_runnable() == []
+        return manager.drained
+
+    drained = asyncio.run(scenario())
+    assert drained == ["stepping"]
+    assert queue.tasks["stepping"]["status"] == "pending"
+    assert queue.tasks["stuck"]["status"] == "pending" and queue.tasks["stuck"]["worker_id"] is None
+    assert queue.tasks["late"]["status"] == "pending"
+
+
+def test_queue_stats_are_aggregated_and_cached(fake_supabase):
+    queue, client = _install_queue(fake_supabase)
+
+    async def scenario():
+        worker = _worker(_FakeManager(queue), "w1")
+        stats = await worker.refresh_queue_stats(max_age=60)
+        await worker.refresh_queue_stats(max_age=60)
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats == {
+        "pending": 28,
+        "running": 3,
+        "tenants_pending": 1,
+        "max_tenant_pending": 28,
+        "max_tenant_running": 2,
+        "oldest_pending_seconds": 40.0,
+    }
+    assert client.targets().count("background_task_queue_stats") == 1
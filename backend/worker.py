@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+SEO記事生成タスク（background_tasks）を処理するスタンドアロンワーカー
+
+API を BACKGROUND_TASK_MODE=worker で起動し、このワーカーを任意の台数動かす:
+
+    uv run python worker.py
+
+SIGTERM / SIGINT を受けると新規タスクの確保をやめ、実行中のタスクをステップの区切りで止めて終了する
+（BACKGROUND_TASK_DRAIN_TIMEOUT 内に区切りに達しなかったタスクは中断し、他のワーカーが保存済みの状態から再開する）。
+"""
+import asyncio
+import logging
+import signal
+
+from app.domains.seo_article.services.generation_service import ArticleGenerationService
+from app.domains.seo_article.services.process_event_bus import process_event_bus
+from app.infrastructure.external_apis.scraping_engine import scraping_engine
+from app.infrastructure.openai_rate_limiter import install_openai_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    install_openai_rate_limiter()
+    service = ArticleGenerationService()
+    worker = service.background_task_manager.worker
+
+    loop = asyncio.get_running_loop()
+    stop_requested = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_requested.set)
+
+    await worker.requeue_expired()
+    worker.ensure_started()
+    await stop_requested.wait()
+
+    logger.info(f"Stopping worker {worker.worker_id} ({len(worker.running)} tasks running)")
+    await service.background_task_manager.drain()
+    await process_event_bus.close()
+    await scraping_engine.aclose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
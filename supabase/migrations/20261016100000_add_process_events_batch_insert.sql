@@ -0,0 +1,188 @@
+-- Batch insert for process_events
+-- Used by the backend write-behind event bus to persist buffered progress events
+-- for a single process in one round-trip while preserving publish order
+
+CREATE OR REPLACE FUNCTION "public"."create_process_events_batch"("p_process_id" "uuid", "p_events" "jsonb") RETURNS integer
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+  base_sequence INTEGER;
+  inserted_count INTEGER;
+BEGIN
+  IF p_events IS NULL OR jsonb_typeof(p_events) <> 'array' OR jsonb_array_length(p_events) = 0 THEN
+    RETURN 0;
+  END IF;
+
+  -- 同一プロセスへの同時書き込みで event_sequence が重複しないようにロック
+  PERFORM pg_advisory_xact_lock(hashtext(p_process_id::text));
+
+  SELECT COALESCE(MAX(event_sequence), 0)
+  INTO base_sequence
+  FROM process_events
+  WHERE process_id = p_process_id;
+
+  -- 配列の順序どおりに連番を振って挿入
+  INSERT INTO process_events (
+    process_id,
+    event_type,
+    event_data,
+    event_sequence,
+    event_category,
+    event_source,
+    published_at
+  )
+  SELECT
+    p_process_id,
+    e.value->>'event_type',
+    COALESCE(e.value->'event_data', '{}'::jsonb),
+    base_sequence + e.ordinality::integer,
+    COALESCE(e.value->>'event_category', 'manual'),
+    COALESCE(e.value->>'event_source', 'application'),
+    NOW()
+  FROM jsonb_array_elements(p_events) WITH ORDINALITY AS e(value, ordinality)
+  ORDER BY e.ordinality;
+
+  GET DIAGNOSTICS inserted_count = ROW_COUNT;
+  RETURN inserted_count;
+END;
+$$;
+
+COMMENT ON FUNCTION public.create_process_events_batch(uuid, jsonb) IS
+    'プロセスイベントを配列順に一括挿入する（event_type / event_data / event_category / event_source を要素に持つ JSON 配列）';
+
+-- 単発の create_process_event もバッチ挿入と同じロックを取り、連番の重複を防ぐ
+CREATE OR REPLACE FUNCTION "public"."create_process_event"("p_process_id" "uuid", "p_event_type" "text", "p_event_data" "jsonb" DEFAULT '{}'::"jsonb", "p_event_category" "text" DEFAULT 'manual'::"text", "p_event_source" "text" DEFAULT 'application'::"text") RETURNS "uuid"
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+  event_id UUID;
+  next_sequence INTEGER;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext(p_process_id::text));
+
+  -- Get next sequence number
+  SELECT COALESCE(MAX(event_sequence), 0) + 1
+  INTO next_sequence
+  FROM process_events
+  WHERE process_id = p_process_id;
+
+  -- Insert the event
+  INSERT INTO process_events (
+    process_id,
+    event_type,
+    event_data,
+    event_sequence,
+    event_category,
+    event_source,
+    published_at
+  ) VALUES (
+    p_process_id,
+    p_event_type,
+    p_event_data,
+    next_sequence,
+    p_event_category,
+    p_event_source,
+    NOW()
+  ) RETURNING id INTO event_id;
+
+  RETURN event_id;
+END;
+$$;
+
+-- generated_articles_state の変更時にイベントを書き込むトリガー関数も同じロックを取る
+CREATE OR REPLACE FUNCTION "public"."publish_process_event"() RETURNS "trigger"
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+  event_data JSONB;
+  channel_name TEXT;
+  next_sequence INTEGER;
+  event_type_name TEXT;
+BEGIN
+  -- Determine channel name (process-specific)
+  channel_name := 'process_' || NEW.id::text;
+
+  -- Determine event type based on operation and changes
+  IF TG_OP = 'INSERT' THEN
+    event_type_name := 'process_created';
+  ELSIF TG_OP = 'UPDATE' THEN
+    -- More specific event types based on what changed
+    IF OLD.status IS DISTINCT FROM NEW.status THEN
+      event_type_name := 'status_changed';
+    ELSIF OLD.current_step_name IS DISTINCT FROM NEW.current_step_name THEN
+      event_type_name := 'step_changed';
+    ELSIF OLD.progress_percentage IS DISTINCT FROM NEW.progress_percentage THEN
+      event_type_name := 'progress_updated';
+    ELSIF OLD.is_waiting_for_input IS DISTINCT FROM NEW.is_waiting_for_input THEN
+      event_type_name := CASE
+        WHEN NEW.is_waiting_for_input THEN 'input_required'
+        ELSE 'input_resolved'
+      END;
+    ELSE
+      event_type_name := 'process_updated';
+    END IF;
+  ELSE
+    event_type_name := 'process_changed';
+  END IF;
+
+  -- Prepare comprehensive event data
+  event_data := jsonb_build_object(
+    'process_id', NEW.id,
+    'status', NEW.status,
+    'current_step', NEW.current_step_name,
+    'executing_step', NEW.executing_step,
+    'progress_percentage', NEW.progress_percentage,
+    'is_waiting_for_input', NEW.is_waiting_for_input,
+    'input_type', NEW.input_type,
+    'updated_at', NEW.updated_at,
+    'event_type', event_type_name,
+    'user_id', NEW.user_id,
+    'organization_id', NEW.organization_id,
+    'background_task_id', NEW.background_task_id,
+    'retry_count', NEW.retry_count,
+    'error_message', NEW.error_message,
+    -- Include relevant context data
+    'article_context', NEW.article_context,
+    'process_metadata', NEW.process_metadata,
+    'step_history', NEW.step_history,
+    -- Change tracking for updates
+    'changes', CASE WHEN TG_OP = 'UPDATE' THEN
+      jsonb_build_object(
+        'status', jsonb_build_object('old', OLD.status, 'new', NEW.status),
+        'current_step', jsonb_build_object('old', OLD.current_step_name, 'new', NEW.current_step_name),
+        'progress', jsonb_build_object('old', OLD.progress_percentage, 'new', NEW.progress_percentage)
+      )
+    ELSE NULL END
+  );
+
+  -- create_process_event / create_process_events_batch と同じロックを取り、連番の重複を防ぐ
+  PERFORM pg_advisory_xact_lock(hashtext(NEW.id::text));
+
+  -- Get next sequence number for this process
+  SELECT COALESCE(MAX(event_sequence), 0) + 1
+  INTO next_sequence
+  FROM process_events
+  WHERE process_id = NEW.id;
+
+  -- Insert event record (now the parent record exists, so no foreign key violation)
+  INSERT INTO process_events (
+    process_id,
+    event_type,
+    event_data,
+    event_sequence,
+    event_category,
+    event_source,
+    published_at
+  ) VALUES (
+    NEW.id,
+    event_type_name,
+    event_data,
+    next_sequence,
+    'process_state',
+    'database_trigger',
+    NOW()
+  );
+
+  RETURN NEW;
+END;
+$$;
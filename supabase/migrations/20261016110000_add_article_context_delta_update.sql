@@ -0,0 +1,57 @@
+-- Incremental persistence for generated_articles_state.article_context
+-- The backend sends only the top-level context keys that changed since the last save
+-- (and only the new tail of list keys that were appended to), merged into the stored
+-- jsonb together with the state columns in one round-trip
+
+CREATE OR REPLACE FUNCTION "public"."update_article_context_delta"("p_process_id" "uuid", "p_context_patch" "jsonb" DEFAULT '{}'::"jsonb", "p_context_append" "jsonb" DEFAULT '{}'::"jsonb", "p_state" "jsonb" DEFAULT '{}'::"jsonb") RETURNS boolean
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+  v_context JSONB;
+  v_key TEXT;
+  v_items JSONB;
+BEGIN
+  SELECT article_context
+  INTO v_context
+  FROM generated_articles_state
+  WHERE id = p_process_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  -- トップレベルキー単位で上書きマージ
+  v_context := COALESCE(v_context, '{}'::jsonb) || COALESCE(p_context_patch, '{}'::jsonb);
+
+  -- リスト型キーは追加された要素だけを末尾に連結
+  FOR v_key, v_items IN SELECT key, value FROM jsonb_each(COALESCE(p_context_append, '{}'::jsonb))
+  LOOP
+    v_context := jsonb_set(
+      v_context,
+      ARRAY[v_key],
+      CASE
+        WHEN jsonb_typeof(v_context->v_key) = 'array' THEN (v_context->v_key) || v_items
+        ELSE v_items
+      END,
+      true
+    );
+  END LOOP;
+
+  UPDATE generated_articles_state
+  SET
+    article_context = v_context,
+    status = COALESCE((p_state->>'status')::generation_status, status),
+    current_step_name = COALESCE(p_state->>'current_step_name', current_step_name),
+    error_message = CASE WHEN p_state ? 'error_message' THEN p_state->>'error_message' ELSE error_message END,
+    style_template_id = COALESCE((p_state->>'style_template_id')::uuid, style_template_id),
+    article_id = COALESCE((p_state->>'article_id')::uuid, article_id),
+    updated_at = COALESCE((p_state->>'updated_at')::timestamptz, NOW())
+  WHERE id = p_process_id;
+
+  RETURN TRUE;
+END;
+$$;
+
+COMMENT ON FUNCTION public.update_article_context_delta(uuid, jsonb, jsonb, jsonb) IS
+    'article_context に変更されたトップレベルキーをマージ（リストは追加分を末尾に連結）し、status / current_step_name などの状態列を同時に更新する';
@@ -0,0 +1,378 @@
+-- Content-addressed step snapshots
+-- Snapshots store a map of top-level ArticleContext field -> content hash (chunk_refs)
+-- instead of the full article_context. Each distinct field value is stored once per
+-- process in article_context_chunks, so unchanged fields (SERP report, research sources,
+-- persona ...) are shared between all snapshots of the process.
+-- Legacy snapshots (chunk_refs IS NULL) keep using article_context as before.
+
+CREATE TABLE IF NOT EXISTS public.article_context_chunks (
+    process_id uuid NOT NULL,
+    content_hash text NOT NULL,
+    payload jsonb NOT NULL,
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT article_context_chunks_pkey PRIMARY KEY (process_id, content_hash),
+    CONSTRAINT article_context_chunks_process_id_fkey FOREIGN KEY (process_id)
+        REFERENCES public.generated_articles_state(id) ON DELETE CASCADE
+);
+
+ALTER TABLE public.article_context_chunks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role has full access to article_context_chunks"
+    ON public.article_context_chunks
+    USING (auth.role() = 'service_role'::text)
+    WITH CHECK (auth.role() = 'service_role'::text);
+
+COMMENT ON TABLE public.article_context_chunks
+    IS 'ステップスナップショットの article_context をトップレベルフィールド単位で内容ハッシュ化して保存するチャンク（プロセス内で重複排除）';
+COMMENT ON COLUMN public.article_context_chunks.content_hash
+    IS 'フィールド値の JSON（キー順ソート）の blake2b ダイジェスト';
+
+ALTER TABLE public.article_generation_step_snapshots
+    ADD COLUMN IF NOT EXISTS chunk_refs jsonb;
+
+COMMENT ON COLUMN public.article_generation_step_snapshots.chunk_refs
+    IS 'トップレベルフィールド名 -> article_context_chunks.content_hash。NULL の場合は article_context に全体を保持（旧形式）';
+
+
+-- チャンク参照から article_context を組み立てる（旧形式はそのまま返す）
+CREATE OR REPLACE FUNCTION "public"."assemble_snapshot_context"("p_snapshot_id" "uuid") RETURNS "jsonb"
+    LANGUAGE "plpgsql" STABLE SECURITY DEFINER
+    AS $$
+DECLARE
+    v_process_id UUID;
+    v_article_context JSONB;
+    v_chunk_refs JSONB;
+    v_missing INTEGER;
+BEGIN
+    SELECT process_id, article_context, chunk_refs
+    INTO v_process_id, v_article_context, v_chunk_refs
+    FROM article_generation_step_snapshots
+    WHERE id = p_snapshot_id;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    IF v_chunk_refs IS NULL THEN
+        RETURN v_article_context;
+    END IF;
+
+    SELECT
+        COALESCE(jsonb_object_agg(refs.key, chunks.payload), '{}'::jsonb),
+        COUNT(*) FILTER (WHERE chunks.content_hash IS NULL)
+    INTO v_article_context, v_missing
+    FROM jsonb_each_text(v_chunk_refs) AS refs(key, content_hash)
+    LEFT JOIN article_context_chunks chunks
+        ON chunks.process_id = v_process_id
+       AND chunks.content_hash = refs.content_hash;
+
+    IF v_missing > 0 THEN
+        RAISE EXCEPTION 'Snapshot % references % missing context chunk(s)', p_snapshot_id, v_missing;
+    END IF;
+
+    RETURN v_article_context;
+END;
+$$;
+
+COMMENT ON FUNCTION public.assemble_snapshot_context(uuid)
+    IS 'スナップショットの chunk_refs から article_context を組み立てる（chunk_refs が NULL の旧形式は article_context を返す）';
+
+
+-- 新しいチャンクだけを受け取り、既存の save_step_snapshot の分岐ロジックでスナップショットを作成する
+CREATE OR REPLACE FUNCTION "public"."save_step_snapshot_chunked"("p_process_id" "uuid", "p_step_name" "text", "p_chunk_refs" "jsonb", "p_chunks" "jsonb" DEFAULT '{}'::"jsonb", "p_step_description" "text" DEFAULT NULL::"text", "p_step_category" "text" DEFAULT 'autonomous'::"text", "p_snapshot_metadata" "jsonb" DEFAULT '{}'::"jsonb", "p_branch_id" "uuid" DEFAULT NULL::"uuid") RETURNS "uuid"
+    LANGUAGE "plpgsql" SECURITY DEFINER
+    AS $$
+DECLARE
+    v_snapshot_id UUID;
+    v_missing TEXT[];
+BEGIN
+    INSERT INTO article_context_chunks (process_id, content_hash, payload)
+    SELECT p_process_id, chunk.key, chunk.value
+    FROM jsonb_each(COALESCE(p_chunks, '{}'::jsonb)) AS chunk
+    ON CONFLICT (process_id, content_hash) DO NOTHING;
+
+    -- 呼び出し側が「保存済み」とみなして省略したチャンクが実在するか確認する
+    SELECT ARRAY_AGG(DISTINCT refs.content_hash)
+    INTO v_missing
+    FROM jsonb_each_text(p_chunk_refs) AS refs(key, content_hash)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM article_context_chunks chunks
+        WHERE chunks.process_id = p_process_id
+          AND chunks.content_hash = refs.content_hash
+    );
+
+    IF v_missing IS NOT NULL THEN
+        RAISE EXCEPTION 'missing_context_chunks: %', array_to_string(v_missing, ',');
+    END IF;
+
+    v_snapshot_id := save_step_snapshot(
+        p_process_id,
+        p_step_name,
+        '{}'::jsonb,
+        p_step_description,
+        p_step_category,
+        p_snapshot_metadata,
+        p_branch_id
+    );
+
+    UPDATE article_generation_step_snapshots
+    SET chunk_refs = p_chunk_refs
+    WHERE id = v_snapshot_id;
+
+    RETURN v_snapshot_id;
+END;
+$$;
+
+COMMENT ON FUNCTION public.save_step_snapshot_chunked(uuid, text, jsonb, jsonb, text, text, jsonb, uuid)
+    IS 'フィールド単位の内容ハッシュ参照でスナップショットを保存する。p_chunks には未保存のチャンク（hash -> value）だけを渡す';
+
+
+-- restore_from_snapshot: チャンク化されたスナップショットを組み立ててから復元する
+CREATE OR REPLACE FUNCTION "public"."restore_from_snapshot"("p_snapshot_id" "uuid", "p_create_new_branch" boolean DEFAULT false) RETURNS "jsonb"
+    LANGUAGE "plpgsql" SECURITY DEFINER
+    AS $$
+DECLARE
+    v_process_id UUID;
+    v_step_name TEXT;
+    v_article_context JSONB;
+    v_branch_id UUID;
+    v_snapshot_branch_id UUID;
+    v_chunk_refs JSONB;
+BEGIN
+    -- Retrieve snapshot data
+    SELECT
+        process_id,
+        step_name,
+        article_context,
+        chunk_refs,
+        branch_id
+    INTO v_process_id, v_step_name, v_article_context, v_chunk_refs, v_snapshot_branch_id
+    FROM article_generation_step_snapshots
+    WHERE id = p_snapshot_id AND can_restore = TRUE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Snapshot not found or cannot be restored: %', p_snapshot_id;
+    END IF;
+
+    -- チャンク化されたスナップショットはチャンクから article_context を組み立てる
+    IF v_chunk_refs IS NOT NULL THEN
+        v_article_context := assemble_snapshot_context(p_snapshot_id);
+    END IF;
+
+    -- Get current active branch
+    SELECT branch_id INTO v_branch_id
+    FROM article_generation_step_snapshots
+    WHERE process_id = v_process_id
+      AND is_active_branch = TRUE
+    ORDER BY created_at DESC
+    LIMIT 1;
+
+    -- If restore point is on a different branch, switch branches
+    IF v_snapshot_branch_id != v_branch_id THEN
+        -- Deactivate all branches for this process
+        UPDATE article_generation_step_snapshots
+        SET is_active_branch = FALSE
+        WHERE process_id = v_process_id;
+
+        -- Activate the snapshot's branch
+        UPDATE article_generation_step_snapshots
+        SET is_active_branch = TRUE
+        WHERE process_id = v_process_id
+          AND branch_id = v_snapshot_branch_id;
+
+        v_branch_id := v_snapshot_branch_id;
+    END IF;
+
+    -- Add restoration metadata to context
+    v_article_context := jsonb_set(
+        v_article_context,
+        '{_restoration_metadata}',
+        jsonb_build_object(
+            'restored_from_snapshot', p_snapshot_id,
+            'restored_at', NOW(),
+            'branch_id', v_branch_id
+        )
+    );
+
+    -- Update process state - NO NEW SNAPSHOT CREATED, just move HEAD
+    UPDATE generated_articles_state
+    SET
+        current_step_name = v_step_name,
+        article_context = v_article_context,
+        current_snapshot_id = p_snapshot_id,  -- Move HEAD to this snapshot
+        status = CASE
+            WHEN v_step_name IN ('persona_generated', 'theme_proposed', 'outline_generated')
+            THEN 'user_input_required'::generation_status
+            ELSE 'in_progress'::generation_status
+        END,
+        is_waiting_for_input = CASE
+            WHEN v_step_name IN ('persona_generated', 'theme_proposed', 'outline_generated')
+            THEN TRUE
+            ELSE FALSE
+        END,
+        input_type = CASE
+            WHEN v_step_name = 'persona_generated' THEN 'select_persona'
+            WHEN v_step_name = 'theme_proposed' THEN 'select_theme'
+            WHEN v_step_name = 'outline_generated' THEN 'approve_outline'
+            ELSE NULL
+        END,
+        updated_at = NOW(),
+        last_activity_at = NOW()
+    WHERE id = v_process_id;
+
+    -- Create process event for restoration
+    PERFORM create_process_event(
+        v_process_id,
+        'snapshot_restored',
+        jsonb_build_object(
+            'snapshot_id', p_snapshot_id,
+            'restored_step', v_step_name,
+            'branch_id', v_branch_id,
+            'restored_at', NOW()
+        )
+    );
+
+    RETURN jsonb_build_object(
+        'process_id', v_process_id,
+        'step_name', v_step_name,
+        'branch_id', v_branch_id,
+        'created_new_branch', FALSE  -- Never create new branch on restore
+    );
+END;
+$$;
+
+
+-- switch_to_branch: ブランチ先の最新スナップショットがチャンク化されていれば組み立ててからプロセスに反映する
+CREATE OR REPLACE FUNCTION "public"."switch_to_branch"("p_process_id" "uuid", "p_branch_id" "uuid") RETURNS boolean
+    LANGUAGE "plpgsql" SECURITY DEFINER
+    AS $$
+DECLARE
+    v_latest_snapshot_id UUID;
+    v_article_context JSONB;
+    v_step_name TEXT;
+    v_chunk_refs JSONB;
+BEGIN
+    -- Verify branch exists for this process
+    SELECT id, article_context, step_name, chunk_refs
+    INTO v_latest_snapshot_id, v_article_context, v_step_name, v_chunk_refs
+    FROM article_generation_step_snapshots
+    WHERE process_id = p_process_id
+      AND branch_id = p_branch_id
+    ORDER BY created_at DESC
+    LIMIT 1;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Branch % not found for process %', p_branch_id, p_process_id;
+    END IF;
+
+    -- チャンク化されたスナップショットの article_context は '{}' なので、チャンクから組み立てる
+    IF v_chunk_refs IS NOT NULL THEN
+        v_article_context := assemble_snapshot_context(v_latest_snapshot_id);
+    END IF;
+
+    -- Deactivate all branches for this process
+    UPDATE article_generation_step_snapshots
+    SET is_active_branch = FALSE
+    WHERE process_id = p_process_id;
+
+    -- Activate the target branch
+    UPDATE article_generation_step_snapshots
+    SET is_active_branch = TRUE
+    WHERE process_id = p_process_id
+      AND branch_id = p_branch_id;
+
+    -- Update process state to reflect the branch
+    UPDATE generated_articles_state
+    SET
+        current_step_name = v_step_name,
+        article_context = v_article_context,
+        updated_at = NOW(),
+        last_activity_at = NOW()
+    WHERE id = p_process_id;
+
+    RETURN TRUE;
+END;
+$$;
+
+
+-- get_snapshot_details: チャンク化されたスナップショットは組み立てた article_context を返す
+CREATE OR REPLACE FUNCTION "public"."get_snapshot_details"("p_snapshot_id" "uuid") RETURNS "jsonb"
+    LANGUAGE "plpgsql" SECURITY DEFINER
+    AS $$
+DECLARE
+    v_snapshot RECORD;
+    v_chunk_refs JSONB;
+BEGIN
+    SELECT
+        id,
+        process_id,
+        step_name,
+        step_index,
+        step_category,
+        step_description,
+        article_context,
+        snapshot_metadata,
+        can_restore,
+        created_at
+    INTO v_snapshot
+    FROM article_generation_step_snapshots
+    WHERE id = p_snapshot_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Snapshot not found: %', p_snapshot_id;
+    END IF;
+
+    SELECT chunk_refs INTO v_chunk_refs
+    FROM article_generation_step_snapshots
+    WHERE id = p_snapshot_id;
+
+    IF v_chunk_refs IS NOT NULL THEN
+        RETURN jsonb_set(to_jsonb(v_snapshot), '{article_context}', assemble_snapshot_context(p_snapshot_id));
+    END IF;
+
+    RETURN to_jsonb(v_snapshot);
+END;
+$$;
+
+
+-- 古いスナップショット削除時に、どのスナップショットからも参照されなくなったチャンクも削除する
+CREATE OR REPLACE FUNCTION "public"."cleanup_old_snapshots"("p_days_old" integer DEFAULT 30, "p_keep_count" integer DEFAULT 10) RETURNS integer
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_deleted_count INTEGER := 0;
+BEGIN
+    -- Delete old snapshots, keeping the most recent p_keep_count per process
+    WITH snapshots_to_keep AS (
+        SELECT id
+        FROM (
+            SELECT id,
+                   ROW_NUMBER() OVER (PARTITION BY process_id ORDER BY created_at DESC) as rn
+            FROM article_generation_step_snapshots
+        ) ranked
+        WHERE rn <= p_keep_count
+    ),
+    old_snapshots AS (
+        SELECT id
+        FROM article_generation_step_snapshots
+        WHERE created_at < (NOW() - INTERVAL '1 day' * p_days_old)
+          AND id NOT IN (SELECT id FROM snapshots_to_keep)
+    )
+    DELETE FROM article_generation_step_snapshots
+    WHERE id IN (SELECT id FROM old_snapshots);
+
+    GET DIAGNOSTICS v_deleted_count = ROW_COUNT;
+
+    DELETE FROM article_context_chunks chunks
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM article_generation_step_snapshots snapshots,
+             jsonb_each_text(snapshots.chunk_refs) AS refs(key, content_hash)
+        WHERE snapshots.process_id = chunks.process_id
+          AND snapshots.chunk_refs IS NOT NULL
+          AND refs.content_hash = chunks.content_hash
+    );
+
+    RETURN v_deleted_count;
+END;
+$$;
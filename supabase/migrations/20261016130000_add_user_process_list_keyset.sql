@@ -0,0 +1,112 @@
+-- Unified, keyset-paginated list of a user's articles and in-flight generation processes
+-- Replaces fetching every article (with full content) and every generated_articles_state row
+-- (with the whole article_context) into the backend and sorting/slicing in Python.
+-- Only list fields are projected; the article excerpt is derived in the database.
+
+CREATE INDEX IF NOT EXISTS idx_articles_user_updated_at
+    ON public.articles USING btree (user_id, updated_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_generated_articles_state_user_updated_at
+    ON public.generated_articles_state USING btree (user_id, updated_at DESC, id DESC);
+
+
+CREATE OR REPLACE FUNCTION "public"."get_user_process_list"(
+    "p_user_id" "text",
+    "p_status_filter" "text" DEFAULT NULL::"text",
+    "p_limit" integer DEFAULT 20,
+    "p_offset" integer DEFAULT 0,
+    "p_cursor_updated_at" timestamp with time zone DEFAULT NULL::timestamp with time zone,
+    "p_cursor_id" "uuid" DEFAULT NULL::"uuid"
+) RETURNS TABLE(
+    "id" "uuid",
+    "process_type" "text",
+    "process_id" "uuid",
+    "title" "text",
+    "excerpt" "text",
+    "status" "text",
+    "keywords" "jsonb",
+    "target_audience" "text",
+    "current_step_name" "text",
+    "progress_percentage" integer,
+    "is_waiting_for_input" boolean,
+    "error_message" "text",
+    "created_at" timestamp with time zone,
+    "updated_at" timestamp with time zone
+)
+    LANGUAGE "sql" STABLE
+    AS $$
+    WITH user_articles AS (
+        SELECT
+            a.id,
+            'article'::text AS process_type,
+            a.generation_process_id AS process_id,
+            a.title,
+            -- 151文字まで返し、省略記号の判定はバックエンドで行う
+            left(regexp_replace(a.content, '<[^>]+>', '', 'g'), 151) AS excerpt,
+            'completed'::text AS status,
+            to_jsonb(a.keywords) AS keywords,
+            a.target_audience,
+            NULL::text AS current_step_name,
+            NULL::integer AS progress_percentage,
+            NULL::boolean AS is_waiting_for_input,
+            NULL::text AS error_message,
+            a.created_at,
+            a.updated_at
+        FROM articles a
+        WHERE a.user_id = p_user_id
+          AND (p_status_filter IS DISTINCT FROM 'completed' OR a.status = 'completed')
+          AND (
+              p_cursor_updated_at IS NULL
+              OR (a.updated_at, a.id) < (p_cursor_updated_at, p_cursor_id)
+          )
+        ORDER BY a.updated_at DESC, a.id DESC
+        LIMIT p_limit + p_offset
+    ),
+    user_processes AS (
+        SELECT
+            s.id,
+            'generation'::text AS process_type,
+            s.id AS process_id,
+            NULL::text AS title,
+            NULL::text AS excerpt,
+            s.status::text AS status,
+            COALESCE(s.article_context->'initial_keywords', '[]'::jsonb) AS keywords,
+            COALESCE(NULLIF(s.article_context->>'custom_persona', ''), s.article_context->>'persona_type') AS target_audience,
+            COALESCE(s.current_step_name, 'start') AS current_step_name,
+            s.progress_percentage,
+            s.is_waiting_for_input,
+            s.error_message,
+            s.created_at,
+            s.updated_at
+        FROM generated_articles_state s
+        WHERE s.user_id = p_user_id
+          AND s.status <> 'completed'
+          AND (p_status_filter IS NULL OR p_status_filter = 'completed' OR s.status::text = p_status_filter)
+          -- 記事が作成済みのプロセスは記事側で表示する
+          AND NOT EXISTS (
+              SELECT 1
+              FROM articles a
+              WHERE a.generation_process_id = s.id
+                AND a.user_id = p_user_id
+                AND (p_status_filter IS DISTINCT FROM 'completed' OR a.status = 'completed')
+          )
+          AND (
+              p_cursor_updated_at IS NULL
+              OR (s.updated_at, s.id) < (p_cursor_updated_at, p_cursor_id)
+          )
+        ORDER BY s.updated_at DESC, s.id DESC
+        LIMIT p_limit + p_offset
+    )
+    SELECT *
+    FROM (
+        SELECT * FROM user_articles
+        UNION ALL
+        SELECT * FROM user_processes
+    ) merged
+    ORDER BY merged.updated_at DESC, merged.id DESC
+    LIMIT p_limit
+    OFFSET p_offset;
+$$;
+
+COMMENT ON FUNCTION public.get_user_process_list(text, text, integer, integer, timestamp with time zone, uuid)
+    IS '記事と生成中プロセスを updated_at の降順でまとめて返す（一覧表示に必要な列のみ）。p_cursor_updated_at / p_cursor_id を渡すとその位置より後ろをキーセットページングで返す';
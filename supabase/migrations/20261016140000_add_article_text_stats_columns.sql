@@ -0,0 +1,155 @@
+-- Precomputed plain-text excerpt / character count / heading count for articles
+-- Computed once whenever articles.content is written (generation completion, manual edits,
+-- agent edits, version restore, image placeholder replacement ...) by a trigger, so list
+-- endpoints read these columns instead of downloading and regex-stripping the whole HTML.
+
+ALTER TABLE public.articles
+    ADD COLUMN IF NOT EXISTS excerpt text,
+    ADD COLUMN IF NOT EXISTS char_count integer,
+    ADD COLUMN IF NOT EXISTS heading_count integer;
+
+COMMENT ON COLUMN public.articles.excerpt IS 'HTML タグを除いた本文の先頭300文字（一覧表示用）';
+COMMENT ON COLUMN public.articles.char_count IS 'HTML タグを除いた本文の文字数';
+COMMENT ON COLUMN public.articles.heading_count IS '本文中の見出し（h1〜h6）の数';
+
+
+CREATE OR REPLACE FUNCTION "public"."refresh_article_text_stats"() RETURNS "trigger"
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_plain_text TEXT;
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.content IS NOT DISTINCT FROM OLD.content THEN
+        RETURN NEW;
+    END IF;
+
+    v_plain_text := regexp_replace(COALESCE(NEW.content, ''), '<[^>]+>', '', 'g');
+
+    NEW.excerpt := left(v_plain_text, 300);
+    NEW.char_count := length(v_plain_text);
+    NEW.heading_count := (
+        SELECT COUNT(*)
+        FROM regexp_matches(COALESCE(NEW.content, ''), '<h[1-6][\s>/]', 'gi')
+    );
+
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER "trigger_refresh_article_text_stats" BEFORE INSERT OR UPDATE OF "content" ON "public"."articles" FOR EACH ROW EXECUTE FUNCTION "public"."refresh_article_text_stats"();
+
+
+-- 既存記事のバックフィル（updated_at を変えないよう更新日時トリガーを一時的に止める）
+ALTER TABLE public.articles DISABLE TRIGGER update_articles_updated_at;
+
+UPDATE public.articles
+SET
+    excerpt = left(regexp_replace(COALESCE(content, ''), '<[^>]+>', '', 'g'), 300),
+    char_count = length(regexp_replace(COALESCE(content, ''), '<[^>]+>', '', 'g')),
+    heading_count = (
+        SELECT COUNT(*)
+        FROM regexp_matches(COALESCE(content, ''), '<h[1-6][\s>/]', 'gi')
+    )
+WHERE excerpt IS NULL;
+
+ALTER TABLE public.articles ENABLE TRIGGER update_articles_updated_at;
+
+
+-- 一覧 RPC も保存済みの抜粋を使う（151文字まで返す仕様は変更しない）
+CREATE OR REPLACE FUNCTION "public"."get_user_process_list"(
+    "p_user_id" "text",
+    "p_status_filter" "text" DEFAULT NULL::"text",
+    "p_limit" integer DEFAULT 20,
+    "p_offset" integer DEFAULT 0,
+    "p_cursor_updated_at" timestamp with time zone DEFAULT NULL::timestamp with time zone,
+    "p_cursor_id" "uuid" DEFAULT NULL::"uuid"
+) RETURNS TABLE(
+    "id" "uuid",
+    "process_type" "text",
+    "process_id" "uuid",
+    "title" "text",
+    "excerpt" "text",
+    "status" "text",
+    "keywords" "jsonb",
+    "target_audience" "text",
+    "current_step_name" "text",
+    "progress_percentage" integer,
+    "is_waiting_for_input" boolean,
+    "error_message" "text",
+    "created_at" timestamp with time zone,
+    "updated_at" timestamp with time zone
+)
+    LANGUAGE "sql" STABLE
+    AS $$
+    WITH user_articles AS (
+        SELECT
+            a.id,
+            'article'::text AS process_type,
+            a.generation_process_id AS process_id,
+            a.title,
+            -- 151文字まで返し、省略記号の判定はバックエンドで行う
+            left(a.excerpt, 151) AS excerpt,
+            'completed'::text AS status,
+            to_jsonb(a.keywords) AS keywords,
+            a.target_audience,
+            NULL::text AS current_step_name,
+            NULL::integer AS progress_percentage,
+            NULL::boolean AS is_waiting_for_input,
+            NULL::text AS error_message,
+            a.created_at,
+            a.updated_at
+        FROM articles a
+        WHERE a.user_id = p_user_id
+          AND (p_status_filter IS DISTINCT FROM 'completed' OR a.status = 'completed')
+          AND (
+              p_cursor_updated_at IS NULL
+              OR (a.updated_at, a.id) < (p_cursor_updated_at, p_cursor_id)
+          )
+        ORDER BY a.updated_at DESC, a.id DESC
+        LIMIT p_limit + p_offset
+    ),
+    user_processes AS (
+        SELECT
+            s.id,
+            'generation'::text AS process_type,
+            s.id AS process_id,
+            NULL::text AS title,
+            NULL::text AS excerpt,
+            s.status::text AS status,
+            COALESCE(s.article_context->'initial_keywords', '[]'::jsonb) AS keywords,
+            COALESCE(NULLIF(s.article_context->>'custom_persona', ''), s.article_context->>'persona_type') AS target_audience,
+            COALESCE(s.current_step_name, 'start') AS current_step_name,
+            s.progress_percentage,
+            s.is_waiting_for_input,
+            s.error_message,
+            s.created_at,
+            s.updated_at
+        FROM generated_articles_state s
+        WHERE s.user_id = p_user_id
+          AND s.status <> 'completed'
+          AND (p_status_filter IS NULL OR p_status_filter = 'completed' OR s.status::text = p_status_filter)
+          -- 記事が作成済みのプロセスは記事側で表示する
+          AND NOT EXISTS (
+              SELECT 1
+              FROM articles a
+              WHERE a.generation_process_id = s.id
+                AND a.user_id = p_user_id
+                AND (p_status_filter IS DISTINCT FROM 'completed' OR a.status = 'completed')
+          )
+          AND (
+              p_cursor_updated_at IS NULL
+              OR (s.updated_at, s.id) < (p_cursor_updated_at, p_cursor_id)
+          )
+        ORDER BY s.updated_at DESC, s.id DESC
+        LIMIT p_limit + p_offset
+    )
+    SELECT *
+    FROM (
+        SELECT * FROM user_articles
+        UNION ALL
+        SELECT * FROM user_processes
+    ) merged
+    ORDER BY merged.updated_at DESC, merged.id DESC
+    LIMIT p_limit
+    OFFSET p_offset;
+$$;
@@ -0,0 +1,136 @@
+-- Leased execution of background_tasks
+-- Workers (the API process in inline mode, or standalone worker processes) claim tasks with
+-- FOR UPDATE SKIP LOCKED and hold a time-limited lease that they extend by heartbeating.
+-- Tasks whose lease expires (worker crashed / instance scaled in) are put back to pending.
+
+ALTER TABLE public.background_tasks
+    ADD COLUMN IF NOT EXISTS lease_expires_at timestamp with time zone;
+
+COMMENT ON COLUMN public.background_tasks.lease_expires_at
+    IS '実行中タスクのリース期限。worker がハートビートで延長し、期限切れのタスクは pending に戻される';
+
+CREATE INDEX IF NOT EXISTS idx_background_tasks_lease_expiry
+    ON public.background_tasks USING btree (lease_expires_at)
+    WHERE (status = 'running'::text);
+
+
+-- 実行可能な pending タスクを最大 p_limit 件確保する（優先度順・依存タスク完了済みのもの）
+CREATE OR REPLACE FUNCTION "public"."claim_background_tasks"("p_worker_id" "text", "p_worker_hostname" "text" DEFAULT NULL::"text", "p_limit" integer DEFAULT 1, "p_lease_seconds" integer DEFAULT 120, "p_task_types" "text"[] DEFAULT NULL::"text"[]) RETURNS SETOF "public"."background_tasks"
+    LANGUAGE "plpgsql"
+    AS $$
+BEGIN
+    RETURN QUERY
+    WITH candidates AS (
+        SELECT t.id
+        FROM background_tasks t
+        WHERE t.status = 'pending'
+          AND t.scheduled_for <= NOW()
+          AND (p_task_types IS NULL OR t.task_type = ANY(p_task_types))
+          AND (t.depends_on = '{}' OR NOT EXISTS (
+              SELECT 1 FROM background_tasks dep
+              WHERE dep.id = ANY(t.depends_on)
+                AND dep.status NOT IN ('completed', 'cancelled')
+          ))
+        ORDER BY t.priority DESC, t.created_at ASC
+        LIMIT GREATEST(p_limit, 0)
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE background_tasks t
+    SET status = 'running',
+        worker_id = p_worker_id,
+        worker_hostname = p_worker_hostname,
+        heartbeat_at = NOW(),
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    FROM candidates
+    WHERE t.id = candidates.id
+    RETURNING t.*;
+END;
+$$;
+
+COMMENT ON FUNCTION public.claim_background_tasks(text, text, integer, integer, text[])
+    IS '実行可能な pending タスクを優先度順に FOR UPDATE SKIP LOCKED で確保し、リース付きで running にする';
+
+
+-- 指定したタスクがまだ pending なら確保する（API プロセス内で即時実行する inline モード用）
+CREATE OR REPLACE FUNCTION "public"."claim_background_task"("p_task_id" "uuid", "p_worker_id" "text", "p_worker_hostname" "text" DEFAULT NULL::"text", "p_lease_seconds" integer DEFAULT 120) RETURNS SETOF "public"."background_tasks"
+    LANGUAGE "plpgsql"
+    AS $$
+BEGIN
+    RETURN QUERY
+    WITH candidate AS (
+        SELECT t.id
+        FROM background_tasks t
+        WHERE t.id = p_task_id
+          AND t.status = 'pending'
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE background_tasks t
+    SET status = 'running',
+        worker_id = p_worker_id,
+        worker_hostname = p_worker_hostname,
+        heartbeat_at = NOW(),
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    FROM candidate
+    WHERE t.id = candidate.id
+    RETURNING t.*;
+END;
+$$;
+
+
+-- リースを延長する。延長できなかったタスク（キャンセル・再キュー・他 worker が確保）は呼び出し側で停止する
+CREATE OR REPLACE FUNCTION "public"."heartbeat_background_tasks"("p_worker_id" "text", "p_task_ids" "uuid"[], "p_lease_seconds" integer DEFAULT 120) RETURNS "uuid"[]
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_extended UUID[];
+BEGIN
+    WITH extended AS (
+        UPDATE background_tasks
+        SET heartbeat_at = NOW(),
+            lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+        WHERE id = ANY(p_task_ids)
+          AND worker_id = p_worker_id
+          AND status = 'running'
+        RETURNING id
+    )
+    SELECT COALESCE(ARRAY_AGG(id), '{}'::uuid[]) INTO v_extended FROM extended;
+
+    RETURN v_extended;
+END;
+$$;
+
+
+-- リース切れの running タスクを pending に戻す（リトライ上限を超えたものは failed）
+CREATE OR REPLACE FUNCTION "public"."requeue_expired_background_tasks"("p_limit" integer DEFAULT 100) RETURNS integer
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH expired AS (
+        SELECT id
+        FROM background_tasks
+        WHERE status = 'running'
+          AND lease_expires_at IS NOT NULL
+          AND lease_expires_at < NOW()
+        ORDER BY lease_expires_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE background_tasks t
+    SET status = CASE WHEN COALESCE(t.retry_count, 0) < COALESCE(t.max_retries, 3) THEN 'pending' ELSE 'failed' END,
+        retry_count = COALESCE(t.retry_count, 0) + 1,
+        scheduled_for = NOW(),
+        error_message = 'Lease expired on worker ' || COALESCE(t.worker_id, 'unknown'),
+        worker_id = NULL,
+        lease_expires_at = NULL
+    FROM expired
+    WHERE t.id = expired.id;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$;
+
+COMMENT ON FUNCTION public.requeue_expired_background_tasks(integer)
+    IS 'リース期限切れの running タスクを pending に戻す（リトライ上限超過は failed）';
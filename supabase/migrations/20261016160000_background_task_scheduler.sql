@@ -0,0 +1,40 @@
+-- Dependency handling for the priority-ordered background task scheduler
+-- claim_background_tasks only releases a pending task once every task in depends_on is completed/cancelled.
+-- A prerequisite that fails permanently would otherwise leave its dependents pending forever,
+-- so they are cancelled as soon as it fails.
+
+-- depends_on @> ARRAY[id] の検索用
+CREATE INDEX IF NOT EXISTS idx_background_tasks_depends_on
+    ON public.background_tasks USING gin (depends_on)
+    WHERE (status = 'pending'::text);
+
+
+CREATE OR REPLACE FUNCTION "public"."cancel_dependents_of_failed_task"() RETURNS "trigger"
+    LANGUAGE "plpgsql"
+    AS $$
+BEGIN
+    UPDATE background_tasks
+    SET status = 'cancelled',
+        completed_at = NOW(),
+        error_message = 'Prerequisite task ' || NEW.id || ' failed'
+    WHERE status = 'pending'
+      AND depends_on @> ARRAY[NEW.id];
+
+    RETURN NULL;
+END;
+$$;
+
+COMMENT ON FUNCTION public.cancel_dependents_of_failed_task()
+    IS '前提タスクが failed になったら、それに依存する pending タスクをキャンセルする';
+
+
+DROP TRIGGER IF EXISTS trigger_cancel_dependents_of_failed_task ON public.background_tasks;
+CREATE TRIGGER trigger_cancel_dependents_of_failed_task
+    AFTER UPDATE OF status ON public.background_tasks
+    FOR EACH ROW
+    WHEN (NEW.status = 'failed' AND OLD.status IS DISTINCT FROM 'failed')
+    EXECUTE FUNCTION public.cancel_dependents_of_failed_task();
+
+
+-- タスクは claim_background_tasks で優先度順に確保するため、ID 指定の確保は不要になった
+DROP FUNCTION IF EXISTS public.claim_background_task(uuid, text, text, integer);
@@ -0,0 +1,75 @@
+-- Shared OpenAI rate-limit buckets (OPENAI_RATE_LIMIT_SHARED=true)
+-- Every API/worker process reserves one request plus its estimated tokens from a per-model bucket,
+-- so the organization's RPM/TPM limits are shared across instances instead of per process.
+
+CREATE TABLE IF NOT EXISTS public.openai_rate_limit_buckets (
+    model text PRIMARY KEY,
+    request_level double precision NOT NULL,
+    token_level double precision NOT NULL,
+    updated_at timestamp with time zone NOT NULL DEFAULT clock_timestamp()
+);
+
+COMMENT ON TABLE public.openai_rate_limit_buckets
+    IS 'OpenAI API のモデル別レート制限バケット（全ワーカー共有、1分で満タンまで補充）';
+
+ALTER TABLE public.openai_rate_limit_buckets ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role has full access to openai_rate_limit_buckets"
+    ON public.openai_rate_limit_buckets
+    USING (auth.role() = 'service_role'::text)
+    WITH CHECK (auth.role() = 'service_role'::text);
+
+
+-- 1リクエスト + p_tokens を予約する。予約できたら 0、足りなければ待つべき秒数を返す
+CREATE OR REPLACE FUNCTION "public"."reserve_openai_rate_budget"("p_model" "text", "p_rpm" integer, "p_tpm" integer, "p_tokens" integer) RETURNS double precision
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_now TIMESTAMPTZ := clock_timestamp();
+    v_bucket RECORD;
+    v_elapsed DOUBLE PRECISION;
+    v_requests DOUBLE PRECISION;
+    v_tokens DOUBLE PRECISION;
+    v_needed DOUBLE PRECISION := LEAST(GREATEST(p_tokens, 0), p_tpm);
+BEGIN
+    INSERT INTO openai_rate_limit_buckets (model, request_level, token_level, updated_at)
+    VALUES (p_model, p_rpm, p_tpm, v_now)
+    ON CONFLICT (model) DO NOTHING;
+
+    SELECT * INTO v_bucket FROM openai_rate_limit_buckets WHERE model = p_model FOR UPDATE;
+
+    v_elapsed := GREATEST(EXTRACT(EPOCH FROM (v_now - v_bucket.updated_at)), 0);
+    v_requests := LEAST(p_rpm, v_bucket.request_level + v_elapsed * p_rpm / 60.0);
+    v_tokens := LEAST(p_tpm, v_bucket.token_level + v_elapsed * p_tpm / 60.0);
+
+    IF v_requests >= 1 AND v_tokens >= v_needed THEN
+        UPDATE openai_rate_limit_buckets
+        SET request_level = v_requests - 1, token_level = v_tokens - v_needed, updated_at = v_now
+        WHERE model = p_model;
+        RETURN 0;
+    END IF;
+
+    UPDATE openai_rate_limit_buckets
+    SET request_level = v_requests, token_level = v_tokens, updated_at = v_now
+    WHERE model = p_model;
+
+    RETURN GREATEST(
+        (1 - v_requests) * 60.0 / p_rpm,
+        (v_needed - v_tokens) * 60.0 / p_tpm,
+        0.05
+    );
+END;
+$$;
+
+
+-- OpenAI が返した残量（x-ratelimit-remaining-*）に合わせて共有バケットを減らす
+CREATE OR REPLACE FUNCTION "public"."sync_openai_rate_budget"("p_model" "text", "p_remaining_requests" integer DEFAULT NULL::integer, "p_remaining_tokens" integer DEFAULT NULL::integer) RETURNS "void"
+    LANGUAGE "plpgsql"
+    AS $$
+BEGIN
+    UPDATE openai_rate_limit_buckets
+    SET request_level = LEAST(request_level, COALESCE(p_remaining_requests, request_level)),
+        token_level = LEAST(token_level, COALESCE(p_remaining_tokens, token_level))
+    WHERE model = p_model;
+END;
+$$;
@@ -0,0 +1,87 @@
+-- Graceful drain and orphan recovery for background_tasks
+-- * release_background_tasks: a stopping instance hands its running tasks back as pending
+--   (not counted as a retry) so another instance resumes them immediately.
+-- * requeue_expired_background_tasks: additionally recovers running tasks without a lease whose
+--   heartbeat is stale (started by the pre-lease executor), and marks the process as error when
+--   a task runs out of retries.
+-- Requeued generation_continue tasks become generation_resume: the user input may already be applied
+-- to the saved context, and resume continues from context.current_step without re-applying it.
+
+CREATE OR REPLACE FUNCTION "public"."release_background_tasks"("p_worker_id" "text", "p_task_ids" "uuid"[]) RETURNS integer
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    UPDATE background_tasks
+    SET status = 'pending',
+        task_type = CASE WHEN task_type = 'generation_continue' THEN 'generation_resume' ELSE task_type END,
+        scheduled_for = NOW(),
+        worker_id = NULL,
+        lease_expires_at = NULL,
+        error_message = 'Released by worker ' || p_worker_id || ' during shutdown'
+    WHERE id = ANY(p_task_ids)
+      AND worker_id = p_worker_id
+      AND status = 'running';
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$;
+
+COMMENT ON FUNCTION public.release_background_tasks(text, uuid[])
+    IS '停止するワーカーの実行中タスクを pending に戻す（リトライ回数には数えない）';
+
+
+DROP FUNCTION IF EXISTS public.requeue_expired_background_tasks(integer);
+
+CREATE OR REPLACE FUNCTION "public"."requeue_expired_background_tasks"("p_limit" integer DEFAULT 100, "p_stale_seconds" integer DEFAULT 900) RETURNS integer
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH expired AS (
+        SELECT id
+        FROM background_tasks
+        WHERE status = 'running'
+          AND (
+              (lease_expires_at IS NOT NULL AND lease_expires_at < NOW())
+              OR (lease_expires_at IS NULL AND COALESCE(heartbeat_at, started_at, updated_at) < NOW() - make_interval(secs => p_stale_seconds))
+          )
+        ORDER BY COALESCE(lease_expires_at, heartbeat_at, started_at, updated_at)
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ),
+    requeued AS (
+        UPDATE background_tasks t
+        SET status = CASE WHEN COALESCE(t.retry_count, 0) < COALESCE(t.max_retries, 3) THEN 'pending' ELSE 'failed' END,
+            task_type = CASE WHEN t.task_type = 'generation_continue' THEN 'generation_resume' ELSE t.task_type END,
+            retry_count = COALESCE(t.retry_count, 0) + 1,
+            scheduled_for = NOW(),
+            completed_at = CASE WHEN COALESCE(t.retry_count, 0) < COALESCE(t.max_retries, 3) THEN NULL ELSE NOW() END,
+            error_message = 'Lease expired on worker ' || COALESCE(t.worker_id, 'unknown'),
+            worker_id = NULL,
+            lease_expires_at = NULL
+        FROM expired
+        WHERE t.id = expired.id
+        RETURNING t.process_id, t.status
+    ),
+    failed_processes AS (
+        UPDATE generated_articles_state s
+        SET status = 'error',
+            error_message = 'Background task failed after repeated worker interruptions'
+        FROM requeued
+        WHERE requeued.status = 'failed'
+          AND s.id = requeued.process_id
+          AND s.status NOT IN ('completed', 'cancelled')
+        RETURNING s.id
+    )
+    SELECT COUNT(*) INTO v_count FROM requeued;
+
+    RETURN v_count;
+END;
+$$;
+
+COMMENT ON FUNCTION public.requeue_expired_background_tasks(integer, integer)
+    IS 'リース期限切れ・ハートビート途絶の running タスクを pending に戻す（リトライ上限超過は failed にしてプロセスを error にする）';
@@ -0,0 +1,208 @@
+-- Per-tenant fair-share scheduling for background_tasks
+-- * plan_tiers gets scheduling_weight / max_concurrent_generations (derived from monthly_article_limit;
+--   tune per plan with UPDATE plan_tiers ...).
+-- * Tasks are stamped with their tenant (organization, or the user for personal accounts) and the plan's
+--   weight / in-flight cap on insert.
+-- * claim_background_tasks orders runnable tasks by priority, then by start-time fair queuing:
+--   a tenant's n-th runnable task gets the virtual start (running + n - 1) / weight, so a tenant with 30 queued
+--   articles interleaves with small tenants instead of running all 30 first. Tasks over the tenant's cap stay pending.
+-- * background_task_queue_stats reports per-tenant queue depth for /metrics.
+
+ALTER TABLE public.plan_tiers
+    ADD COLUMN IF NOT EXISTS scheduling_weight integer,
+    ADD COLUMN IF NOT EXISTS max_concurrent_generations integer;
+
+UPDATE public.plan_tiers
+SET scheduling_weight = GREATEST(1, monthly_article_limit / 10)
+WHERE scheduling_weight IS NULL;
+
+UPDATE public.plan_tiers
+SET max_concurrent_generations = LEAST(8, GREATEST(2, monthly_article_limit / 5))
+WHERE max_concurrent_generations IS NULL;
+
+ALTER TABLE public.plan_tiers
+    ALTER COLUMN scheduling_weight SET DEFAULT 1,
+    ALTER COLUMN scheduling_weight SET NOT NULL,
+    ALTER COLUMN max_concurrent_generations SET DEFAULT 2,
+    ALTER COLUMN max_concurrent_generations SET NOT NULL;
+
+COMMENT ON COLUMN public.plan_tiers.scheduling_weight IS '生成タスクの公平キューでの重み（大きいほど多く実行枠を得る）';
+COMMENT ON COLUMN public.plan_tiers.max_concurrent_generations IS 'テナントあたりの同時実行生成タスク数の上限';
+
+
+ALTER TABLE public.background_tasks
+    ADD COLUMN IF NOT EXISTS tenant_id text,
+    ADD COLUMN IF NOT EXISTS tenant_weight integer DEFAULT 1 NOT NULL,
+    ADD COLUMN IF NOT EXISTS tenant_max_running integer;
+
+CREATE INDEX IF NOT EXISTS idx_background_tasks_tenant_running
+    ON public.background_tasks (tenant_id)
+    WHERE (status = 'running'::text);
+
+
+-- テナント（組織があれば組織、なければユーザー）と契約プランのスケジューリング設定を返す
+CREATE OR REPLACE FUNCTION "public"."resolve_generation_tenant"("p_user_id" "text", "p_organization_id" "uuid" DEFAULT NULL::"uuid") RETURNS TABLE("tenant_id" "text", "weight" integer, "max_running" integer)
+    LANGUAGE "plpgsql" STABLE
+    AS $$
+DECLARE
+    v_tier TEXT;
+BEGIN
+    IF p_organization_id IS NOT NULL THEN
+        SELECT s.plan_tier_id INTO v_tier
+        FROM organization_subscriptions s
+        WHERE s.organization_id = p_organization_id
+          AND s.status IN ('active', 'trialing')
+        ORDER BY s.current_period_end DESC
+        LIMIT 1;
+    ELSE
+        SELECT s.plan_tier_id INTO v_tier
+        FROM user_subscriptions s
+        WHERE s.user_id = p_user_id
+          AND s.status = 'active';
+    END IF;
+
+    RETURN QUERY
+    SELECT COALESCE('org:' || p_organization_id::text, 'user:' || p_user_id),
+           COALESCE(pt.scheduling_weight, 1),
+           COALESCE(pt.max_concurrent_generations, 2)
+    FROM (SELECT COALESCE(v_tier, 'free') AS id) tier
+    LEFT JOIN plan_tiers pt ON pt.id = tier.id;
+END;
+$$;
+
+COMMENT ON FUNCTION public.resolve_generation_tenant(text, uuid)
+    IS '生成ワークロードの公平キュー用にテナントIDとプランの重み・同時実行上限を返す';
+
+
+CREATE OR REPLACE FUNCTION "public"."set_background_task_tenant"() RETURNS "trigger"
+    LANGUAGE "plpgsql"
+    AS $$
+DECLARE
+    v_user_id TEXT;
+    v_organization_id UUID;
+BEGIN
+    IF NEW.tenant_id IS NOT NULL THEN
+        RETURN NEW;
+    END IF;
+
+    SELECT s.user_id, s.organization_id INTO v_user_id, v_organization_id
+    FROM generated_articles_state s
+    WHERE s.id = NEW.process_id;
+
+    IF v_user_id IS NULL THEN
+        v_user_id := NEW.task_data ->> 'user_id';
+        v_organization_id := NULLIF(NEW.task_data ->> 'organization_id', '')::uuid;
+    END IF;
+
+    IF v_user_id IS NOT NULL OR v_organization_id IS NOT NULL THEN
+        SELECT r.tenant_id, r.weight, r.max_running
+        INTO NEW.tenant_id, NEW.tenant_weight, NEW.tenant_max_running
+        FROM resolve_generation_tenant(v_user_id, v_organization_id) r;
+    END IF;
+
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_set_background_task_tenant ON public.background_tasks;
+CREATE TRIGGER trigger_set_background_task_tenant
+    BEFORE INSERT ON public.background_tasks
+    FOR EACH ROW
+    EXECUTE FUNCTION public.set_background_task_tenant();
+
+-- 既存の未完了タスクにもテナントを設定する
+UPDATE public.background_tasks t
+SET tenant_id = r.tenant_id,
+    tenant_weight = r.weight,
+    tenant_max_running = r.max_running
+FROM public.generated_articles_state s,
+     LATERAL public.resolve_generation_tenant(s.user_id, s.organization_id) r
+WHERE s.id = t.process_id
+  AND t.tenant_id IS NULL
+  AND t.status IN ('pending', 'running');
+
+
+CREATE OR REPLACE FUNCTION "public"."claim_background_tasks"("p_worker_id" "text", "p_worker_hostname" "text" DEFAULT NULL::"text", "p_limit" integer DEFAULT 1, "p_lease_seconds" integer DEFAULT 120, "p_task_types" "text"[] DEFAULT NULL::"text"[]) RETURNS SETOF "public"."background_tasks"
+    LANGUAGE "plpgsql"
+    AS $$
+BEGIN
+    -- テナントごとの実行中件数を正しく数えるため、確保処理は直列化する（確保自体は数ミリ秒で終わる）
+    PERFORM pg_advisory_xact_lock(hashtext('claim_background_tasks'));
+
+    RETURN QUERY
+    WITH running AS (
+        SELECT r.tenant_id, COUNT(*) AS running_count
+        FROM background_tasks r
+        WHERE r.status = 'running'
+          AND r.tenant_id IS NOT NULL
+        GROUP BY r.tenant_id
+    ),
+    runnable AS (
+        SELECT t.id,
+               t.priority,
+               t.created_at,
+               t.tenant_max_running,
+               GREATEST(t.tenant_weight, 1) AS weight,
+               COALESCE(running.running_count, 0) AS running_count,
+               ROW_NUMBER() OVER (
+                   PARTITION BY COALESCE(t.tenant_id, t.id::text)
+                   ORDER BY t.priority DESC, t.created_at ASC
+               ) AS tenant_rank
+        FROM background_tasks t
+        LEFT JOIN running ON running.tenant_id = t.tenant_id
+        WHERE t.status = 'pending'
+          AND t.scheduled_for <= NOW()
+          AND (p_task_types IS NULL OR t.task_type = ANY(p_task_types))
+          AND (t.depends_on = '{}' OR NOT EXISTS (
+              SELECT 1 FROM background_tasks dep
+              WHERE dep.id = ANY(t.depends_on)
+                AND dep.status NOT IN ('completed', 'cancelled')
+          ))
+    ),
+    fair AS (
+        SELECT runnable.id
+        FROM runnable
+        WHERE runnable.tenant_max_running IS NULL
+           OR runnable.running_count + runnable.tenant_rank <= runnable.tenant_max_running
+        ORDER BY runnable.priority DESC,
+                 (runnable.running_count + runnable.tenant_rank - 1)::numeric / runnable.weight ASC,
+                 runnable.created_at ASC
+        LIMIT GREATEST(p_limit, 0)
+    ),
+    candidates AS (
+        SELECT t.id
+        FROM background_tasks t
+        WHERE t.id IN (SELECT fair.id FROM fair)
+          AND t.status = 'pending'
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE background_tasks t
+    SET status = 'running',
+        worker_id = p_worker_id,
+        worker_hostname = p_worker_hostname,
+        heartbeat_at = NOW(),
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    FROM candidates
+    WHERE t.id = candidates.id
+    RETURNING t.*;
+END;
+$$;
+
+COMMENT ON FUNCTION public.claim_background_tasks(text, text, integer, integer, text[])
+    IS '実行可能な pending タスクを優先度・テナントの重み付き公平順で確保し、リース付きで running にする（テナントの同時実行上限を超える分は確保しない）';
+
+
+CREATE OR REPLACE FUNCTION "public"."background_task_queue_stats"() RETURNS TABLE("tenant_id" "text", "pending" integer, "running" integer, "oldest_pending_seconds" double precision)
+    LANGUAGE "sql" STABLE
+    AS $$
+    SELECT COALESCE(t.tenant_id, 'unknown'),
+           COUNT(*) FILTER (WHERE t.status = 'pending')::integer,
+           COUNT(*) FILTER (WHERE t.status = 'running')::integer,
+           COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(GREATEST(t.created_at, t.scheduled_for)) FILTER (WHERE t.status = 'pending')), 0)::double precision
+    FROM background_tasks t
+    WHERE t.status IN ('pending', 'running')
+    GROUP BY COALESCE(t.tenant_id, 'unknown');
+$$;
+
+COMMENT ON FUNCTION public.background_task_queue_stats()
+    IS 'テナントごとの待機・実行中タスク数と最も古い待機タスクの待ち時間（/metrics 用）';
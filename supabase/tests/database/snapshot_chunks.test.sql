@@ -0,0 +1,55 @@
+-- チャンク化スナップショット（20261016120000_add_content_addressed_snapshot_chunks）のテスト
+-- 実行: supabase test db
+begin;
+create extension if not exists pgtap with schema extensions;
+
+select plan(4);
+
+insert into generated_articles_state (id, user_id, article_context, current_step_name)
+values ('00000000-0000-0000-0000-0000000000a1', 'test-user', '{"keywords": ["before"]}', 'keyword_analyzing');
+
+-- 記事コンテキストをチャンク参照で保存する（article_context 列には '{}' が入る）
+create temporary table chunked_snapshot on commit drop as
+select save_step_snapshot_chunked(
+    '00000000-0000-0000-0000-0000000000a1',
+    'outline_generated',
+    '{"keywords": "hash-keywords", "outline": "hash-outline"}'::jsonb,
+    '{"hash-keywords": ["seo", "blog"], "hash-outline": {"title": "見出し"}}'::jsonb
+) as snapshot_id;
+
+select is(
+    (select article_context from article_generation_step_snapshots
+     where id = (select snapshot_id from chunked_snapshot)),
+    '{}'::jsonb,
+    'chunked snapshot stores an empty article_context'
+);
+
+-- プロセス側のコンテキストを別の状態にしてからブランチを切り替える
+update generated_articles_state
+set article_context = '{"keywords": ["other"]}'
+where id = '00000000-0000-0000-0000-0000000000a1';
+
+select ok(
+    switch_to_branch(
+        '00000000-0000-0000-0000-0000000000a1',
+        (select branch_id from article_generation_step_snapshots
+         where id = (select snapshot_id from chunked_snapshot))
+    ),
+    'switch_to_branch succeeds for a chunked snapshot'
+);
+
+select is(
+    (select article_context from generated_articles_state
+     where id = '00000000-0000-0000-0000-0000000000a1'),
+    '{"keywords": ["seo", "blog"], "outline": {"title": "見出し"}}'::jsonb,
+    'switch_to_branch restores the assembled context'
+);
+
+select is(
+    get_snapshot_details((select snapshot_id from chunked_snapshot)) -> 'article_context',
+    '{"keywords": ["seo", "blog"], "outline": {"title": "見出し"}}'::jsonb,
+    'get_snapshot_details returns the assembled context'
+);
+
+select * from finish();
+rollback;